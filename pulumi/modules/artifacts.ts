@@ -67,6 +67,29 @@ export function createArtifacts(namePrefix: string, tags: Tags) {
   const staticBucket = secureBucket("static-assets-bucket", `${namePrefix}-static-assets`, tags);
   const mediaBucket = publicReadBucket("media-assets-bucket", `${namePrefix}-media-assets`, tags);
 
+  // Browsers (app and embedded widgets) PUT attachment parts straight to the
+  // bucket through presigned multipart URLs and need each part's ETag back.
+  new aws.s3.BucketCorsConfigurationV2("media-assets-bucket-cors", {
+    bucket: mediaBucket.id,
+    corsRules: [{
+      allowedMethods: ["PUT"],
+      allowedOrigins: ["*"],
+      allowedHeaders: ["*"],
+      exposeHeaders: ["ETag"],
+      maxAgeSeconds: 3000,
+    }],
+  });
+
+  new aws.s3.BucketLifecycleConfigurationV2("media-assets-bucket-lifecycle", {
+    bucket: mediaBucket.id,
+    rules: [{
+      id: "abort-incomplete-multipart-uploads",
+      status: "Enabled",
+      filter: {},
+      abortIncompleteMultipartUpload: { daysAfterInitiation: 1 },
+    }],
+  });
+
   const djangoRepo = new aws.ecr.Repository("django-repo", {
     name: `${namePrefix}-django`,
     imageTagMutability: "MUTABLE",
@@ -60,7 +60,14 @@ export function createAppServices(args: {
       Version: "2012-10-17",
       Statement: [{
         Effect: "Allow",
-        Action: ["s3:PutObject", "s3:GetObject", "s3:DeleteObject", "s3:ListBucket"],
+        Action: [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject",
+          "s3:ListBucket",
+          "s3:AbortMultipartUpload",
+          "s3:ListMultipartUploadParts",
+        ],
         Resource: [arn, `${arn}/*`],
       }],
     })),
@@ -126,7 +133,7 @@ export function createAppServices(args: {
     { name: "CORS_ORIGINS", value: config.corsOrigins },
     { name: "FRONTEND_URL", value: frontendUrl },
     { name: "MCP_POLL_TIMEOUT_SEC", value: "240" },
-    { name: "MCP_POLL_INTERVAL_SEC", value: "2" },
+    { name: "MCP_PROGRESS_INTERVAL_SEC", value: "5" },
   ];
 
   const djangoTaskDefinition = new aws.ecs.TaskDefinition("django-task", {
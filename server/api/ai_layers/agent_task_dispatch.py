@@ -30,6 +30,10 @@ from api.ai_layers.mcp_access import MCP_BASIC_TOOL_NAMES
 
 DEFAULT_MCP_TOOL_NAMES = list(MCP_BASIC_TOOL_NAMES)
 
+# Published on the notifications channel when an MCP-dispatched run finishes;
+# the streaming MCP gateway wakes the tool call waiting on that task.
+MCP_TASK_FINISHED_EVENT = "mcp_task_finished"
+
 logger = logging.getLogger(__name__)
 
 
@@ -331,7 +335,7 @@ def dispatch_conversation_agent_task(
 
     if mcp_client_id:
         cache.set(
-            f"mcp_task_{task.id}",
+            mcp_task_cache_key(task.id),
             {
                 "user_id": user.id,
                 "mcp_client_id": mcp_client_id,
@@ -345,3 +349,26 @@ def dispatch_conversation_agent_task(
         task_id=task.id,
         conversation_id=str(conversation_id),
     )
+
+
+def mcp_task_cache_key(task_id: str) -> str:
+    return f"mcp_task_{task_id}"
+
+
+def publish_mcp_task_finished(task_id: str, state: str | None = None) -> bool:
+    """Push completion of an MCP-dispatched agent run; False for other tasks."""
+    if not task_id or cache.get(mcp_task_cache_key(task_id)) is None:
+        return False
+    from api.notify.actions import notify_route
+
+    try:
+        notify_route(
+            f"mcp_task:{task_id}",
+            MCP_TASK_FINISHED_EVENT,
+            {"task_id": str(task_id), "state": state},
+        )
+    except Exception:
+        # The gateway falls back to a slow result check.
+        logger.warning("Could not publish MCP completion for task %s", task_id, exc_info=True)
+        return False
+    return True
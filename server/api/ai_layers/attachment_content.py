@@ -0,0 +1,107 @@
+"""
+Per-attachment content cache used by ``read_attachment``.
+
+PDFs and images are uploaded once to the OpenAI Files API with an expiry;
+questions then reference the returned file id instead of sending the file
+inline. Office and text documents are converted to text once and the text is
+kept. Both live in ``AttachmentContentCache`` and are rebuilt when the
+attachment's file changes or the provider file has expired.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import AttachmentContentCache
+
+logger = logging.getLogger(__name__)
+
+# Provider files delete themselves after this long.
+PROVIDER_FILE_TTL = timedelta(days=7)
+# Stop referencing a provider file this long before it expires.
+PROVIDER_FILE_EXPIRY_MARGIN = timedelta(hours=1)
+# Formats read by the model from the provider file (layout and page images
+# matter); other documents are converted to text locally when possible.
+PROVIDER_FILE_FORMATS = {"pdf"}
+
+
+def content_cache_for(att) -> AttachmentContentCache:
+    """Cache row for ``att``; reset when the attachment now points at another file."""
+    source_name = att.file.name if att.file else ""
+    cache, created = AttachmentContentCache.objects.get_or_create(
+        attachment=att, defaults={"source_name": source_name}
+    )
+    if not created and cache.source_name != source_name:
+        cache.source_name = source_name
+        cache.provider_file_id = ""
+        cache.provider_file_expires_at = None
+        cache.extracted_text = None
+        cache.save()
+    return cache
+
+
+def attachment_filename(att) -> str:
+    return att.file.name.split("/")[-1] if att.file.name else f"file_{att.id}"
+
+
+def provider_file_id(client, att, cache: AttachmentContentCache, *, purpose: str) -> str:
+    """Provider file id for the attachment, uploading it when there is no live one."""
+    now = timezone.now()
+    if (
+        cache.provider_file_id
+        and cache.provider_file_expires_at
+        and cache.provider_file_expires_at > now
+    ):
+        return cache.provider_file_id
+
+    with att.file.open("rb") as f:
+        uploaded = client.files.create(
+            file=(attachment_filename(att), f, att.content_type or "application/octet-stream"),
+            purpose=purpose,
+            expires_after={
+                "anchor": "created_at",
+                "seconds": int(PROVIDER_FILE_TTL.total_seconds()),
+            },
+        )
+    cache.provider_file_id = uploaded.id
+    cache.provider_file_expires_at = now + PROVIDER_FILE_TTL - PROVIDER_FILE_EXPIRY_MARGIN
+    cache.save(update_fields=["provider_file_id", "provider_file_expires_at", "updated_at"])
+    return cache.provider_file_id
+
+
+def forget_provider_file(cache: AttachmentContentCache) -> None:
+    """Drop a provider file id the provider no longer accepts."""
+    cache.provider_file_id = ""
+    cache.provider_file_expires_at = None
+    cache.save(update_fields=["provider_file_id", "provider_file_expires_at", "updated_at"])
+
+
+def extracted_text(att, cache: AttachmentContentCache) -> str:
+    """
+    Locally extracted text for office and text documents; "" for PDFs and for
+    files that could not be converted, which are read through the provider file.
+    """
+    if cache.extracted_text is not None:
+        return cache.extracted_text
+
+    from api.rag.actions import infer_upload_format, read_file_content
+
+    text = ""
+    with att.file.open("rb") as f:
+        fmt = infer_upload_format(
+            f, content_type=att.content_type, fallback_name=attachment_filename(att)
+        )
+        if fmt not in PROVIDER_FILE_FORMATS:
+            try:
+                text, _ = read_file_content(
+                    f, content_type=att.content_type, fallback_name=attachment_filename(att)
+                )
+            except Exception:
+                logger.warning("Could not extract text from attachment %s", att.id, exc_info=True)
+                text = ""
+    cache.extracted_text = (text or "").strip()
+    cache.save(update_fields=["extracted_text", "updated_at"])
+    return cache.extracted_text
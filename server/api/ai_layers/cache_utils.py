@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth.models import User
 
 AGENT_LIST_VERSION_TIMEOUT_SECONDS = 60 * 60 * 24 * 30
 
+# Published on the notifications channel; the streaming MCP gateway drops its
+# cached agent catalogs when it sees this event.
+MCP_AGENTS_CHANGED_EVENT = "mcp_agents_changed"
+
 def _agent_list_version_key(user_id: int, org_id: str) -> str:
     return f"agent_list_v_{user_id}_{org_id}"
 
@@ -32,11 +37,28 @@ def bump_agent_list_version(user_id: int, org_id: str) -> None:
         v = 1
     cache.set(key, v + 1, timeout=AGENT_LIST_VERSION_TIMEOUT_SECONDS)
 
-def bump_agent_list_version_for_user(user_id: int, org_id: str | None) -> None:
+def notify_mcp_agents_changed() -> None:
+    """Tell the MCP gateway to refetch agent catalogs once the current transaction commits."""
+    from api.notify.actions import notify_route
+
+    def _publish():
+        try:
+            notify_route("mcp", MCP_AGENTS_CHANGED_EVENT, {})
+        except Exception:
+            # The gateway's catalog TTL still bounds staleness.
+            pass
+
+    transaction.on_commit(_publish)
+
+def _bump_user_versions(user_id: int, org_id: str | None) -> None:
     bump_agent_list_version(user_id, "no_org")
     if org_id:
         bump_agent_list_version(user_id, str(org_id))
 
+def bump_agent_list_version_for_user(user_id: int, org_id: str | None) -> None:
+    _bump_user_versions(user_id, org_id)
+    notify_mcp_agents_changed()
+
 def bump_agent_list_version_for_org_members(organization) -> None:
     """
     Bump agent list versions for all org members + owner.
@@ -59,5 +81,6 @@ def bump_agent_list_version_for_org_members(organization) -> None:
         Q(profile__organization=org) | Q(id=org.owner_id)
     ).distinct()
     for u in members:
-        bump_agent_list_version_for_user(u.id, org_id)
+        _bump_user_versions(u.id, org_id)
+    notify_mcp_agents_changed()
 
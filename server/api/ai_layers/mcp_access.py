@@ -99,6 +99,7 @@ MCP_WHATSAPP_TOOL_NAMES: tuple[str, ...] = (
     "list_whatsapp_resources",
     "list_whatsapp_templates",
     "send_ws_template_message",
+    "broadcast_ws_template_message",
 )
 
 MCP_CALENDAR_TOOL_NAMES: tuple[str, ...] = (
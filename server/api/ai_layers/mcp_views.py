@@ -16,7 +16,7 @@ from django.http import FileResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from api.ai_layers.agent_task_dispatch import dispatch_conversation_agent_task
+from api.ai_layers.agent_task_dispatch import dispatch_conversation_agent_task, mcp_task_cache_key
 from api.ai_layers.mcp_access import (
     MCP_TOOL_PRESETS,
     agent_to_mcp_tool_payload,
@@ -56,7 +56,7 @@ def _require_integrations_management(request):
     return None
 
 def _mcp_task_authorized(request, task_id: str) -> bool:
-    meta = cache.get(f"mcp_task_{task_id}")
+    meta = cache.get(mcp_task_cache_key(task_id))
     if not meta:
         return False
     return (
@@ -204,7 +204,7 @@ def mcp_task_result(request, task_id: str):
             "iterations": payload.get("iterations"),
             "tool_calls_count": payload.get("tool_calls_count"),
             "attachments": attachments,
-            "conversation_id": cache.get(f"mcp_task_{task_id}", {}).get(
+            "conversation_id": cache.get(mcp_task_cache_key(task_id), {}).get(
                 "conversation_id"
             ),
         }
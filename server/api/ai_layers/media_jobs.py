@@ -0,0 +1,331 @@
+"""
+Long-running media generations (Veo videos, Gamma files, Runway clips).
+
+The tool that starts a generation submits it, stores the provider's operation
+id on a ``MediaGenerationJob`` and returns right away, so no worker sleeps
+while the provider renders. ``poll_media_generation_jobs`` runs from beat and
+hands each due job to ``poll_media_generation_job``, which asks the provider
+once:
+
+- still running: the job is checked again after the provider's interval;
+- finished: the provider's ``finish`` hook stores the result as an attachment,
+  which is posted to the conversation as an assistant message (and sent over
+  WhatsApp for WhatsApp threads);
+- failed or past its deadline: the conversation gets a short assistant message
+  with the reason.
+
+Each check claims the job by moving ``next_poll_at`` forward in one UPDATE, so
+overlapping beats or redelivered tasks never poll or finish a job twice. The
+result is downloaded and stored under that lease, outside any transaction; only
+the job row update and the result message are written atomically, and only while
+the lease is still ours.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MediaGenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Due jobs handed to workers per beat; the rest wait for the next beat.
+MEDIA_JOB_POLL_BATCH = 200
+# A finished job is leased this long while its result is downloaded and stored.
+MEDIA_JOB_FINISH_LEASE = timedelta(minutes=10)
+
+
+class MediaGenerationFailed(Exception):
+    """The provider reported a terminal failure; the message is shown to the user."""
+
+
+@dataclass(frozen=True)
+class MediaProvider:
+    poll_interval: timedelta
+    timeout: timedelta
+    # (job) -> provider payload once finished, None while still running.
+    check: Callable[[MediaGenerationJob], Any]
+    # (job, payload) -> stored attachment to post, or None when the hook
+    # delivered the result itself.
+    finish: Callable[[MediaGenerationJob, Any], Any]
+    ready_text: str = "Your file is ready."
+    failed_text: str = "The file could not be generated"
+
+
+def media_providers() -> dict[str, MediaProvider]:
+    from api.tools.actions import check_runway_job, finish_runway_job
+
+    from .tools.generate_gamma_presentation import check_gamma_job, finish_gamma_job
+    from .tools.generate_video import check_veo_job, finish_veo_job
+
+    return {
+        MediaGenerationJob.Provider.VEO: MediaProvider(
+            poll_interval=timedelta(seconds=15),
+            timeout=timedelta(minutes=6),
+            check=check_veo_job,
+            finish=finish_veo_job,
+            ready_text="Your video is ready.",
+            failed_text="The video could not be generated",
+        ),
+        MediaGenerationJob.Provider.GAMMA: MediaProvider(
+            poll_interval=timedelta(seconds=10),
+            timeout=timedelta(minutes=6),
+            check=check_gamma_job,
+            finish=finish_gamma_job,
+        ),
+        MediaGenerationJob.Provider.RUNWAY: MediaProvider(
+            poll_interval=timedelta(seconds=10),
+            timeout=timedelta(minutes=10),
+            check=check_runway_job,
+            finish=finish_runway_job,
+        ),
+    }
+
+
+def start_media_job(
+    *,
+    provider: str,
+    operation_id: str,
+    conversation,
+    user=None,
+    agent=None,
+    message=None,
+    params: dict | None = None,
+) -> MediaGenerationJob:
+    """Record a submitted generation; its first check runs one interval from now."""
+    settings = media_providers()[provider]
+    now = timezone.now()
+    return MediaGenerationJob.objects.create(
+        provider=provider,
+        operation_id=operation_id,
+        conversation=conversation,
+        user=user,
+        agent=agent,
+        message=message,
+        params=params or {},
+        next_poll_at=now + settings.poll_interval,
+        deadline_at=now + settings.timeout,
+    )
+
+
+def dispatch_due_media_jobs(*, now=None) -> int:
+    from .tasks import poll_media_generation_job
+
+    now = now or timezone.now()
+    ids = list(
+        MediaGenerationJob.objects.filter(
+            status=MediaGenerationJob.Status.PENDING, next_poll_at__lte=now
+        )
+        .order_by("next_poll_at")
+        .values_list("id", flat=True)[:MEDIA_JOB_POLL_BATCH]
+    )
+    for job_id in ids:
+        poll_media_generation_job.delay(str(job_id))
+    return len(ids)
+
+
+def _claim(job: MediaGenerationJob, until) -> bool:
+    claimed = MediaGenerationJob.objects.filter(
+        id=job.id,
+        status=MediaGenerationJob.Status.PENDING,
+        next_poll_at=job.next_poll_at,
+    ).update(next_poll_at=until, attempts=F("attempts") + 1)
+    if claimed:
+        job.next_poll_at = until
+    return bool(claimed)
+
+
+def poll_media_job(job_id, *, now=None) -> str:
+    """Check one due job with its provider; returns the outcome."""
+    now = now or timezone.now()
+    job = (
+        MediaGenerationJob.objects.select_related("conversation")
+        .filter(id=job_id, status=MediaGenerationJob.Status.PENDING)
+        .first()
+    )
+    if job is None:
+        return "gone"
+    if job.next_poll_at > now:
+        return "not_due"
+    provider = media_providers()[job.provider]
+    if not _claim(job, now + provider.poll_interval):
+        return "claimed_elsewhere"
+
+    try:
+        payload = provider.check(job)
+    except MediaGenerationFailed as exc:
+        fail_media_job(job, str(exc))
+        return "failed"
+    except Exception:
+        # Network errors and provider hiccups: try again next interval.
+        logger.warning("Media job %s check failed", job.id, exc_info=True)
+        payload = None
+
+    if payload is None:
+        if now >= job.deadline_at:
+            fail_media_job(job, "timed out")
+            return "failed"
+        return "pending"
+
+    if not _claim(job, now + MEDIA_JOB_FINISH_LEASE):
+        return "claimed_elsewhere"
+    try:
+        # Slow network and storage I/O: no transaction or row lock is held here.
+        attachment = provider.finish(job, payload)
+    except Exception as exc:
+        logger.exception("Media job %s could not store its result", job.id)
+        fail_media_job(job, str(exc))
+        return "failed"
+
+    try:
+        with transaction.atomic():
+            finished = MediaGenerationJob.objects.filter(
+                id=job.id,
+                status=MediaGenerationJob.Status.PENDING,
+                next_poll_at=job.next_poll_at,
+            ).update(
+                status=MediaGenerationJob.Status.SUCCEEDED,
+                attachment=attachment,
+                finished_at=timezone.now(),
+            )
+            if finished and attachment is not None:
+                post_media_result(job, attachment, provider.ready_text)
+    except Exception as exc:
+        logger.exception("Media job %s could not record its result", job.id)
+        _discard_attachment(attachment)
+        fail_media_job(job, str(exc))
+        return "failed"
+    if not finished:
+        # The lease ran out while storing and the job was finished or failed elsewhere.
+        logger.warning("Media job %s lost its lease before recording its result", job.id)
+        _discard_attachment(attachment)
+        return "claimed_elsewhere"
+    return "succeeded"
+
+
+def _discard_attachment(attachment) -> None:
+    if attachment is None:
+        return
+    try:
+        if attachment.file:
+            attachment.file.delete(save=False)
+        attachment.delete()
+    except Exception:
+        logger.exception("Could not discard orphaned media attachment %s", attachment.id)
+
+
+def fail_media_job(job: MediaGenerationJob, reason: str) -> bool:
+    updated = MediaGenerationJob.objects.filter(
+        id=job.id, status=MediaGenerationJob.Status.PENDING
+    ).update(
+        status=MediaGenerationJob.Status.FAILED,
+        error=reason[:2000],
+        finished_at=timezone.now(),
+    )
+    if not updated:
+        return False
+    logger.warning("Media job %s (%s) failed: %s", job.id, job.provider, reason)
+    if job.message_id is None:
+        provider = media_providers()[job.provider]
+        try:
+            post_media_result(job, None, f"{provider.failed_text}: {reason}")
+        except Exception:
+            logger.exception("Could not report failed media job %s", job.id)
+    return True
+
+
+def post_media_result(job: MediaGenerationJob, attachment, text: str):
+    """Post the job outcome as an assistant message and push it to the user's channel."""
+    from api.messaging.models import Message
+    from api.messaging.takeover import emit_message_created
+    from api.notify.actions import notify_user
+
+    from .tasks import _message_attachment_to_display_dict
+
+    conversation = job.conversation
+    descriptor = (
+        _message_attachment_to_display_dict(attachment) if attachment is not None else None
+    )
+    if descriptor:
+        link = "![Video]" if attachment.content_type.startswith("video/") else "[Download file]"
+        text = f"{text}\n\n{link}(attachment:{attachment.id})"
+
+    msg = Message.objects.create(
+        conversation=conversation,
+        type="assistant",
+        text=text,
+        metadata={"media_generation_job_id": str(job.id)},
+        attachments=[descriptor] if descriptor else [],
+    )
+    if attachment is not None:
+        attachment.message = msg
+        attachment.save(update_fields=["message"])
+
+    def _deliver():
+        if conversation.ws_number_id and conversation.whatsapp_user_number:
+            from api.whatsapp.actions import send_message as send_text_message
+            from api.whatsapp.outbound_media import deliver_whatsapp_attachments
+
+            if attachment is not None:
+                deliver_whatsapp_attachments(
+                    phone_number_id=conversation.ws_number.platform_id,
+                    to=conversation.whatsapp_user_number,
+                    assistant_message=msg,
+                )
+            else:
+                send_text_message(
+                    conversation.ws_number.platform_id,
+                    conversation.whatsapp_user_number,
+                    text,
+                    None,
+                )
+        elif conversation.widget_visitor_session_id:
+            agent = job.agent
+            notify_user(
+                f"widget_session:{conversation.widget_visitor_session_id}",
+                "agent_loop_finished",
+                {
+                    "conversation_id": str(conversation.id),
+                    "output": msg.text,
+                    "message_id": msg.id,
+                    "versions": [
+                        {
+                            "text": msg.text,
+                            "type": "assistant",
+                            "agent_slug": agent.slug if agent else None,
+                            "agent_name": agent.name if agent else None,
+                        }
+                    ],
+                    "iterations": 0,
+                    "tool_calls_count": 0,
+                },
+            )
+        if job.user_id:
+            notify_user(
+                job.user_id,
+                "media_generation_finished",
+                {
+                    "conversation_id": str(conversation.id),
+                    "message_id": msg.id,
+                    "job_id": str(job.id),
+                    "status": "succeeded" if attachment is not None else "failed",
+                    "attachment": descriptor,
+                },
+            )
+        emit_message_created([job.user_id] if job.user_id else None, conversation, msg)
+
+    def _deliver_safely():
+        try:
+            _deliver()
+        except Exception:
+            logger.exception("Could not deliver media job %s result", job.id)
+
+    transaction.on_commit(_deliver_safely)
+    return msg
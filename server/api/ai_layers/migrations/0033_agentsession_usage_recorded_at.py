@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_layers', '0032_alter_agent_pre_approved_tools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentsession',
+            name='usage_recorded_at',
+            field=models.DateTimeField(blank=True, help_text="Set when this session's LLM usage was billed; guards against double billing.", null=True),
+        ),
+    ]
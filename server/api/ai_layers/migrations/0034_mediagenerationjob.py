@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_layers', '0033_agentsession_usage_recorded_at'),
+        ('messaging', '0040_conversation_analysis_scheduling'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaGenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('provider', models.CharField(choices=[('veo', 'Google Veo'), ('gamma', 'Gamma'), ('runway', 'Runway')], max_length=16)),
+                ('operation_id', models.CharField(help_text='Provider-side id of the running generation (operation name, generationId, task id).', max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Request parameters needed to store the result (prompt, formats, filename...).')),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_poll_at', models.DateTimeField()),
+                ('deadline_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_generation_jobs', to='ai_layers.agent')),
+                ('attachment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.messageattachment')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_generation_jobs', to='messaging.conversation')),
+                ('message', models.ForeignKey(blank=True, help_text='Message that receives the result; when empty a new assistant message is posted.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_generation_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_poll_at'], name='media_job_due')],
+            },
+        ),
+    ]
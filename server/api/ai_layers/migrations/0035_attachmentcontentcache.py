@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_layers', '0034_mediagenerationjob'),
+        ('messaging', '0040_conversation_analysis_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentContentCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(help_text='Storage name of the file this cache was built from.', max_length=500)),
+                ('provider_file_id', models.CharField(blank=True, default='', max_length=255)),
+                ('provider_file_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('extracted_text', models.TextField(blank=True, help_text='Locally extracted text; empty when the format has none, null when not extracted yet.', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attachment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='content_cache', to='messaging.messageattachment')),
+            ],
+        ),
+    ]
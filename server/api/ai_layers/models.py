@@ -297,6 +297,11 @@ class AgentSession(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     ended_at = models.DateTimeField(null=True, blank=True)
     dismissed_at = models.DateTimeField(null=True, blank=True)
+    usage_recorded_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set when this session's LLM usage was billed; guards against double billing.",
+    )
 
     class Meta:
         ordering = ["-started_at"]
@@ -393,3 +398,121 @@ class MCPClient(models.Model):
         if not key:
             return None
         return cls.objects.filter(key=key, revoked=False).select_related("user").first()
+
+class MediaGenerationJob(models.Model):
+    """
+    A long-running media generation submitted to an external provider.
+
+    The tool that starts it stores the provider's operation id and returns;
+    ``api.ai_layers.media_jobs`` polls the provider and delivers the result
+    into the conversation (see that module).
+    """
+
+    class Provider(models.TextChoices):
+        VEO = "veo", "Google Veo"
+        GAMMA = "gamma", "Gamma"
+        RUNWAY = "runway", "Runway"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider = models.CharField(max_length=16, choices=Provider.choices)
+    operation_id = models.CharField(
+        max_length=500,
+        help_text="Provider-side id of the running generation (operation name, generationId, task id).",
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    conversation = models.ForeignKey(
+        "messaging.Conversation",
+        on_delete=models.CASCADE,
+        related_name="media_generation_jobs",
+    )
+    message = models.ForeignKey(
+        "messaging.Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Message that receives the result; when empty a new assistant message is posted.",
+    )
+    user = models.ForeignKey(
+        "auth.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="media_generation_jobs",
+    )
+    agent = models.ForeignKey(
+        "ai_layers.Agent",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="media_generation_jobs",
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Request parameters needed to store the result (prompt, formats, filename...).",
+    )
+    attachment = models.ForeignKey(
+        "messaging.MessageAttachment",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    next_poll_at = models.DateTimeField()
+    deadline_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["next_poll_at"],
+                name="media_job_due",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"MediaGenerationJob({self.id}) {self.provider}:{self.status}"
+
+
+class AttachmentContentCache(models.Model):
+    """
+    Reusable content of a message attachment for ``read_attachment``.
+
+    Holds the provider Files API id the file was uploaded under (until it
+    expires) and the text extracted locally, so follow-up questions about the
+    same attachment neither re-read the file from storage nor re-upload it.
+    """
+
+    attachment = models.OneToOneField(
+        "messaging.MessageAttachment",
+        on_delete=models.CASCADE,
+        related_name="content_cache",
+    )
+    source_name = models.CharField(
+        max_length=500,
+        help_text="Storage name of the file this cache was built from.",
+    )
+    provider_file_id = models.CharField(max_length=255, blank=True, default="")
+    provider_file_expires_at = models.DateTimeField(null=True, blank=True)
+    extracted_text = models.TextField(
+        null=True,
+        blank=True,
+        help_text="Locally extracted text; empty when the format has none, null when not extracted yet.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"AttachmentContentCache({self.attachment_id})"
@@ -44,6 +44,7 @@ def platform_assistant_task(
         _resolve_user_inputs_and_attachments,
         _serialize_prev_messages,
     )
+    from api.consumption.usage_capture import enqueue_agent_session_usage
     from api.messaging.models import Conversation, Message
     from api.messaging.takeover import is_takeover_active
     from api.notify.actions import notify_user
@@ -347,6 +348,7 @@ def platform_assistant_task(
         )
         session.assistant_message = assistant_msg
         session.save(update_fields=["assistant_message"])
+        enqueue_agent_session_usage([session])
 
         if not conversation.title:
             logger.info(
@@ -1,9 +1,9 @@
 import logging
 
-from django.db.models.signals import post_save, post_delete, pre_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Agent, AgentKind, LanguageModel, RoleAgentAssignment
+from .models import Agent, AgentKind, LanguageModel, MCPClient, RoleAgentAssignment
 from api.authenticate.models import UserProfile
 from api.rag.models import Collection
 from api.consumption.models import Currency, Wallet
@@ -95,3 +95,13 @@ def role_agent_assignment_changed(sender, instance, **kwargs):
     org = getattr(agent, "organization", None) if agent else None
     if org:
         bump_agent_list_version_for_org_members(org)
+
+
+@receiver(m2m_changed, sender=MCPClient.allowed_agents.through)
+def mcp_client_allowed_agents_changed(sender, instance, action, **kwargs):
+    """A credential's agent allowlist is its MCP tool catalog; refresh the gateway's copy."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    from api.ai_layers.cache_utils import notify_mcp_agents_changed
+
+    notify_mcp_agents_changed()
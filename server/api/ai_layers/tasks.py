@@ -68,6 +68,19 @@ def async_generate_agent_profile_picture(agent_id: int):
     profile_picture_url = generate_agent_profile_picture(agent_id)
     return profile_picture_url
 
+@shared_task
+def poll_media_generation_jobs():
+    """Beat: hand every media generation job due for a status check to a worker."""
+    from .media_jobs import dispatch_due_media_jobs
+
+    return {"dispatched": dispatch_due_media_jobs()}
+
+@shared_task
+def poll_media_generation_job(job_id: str):
+    from .media_jobs import poll_media_job
+
+    return {"job_id": job_id, "outcome": poll_media_job(job_id)}
+
 def _agent_clock_context(
     client_datetime: dict | None,
     *,
@@ -1093,6 +1106,7 @@ def conversation_agent_task(
     from api.notify.actions import notify_user
     from api.messaging.models import Conversation, Message
     from api.messaging.schedule_helpers import normalize_capability_names
+    from api.consumption.usage_capture import enqueue_agent_session_usage
     notification_route_id = user_id
     actor_user_id = user_id if isinstance(user_id, int) else None
 
@@ -1539,9 +1553,9 @@ def conversation_agent_task(
                     "image_attachment_id is OPTIONAL — provide it only when the user has an existing image in the conversation they want animated as the first frame. "
                     "If no image is available or the user just wants text-to-video, leave image_attachment_id empty. "
                     "Do NOT ask the user to provide an image before generating — just call the tool with the prompt alone if no image is available. "
-                    "Video generation takes up to 6 minutes — inform the user it may take a moment. "
-                    "\n\nWhen referencing the video attachment in markdown, link it like: "
-                    "![Video](attachment:<attachment_id>)."
+                    "generate_video returns right away with a job_id: the video renders in the background "
+                    "and is posted to this conversation automatically when ready (usually within a few minutes). "
+                    "Tell the user it is on its way; do not link an attachment for it."
                 )
             _doc_tools_ok = (
                 override_allowlist is None
@@ -1589,8 +1603,10 @@ def conversation_agent_task(
                     "- input_text: topic or outline (required). "
                     "- export_format: default 'pdf' for sharing; use 'pptx' only if the user "
                     "needs an editable PowerPoint. "
-                    "Generation can take up to a few minutes — tell the user it may take a moment. "
-                    "After success, include: [Download file](attachment:<attachment_id>)."
+                    "generate_gamma_attachment returns right away with a job_id: the file is generated "
+                    "in the background and posted to this conversation automatically when ready "
+                    "(usually within a few minutes). Tell the user it is on its way; do not link an "
+                    "attachment for it."
                 )
             if "create_speech" in (agent_tool_names or []):
                 from api.voices.instructions import build_create_speech_tool_instructions
@@ -1648,7 +1664,10 @@ def conversation_agent_task(
                 if widget_agent:
                     organization = getattr(widget_agent, "organization", None)
 
-            from api.ai_layers.tools import WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES
+            from api.ai_layers.tools import (
+                WHATSAPP_BROADCAST_TOOL_NAMES,
+                WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES,
+            )
             from api.ai_layers.tools.calendar_tool_helpers import CALENDAR_AGENT_TOOL_NAMES
             from api.integrations.services import user_has_personal_google_calendar
             from api.whatsapp.models import WSNumber
@@ -1677,6 +1696,7 @@ def conversation_agent_task(
                     t
                     for t in agent_tool_names
                     if t not in WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES
+                    and t not in WHATSAPP_BROADCAST_TOOL_NAMES
                 ]
 
             if is_widget_chat:
@@ -2194,7 +2214,11 @@ def conversation_agent_task(
                 resolve_kwargs["organization_id"] = organization.id
             if is_whatsapp_chat and actor_user_id is None:
                 resolve_kwargs["is_whatsapp_visitor"] = True
-                _strip_unlinked = {"list_conversations", *WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES}
+                _strip_unlinked = {
+                    "list_conversations",
+                    *WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES,
+                    *WHATSAPP_BROADCAST_TOOL_NAMES,
+                }
                 agent_tool_names = [
                     n for n in agent_tool_names if n not in _strip_unlinked
                 ]
@@ -2486,6 +2510,7 @@ def conversation_agent_task(
                     ).update(message=handoff_msg)
                 session.assistant_message = handoff_msg
                 session.save(update_fields=["assistant_message"])
+                enqueue_agent_session_usage([session])
 
                 # Do not rewrite conversation.metadata.related_agents — the user's
                 # chat selection must stay as they left it after a handoff.
@@ -2571,6 +2596,7 @@ def conversation_agent_task(
                         ).update(message=grupal_msg)
                     session.assistant_message = grupal_msg
                     session.save(update_fields=["assistant_message"])
+                    enqueue_agent_session_usage([session])
                     attachments_for_notify = list(assistant_message_attachments)
                     assistant_message_attachments = []
                     assistant_attachment_ids = []
@@ -2620,6 +2646,7 @@ def conversation_agent_task(
                 for s in agent_sessions_created:
                     s.assistant_message = assistant_msg
                     s.save(update_fields=["assistant_message"])
+                enqueue_agent_session_usage(agent_sessions_created)
                 logger.info(
                     "conversation_agent_task generate_title after assistant message: "
                     "conversation_id=%s modality=isolated current_title=%r message_id=%s",
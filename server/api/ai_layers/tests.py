@@ -695,32 +695,28 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
         )
 
     @patch.dict("os.environ", {"GAMMA_API_KEY": "test-gamma-key"})
-    @patch("api.ai_layers.tools.generate_gamma_presentation.time.sleep", return_value=None)
+    @patch("api.ai_layers.media_jobs.start_media_job")
     @patch("api.ai_layers.tools.generate_gamma_presentation.requests.get")
     @patch("api.ai_layers.tools.generate_gamma_presentation.requests.post")
     @patch("api.ai_layers.models.Agent")
-    @patch("api.messaging.models.MessageAttachment")
     @patch("api.messaging.models.Conversation")
-    def test_impl_creates_attachment(
+    def test_impl_submits_generation_and_records_job(
         self,
         mock_conversation_cls,
-        mock_attachment_cls,
         mock_agent,
         mock_post,
         mock_get,
-        _mock_sleep,
+        mock_start_job,
     ):
         from api.ai_layers.tools.generate_gamma_presentation import (
             _generate_gamma_attachment_impl,
         )
 
+        conversation = Mock(id="conv-1")
         mock_conversation_cls.objects.select_related.return_value.get.return_value = (
-            Mock(id="conv-1")
+            conversation
         )
-        att = Mock()
-        att.id = "att-uuid"
-        att.file.url = "/media/message_attachments/2026/07/deck.pdf"
-        mock_attachment_cls.objects.create.return_value = att
+        mock_start_job.return_value = Mock(id="job-uuid")
 
         create_resp = Mock()
         create_resp.status_code = 200
@@ -728,23 +724,6 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
         create_resp.text = ""
         mock_post.return_value = create_resp
 
-        status_resp = Mock()
-        status_resp.status_code = 200
-        status_resp.json.return_value = {
-            "generationId": "gen-123",
-            "status": "completed",
-            "exportUrl": "https://gamma.example/export.pdf",
-            "gammaUrl": "https://gamma.app/docs/abc",
-            "gammaId": "g_abc",
-        }
-        status_resp.text = ""
-
-        download_resp = Mock()
-        download_resp.status_code = 200
-        download_resp.content = b"%PDF-1.4 fake"
-
-        mock_get.side_effect = [status_resp, download_resp]
-
         result = _generate_gamma_attachment_impl(
             input_text="Renewable energy overview",
             title="Energy",
@@ -759,38 +738,35 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
             agent_slug="test-agent",
         )
 
-        self.assertEqual(result.attachment_id, "att-uuid")
-        self.assertEqual(result.name, "deck.pdf")
+        self.assertEqual(result.job_id, "job-uuid")
+        self.assertEqual(result.status, "pending")
         self.assertEqual(result.format, "presentation")
         self.assertEqual(result.export_format, "pdf")
-        self.assertEqual(result.content_type, "application/pdf")
-        self.assertIn("deck.pdf", result.content)
         self.assertEqual(result.generation_id, "gen-123")
         mock_post.assert_called_once()
         payload = mock_post.call_args.kwargs["json"]
         self.assertEqual(payload["format"], "presentation")
         self.assertEqual(payload["cardOptions"]["dimensions"], "16x9")
-        self.assertEqual(mock_get.call_count, 2)
-        mock_attachment_cls.objects.create.assert_called_once()
-        create_kwargs = mock_attachment_cls.objects.create.call_args.kwargs
-        self.assertEqual(create_kwargs["content_type"], "application/pdf")
-        self.assertEqual(create_kwargs["kind"], "file")
+        # Nothing waits on Gamma inside the tool call.
+        mock_get.assert_not_called()
+        job_kwargs = mock_start_job.call_args.kwargs
+        self.assertEqual(job_kwargs["provider"], "gamma")
+        self.assertEqual(job_kwargs["operation_id"], "gen-123")
+        self.assertIs(job_kwargs["conversation"], conversation)
+        self.assertEqual(
+            job_kwargs["params"],
+            {"format": "presentation", "export_format": "pdf", "output_filename": "deck.pdf"},
+        )
 
     @patch.dict("os.environ", {"GAMMA_API_KEY": "test-gamma-key"})
-    @patch("api.ai_layers.tools.generate_gamma_presentation.time.sleep", return_value=None)
-    @patch("api.ai_layers.tools.generate_gamma_presentation.requests.get")
+    @patch("api.ai_layers.media_jobs.start_media_job")
     @patch("api.ai_layers.tools.generate_gamma_presentation.requests.post")
-    @patch("api.ai_layers.models.Agent")
-    @patch("api.messaging.models.MessageAttachment")
     @patch("api.messaging.models.Conversation")
     def test_impl_document_format_uses_pageless_dimensions(
         self,
         mock_conversation_cls,
-        mock_attachment_cls,
-        mock_agent,
         mock_post,
-        mock_get,
-        _mock_sleep,
+        mock_start_job,
     ):
         from api.ai_layers.tools.generate_gamma_presentation import (
             _generate_gamma_attachment_impl,
@@ -799,10 +775,7 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
         mock_conversation_cls.objects.select_related.return_value.get.return_value = (
             Mock(id="conv-1")
         )
-        att = Mock()
-        att.id = "att-doc"
-        att.file.url = "/media/message_attachments/2026/07/brief.pdf"
-        mock_attachment_cls.objects.create.return_value = att
+        mock_start_job.return_value = Mock(id="job-doc")
 
         create_resp = Mock()
         create_resp.status_code = 200
@@ -810,19 +783,6 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
         create_resp.text = ""
         mock_post.return_value = create_resp
 
-        status_resp = Mock()
-        status_resp.status_code = 200
-        status_resp.json.return_value = {
-            "generationId": "gen-doc",
-            "status": "completed",
-            "exportUrl": "https://gamma.example/export.pdf",
-        }
-        status_resp.text = ""
-        download_resp = Mock()
-        download_resp.status_code = 200
-        download_resp.content = b"%PDF-1.4 fake"
-        mock_get.side_effect = [status_resp, download_resp]
-
         result = _generate_gamma_attachment_impl(
             input_text="Weekly tax brief",
             title="Expreso Fiscal",
@@ -844,8 +804,7 @@ class GenerateGammaAttachmentToolTests(SimpleTestCase):
         self.assertEqual(payload["cardOptions"]["dimensions"], "pageless")
         self.assertEqual(payload["exportAs"], "pdf")
         self.assertEqual(
-            mock_attachment_cls.objects.create.call_args.kwargs["metadata"]["format"],
-            "document",
+            mock_start_job.call_args.kwargs["params"]["format"], "document"
         )
 
     @patch.dict("os.environ", {"GAMMA_API_KEY": ""})
@@ -2509,6 +2468,29 @@ class MCPGatewayTests(TestCase):
         self.mcp_client.refresh_from_db()
         self.assertTrue(self.mcp_client.revoked)
 
+class MCPTaskCompletionPushTests(SimpleTestCase):
+    @patch("api.notify.actions.notify_route")
+    def test_finished_agent_task_pushes_mcp_completion(self, mock_notify):
+        from types import SimpleNamespace
+
+        from django.core.cache import cache
+
+        from api.celery_signals import publish_mcp_agent_task_finished
+
+        agent_task = SimpleNamespace(name="api.ai_layers.tasks.conversation_agent_task")
+        cache.set("mcp_task_task-done", {"user_id": 1}, timeout=60)
+        self.addCleanup(cache.delete, "mcp_task_task-done")
+
+        publish_mcp_agent_task_finished(sender=agent_task, task_id="task-done", state="SUCCESS")
+        # Runs not dispatched through MCP publish nothing.
+        publish_mcp_agent_task_finished(sender=agent_task, task_id="task-web", state="SUCCESS")
+
+        mock_notify.assert_called_once_with(
+            "mcp_task:task-done",
+            "mcp_task_finished",
+            {"task_id": "task-done", "state": "SUCCESS"},
+        )
+
 class ListAttachmentsToolTests(TestCase):
     def setUp(self):
         from django.core.files.base import ContentFile
@@ -0,0 +1,156 @@
+"""Tests for the read_attachment content cache (provider file ids + extracted text)."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openai import NotFoundError
+
+from api.ai_layers.models import AttachmentContentCache, LanguageModel
+from api.ai_layers.tools.read_attachment import _read_attachment_impl
+from api.consumption.models import Currency
+from api.messaging.models import Conversation, MessageAttachment
+from api.providers.models import AIProvider
+from api.rag import actions as rag_actions
+
+
+def _openai_client(*file_ids: str) -> Mock:
+    client = Mock()
+    client.files.create.side_effect = [SimpleNamespace(id=file_id) for file_id in file_ids]
+    client.responses.create.return_value = SimpleNamespace(output_text="answer")
+    return client
+
+
+def _sent_content(client, call_index: int = -1) -> list[dict]:
+    return client.responses.create.call_args_list[call_index].kwargs["input"][0]["content"]
+
+
+class ReadAttachmentContentCacheTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, slug="gpt-read", name="GPT Read")
+        self.user = User.objects.create_user(username="reader", password="x")
+        self.conversation = Conversation.objects.create(user=self.user)
+
+    def _attachment(self, name: str, content: bytes, content_type: str) -> MessageAttachment:
+        return MessageAttachment.objects.create(
+            conversation=self.conversation,
+            user=self.user,
+            file=SimpleUploadedFile(name, content, content_type=content_type),
+            content_type=content_type,
+        )
+
+    def _ask(self, client, att, question="what is it?"):
+        with patch("api.ai_layers.tools.read_attachment.OpenAI", return_value=client):
+            return _read_attachment_impl(
+                attachment_id=str(att.id),
+                question=question,
+                conversation_id=str(self.conversation.id),
+                user_id=self.user.id,
+            )
+
+    def test_pdf_is_uploaded_once_and_referenced_by_file_id(self):
+        att = self._attachment("report.pdf", b"%PDF-1.4 fake", "application/pdf")
+        client = _openai_client("file-pdf")
+
+        self._ask(client, att, "first question")
+        result = self._ask(client, att, "second question")
+
+        self.assertEqual(result.answer, "answer")
+        client.files.create.assert_called_once()
+        self.assertEqual(client.files.create.call_args.kwargs["purpose"], "user_data")
+        self.assertEqual(
+            _sent_content(client)[1], {"type": "input_file", "file_id": "file-pdf"}
+        )
+        cache = AttachmentContentCache.objects.get(attachment=att)
+        self.assertEqual(cache.provider_file_id, "file-pdf")
+        self.assertGreater(cache.provider_file_expires_at, timezone.now())
+
+    def test_expired_provider_file_is_uploaded_again(self):
+        att = self._attachment("photo.png", b"\x89PNG fake", "image/png")
+        client = _openai_client("file-old", "file-new")
+
+        self._ask(client, att)
+        AttachmentContentCache.objects.filter(attachment=att).update(
+            provider_file_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self._ask(client, att)
+
+        self.assertEqual(client.files.create.call_count, 2)
+        self.assertEqual(
+            _sent_content(client)[1], {"type": "input_image", "file_id": "file-new"}
+        )
+
+    def test_rejected_cached_file_is_replaced_once(self):
+        att = self._attachment("report.pdf", b"%PDF-1.4 fake", "application/pdf")
+        client = _openai_client("file-gone", "file-fresh")
+        self._ask(client, att)
+
+        gone = NotFoundError(
+            "No such File object",
+            response=httpx.Response(404, request=httpx.Request("POST", "https://api.openai.com")),
+            body=None,
+        )
+        client.responses.create.side_effect = [gone, SimpleNamespace(output_text="retried")]
+        result = self._ask(client, att)
+
+        self.assertEqual(result.answer, "retried")
+        self.assertEqual(
+            _sent_content(client)[1], {"type": "input_file", "file_id": "file-fresh"}
+        )
+
+    def test_text_document_is_extracted_once_without_upload(self):
+        att = self._attachment("notes.txt", b"The launch is on Friday.", "text/plain")
+        client = _openai_client()
+
+        with patch(
+            "api.rag.actions.read_file_content", wraps=rag_actions.read_file_content
+        ) as read_content:
+            self._ask(client, att)
+            self._ask(client, att)
+
+        client.files.create.assert_not_called()
+        self.assertEqual(read_content.call_count, 1)
+        self.assertIn("The launch is on Friday.", _sent_content(client)[0]["text"])
+        self.assertEqual(
+            AttachmentContentCache.objects.get(attachment=att).extracted_text,
+            "The launch is on Friday.",
+        )
+
+    @override_settings(READ_ATTACHMENT_MAX_CHARS=10)
+    def test_long_text_is_truncated_and_flagged(self):
+        att = self._attachment("long.txt", b"0123456789-tail-not-sent", "text/plain")
+        client = _openai_client()
+
+        result = self._ask(client, att)
+
+        self.assertTrue(result.truncated)
+        self.assertIn("truncated", result.message)
+        sent = _sent_content(client)[0]["text"]
+        self.assertIn("0123456789", sent)
+        self.assertNotIn("tail-not-sent", sent)
+        self.assertIn("[Text truncated after 10 characters.]", sent)
+
+    def test_short_text_is_not_flagged(self):
+        att = self._attachment("short.txt", b"short", "text/plain")
+
+        result = self._ask(_openai_client(), att)
+
+        self.assertFalse(result.truncated)
+        self.assertEqual(result.message, "Successfully analyzed short.txt")
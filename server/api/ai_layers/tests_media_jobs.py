@@ -0,0 +1,186 @@
+"""Tests for background media generation jobs (submit, poll, deliver)."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.ai_layers.media_jobs import dispatch_due_media_jobs, poll_media_job, start_media_job
+from api.ai_layers.models import LanguageModel, MediaGenerationJob
+from api.consumption.models import Currency
+from api.messaging.models import Conversation, Message, MessageAttachment
+from api.providers.models import AIProvider
+
+def _gamma_response(payload: dict | None = None, *, content: bytes = b"") -> Mock:
+    resp = Mock()
+    resp.status_code = 200
+    resp.text = ""
+    resp.json.return_value = payload or {}
+    resp.content = content
+    return resp
+
+@patch.dict("os.environ", {"GAMMA_API_KEY": "test-gamma-key"})
+@patch("api.notify.actions.notify_route")
+@patch("api.ai_layers.tools.generate_gamma_presentation.requests.get")
+class MediaGenerationJobPollTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, slug="gpt-media", name="GPT Media")
+        self.user = User.objects.create_user(
+            username="media", email="media@test.com", password="x"
+        )
+        self.conversation = Conversation.objects.create(user=self.user)
+        self.job = start_media_job(
+            provider=MediaGenerationJob.Provider.GAMMA,
+            operation_id="gen-123",
+            conversation=self.conversation,
+            user=self.user,
+            params={"format": "presentation", "export_format": "pdf", "output_filename": "deck.pdf"},
+        )
+        self.due = self.job.next_poll_at
+
+    def test_pending_generation_is_rescheduled_without_waiting(self, mock_get, _notify):
+        mock_get.return_value = _gamma_response({"status": "pending"})
+
+        self.assertEqual(poll_media_job(self.job.id, now=self.due), "pending")
+        # A redelivered task for the same check finds the job already moved on.
+        self.assertEqual(poll_media_job(self.job.id, now=self.due), "not_due")
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, MediaGenerationJob.Status.PENDING)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertEqual(self.job.next_poll_at, self.due + timedelta(seconds=10))
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_completed_generation_posts_attachment_to_conversation(self, mock_get, notify):
+        mock_get.side_effect = [
+            _gamma_response(
+                {
+                    "status": "completed",
+                    "exportUrl": "https://gamma.example/export.pdf",
+                    "gammaUrl": "https://gamma.app/docs/abc",
+                }
+            ),
+            _gamma_response(content=b"%PDF-1.4 fake"),
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(poll_media_job(self.job.id, now=self.due), "succeeded")
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, MediaGenerationJob.Status.SUCCEEDED)
+        attachment = MessageAttachment.objects.get(id=self.job.attachment_id)
+        self.assertEqual(attachment.content_type, "application/pdf")
+        self.assertEqual(attachment.metadata["generation_id"], "gen-123")
+        message = Message.objects.get(conversation=self.conversation)
+        self.assertEqual(message.type, "assistant")
+        self.assertEqual(attachment.message_id, message.id)
+        self.assertIn(f"attachment:{attachment.id}", message.text)
+        self.assertEqual(message.attachments[0]["attachment_id"], str(attachment.id))
+        events = [call.args[1] for call in notify.call_args_list]
+        self.assertIn("media_generation_finished", events)
+
+    def _completed_gamma_responses(self):
+        return [
+            _gamma_response(
+                {
+                    "status": "completed",
+                    "exportUrl": "https://gamma.example/export.pdf",
+                    "gammaUrl": "https://gamma.app/docs/abc",
+                }
+            ),
+            _gamma_response(content=b"%PDF-1.4 fake"),
+        ]
+
+    def test_result_is_stored_outside_a_transaction(self, mock_get, _notify):
+        from django.db import connection
+
+        from api.ai_layers.tools import generate_gamma_presentation
+
+        mock_get.side_effect = self._completed_gamma_responses()
+        real_finish = generate_gamma_presentation.finish_gamma_job
+        depth = []
+
+        def finish(job, payload):
+            depth.append(len(connection.savepoint_ids))
+            return real_finish(job, payload)
+
+        outer = len(connection.savepoint_ids)
+        with patch.object(generate_gamma_presentation, "finish_gamma_job", finish):
+            self.assertEqual(poll_media_job(self.job.id, now=self.due), "succeeded")
+
+        self.assertEqual(depth, [outer])
+
+    def test_result_stored_after_lease_was_lost_is_discarded(self, mock_get, _notify):
+        from api.ai_layers.tools import generate_gamma_presentation
+
+        mock_get.side_effect = self._completed_gamma_responses()
+        real_finish = generate_gamma_presentation.finish_gamma_job
+
+        def slow_finish(job, payload):
+            attachment = real_finish(job, payload)
+            MediaGenerationJob.objects.filter(id=job.id).update(
+                status=MediaGenerationJob.Status.FAILED, error="timed out"
+            )
+            return attachment
+
+        with patch.object(generate_gamma_presentation, "finish_gamma_job", slow_finish):
+            outcome = poll_media_job(self.job.id, now=self.due)
+
+        self.assertEqual(outcome, "claimed_elsewhere")
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, MediaGenerationJob.Status.FAILED)
+        self.assertFalse(MessageAttachment.objects.exists())
+        self.assertFalse(Message.objects.filter(conversation=self.conversation).exists())
+
+    def test_failed_generation_reports_reason(self, mock_get, _notify):
+        mock_get.return_value = _gamma_response(
+            {"status": "failed", "error": {"message": "content policy"}}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(poll_media_job(self.job.id, now=self.due), "failed")
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, MediaGenerationJob.Status.FAILED)
+        self.assertIn("content policy", self.job.error)
+        message = Message.objects.get(conversation=self.conversation)
+        self.assertIn("content policy", message.text)
+        self.assertEqual(message.attachments, [])
+
+    def test_generation_past_deadline_times_out(self, mock_get, _notify):
+        mock_get.return_value = _gamma_response({"status": "pending"})
+
+        outcome = poll_media_job(self.job.id, now=self.job.deadline_at + timedelta(seconds=1))
+
+        self.assertEqual(outcome, "failed")
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.error, "timed out")
+
+    @patch("api.ai_layers.tasks.poll_media_generation_job.delay")
+    def test_dispatch_only_hands_out_due_jobs(self, mock_delay, _mock_get, _notify):
+        later = start_media_job(
+            provider=MediaGenerationJob.Provider.GAMMA,
+            operation_id="gen-later",
+            conversation=self.conversation,
+            user=self.user,
+        )
+        MediaGenerationJob.objects.filter(id=later.id).update(
+            next_poll_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertEqual(dispatch_due_media_jobs(now=self.due), 1)
+        mock_delay.assert_called_once_with(str(self.job.id))
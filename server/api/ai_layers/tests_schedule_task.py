@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 from django.contrib.auth.models import User
-from django.test import SimpleTestCase, TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.utils import timezone
 
 from api.ai_layers.models import Agent, LanguageModel
@@ -159,9 +160,8 @@ class ScheduleTaskToolTests(TestCase):
             organization=self.org,
         )
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_once_create(self, mock_apply):
-        mock_apply.return_value = MagicMock(id="celery-once-1")
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_once_create(self, mock_schedule):
         from api.ai_layers.tools.schedule_task import _schedule_task_impl
 
         future_local = (
@@ -190,13 +190,12 @@ class ScheduleTaskToolTests(TestCase):
         self.assertEqual(task.status, ScheduledConversationTask.Status.PENDING)
         self.assertEqual(task.title, "Weekly competitor report")
         self.assertEqual(task.agent_slugs, [self.agent.slug])
-        self.assertEqual(task.celery_task_id, "celery-once-1")
+        self.assertIsNone(task.celery_task_id)
         self.assertEqual(task.capabilities, [])
-        mock_apply.assert_called_once()
+        mock_schedule.assert_called_once()
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_explicit_agent_slugs_can_add_specialists(self, mock_apply):
-        mock_apply.return_value = MagicMock(id="celery-agents-1")
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_explicit_agent_slugs_can_add_specialists(self, mock_schedule):
         specialist = Agent.objects.create(
             name="Tax Specialist",
             slug="tax-sched-specialist",
@@ -235,8 +234,8 @@ class ScheduleTaskToolTests(TestCase):
         self.assertEqual(task.agent_slugs, [self.agent.slug, specialist.slug])
         self.assertEqual(task.multiagentic_modality, "grupal")
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_rejects_inaccessible_agent_slug(self, mock_apply):
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_rejects_inaccessible_agent_slug(self, mock_schedule):
         from api.ai_layers.tools.schedule_task import _schedule_task_impl
 
         future_local = (
@@ -256,11 +255,10 @@ class ScheduleTaskToolTests(TestCase):
                 run_at=future_local.strftime("%Y-%m-%dT%H:%M:%S"),
             )
         self.assertIn("not found or not accessible", str(ctx.exception).lower())
-        mock_apply.assert_not_called()
+        mock_schedule.assert_not_called()
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_does_not_snapshot_tools(self, mock_apply):
-        mock_apply.return_value = MagicMock(id="celery-caps-1")
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_does_not_snapshot_tools(self, mock_schedule):
         from api.ai_layers.tools.schedule_task import get_tool
 
         tool = get_tool(
@@ -291,9 +289,8 @@ class ScheduleTaskToolTests(TestCase):
         self.assertEqual(task.capabilities, [])
         self.assertNotIn("Optional tools allowlist", tool["description"])
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_weekly_and_cancel(self, mock_apply):
-        mock_apply.return_value = MagicMock(id="celery-weekly-1")
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_weekly_and_cancel(self, mock_schedule):
         from api.ai_layers.tools.cancel_scheduled_task import _cancel_scheduled_task_impl
         from api.ai_layers.tools.list_scheduled_tasks import _list_scheduled_tasks_impl
         from api.ai_layers.tools.schedule_task import _schedule_task_impl
@@ -330,15 +327,15 @@ class ScheduleTaskToolTests(TestCase):
                 organization_id=self.org.id,
             )
         self.assertTrue(cancelled.success)
-        mock_revoke.assert_called_once_with("celery-weekly-1", terminate=False)
+        mock_revoke.assert_not_called()
         task = ScheduledConversationTask.objects.get(id=result.task_id)
         self.assertEqual(task.status, ScheduledConversationTask.Status.CANCELLED)
 
     def test_resolve_org_timezone(self):
         self.assertEqual(resolve_org_timezone(self.org.id), "America/Guayaquil")
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
-    def test_schedule_requires_title(self, mock_apply):
+    @patch("api.messaging.scheduler.schedule_conversation_task")
+    def test_schedule_requires_title(self, mock_schedule):
         from api.ai_layers.tools.schedule_task import _schedule_task_impl
 
         with self.assertRaises(ValueError):
@@ -354,10 +351,11 @@ class ScheduleTaskToolTests(TestCase):
                 recurrence="daily",
                 time_of_day="10:00",
             )
-        mock_apply.assert_not_called()
+        mock_schedule.assert_not_called()
 
 class ScheduleFirePathTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.llm = _seed_llm_and_currency()
         self.user = User.objects.create_user(
             username="fire", email="fire@test.com", password="x"
@@ -487,8 +485,8 @@ class ScheduleFirePathTests(TestCase):
         self.assertEqual(task.status, ScheduledConversationTask.Status.PENDING)
         self.assertGreater(task.next_run_at, timezone.now())
 
-    @patch("api.messaging.tasks.run_scheduled_conversation_task.delay")
-    def test_catch_up_enqueues_overdue(self, mock_delay):
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_catch_up_enqueues_overdue(self, mock_apply):
         due = self._make_pending()
         future = self._make_pending(
             next_run_at=timezone.now() + timedelta(hours=2),
@@ -499,9 +497,124 @@ class ScheduleFirePathTests(TestCase):
 
         out = run_due_scheduled_conversation_tasks()
         self.assertEqual(out["enqueued"], 1)
-        mock_delay.assert_called_once_with(str(due.id))
+        mock_apply.assert_called_once()
+        self.assertEqual(mock_apply.call_args.kwargs["args"], [str(due.id)])
         self.assertNotEqual(str(future.id), str(due.id))
 
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_dispatch_records_celery_task_id(self, mock_apply):
+        from api.messaging.scheduler import dispatch_due_scheduled_tasks, reconcile_scheduled_tasks
+
+        task = self._make_pending()
+        reconcile_scheduled_tasks()
+        dispatch_due_scheduled_tasks()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, ScheduledConversationTask.Status.DISPATCHED)
+        self.assertIsNotNone(task.claimed_at)
+        self.assertEqual(task.celery_task_id, mock_apply.call_args.kwargs["task_id"])
+
+    @override_settings(SCHEDULED_TASKS_MAX_RUNNING_PER_ORG=1000)
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_dispatcher_drains_large_backlog_in_one_run(self, mock_apply):
+        from api.messaging.scheduler import dispatch_due_scheduled_tasks, reconcile_scheduled_tasks
+
+        for i in range(250):
+            self._make_pending(instruction_text=f"Backlog {i}")
+
+        reconcile_scheduled_tasks()
+        out = dispatch_due_scheduled_tasks()
+
+        self.assertEqual(out["dispatched"], 250)
+        self.assertEqual(mock_apply.call_count, 250)
+        self.assertEqual(dispatch_due_scheduled_tasks()["dispatched"], 0)
+
+    @override_settings(SCHEDULED_TASKS_MAX_RUNNING_PER_ORG=2)
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_dispatcher_defers_over_org_budget(self, mock_apply):
+        from api.messaging.scheduler import dispatch_due_scheduled_tasks, reconcile_scheduled_tasks
+
+        running = self._make_pending(status=ScheduledConversationTask.Status.RUNNING)
+        for i in range(3):
+            self._make_pending(instruction_text=f"Due {i}")
+
+        reconcile_scheduled_tasks()
+        out = dispatch_due_scheduled_tasks()
+
+        self.assertEqual(out["dispatched"], 1)
+        self.assertEqual(out["deferred"], 2)
+        # The dispatched task has not started yet but still holds its slot.
+        later = dispatch_due_scheduled_tasks(now=timezone.now() + timedelta(seconds=10))
+        self.assertEqual(later["dispatched"], 0)
+
+        running.status = ScheduledConversationTask.Status.DONE
+        running.save()
+        latest = dispatch_due_scheduled_tasks(now=timezone.now() + timedelta(seconds=20))
+        self.assertEqual(latest["dispatched"], 1)
+
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_dispatcher_sends_tasks_due_within_a_second_with_exact_eta(self, mock_apply):
+        from api.messaging.scheduler import dispatch_due_scheduled_tasks, schedule_conversation_task
+
+        run_at = timezone.now() + timedelta(milliseconds=500)
+        task = self._make_pending(run_at=run_at, next_run_at=run_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_conversation_task(task)
+
+        dispatch_due_scheduled_tasks()
+
+        mock_apply.assert_called_once()
+        self.assertEqual(mock_apply.call_args.kwargs["args"], [str(task.id)])
+        self.assertEqual(mock_apply.call_args.kwargs["eta"], run_at)
+
+    @patch("api.messaging.tasks.run_scheduled_conversation_task.apply_async")
+    def test_reaper_releases_stale_claims(self, mock_apply):
+        from api.messaging.scheduler import reap_stale_scheduled_tasks
+
+        long_ago = timezone.now() - timedelta(hours=2)
+        lost_message = self._make_pending(
+            status=ScheduledConversationTask.Status.DISPATCHED,
+            claimed_at=long_ago,
+            celery_task_id="lost",
+        )
+        dead_once = self._make_pending(
+            status=ScheduledConversationTask.Status.RUNNING, claimed_at=long_ago
+        )
+        dead_recurring = self._make_pending(
+            status=ScheduledConversationTask.Status.RUNNING,
+            claimed_at=long_ago,
+            schedule_type=ScheduledConversationTask.ScheduleType.RECURRING,
+            cron="0 11 * * 1",
+            run_at=None,
+        )
+        fresh = self._make_pending(
+            status=ScheduledConversationTask.Status.RUNNING, claimed_at=timezone.now()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            out = reap_stale_scheduled_tasks()
+
+        self.assertEqual(out, {"released": 1, "abandoned_runs": 2})
+        for task in (lost_message, dead_once, dead_recurring, fresh):
+            task.refresh_from_db()
+        self.assertEqual(lost_message.status, ScheduledConversationTask.Status.PENDING)
+        self.assertIsNone(lost_message.celery_task_id)
+        self.assertEqual(dead_once.status, ScheduledConversationTask.Status.FAILED)
+        self.assertEqual(dead_recurring.status, ScheduledConversationTask.Status.PENDING)
+        self.assertGreater(dead_recurring.next_run_at, timezone.now())
+        self.assertEqual(fresh.status, ScheduledConversationTask.Status.RUNNING)
+
+    @patch("api.ai_layers.tasks.conversation_agent_task")
+    def test_fire_runs_dispatched_task(self, mock_agent):
+        mock_agent.return_value = {"status": "completed", "user_message_id": 5}
+        task = self._make_pending(status=ScheduledConversationTask.Status.DISPATCHED)
+        from api.messaging.tasks import run_scheduled_conversation_task
+
+        result = run_scheduled_conversation_task(str(task.id))
+
+        self.assertEqual(result["status"], ScheduledConversationTask.Status.DONE)
+        mock_agent.assert_called_once()
+
     @patch("api.messaging.tasks.enqueue_scheduled_conversation_task")
     @patch("api.ai_layers.tasks.conversation_agent_task")
     def test_recurring_advances_after_fire(self, mock_agent, mock_enqueue):
@@ -54,6 +54,7 @@ TOOL_REGISTRY: dict[str, str] = {
     "list_whatsapp_resources": "api.ai_layers.tools.list_whatsapp_resources",
     "list_whatsapp_templates": "api.ai_layers.tools.list_whatsapp_templates",
     "send_ws_template_message": "api.ai_layers.tools.send_ws_template_message",
+    "broadcast_ws_template_message": "api.ai_layers.tools.broadcast_ws_template_message",
     "list_calendar_events": "api.ai_layers.tools.list_calendar_events",
     "create_calendar_event": "api.ai_layers.tools.create_calendar_event",
     "update_calendar_event": "api.ai_layers.tools.update_calendar_event",
@@ -69,6 +70,10 @@ WHATSAPP_TEMPLATE_AGENT_TOOL_NAMES: tuple[str, ...] = (
     "send_ws_template_message",
 )
 
+# Needs a WhatsApp line like the template tools, but is never auto-injected:
+# bulk sends are enabled per agent.
+WHATSAPP_BROADCAST_TOOL_NAMES: tuple[str, ...] = ("broadcast_ws_template_message",)
+
 SCHEDULE_AGENT_TOOL_NAMES: tuple[str, ...] = (
     "schedule_task",
     "list_scheduled_tasks",
@@ -110,6 +115,7 @@ USER_REQUIRED_TOOL_NAMES: frozenset[str] = frozenset(
         "list_whatsapp_resources",
         "list_whatsapp_templates",
         "send_ws_template_message",
+        "broadcast_ws_template_message",
         "list_calendar_events",
         "create_calendar_event",
         "update_calendar_event",
@@ -0,0 +1,120 @@
+"""
+Tool: broadcast_ws_template_message
+
+Send one allowlisted WhatsApp Cloud API template to many verified contacts on a
+sender line assigned to the current agent: every member holding a role, every
+contact of conversations carrying a tag, or an explicit contact list. Sending
+runs in the background; the tool returns the broadcast id and its counters.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from api.whatsapp.models import WSTemplateBroadcast
+from api.whatsapp.template_broadcast import (
+    BroadcastAudience,
+    broadcast_progress,
+    create_template_broadcast,
+)
+from api.whatsapp.template_send import TemplateVariables
+
+class BroadcastWsTemplateMessageParams(BaseModel):
+    sender_id: int | None = Field(
+        default=None,
+        description="WhatsApp sender_id from list_whatsapp_resources. Required to start a broadcast.",
+    )
+    template_id: str | None = Field(
+        default=None,
+        description="Local template_id from list_whatsapp_templates. Required to start a broadcast.",
+    )
+    audience: BroadcastAudience | None = Field(
+        default=None,
+        description=(
+            "Exactly one of role_id (organization role), tag_id (conversation tag) "
+            "or ws_contact_ids (verified contacts from list_whatsapp_resources)."
+        ),
+    )
+    template_variables: TemplateVariables = Field(default_factory=TemplateVariables)
+    broadcast_id: str | None = Field(
+        default=None,
+        description=(
+            "Pass only this to check the progress of a broadcast started earlier "
+            "in this conversation."
+        ),
+    )
+
+def get_tool(
+    conversation_id: str | None = None,
+    user_id: int | None = None,
+    organization_id=None,
+    agent_id: int | None = None,
+    **kwargs,
+) -> dict:
+    if not conversation_id:
+        raise ValueError(
+            "broadcast_ws_template_message requires conversation_id in tool context"
+        )
+    if user_id is None or not isinstance(user_id, int):
+        raise ValueError(
+            "broadcast_ws_template_message requires an authenticated web user"
+        )
+    if organization_id is None:
+        raise ValueError(
+            "broadcast_ws_template_message requires organization_id in tool context"
+        )
+    if agent_id is None:
+        raise ValueError(
+            "broadcast_ws_template_message requires agent_id in tool context"
+        )
+
+    def broadcast_ws_template_message(
+        sender_id: int | None = None,
+        template_id: str | None = None,
+        audience: BroadcastAudience | dict[str, Any] | None = None,
+        template_variables: TemplateVariables | dict[str, Any] | None = None,
+        broadcast_id: str | None = None,
+    ) -> dict[str, Any]:
+        if broadcast_id:
+            broadcast = WSTemplateBroadcast.objects.filter(
+                id=broadcast_id,
+                created_by_id=user_id,
+                organization_id=organization_id,
+            ).first()
+            if not broadcast:
+                raise ValueError(f"Broadcast {broadcast_id} not found")
+            return broadcast_progress(broadcast)
+        if sender_id is None or not template_id or audience is None:
+            raise ValueError(
+                "sender_id, template_id and audience are required to start a broadcast"
+            )
+        broadcast = create_template_broadcast(
+            actor_user_id=user_id,
+            organization_id=organization_id,
+            agent_id=agent_id,
+            sender_id=sender_id,
+            template_id=template_id,
+            template_variables=template_variables or {},
+            audience=audience,
+            source_conversation_id=conversation_id,
+        )
+        return broadcast_progress(broadcast)
+
+    return {
+        "name": "broadcast_ws_template_message",
+        "description": (
+            "Send the same approved WhatsApp template to many verified WhatsApp "
+            "contacts at once from a sender line assigned to you: all members "
+            "with an organization role (audience.role_id), the contacts of "
+            "conversations tagged with a tag (audience.tag_id), or a list of "
+            "ws_contact_ids. Unverified contacts and members without a phone on "
+            "the line are reported as skipped. Messages are sent in the "
+            "background; the result has a broadcast_id and sent/failed/pending "
+            "counters. Call again with only broadcast_id to check progress. "
+            "Use send_ws_template_message for a single contact."
+        ),
+        "parameters": BroadcastWsTemplateMessageParams,
+        "function": broadcast_ws_template_message,
+    }
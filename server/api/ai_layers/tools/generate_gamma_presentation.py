@@ -1,9 +1,10 @@
 """
 Tool: generate_gamma_attachment
 
-Generates a Gamma file (presentation or document) via the public API,
-downloads the export (PDF by default, PPTX optional), stores it as a
-MessageAttachment, and returns attachment metadata for download in chat.
+Starts a Gamma file generation (presentation or document) via the public
+API and tracks it as a MediaGenerationJob. When Gamma finishes,
+api.ai_layers.media_jobs downloads the export (PDF by default, PPTX optional),
+stores it as a MessageAttachment and posts it to the conversation.
 
 The public tool name is generate_gamma_attachment. generate_gamma_presentation
 is kept as a registry alias for agents/lines that still have the old name.
@@ -14,7 +15,6 @@ from __future__ import annotations
 import logging
 import os
 import re
-import time
 import uuid
 from datetime import timedelta
 from typing import Literal
@@ -29,8 +29,6 @@ logger = logging.getLogger(__name__)
 _SLUG_SAFE = re.compile(r"[^a-zA-Z0-9._-]+")
 
 GAMMA_API_BASE = "https://public-api.gamma.app/v1.0"
-POLL_INTERVAL_SECONDS = 10
-MAX_WAIT_SECONDS = 360
 
 ExportFormat = Literal["pdf", "pptx"]
 GammaFormat = Literal["document", "presentation"]
@@ -108,14 +106,12 @@ class GenerateGammaAttachmentParams(BaseModel):
 
 
 class GenerateGammaAttachmentResult(BaseModel):
-    attachment_id: str
-    name: str
-    content: str
-    content_type: str
+    job_id: str
+    status: Literal["pending"]
     format: GammaFormat
     export_format: ExportFormat
-    gamma_url: str = ""
     generation_id: str = ""
+    detail: str = ""
 
 
 def _api_key() -> str:
@@ -186,32 +182,26 @@ def _create_generation(
     return str(generation_id)
 
 
-def _poll_generation(api_key: str, generation_id: str) -> dict:
-    elapsed = 0
-    while elapsed <= MAX_WAIT_SECONDS:
-        resp = requests.get(
-            f"{GAMMA_API_BASE}/generations/{generation_id}",
-            headers=_headers(api_key),
-            timeout=60,
-        )
-        _raise_for_gamma_status(resp, action="generation status")
-        data = resp.json()
-        status = (data.get("status") or "").lower()
-        if status == "completed":
-            return data
-        if status == "failed":
-            err = data.get("error") or {}
-            msg = err.get("message") if isinstance(err, dict) else str(err)
-            raise ValueError(f"Gamma generation failed: {msg or 'unknown error'}")
-        logger.info(
-            "Gamma generation %s pending (%ds elapsed)",
-            generation_id,
-            elapsed,
-        )
-        time.sleep(POLL_INTERVAL_SECONDS)
-        elapsed += POLL_INTERVAL_SECONDS
+def _generation_status(api_key: str, generation_id: str) -> dict | None:
+    """One status check: the status payload once completed, None while pending."""
+    from api.ai_layers.media_jobs import MediaGenerationFailed
 
-    raise ValueError("Gamma generation timed out after 6 minutes.")
+    resp = requests.get(
+        f"{GAMMA_API_BASE}/generations/{generation_id}",
+        headers=_headers(api_key),
+        timeout=60,
+    )
+    _raise_for_gamma_status(resp, action="generation status")
+    data = resp.json()
+    status = (data.get("status") or "").lower()
+    if status == "completed":
+        return data
+    if status == "failed":
+        err = data.get("error") or {}
+        msg = err.get("message") if isinstance(err, dict) else str(err)
+        raise MediaGenerationFailed(f"Gamma generation failed: {msg or 'unknown error'}")
+    logger.info("Gamma generation %s pending", generation_id)
+    return None
 
 
 def _download_export(export_url: str) -> bytes:
@@ -262,7 +252,9 @@ def _generate_gamma_attachment_impl(
 ) -> GenerateGammaAttachmentResult:
     from django.contrib.auth.models import User
 
-    from api.messaging.models import Conversation, MessageAttachment
+    from api.ai_layers.media_jobs import start_media_job
+    from api.ai_layers.models import MediaGenerationJob
+    from api.messaging.models import Conversation
 
     input_text = (input_text or "").strip()
     if not input_text:
@@ -280,6 +272,22 @@ def _generate_gamma_attachment_impl(
     except Conversation.DoesNotExist:
         raise ValueError("Conversation not found")
 
+    user = None
+    if user_id is not None:
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            user = None
+
+    agent_obj = None
+    if agent_slug:
+        try:
+            from api.ai_layers.models import Agent
+
+            agent_obj = Agent.objects.get(slug=agent_slug)
+        except Exception:
+            agent_obj = None
+
     api_key = _api_key()
     generation_id = _create_generation(
         api_key=api_key,
@@ -292,7 +300,42 @@ def _generate_gamma_attachment_impl(
         export_format=export_format,
         gamma_format=gamma_format,
     )
-    status_data = _poll_generation(api_key, generation_id)
+    job = start_media_job(
+        provider=MediaGenerationJob.Provider.GAMMA,
+        operation_id=generation_id,
+        conversation=conversation,
+        user=user,
+        agent=agent_obj,
+        params={
+            "format": gamma_format,
+            "export_format": export_format,
+            "output_filename": output_filename,
+        },
+    )
+    return GenerateGammaAttachmentResult(
+        job_id=str(job.id),
+        status="pending",
+        format=gamma_format,
+        export_format=export_format,
+        generation_id=generation_id,
+        detail=(
+            "Gamma generation started. The file is posted to this conversation "
+            "automatically when it is ready (usually within a few minutes)."
+        ),
+    )
+
+
+def check_gamma_job(job) -> dict | None:
+    return _generation_status(_api_key(), job.operation_id)
+
+
+def finish_gamma_job(job, status_data: dict):
+    """Download the finished export and store it as an attachment of the job's conversation."""
+    from api.messaging.models import MessageAttachment
+
+    params = job.params or {}
+    gamma_format: GammaFormat = params.get("format") or "presentation"
+    export_format: ExportFormat = params.get("export_format") or "pdf"
     export_url = (status_data.get("exportUrl") or "").strip()
     if not export_url:
         raise ValueError(
@@ -301,57 +344,31 @@ def _generate_gamma_attachment_impl(
         )
     raw = _download_export(export_url)
 
-    user = None
-    if user_id is not None:
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            user = None
-
-    agent_obj = None
-    if agent_slug:
-        try:
-            from api.ai_layers.models import Agent
-
-            agent_obj = Agent.objects.get(slug=agent_slug)
-        except Exception:
-            agent_obj = None
-
-    fname = _normalize_filename(output_filename, export_format, gamma_format)
+    fname = _normalize_filename(
+        params.get("output_filename") or "", export_format, gamma_format
+    )
     stem = fname[: -len(f".{export_format}")]
     storage_name = f"{stem}-{uuid.uuid4().hex[:8]}.{export_format}"
-    content_type = _CONTENT_TYPES[export_format]
 
     expires_at = timezone.now() + timedelta(days=365 * 10)
-    file_obj = ContentFile(raw, name=storage_name)
-    attachment = MessageAttachment.objects.create(
-        conversation=conversation,
-        user=user,
-        agent=agent_obj,
+    return MessageAttachment.objects.create(
+        conversation=job.conversation,
+        user=job.user,
+        agent=job.agent,
         kind="file",
-        file=file_obj,
-        content_type=content_type,
+        file=ContentFile(raw, name=storage_name),
+        content_type=_CONTENT_TYPES[export_format],
         expires_at=expires_at,
         metadata={
             "source": "generate_gamma_attachment",
             "format": gamma_format,
             "export_format": export_format,
-            "generation_id": generation_id,
+            "generation_id": job.operation_id,
             "gamma_id": status_data.get("gammaId") or "",
             "gamma_url": status_data.get("gammaUrl") or "",
+            "media_generation_job_id": str(job.id),
         },
     )
-    content_url = attachment.file.url if attachment.file else ""
-    return GenerateGammaAttachmentResult(
-        attachment_id=str(attachment.id),
-        name=fname,
-        content=content_url,
-        content_type=content_type,
-        format=gamma_format,
-        export_format=export_format,
-        gamma_url=str(status_data.get("gammaUrl") or ""),
-        generation_id=generation_id,
-    )
 
 
 def get_tool(
@@ -398,9 +415,9 @@ def get_tool(
             "Create a downloadable Gamma file. Pass input_text (topic or outline) "
             "and format: 'presentation' for slides or 'document' for a pageless "
             "document. Default export_format is 'pdf'; use 'pptx' only when the "
-            "user needs an editable PowerPoint. Generation can take up to a few "
-            "minutes. After success, include in your reply: "
-            "[Download file](attachment:<attachment_id>). "
+            "user needs an editable PowerPoint. Returns immediately with a job_id; "
+            "the file is posted to the conversation automatically when ready "
+            "(usually within a few minutes). "
             "Files start as personal; call update_attachment_visibility if other "
             "org members need to list or receive the file."
         ),
@@ -4,6 +4,10 @@ Tool: generate_video
 Generates a video using Google Veo 3.1 (Vertex AI).
 Supports text-to-video and image-to-video (when an image attachment is provided).
 
+The tool only submits the generation: the Veo operation is tracked as a
+MediaGenerationJob and the finished video is posted to the conversation by
+api.ai_layers.media_jobs.
+
 Authentication uses a service account JSON stored in the GOOGLE_APPLICATION_CREDENTIALS_JSON
 environment variable (minified single-line JSON). The tool writes it to a temp file and sets
 GOOGLE_APPLICATION_CREDENTIALS before calling the Vertex AI client.
@@ -15,11 +19,12 @@ import json
 import logging
 import os
 import tempfile
-import time
 import uuid
+from contextlib import contextmanager
 from typing import Literal
 
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.utils.text import slugify
 from pydantic import BaseModel, Field
 
@@ -30,6 +35,7 @@ GOOGLE_CLOUD_PROJECT = os.environ.get("GOOGLE_CLOUD_PROJECT", "masscer-492023")
 GOOGLE_CLOUD_LOCATION = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
 
 VEO_PRICE_PER_SECOND_USD = 0.40
+VEO_DURATION_SECONDS = 8.0
 
 VideoAspectRatio = Literal["landscape", "portrait"]
 
@@ -55,12 +61,12 @@ class GenerateVideoParams(BaseModel):
     )
 
 class GenerateVideoResult(BaseModel):
-    attachment_id: str = Field(description="UUID of the created video MessageAttachment.")
-    name: str = Field(description="Short slugified name for display.")
-    content: str = Field(description="Display URL for the generated video.")
+    job_id: str = Field(description="UUID of the MediaGenerationJob rendering the video.")
+    status: Literal["pending"] = Field(description="Generation runs in the background.")
     model: str = Field(description="Model used for generation.")
     aspect_ratio: VideoAspectRatio = Field(description="Aspect ratio requested (16:9 or 9:16).")
-    duration_seconds: float = Field(description="Duration of the generated video in seconds.")
+    duration_seconds: float = Field(description="Duration of the video being generated, in seconds.")
+    detail: str = Field(description="What happens next, to relay to the user.")
 
 def _setup_google_credentials() -> str | None:
     """
@@ -93,32 +99,46 @@ def _guess_video_filename(prompt: str) -> str:
     base = slugify((prompt or "").strip()[:80] or "video")
     return f"{base}-{uuid.uuid4().hex[:8]}.mp4"
 
-def _generate_video_veo(
-    *,
-    prompt: str,
-    image_bytes: bytes | None,
-    image_mime_type: str | None,
-    aspect_ratio: VideoAspectRatio,
-) -> tuple[bytes, float]:
-    """
-    Call Veo 3.1 via the google-genai SDK.
-    Supports text-to-video (image_bytes=None) and image-to-video.
-    Returns (video_bytes, duration_seconds).
-    """
+@contextmanager
+def _google_credentials():
+    tmp_creds_path = _setup_google_credentials()
+    try:
+        yield
+    finally:
+        if tmp_creds_path and tmp_creds_path.startswith(tempfile.gettempdir()):
+            try:
+                os.unlink(tmp_creds_path)
+            except Exception:
+                pass
+
+def _veo_client():
     try:
         from google import genai
-        from google.genai import types as genai_types
     except ImportError:
         raise ValueError("google-genai is not installed. Run: uv add google-genai")
 
-    import base64
-
-    client = genai.Client(
+    return genai.Client(
         vertexai=True,
         project=GOOGLE_CLOUD_PROJECT,
         location=GOOGLE_CLOUD_LOCATION,
     )
 
+def _submit_veo_generation(
+    *,
+    prompt: str,
+    image_bytes: bytes | None,
+    image_mime_type: str | None,
+    aspect_ratio: VideoAspectRatio,
+) -> str:
+    """
+    Start a Veo 3.1 generation via the google-genai SDK and return the
+    long-running operation name. Supports text-to-video (image_bytes=None)
+    and image-to-video.
+    """
+    from google.genai import types as genai_types
+
+    client = _veo_client()
+
     if image_bytes is not None:
         source = genai_types.GenerateVideosSource(
             prompt=prompt,
@@ -133,7 +153,7 @@ def _generate_video_veo(
     config = genai_types.GenerateVideosConfig(
         aspect_ratio=_ASPECT_RATIO_TO_VEO[aspect_ratio],
         number_of_videos=1,
-        duration_seconds=8,
+        duration_seconds=int(VEO_DURATION_SECONDS),
         generate_audio=True,
         resolution="720p",
     )
@@ -143,25 +163,23 @@ def _generate_video_veo(
         source=source,
         config=config,
     )
+    if not getattr(operation, "name", None):
+        raise ValueError("Veo did not return an operation name.")
+    return operation.name
+
+def _veo_video_bytes(client, operation) -> bytes:
+    """Video bytes of a finished Veo operation; raises MediaGenerationFailed when there are none."""
+    import base64
 
-    max_wait_seconds = 360
-    poll_interval = 15
-    elapsed = 0
-    while not operation.done:
-        if elapsed >= max_wait_seconds:
-            raise ValueError("Video generation timed out after 6 minutes.")
-        logger.info("Veo operation in progress... (%ds elapsed)", elapsed)
-        time.sleep(poll_interval)
-        elapsed += poll_interval
-        operation = client.operations.get(operation)
+    from api.ai_layers.media_jobs import MediaGenerationFailed
 
     if getattr(operation, "error", None):
         logger.error("Veo operation error: %s", operation.error)
-        raise ValueError(f"Veo generation failed: {operation.error}")
+        raise MediaGenerationFailed(f"Veo generation failed: {operation.error}")
 
     if not operation.result:
         logger.error("Veo operation has no result. Full operation: %s", operation)
-        raise ValueError("Veo generation failed — no result returned.")
+        raise MediaGenerationFailed("Veo generation failed — no result returned.")
 
     veo_result = operation.result
     rai_count = getattr(veo_result, "rai_media_filtered_count", None)
@@ -178,11 +196,11 @@ def _generate_video_veo(
     if not generated_videos or not generated_videos[0].video:
         if rai_count or rai_reasons:
             detail = "; ".join(rai_reasons) if rai_reasons else f"filtered_count={rai_count}"
-            raise ValueError(
+            raise MediaGenerationFailed(
                 "Veo did not return a video — Google's safety filters blocked this request "
                 f"({detail}). This is not a billing quota issue; try a different prompt or image, or retry."
             )
-        raise ValueError(
+        raise MediaGenerationFailed(
             "Veo returned no video data (empty generated_videos). "
             "If this persists, check Cloud project quotas and Vertex AI Veo availability for your region."
         )
@@ -197,10 +215,64 @@ def _generate_video_veo(
         raw = client.files.download(file=video)
 
     if not raw:
-        raise ValueError("Veo returned a video object with no bytes and no downloadable URI.")
+        raise MediaGenerationFailed("Veo returned a video object with no bytes and no downloadable URI.")
+    return raw
 
-    duration = 8.0
-    return raw, duration
+def check_veo_job(job) -> bytes | None:
+    """One status check of a Veo operation: the video bytes once done, else None."""
+    from google.genai import types as genai_types
+
+    with _google_credentials():
+        client = _veo_client()
+        operation = client.operations.get(
+            genai_types.GenerateVideosOperation(name=job.operation_id)
+        )
+        if not operation.done:
+            logger.info("Veo operation %s in progress (attempt %d)", job.operation_id, job.attempts)
+            return None
+        return _veo_video_bytes(client, operation)
+
+def finish_veo_job(job, raw: bytes):
+    """Store the finished video as an attachment of the job's conversation and bill it."""
+    from api.messaging.models import MessageAttachment
+
+    params = job.params or {}
+    prompt = params.get("prompt") or ""
+    duration_seconds = VEO_DURATION_SECONDS
+    conversation = job.conversation
+
+    attachment = MessageAttachment.objects.create(
+        conversation=conversation,
+        user=job.user,
+        agent=job.agent,
+        kind="file",
+        file=ContentFile(raw, name=_guess_video_filename(prompt)),
+        content_type="video/mp4",
+        metadata={
+            "prompt": prompt,
+            "model": VEO_MODEL,
+            "aspect_ratio": params.get("aspect_ratio"),
+            "source_image_attachment_id": params.get("source_image_attachment_id"),
+            "duration_seconds": duration_seconds,
+            "source_video_url": f"google://{VEO_MODEL}",
+            "media_generation_job_id": str(job.id),
+        },
+    )
+
+    if job.user_id is not None:
+        try:
+            from api.consumption.tasks import async_register_video_generation
+            organization_id = conversation.organization_id
+            user_id = job.user_id
+            transaction.on_commit(
+                lambda: async_register_video_generation.delay(
+                    user_id, VEO_MODEL, duration_seconds, organization_id
+                )
+            )
+        except Exception:
+            logger.warning("Failed to queue video billing task", exc_info=True)
+
+    return attachment
 
 def _generate_video_impl(
     *,
@@ -211,9 +283,10 @@ def _generate_video_impl(
     user_id: int | None,
     agent_slug: str | None,
 ) -> GenerateVideoResult:
-    from django.conf import settings
     from django.contrib.auth.models import User
 
+    from api.ai_layers.media_jobs import start_media_job
+    from api.ai_layers.models import MediaGenerationJob
     from api.authenticate.services import FeatureFlagService
     from api.messaging.models import Conversation, MessageAttachment
 
@@ -266,24 +339,17 @@ def _generate_video_impl(
         except MessageAttachment.DoesNotExist:
             raise ValueError(f"Image attachment '{image_attachment_id}' not found.")
 
-    tmp_creds_path = _setup_google_credentials()
-
     try:
-        raw, duration_seconds = _generate_video_veo(
-            prompt=prompt,
-            image_bytes=image_bytes,
-            image_mime_type=image_mime_type,
-            aspect_ratio=aspect_ratio,
-        )
+        with _google_credentials():
+            operation_name = _submit_veo_generation(
+                prompt=prompt,
+                image_bytes=image_bytes,
+                image_mime_type=image_mime_type,
+                aspect_ratio=aspect_ratio,
+            )
     except Exception as e:
-        logger.exception("Failed to generate video via Veo")
+        logger.exception("Failed to start video generation via Veo")
         raise ValueError(f"Failed to generate video: {str(e)}")
-    finally:
-        if tmp_creds_path and tmp_creds_path.startswith(tempfile.gettempdir()):
-            try:
-                os.unlink(tmp_creds_path)
-            except Exception:
-                pass
 
     agent_obj = None
     if agent_slug:
@@ -293,50 +359,29 @@ def _generate_video_impl(
         except Exception:
             agent_obj = None
 
-    filename = _guess_video_filename(prompt)
-    file_obj = ContentFile(raw, name=filename)
-
-    attachment = MessageAttachment.objects.create(
+    job = start_media_job(
+        provider=MediaGenerationJob.Provider.VEO,
+        operation_id=operation_name,
         conversation=conversation,
         user=user,
         agent=agent_obj,
-        kind="file",
-        file=file_obj,
-        content_type="video/mp4",
-        metadata={
+        params={
             "prompt": prompt,
-            "model": VEO_MODEL,
             "aspect_ratio": aspect_ratio,
             "source_image_attachment_id": source_image_id,
-            "duration_seconds": duration_seconds,
-            "source_video_url": f"google://{VEO_MODEL}",
         },
     )
 
-    if user_id is not None:
-        try:
-            from api.consumption.tasks import async_register_video_generation
-            organization_id = getattr(conversation.organization, "id", None)
-            async_register_video_generation.delay(user_id, VEO_MODEL, duration_seconds, organization_id)
-        except Exception:
-            logger.warning("Failed to queue video billing task", exc_info=True)
-
-    api_base = getattr(settings, "API_BASE_URL", None) or ""
-    file_url = attachment.file.url if attachment.file else ""
-    display_url = (
-        f"{api_base.rstrip('/')}{file_url}"
-        if api_base and file_url and not file_url.startswith("http")
-        else file_url
-    )
-
-    name = slugify(prompt[:100]) or "video"
     return GenerateVideoResult(
-        attachment_id=str(attachment.id),
-        name=name,
-        content=display_url,
+        job_id=str(job.id),
+        status="pending",
         model=VEO_MODEL,
         aspect_ratio=aspect_ratio,
-        duration_seconds=duration_seconds,
+        duration_seconds=VEO_DURATION_SECONDS,
+        detail=(
+            "Video generation started. The video is posted to this conversation "
+            "automatically when it is ready (usually within a few minutes)."
+        ),
     )
 
 def get_tool(
@@ -370,8 +415,8 @@ def get_tool(
             "aspect_ratio: landscape (16:9) or portrait (9:16) only — Veo does not support square; default landscape. "
             "Optionally provide image_attachment_id (UUID of an existing image MessageAttachment) "
             "to use it as the first frame — if omitted, generates from text only. "
-            "Video generation takes up to 6 minutes — inform the user it may take a moment. "
-            "Returns an attachment_id and a display URL for the generated video."
+            "The tool returns immediately with a job_id; the finished video is posted to the "
+            "conversation automatically (usually within a few minutes) — tell the user it is on its way."
         ),
         "parameters": GenerateVideoParams,
         "function": generate_video,
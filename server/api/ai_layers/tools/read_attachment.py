@@ -1,16 +1,18 @@
 """
 Tool for reading message attachments by ID and answering questions about them.
 
-Supports images (via vision) and documents (PDF, DOCX, etc. via input_file).
-Uses OpenAI to analyze the content and answer the provided question.
+Supports images (via vision) and documents (PDF, DOCX, etc.). Files are
+uploaded once to the OpenAI Files API and extracted text is kept, both in
+``AttachmentContentCache`` (see ``api.ai_layers.attachment_content``), so
+follow-up questions only send the question.
 """
 
 from __future__ import annotations
 
-import base64
 import logging
 from typing import TYPE_CHECKING
 
+from django.conf import settings
 from openai import OpenAI
 from pydantic import BaseModel, Field
 
@@ -19,6 +21,30 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+READ_ATTACHMENT_MAX_CHARS = 120_000
+
+def read_attachment_max_chars() -> int:
+    return max(1, int(getattr(settings, "READ_ATTACHMENT_MAX_CHARS", READ_ATTACHMENT_MAX_CHARS)))
+
+def _truncate_for_model(text: str) -> tuple[str, bool]:
+    """
+    Cut text to the configured limit and mark the cut so the model does not
+    treat missing content as absent. The second value says whether it was cut.
+    """
+    max_chars = read_attachment_max_chars()
+    if len(text) <= max_chars:
+        return text, False
+    return f"{text[:max_chars]}\n\n[Text truncated after {max_chars} characters.]", True
+
+def _analyzed_message(subject: str, truncated: bool) -> str:
+    message = f"Successfully analyzed {subject}"
+    if truncated:
+        message += (
+            f" (text truncated to the first {read_attachment_max_chars()} characters; "
+            "content after that was not read)"
+        )
+    return message
+
 class ReadAttachmentParams(BaseModel):
     """Parameters for the read_attachment tool."""
 
@@ -45,6 +71,10 @@ class ReadAttachmentResult(BaseModel):
         default="Successfully analyzed attachment",
         description="Status message",
     )
+    truncated: bool = Field(
+        default=False,
+        description="True when only the beginning of the attachment text was read",
+    )
 
 def _read_attachment_impl(
     attachment_id: str,
@@ -58,7 +88,7 @@ def _read_attachment_impl(
 
     Validates that the attachment is in the current conversation, or belongs
     to the same user (cross-conversation).
-    For images: uses vision API. For documents: uses input_file with base64.
+    Images and documents go through the per-attachment content cache.
     """
     from api.ai_layers.tools.attachment_access import user_can_access_attachment
     from api.messaging.models import MessageAttachment
@@ -85,79 +115,132 @@ def _read_attachment_impl(
     is_image = bool(att.content_type and att.content_type.startswith("image/"))
     return _process_image(att, question) if is_image else _process_document(att, question)
 
+IMAGE_INSTRUCTIONS = (
+    "Answer the user's question about the image. Be concise and accurate. Extract "
+    "specific information when requested. If the information is not visible, say so clearly."
+)
+DOCUMENT_INSTRUCTIONS = (
+    "Answer the user's question about the document. Be concise and accurate. Extract "
+    "specific information when requested. If the information is not in the document, "
+    "state that clearly."
+)
+
+
+def _ask(client, instructions: str, content: list[dict]) -> str:
+    response = client.responses.create(
+        model="gpt-4o",
+        instructions=instructions,
+        input=[{"role": "user", "content": content}],
+    )
+    return _extract_output_text(response) or "Could not extract a response from the model."
+
+
+def _ask_with_provider_file(
+    client, att, cache, *, purpose: str, file_part, question: str, instructions: str
+) -> str:
+    """
+    Ask about the attachment through its cached provider file, uploading it on
+    first use. A cached id the provider rejects is replaced by a fresh upload once.
+    """
+    from openai import BadRequestError, NotFoundError
+
+    from api.ai_layers.attachment_content import forget_provider_file, provider_file_id
+
+    cached_id = cache.provider_file_id
+    file_id = provider_file_id(client, att, cache, purpose=purpose)
+    content = [{"type": "input_text", "text": question}, file_part(file_id)]
+    try:
+        return _ask(client, instructions, content)
+    except (BadRequestError, NotFoundError):
+        if file_id != cached_id:
+            raise
+        logger.info("Provider file %s for attachment %s is gone; uploading again", file_id, att.id)
+        forget_provider_file(cache)
+        file_id = provider_file_id(client, att, cache, purpose=purpose)
+        content[1] = file_part(file_id)
+        return _ask(client, instructions, content)
+
+
 def _process_image(att, question: str) -> ReadAttachmentResult:
-    """Process image via vision API."""
+    """Process image via vision API, referencing the cached provider file."""
     import os
 
+    from api.ai_layers.attachment_content import content_cache_for
+
     client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
     if not att.file:
         raise ValueError(f"File content not available for attachment {att.id}")
 
-    with att.file.open("rb") as f:
-        raw = f.read()
-    b64 = base64.b64encode(raw).decode("ascii")
-    mime = att.content_type or "image/png"
-    data_url = f"data:{mime};base64,{b64}"
-
-    content = [
-        {"type": "input_text", "text": question},
-        {"type": "input_image", "image_url": data_url},
-    ]
-
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            instructions="Answer the user's question about the image. Be concise and accurate. Extract specific information when requested. If the information is not visible, say so clearly.",
-            input=[{"role": "user", "content": content}],
+        answer_text = _ask_with_provider_file(
+            client,
+            att,
+            content_cache_for(att),
+            purpose="vision",
+            file_part=lambda file_id: {"type": "input_image", "file_id": file_id},
+            question=question,
+            instructions=IMAGE_INSTRUCTIONS,
         )
-        answer_text = _extract_output_text(response)
-        if not answer_text:
-            answer_text = "Could not extract a response from the model."
         return ReadAttachmentResult(
             answer=answer_text,
-            message=f"Successfully analyzed image",
+            message="Successfully analyzed image",
         )
     except Exception as e:
         logger.exception("Error analyzing image %s", att.id)
         raise ValueError(f"Failed to analyze image: {str(e)}")
 
 def _process_document(att, question: str) -> ReadAttachmentResult:
-    """Process document (PDF, DOCX, etc.) via input_file."""
+    """
+    Process document (PDF, DOCX, etc.). Text extracted once from office and
+    text files is sent as text; PDFs and anything else go through the cached
+    provider file.
+    """
     import os
 
+    from api.ai_layers.attachment_content import (
+        attachment_filename,
+        content_cache_for,
+        extracted_text,
+    )
+
     client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
     if not att.file:
         raise ValueError(f"File content not available for attachment {att.id}")
 
-    with att.file.open("rb") as f:
-        raw = f.read()
-    b64 = base64.b64encode(raw).decode("ascii")
-    mime = att.content_type or "application/octet-stream"
-    filename = att.file.name.split("/")[-1] if att.file.name else f"file_{att.id}"
-
-    content = [
-        {"type": "input_text", "text": question},
-        {
-            "type": "input_file",
-            "filename": filename,
-            "file_data": f"data:{mime};base64,{b64}",
-        },
-    ]
-
+    filename = attachment_filename(att)
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            instructions="Answer the user's question about the document. Be concise and accurate. Extract specific information when requested. If the information is not in the document, state that clearly.",
-            input=[{"role": "user", "content": content}],
-        )
-        answer_text = _extract_output_text(response)
-        if not answer_text:
-            answer_text = "Could not extract a response from the model."
+        cache = content_cache_for(att)
+        text = extracted_text(att, cache)
+        truncated = False
+        if text:
+            text, truncated = _truncate_for_model(text)
+            content = [
+                {
+                    "type": "input_text",
+                    "text": (
+                        f"Document name: {filename}\n\n"
+                        f"Document text:\n{text}\n\n"
+                        f"Question: {question}"
+                    ),
+                }
+            ]
+            answer_text = _ask(client, DOCUMENT_INSTRUCTIONS, content)
+        else:
+            answer_text = _ask_with_provider_file(
+                client,
+                att,
+                cache,
+                purpose="user_data",
+                file_part=lambda file_id: {"type": "input_file", "file_id": file_id},
+                question=question,
+                instructions=DOCUMENT_INSTRUCTIONS,
+            )
         return ReadAttachmentResult(
             answer=answer_text,
-            message=f"Successfully analyzed {filename}",
+            message=_analyzed_message(filename, truncated),
+            truncated=truncated,
         )
     except Exception as e:
         logger.exception("Error analyzing document %s", att.id)
@@ -229,9 +312,7 @@ def _process_rag_document(att, question: str) -> ReadAttachmentResult:
     text = getattr(doc, "text", "") or ""
     name = getattr(doc, "name", None) or f"document_{doc.id}"
 
-    max_chars = 120_000
-    if len(text) > max_chars:
-        text = text[:max_chars]
+    text, truncated = _truncate_for_model(text)
 
     collection_context = _search_document_collection(doc, question)
 
@@ -262,7 +343,8 @@ def _process_rag_document(att, question: str) -> ReadAttachmentResult:
             answer_text = "Could not extract a response from the model."
         return ReadAttachmentResult(
             answer=answer_text,
-            message="Successfully analyzed RAG document",
+            message=_analyzed_message("RAG document", truncated),
+            truncated=truncated,
         )
     except Exception as e:
         logger.exception("Error analyzing RAG document attachment %s", att.id)
@@ -305,9 +387,7 @@ def _process_website(att, question: str) -> ReadAttachmentResult:
         text = re.sub(r"[ \\t\\r\\f\\v]+", " ", text)
         text = re.sub(r"\\n\\s*\\n+", "\n\n", text).strip()
 
-    max_chars = 120_000
-    if len(text) > max_chars:
-        text = text[:max_chars]
+    text, truncated = _truncate_for_model(text)
 
     content = [
         {
@@ -334,7 +414,8 @@ def _process_website(att, question: str) -> ReadAttachmentResult:
             answer_text = "Could not extract a response from the model."
         return ReadAttachmentResult(
             answer=answer_text,
-            message="Successfully analyzed website",
+            message=_analyzed_message("website", truncated),
+            truncated=truncated,
         )
     except Exception as e:
         logger.exception("Error analyzing website attachment %s", att.id)
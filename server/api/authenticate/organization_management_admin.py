@@ -30,6 +30,7 @@ from api.authenticate.models import (
     OrganizationManagementProxy,
     UserProfile,
 )
+from api.consumption.billing_status import invalidate_billing_status
 from api.consumption.models import Currency, OrganizationWallet, OrganizationWalletTransaction
 from api.payments.billing_helpers import (
     forfeit_subscription_credits,
@@ -47,6 +48,7 @@ def _cancel_all_masscer_subscriptions_for_org(org: Organization) -> int:
         end_date=now,
         updated_at=now,
     )
+    invalidate_billing_status(org.id)
     if had_active:
         forfeit_subscription_credits(org)
     return n
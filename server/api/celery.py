@@ -24,12 +24,32 @@ import api.ai_layers.platform_assistant_task  # noqa: F401
 app.conf.beat_schedule = {
     'check-pending-conversations': {
         'task': 'api.messaging.tasks.check_pending_conversations',
-        'schedule': 180.0,
+        'schedule': 60.0,
+    },
+    'settle-organization-wallet-ledgers': {
+        'task': 'api.consumption.tasks.settle_organization_wallet_ledgers',
+        'schedule': 15.0,
+    },
+    'dispatch-scheduled-conversation-tasks': {
+        'task': 'api.messaging.tasks.dispatch_scheduled_conversation_tasks',
+        'schedule': 1.0,
     },
     'run-due-scheduled-conversation-tasks': {
         'task': 'api.messaging.tasks.run_due_scheduled_conversation_tasks',
         'schedule': 60.0,
     },
+    'reclaim-stale-template-broadcast-recipients': {
+        'task': 'api.whatsapp.tasks.reclaim_stale_template_broadcast_recipients',
+        'schedule': 60.0,
+    },
+    'poll-media-generation-jobs': {
+        'task': 'api.ai_layers.tasks.poll_media_generation_jobs',
+        'schedule': 5.0,
+    },
+    'refresh-conversation-rollups': {
+        'task': 'api.messaging.tasks.refresh_conversation_rollups',
+        'schedule': crontab(minute='*/15'),
+    },
     'expire-subscriptions-past-end-date': {
         'task': 'api.payments.tasks.expire_subscriptions_past_end_date',
         'schedule': crontab(minute=12),
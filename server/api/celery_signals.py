@@ -12,3 +12,12 @@ def close_connections_after_task(*args, **kwargs):
     """Cierra conexiones después de ejecutar una tarea."""
     print("closing connections after task")
     close_old_connections()
+
+@signals.task_postrun.connect
+def publish_mcp_agent_task_finished(sender=None, task_id=None, state=None, **kwargs):
+    """Wake the MCP tool call waiting on this agent run (result is already stored)."""
+    if getattr(sender, "name", "") != "api.ai_layers.tasks.conversation_agent_task":
+        return
+    from api.ai_layers.agent_task_dispatch import publish_mcp_task_finished
+
+    publish_mcp_task_finished(task_id, state)
@@ -1,6 +1,14 @@
 import logging
 
-from .models import Consumption, Currency, OrganizationWallet, Wallet
+from django.utils import timezone
+
+from .billing_status import organization_billing_status, subscription_state_is_active
+from .ledger import (
+    append_organization_debit,
+    estimated_organization_balance,
+    organization_wallet_ledger_enabled,
+)
+from .models import Consumption, Currency, Wallet
 from .wallet_ops import organization_wallet_use_balance
 from api.ai_layers.models import LanguageModel
 from api.payments.models import WinningRates
@@ -29,39 +37,31 @@ def notify_org_billing_denied(user_id, reason: str) -> None:
 def _check_org_subscription(organization_id) -> tuple[bool, str]:
     """
     Verify the organization has an active subscription with credits remaining.
-    Returns (allowed: bool, reason: str).
+    Returns (allowed: bool, reason: str). Reads the cached billing status.
     """
     try:
-        from api.payments.models import Subscription
-
-        subscription = (
-            Subscription.objects.filter(organization_id=organization_id)
-            .order_by("-created_at")
-            .first()
-        )
+        subscription, wallet = organization_billing_status(organization_id)
 
         if subscription is None:
             return False, "no_subscription"
 
-        if not subscription.is_active():
-            try:
-                org_wallet = OrganizationWallet.objects.get(organization_id=organization_id)
-                if org_wallet.purchased_balance > 0:
-                    return False, "subscription_expired_with_purchased_locked"
-            except OrganizationWallet.DoesNotExist:
-                pass
+        if not subscription_state_is_active(subscription):
+            if wallet is not None and wallet[1] > 0:
+                return False, "subscription_expired_with_purchased_locked"
             return False, "subscription_expired"
 
-        try:
-            org_wallet = OrganizationWallet.objects.get(organization_id=organization_id)
-        except OrganizationWallet.DoesNotExist:
+        if wallet is None:
             logger.warning(
                 "OrganizationWallet missing for org_id=%s while subscription is active — denying",
                 organization_id,
             )
             return False, "no_org_wallet"
 
-        if org_wallet.total_balance <= 0:
+        balance = wallet[0] + wallet[1]
+        if organization_wallet_ledger_enabled():
+            # Debits journaled by the ledger but not yet settled count against the balance.
+            balance = estimated_organization_balance(organization_id, balance)
+        if balance <= 0:
             return False, "out_of_balance"
 
         return True, "ok"
@@ -84,14 +84,23 @@ def register_consumption(
             notify_org_billing_denied(user_id, reason)
             return False
 
-        try:
-            OrganizationWallet.objects.get(organization_id=organization_id)
-        except OrganizationWallet.DoesNotExist:
-            notify_org_billing_denied(user_id, "no_org_wallet")
-            return False
+        if organization_wallet_ledger_enabled():
+            # The check above found the wallet; settlement debits it in batches.
+            append_organization_debit(
+                user_id=user_id,
+                organization_id=organization_id,
+                amount=amount,
+                is_for=is_for,
+            )
+            return True
 
         Consumption.objects.create(
-            user_id=user_id, wallet=None, amount=amount, is_for=is_for
+            user_id=user_id,
+            wallet=None,
+            organization_id=organization_id,
+            amount=amount,
+            is_for=is_for,
+            settled_at=timezone.now(),
         )
         if not organization_wallet_use_balance(organization_id, amount):
             notify_org_billing_denied(user_id, "out_of_balance")
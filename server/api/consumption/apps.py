@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ConsumptionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api.consumption"
+
+    def ready(self):
+        import api.consumption.signals
@@ -0,0 +1,105 @@
+"""
+Cached billing state for organization admission checks.
+
+``_check_org_subscription`` runs at the start of every agent turn and again in
+``register_consumption``. It reads two cache entries per organization in one
+round trip instead of querying ``Subscription`` and ``OrganizationWallet``:
+
+- the latest subscription's status and end date (``is_active`` is evaluated on
+  read, so a cached subscription still lapses exactly at its end date);
+- the wallet's subscription and purchased balances.
+
+Model signals (``api.consumption.signals``) invalidate or rewrite the entries;
+code that changes these rows with queryset ``update()`` calls
+``invalidate_billing_status`` itself. The TTLs bound staleness from anything
+that slips past both.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+BILLING_SUBSCRIPTION_TTL_SECONDS = 5 * 60
+BILLING_WALLET_TTL_SECONDS = 60
+
+_NONE = "none"
+
+
+def _subscription_key(organization_id) -> str:
+    return f"billing:subscription:{organization_id}"
+
+
+def _wallet_key(organization_id) -> str:
+    return f"billing:wallet:{organization_id}"
+
+
+def subscription_state(subscription) -> dict | None:
+    if subscription is None:
+        return None
+    return {"status": subscription.status, "end_date": subscription.end_date}
+
+
+def subscription_state_is_active(state: dict) -> bool:
+    """Same rule as ``Subscription.is_active`` on the cached fields."""
+    if state["status"] not in ("trial", "active"):
+        return False
+    if state["end_date"] and timezone.now() > state["end_date"]:
+        return False
+    return True
+
+
+def wallet_state(wallet) -> tuple[Decimal, Decimal] | None:
+    if wallet is None:
+        return None
+    return (wallet.subscription_balance, wallet.purchased_balance)
+
+
+def organization_billing_status(organization_id) -> tuple[dict | None, tuple[Decimal, Decimal] | None]:
+    """(subscription state, (subscription_balance, purchased_balance)); None when missing."""
+    from api.payments.models import Subscription
+
+    from .models import OrganizationWallet
+
+    sub_key = _subscription_key(organization_id)
+    wallet_key = _wallet_key(organization_id)
+    cached = cache.get_many([sub_key, wallet_key])
+
+    if sub_key in cached:
+        subscription = None if cached[sub_key] == _NONE else cached[sub_key]
+    else:
+        subscription = subscription_state(
+            Subscription.objects.filter(organization_id=organization_id)
+            .order_by("-created_at")
+            .first()
+        )
+        cache.set(sub_key, subscription or _NONE, BILLING_SUBSCRIPTION_TTL_SECONDS)
+
+    if wallet_key in cached:
+        wallet = None if cached[wallet_key] == _NONE else cached[wallet_key]
+    else:
+        wallet = wallet_state(
+            OrganizationWallet.objects.filter(organization_id=organization_id).first()
+        )
+        cache.set(wallet_key, wallet or _NONE, BILLING_WALLET_TTL_SECONDS)
+
+    return subscription, wallet
+
+
+def remember_wallet_balances(organization_id, balances: tuple[Decimal, Decimal]) -> None:
+    """Write a freshly saved wallet's (subscription, purchased) balances through to the cache."""
+    cache.set(_wallet_key(organization_id), balances, BILLING_WALLET_TTL_SECONDS)
+
+
+def invalidate_billing_status(organization_id, *, subscription: bool = True, wallet: bool = True) -> None:
+    """Drop cached billing state now and again once the surrounding transaction commits."""
+    keys = []
+    if subscription:
+        keys.append(_subscription_key(organization_id))
+    if wallet:
+        keys.append(_wallet_key(organization_id))
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,173 @@
+"""
+Organization compute-unit ledger.
+
+With ``ORGANIZATION_WALLET_LEDGER_ENABLED`` on, ``register_consumption`` no
+longer debits ``OrganizationWallet`` per usage event (a ``select_for_update`` on
+the org's single wallet row, which serializes every concurrent agent of that
+org). It appends the debit as an unsettled ``Consumption`` row instead and adds
+the amount to a per-organization pending counter in Redis.
+
+``settle_organization_ledger`` (run every few seconds by
+``settle_organization_wallet_ledgers``) debits all unsettled rows of an org in
+one locked wallet update with the usual subscription-then-purchased semantics
+and resets the pending counter to the org's remaining unsettled total. Between
+settlements, ``estimated_organization_balance`` (wallet total minus the pending
+counter) is what admission control compares against.
+"""
+
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Consumption, OrganizationWallet
+from .wallet_ops import debit_locked_organization_wallet
+
+logger = logging.getLogger(__name__)
+
+# Bounds one settlement transaction; a busier org is settled over several runs.
+ORGANIZATION_LEDGER_SETTLE_BATCH = 5000
+
+
+def organization_wallet_ledger_enabled() -> bool:
+    return bool(getattr(settings, "ORGANIZATION_WALLET_LEDGER_ENABLED", False))
+
+
+def _pending_key(organization_id) -> str:
+    return cache.make_key(f"consumption:ledger:pending:{organization_id}")
+
+
+# The counter is reset from the journal on every settlement; between
+# settlements appends add to it. The expiry drops a counter that drifted (a lost
+# update, a Redis restart) once its org has nothing left to settle.
+ORGANIZATION_LEDGER_PENDING_TTL = 600
+
+
+def _add_pending(organization_id, amount: Decimal) -> None:
+    key = _pending_key(organization_id)
+    try:
+        pipe = get_redis_connection("default").pipeline()
+        pipe.incrbyfloat(key, str(amount))
+        pipe.expire(key, ORGANIZATION_LEDGER_PENDING_TTL)
+        pipe.execute()
+    except Exception:
+        # The journal row is the source of truth; the next settlement repairs the estimate.
+        logger.warning("Ledger pending counter update failed for org %s", organization_id, exc_info=True)
+
+
+def reconcile_pending_organization_debits(organization_id) -> Decimal:
+    """Reset the pending counter to the sum of the org's unsettled journal rows."""
+    total = Consumption.objects.filter(
+        organization_id=organization_id, settled_at__isnull=True
+    ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+    try:
+        get_redis_connection("default").set(
+            _pending_key(organization_id), str(total), ex=ORGANIZATION_LEDGER_PENDING_TTL
+        )
+    except Exception:
+        logger.warning("Ledger pending counter reset failed for org %s", organization_id, exc_info=True)
+    return total
+
+
+def pending_organization_debits(organization_id) -> Decimal:
+    """Unsettled debits of the org according to the Redis counter (0 when unknown)."""
+    try:
+        raw = get_redis_connection("default").get(_pending_key(organization_id))
+    except Exception:
+        logger.warning("Ledger pending counter read failed for org %s", organization_id, exc_info=True)
+        return Decimal("0")
+    if raw is None:
+        return Decimal("0")
+    return max(Decimal(raw.decode() if isinstance(raw, bytes) else raw), Decimal("0"))
+
+
+def estimated_organization_balance(organization_id, wallet_total: Decimal) -> Decimal:
+    """Wallet balance as of the next settlement: settled total minus pending debits."""
+    return Decimal(wallet_total) - pending_organization_debits(organization_id)
+
+
+def append_organization_debit(
+    *,
+    user_id: int,
+    organization_id,
+    amount: Decimal,
+    is_for: str,
+) -> Consumption:
+    """Journal one org debit; ``settle_organization_ledger`` applies it to the wallet."""
+    consumption = Consumption.objects.create(
+        user_id=user_id,
+        wallet=None,
+        organization_id=organization_id,
+        amount=amount,
+        is_for=is_for,
+    )
+    transaction.on_commit(lambda: _add_pending(organization_id, amount))
+    return consumption
+
+
+def settle_organization_ledger(organization_id) -> dict:
+    """Debit the org wallet once for every unsettled consumption row of the org."""
+    with transaction.atomic():
+        wallet = (
+            OrganizationWallet.objects.select_for_update()
+            .filter(organization_id=organization_id)
+            .first()
+        )
+        # Holding the wallet lock makes concurrent settlers of this org wait here,
+        # so each row is claimed exactly once.
+        transaction.on_commit(lambda: reconcile_pending_organization_debits(organization_id))
+        if wallet is None:
+            # Nothing to debit yet; the rows stay owed until the org has a wallet.
+            logger.info("Org %s has unsettled debits but no wallet", organization_id)
+            return {
+                "organization_id": organization_id,
+                "settled": 0,
+                "amount": "0",
+                "error": "no_org_wallet",
+            }
+        rows = list(
+            Consumption.objects.filter(
+                organization_id=organization_id, settled_at__isnull=True
+            )
+            .order_by("id")
+            .values_list("id", "amount", "user_id")[:ORGANIZATION_LEDGER_SETTLE_BATCH]
+        )
+        if not rows:
+            return {"organization_id": organization_id, "settled": 0, "amount": "0"}
+
+        ids = [row_id for row_id, _amount, _user_id in rows]
+        amount = sum((row_amount for _id, row_amount, _user_id in rows), Decimal("0"))
+        covered = debit_locked_organization_wallet(wallet, amount)
+        Consumption.objects.filter(id__in=ids).update(settled_at=timezone.now())
+
+    if not covered:
+        from .actions import notify_org_billing_denied
+
+        logger.warning(
+            "Org %s ledger settlement of %s exceeded the wallet balance", organization_id, amount
+        )
+        notify_org_billing_denied(rows[-1][2], "out_of_balance")
+    return {
+        "organization_id": organization_id,
+        "settled": len(ids),
+        "amount": str(amount),
+        "covered": covered,
+    }
+
+
+def organizations_with_unsettled_debits() -> list:
+    return list(
+        Consumption.objects.filter(
+            organization__isnull=False, settled_at__isnull=True
+        )
+        .values_list("organization_id", flat=True)
+        .distinct()
+    )
+
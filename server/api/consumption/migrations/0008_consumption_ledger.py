@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticate', '0026_userprofile__phone_numbers'),
+        ('consumption', '0007_alter_organizationwallet_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumption',
+            name='organization',
+            field=models.ForeignKey(blank=True, help_text='Organization wallet this usage is billed to.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consumptions', to='authenticate.organization'),
+        ),
+        migrations.AddField(
+            model_name='consumption',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, help_text='When the amount was debited from the organization wallet. Empty while it waits in the ledger.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='consumption',
+            index=models.Index(condition=models.Q(('organization__isnull', False), ('settled_at__isnull', True)), fields=['organization', 'id'], name='consumption_unsettled'),
+        ),
+    ]
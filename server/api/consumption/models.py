@@ -63,9 +63,31 @@ class Consumption(models.Model):
         ],
     )
     description = models.TextField(null=True, blank=True)
+    organization = models.ForeignKey(
+        "authenticate.Organization",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="consumptions",
+        help_text="Organization wallet this usage is billed to.",
+    )
+    settled_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the amount was debited from the organization wallet. Empty while it waits in the ledger.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "id"],
+                condition=models.Q(settled_at__isnull=True, organization__isnull=False),
+                name="consumption_unsettled",
+            ),
+        ]
+
     def __str__(self):
         return f"<Consumption user={self.user.username} amount={self.amount} is_for={self.is_for} />"
 
@@ -0,0 +1,38 @@
+"""Keep the cached billing state (``api.consumption.billing_status``) in step with the database."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.authenticate.models import Organization
+from api.payments.models import Subscription
+
+from .billing_status import invalidate_billing_status, remember_wallet_balances
+from .models import OrganizationWallet
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_billing_changed(sender, instance, **kwargs):
+    invalidate_billing_status(instance.organization_id, wallet=False)
+
+
+@receiver(post_save, sender=OrganizationWallet)
+def wallet_billing_saved(sender, instance, **kwargs):
+    # Every direct-mode debit saves the wallet; rewriting the entry keeps the
+    # next admission check a cache hit.
+    organization_id = instance.organization_id
+    balances = (instance.subscription_balance, instance.purchased_balance)
+    transaction.on_commit(lambda: remember_wallet_balances(organization_id, balances))
+
+
+@receiver(post_delete, sender=OrganizationWallet)
+def wallet_billing_deleted(sender, instance, **kwargs):
+    invalidate_billing_status(instance.organization_id, subscription=False)
+
+
+@receiver(post_save, sender=Organization)
+def organization_billing_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_billing_status(instance.id)
+
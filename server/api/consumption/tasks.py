@@ -1,12 +1,24 @@
+import logging
+
 from .actions import register_llm_interaction, register_image_generation, register_video_generation
 from celery import shared_task
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def async_register_llm_interaction(user_id, input_tokens, output_tokens, model_slug, organization_id=None):
     return register_llm_interaction(user_id, input_tokens, output_tokens, model_slug, organization_id)
 
 
+@shared_task
+def async_register_agent_session_usage(session_ids):
+    """Bill the LLM usage of a turn's agent sessions, once per session."""
+    from .usage_capture import record_agent_session_usage
+
+    return record_agent_session_usage(session_ids)
+
+
 @shared_task
 def async_register_image_generation(user_id, model_slug, organization_id=None):
     return register_image_generation(user_id, model_slug, organization_id)
@@ -15,3 +27,17 @@ def async_register_image_generation(user_id, model_slug, organization_id=None):
 @shared_task
 def async_register_video_generation(user_id, model_slug, duration_seconds, organization_id=None):
     return register_video_generation(user_id, model_slug, duration_seconds, organization_id)
+
+
+@shared_task
+def settle_organization_wallet_ledgers():
+    """Apply journaled org debits to their wallets (see ``api.consumption.ledger``)."""
+    from .ledger import organizations_with_unsettled_debits, settle_organization_ledger
+
+    results = []
+    for organization_id in organizations_with_unsettled_debits():
+        try:
+            results.append(settle_organization_ledger(organization_id))
+        except Exception:
+            logger.exception("Ledger settlement failed for org %s", organization_id)
+    return {"organizations": len(results), "results": results}
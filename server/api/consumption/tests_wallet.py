@@ -1,16 +1,25 @@
 from decimal import Decimal
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from api.authenticate.models import Organization
-from api.consumption.actions import register_consumption
+from api.consumption.actions import _check_org_subscription, register_consumption
+from api.consumption.ledger import (
+    _add_pending,
+    append_organization_debit,
+    pending_organization_debits,
+)
 from api.consumption.models import (
+    Consumption,
     Currency,
     OrganizationWallet,
     OrganizationWalletTransaction,
     Wallet,
 )
+from api.consumption.tasks import settle_organization_wallet_ledgers
 from api.consumption.wallet_ops import organization_wallet_use_balance
 from api.payments.billing_helpers import (
     forfeit_subscription_credits,
@@ -143,3 +152,194 @@ class RegisterConsumptionOrgEnforcementTests(TestCase):
         self.assertFalse(
             Wallet.objects.filter(user_id=self.owner.id, unit=self.cu).exists()
         )
+
+
+def _seed_language_model():
+    """User creation provisions a default agent, which needs a LanguageModel."""
+    from api.ai_layers.models import LanguageModel
+    from api.providers.models import AIProvider
+
+    provider = AIProvider.objects.create(name="OpenAI-wallet-tests")
+    LanguageModel.objects.create(provider=provider, slug="gpt-wallet-tests", name="GPT Wallet Tests")
+
+
+@override_settings(ORGANIZATION_WALLET_LEDGER_ENABLED=True)
+class OrganizationWalletLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _seed_language_model()
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        self.owner = User.objects.create_user("ledger_u1", "ledger_u1@ex.com", "pw-test-123")
+        self.org = Organization.objects.create(name="Ledger Org", owner=self.owner)
+        self.cu = Currency.objects.get(name="Compute Unit")
+        plan, _ = SubscriptionPlan.objects.get_or_create(
+            slug="organization",
+            defaults={
+                "display_name": "Org",
+                "monthly_price_usd": Decimal("100"),
+                "credits_limit_usd": Decimal("10"),
+            },
+        )
+        Subscription.objects.create(organization=self.org, plan=plan, status="active")
+        OrganizationWallet.objects.update_or_create(
+            organization=self.org,
+            defaults={
+                "subscription_balance": Decimal("100"),
+                "purchased_balance": Decimal("50"),
+                "unit": self.cu,
+            },
+        )
+
+    def _consume(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return register_consumption(
+                self.owner.id, Decimal(amount), organization_id=self.org.id
+            )
+
+    def test_debits_are_journaled_then_settled_in_one_batch(self):
+        self.assertTrue(self._consume("30"))
+        self.assertTrue(self._consume("90"))
+
+        wallet = OrganizationWallet.objects.get(organization=self.org)
+        self.assertEqual(wallet.total_balance, Decimal("150"))
+        self.assertEqual(pending_organization_debits(self.org.id), Decimal("120"))
+        self.assertEqual(
+            Consumption.objects.filter(organization=self.org, settled_at__isnull=True).count(),
+            2,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = settle_organization_wallet_ledgers()
+
+        self.assertEqual(result["organizations"], 1)
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.subscription_balance, Decimal("0"))
+        self.assertEqual(wallet.purchased_balance, Decimal("30"))
+        self.assertEqual(pending_organization_debits(self.org.id), Decimal("0"))
+        self.assertFalse(
+            Consumption.objects.filter(organization=self.org, settled_at__isnull=True).exists()
+        )
+
+    def test_admission_counts_unsettled_debits(self):
+        self.assertTrue(self._consume("150"))
+        with patch("api.consumption.actions.notify_org_billing_denied") as mock_notify:
+            self.assertFalse(self._consume("1"))
+        mock_notify.assert_called_once_with(self.owner.id, "out_of_balance")
+        self.assertEqual(
+            Consumption.objects.filter(organization=self.org).count(), 1
+        )
+
+    def test_overdrawn_settlement_zeroes_buckets_and_notifies(self):
+        self.assertTrue(self._consume("100"))
+        self.assertTrue(self._consume("80"))
+        with patch("api.consumption.actions.notify_org_billing_denied") as mock_notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                settle_organization_wallet_ledgers()
+        mock_notify.assert_called_once_with(self.owner.id, "out_of_balance")
+        wallet = OrganizationWallet.objects.get(organization=self.org)
+        self.assertEqual(wallet.total_balance, Decimal("0"))
+
+    def test_settlement_resets_a_drifted_pending_counter(self):
+        self.assertTrue(self._consume("30"))
+        self.assertTrue(self._consume("20"))
+        # An append whose journal row never committed (or a replayed update).
+        _add_pending(self.org.id, Decimal("500"))
+        self.assertEqual(pending_organization_debits(self.org.id), Decimal("550"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settle_organization_wallet_ledgers()
+
+        self.assertEqual(pending_organization_debits(self.org.id), Decimal("0"))
+        self.assertEqual(
+            OrganizationWallet.objects.get(organization=self.org).total_balance,
+            Decimal("100"),
+        )
+
+    def test_debits_without_a_wallet_stay_unsettled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            append_organization_debit(
+                user_id=self.owner.id,
+                organization_id=self.org.id,
+                amount=Decimal("40"),
+                is_for="llm_interaction",
+            )
+        OrganizationWallet.objects.filter(organization=self.org).delete()
+
+        with patch("api.consumption.actions.notify_org_billing_denied") as mock_notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = settle_organization_wallet_ledgers()
+
+        self.assertEqual(result["results"][0]["settled"], 0)
+        mock_notify.assert_not_called()
+        self.assertTrue(
+            Consumption.objects.filter(organization=self.org, settled_at__isnull=True).exists()
+        )
+        self.assertEqual(pending_organization_debits(self.org.id), Decimal("40"))
+
+    @override_settings(ORGANIZATION_WALLET_LEDGER_ENABLED=False)
+    def test_direct_mode_records_settled_rows(self):
+        self.assertTrue(self._consume("10"))
+        row = Consumption.objects.get(organization=self.org)
+        self.assertIsNotNone(row.settled_at)
+        self.assertEqual(
+            OrganizationWallet.objects.get(organization=self.org).total_balance,
+            Decimal("140"),
+        )
+        self.assertEqual(settle_organization_wallet_ledgers()["organizations"], 0)
+
+
+class BillingStatusCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _seed_language_model()
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        self.owner = User.objects.create_user("bsc_u1", "bsc_u1@ex.com", "pw-test-123")
+        self.org = Organization.objects.create(name="BSC Org", owner=self.owner)
+        self.cu = Currency.objects.get(name="Compute Unit")
+        plan, _ = SubscriptionPlan.objects.get_or_create(
+            slug="organization",
+            defaults={
+                "display_name": "Org",
+                "monthly_price_usd": Decimal("100"),
+                "credits_limit_usd": Decimal("10"),
+            },
+        )
+        self.subscription = Subscription.objects.create(
+            organization=self.org, plan=plan, status="active"
+        )
+        OrganizationWallet.objects.update_or_create(
+            organization=self.org,
+            defaults={
+                "subscription_balance": Decimal("100"),
+                "purchased_balance": Decimal("0"),
+                "unit": self.cu,
+            },
+        )
+
+    def test_repeat_check_is_served_from_cache(self):
+        self.assertEqual(_check_org_subscription(self.org.id), (True, "ok"))
+        with self.assertNumQueries(0):
+            self.assertEqual(_check_org_subscription(self.org.id), (True, "ok"))
+
+    def test_subscription_save_invalidates(self):
+        _check_org_subscription(self.org.id)
+        self.subscription.status = "expired"
+        self.subscription.save()
+        self.assertEqual(
+            _check_org_subscription(self.org.id), (False, "subscription_expired")
+        )
+
+    def test_forfeit_invalidates_wallet_balances(self):
+        _check_org_subscription(self.org.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            forfeit_subscription_credits(self.org)
+        self.assertEqual(_check_org_subscription(self.org.id), (False, "out_of_balance"))
+
+    def test_debit_writes_balances_through(self):
+        _check_org_subscription(self.org.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            organization_wallet_use_balance(self.org.id, Decimal("100"))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                _check_org_subscription(self.org.id), (False, "out_of_balance")
+            )
@@ -0,0 +1,127 @@
+"""
+LLM usage capture for agent turns.
+
+Every ``AgentSession`` that produced an assistant message is billed exactly
+once. The agent tasks call ``enqueue_agent_session_usage`` with the sessions of
+a turn once their assistant message exists; one Celery task then bills the
+whole batch. Each session is claimed by setting ``usage_recorded_at`` in the
+same transaction that registers the consumption, so a redelivered task, a
+retried turn or a second enqueue of the same session bills nothing.
+
+Saving ``Message`` rows no longer bills anything, so edits and metadata
+updates of assistant messages stay free of billing work.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .actions import register_llm_interaction
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_billing_context(conversation) -> tuple[int | None, int | None]:
+    """
+    Return (billing_user_id, organization_id) for consumption registration.
+
+    Anonymous channels (widget/WhatsApp) have conversation.user=None; charge the org wallet
+    using organization.owner_id when available.
+    """
+    from api.messaging.tasks import get_user_organization
+
+    if conversation is None:
+        return None, None
+    organization_id = conversation.organization_id
+    if conversation.user_id:
+        if not organization_id and conversation.user:
+            org = get_user_organization(conversation.user)
+            organization_id = org.id if org else None
+        return conversation.user_id, organization_id
+    if organization_id:
+        owner_id = conversation.organization.owner_id
+        if owner_id:
+            return owner_id, organization_id
+    return None, organization_id
+
+
+def session_usage(session) -> tuple[int, int, str | None]:
+    """(prompt_tokens, completion_tokens, model_slug) recorded on an agent session."""
+    usage = (session.outputs or {}).get("usage") or {}
+    model = (session.inputs or {}).get("model") or {}
+    return (
+        int(usage.get("prompt_tokens") or 0),
+        int(usage.get("completion_tokens") or 0),
+        model.get("slug"),
+    )
+
+
+def enqueue_agent_session_usage(sessions) -> None:
+    """Bill the given sessions in one background task after the current transaction commits."""
+    from .tasks import async_register_agent_session_usage
+
+    session_ids = [str(s.id) for s in sessions if s is not None]
+    if not session_ids:
+        return
+    transaction.on_commit(
+        lambda: async_register_agent_session_usage.delay(session_ids)
+    )
+
+
+def _record_session_usage(session_id, billing_cache: dict) -> str:
+    from api.ai_layers.models import AgentSession
+
+    with transaction.atomic():
+        claimed = AgentSession.objects.filter(
+            id=session_id, usage_recorded_at__isnull=True
+        ).update(usage_recorded_at=timezone.now())
+        if not claimed:
+            return "duplicate"
+
+        session = AgentSession.objects.select_related(
+            "conversation", "conversation__organization"
+        ).get(id=session_id)
+        input_tokens, output_tokens, model_slug = session_usage(session)
+        if not input_tokens or not output_tokens:
+            return "empty"
+
+        conversation = session.conversation
+        conversation_id = conversation.id if conversation else None
+        if conversation_id not in billing_cache:
+            billing_cache[conversation_id] = resolve_billing_context(conversation)
+        billing_user_id, organization_id = billing_cache[conversation_id]
+        if billing_user_id is None:
+            logger.warning(
+                "Skipping LLM usage billing: no billing user for conversation_id=%s "
+                "(organization_id=%s)",
+                conversation_id,
+                organization_id,
+            )
+            return "no_billing_user"
+
+        register_llm_interaction(
+            billing_user_id,
+            input_tokens,
+            output_tokens,
+            model_slug,
+            organization_id,
+        )
+        return "recorded"
+
+
+def record_agent_session_usage(session_ids) -> dict:
+    """Bill each not-yet-billed session once; returns counts per outcome."""
+    outcomes: dict[str, int] = {}
+    # Sessions of one turn share a conversation; resolve its billing user once.
+    billing_cache: dict = {}
+    for session_id in session_ids:
+        try:
+            outcome = _record_session_usage(session_id, billing_cache)
+        except Exception:
+            logger.exception("Could not record LLM usage for agent session %s", session_id)
+            outcome = "error"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return outcomes
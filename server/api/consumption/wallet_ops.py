@@ -9,6 +9,30 @@ from django.db import transaction
 from api.consumption.models import OrganizationWallet
 
 
+def debit_locked_organization_wallet(w: OrganizationWallet, amount: Decimal) -> bool:
+    """
+    Deduct from a wallet row the caller holds under ``select_for_update``:
+    subscription bucket first, then purchased. If insufficient total, zero both
+    buckets and return False.
+    """
+    total = w.subscription_balance + w.purchased_balance
+    if total < amount:
+        w.subscription_balance = Decimal("0")
+        w.purchased_balance = Decimal("0")
+        w.save(
+            update_fields=["subscription_balance", "purchased_balance", "updated_at"]
+        )
+        return False
+    rem = amount
+    take_sub = min(rem, w.subscription_balance)
+    w.subscription_balance -= take_sub
+    rem -= take_sub
+    if rem > 0:
+        w.purchased_balance -= rem
+    w.save(update_fields=["subscription_balance", "purchased_balance", "updated_at"])
+    return True
+
+
 def organization_wallet_use_balance(organization_id, amount: Decimal) -> bool:
     """
     Deduct compute units: subscription bucket first, then purchased.
@@ -23,19 +47,4 @@ def organization_wallet_use_balance(organization_id, amount: Decimal) -> bool:
         )
         if not w:
             return False
-        total = w.subscription_balance + w.purchased_balance
-        if total < amount:
-            w.subscription_balance = Decimal("0")
-            w.purchased_balance = Decimal("0")
-            w.save(
-                update_fields=["subscription_balance", "purchased_balance", "updated_at"]
-            )
-            return False
-        rem = amount
-        take_sub = min(rem, w.subscription_balance)
-        w.subscription_balance -= take_sub
-        rem -= take_sub
-        if rem > 0:
-            w.purchased_balance -= rem
-        w.save(update_fields=["subscription_balance", "purchased_balance", "updated_at"])
-        return True
+        return debit_locked_organization_wallet(w, amount)
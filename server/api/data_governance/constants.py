@@ -6,3 +6,8 @@ MIN_DELETED_CONVERSATION_RETENTION_DAYS = 0
 EXPORT_FILE_TTL_DAYS = 7
 EXPORT_MAX_DOWNLOAD_COUNT = 3
 EXPORT_MAX_DATE_RANGE_DAYS = 365
+
+# Streaming export archive
+EXPORT_JSONL_PART_BYTES = 8 * 1024 * 1024
+EXPORT_FILE_SPOOL_BYTES = 8 * 1024 * 1024
+EXPORT_QUERY_CHUNK_SIZE = 500
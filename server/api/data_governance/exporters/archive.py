@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO
+
+from api.data_governance.constants import EXPORT_FILE_SPOOL_BYTES, EXPORT_JSONL_PART_BYTES
+from api.data_governance.exporters.base import ExportArtifact
+
+logger = logging.getLogger(__name__)
+
+
+class CountingWriter:
+    """Write-only stream wrapper that counts bytes.
+
+    It has no ``tell``/``seek``, so ``ZipFile`` treats the target as
+    unseekable and never rewinds it; remote storage files (S3 multipart
+    uploads) can then receive the archive as it is produced.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_written = 0
+
+    def write(self, data) -> int:
+        self._raw.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        flush = getattr(self._raw, "flush", None)
+        if flush is not None:
+            flush()
+
+
+def _zip_info(relative_path: str, file_size: int = 0) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(relative_path, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = file_size
+    return info
+
+
+class ExportArchive:
+    """Zip archive written straight to an output stream.
+
+    Exporters may run in parallel threads: entries are rendered or spooled
+    outside the lock and only the copy into the zip is serialized, so at most
+    one JSON Lines part or spooled file per exporter is held at a time.
+    """
+
+    def __init__(self, stream, *, part_bytes: int = EXPORT_JSONL_PART_BYTES):
+        self._zip = zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED)
+        self._lock = threading.Lock()
+        self.part_bytes = part_bytes
+
+    def __enter__(self) -> ExportArchive:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def write_bytes(self, relative_path: str, data: bytes) -> ExportArtifact:
+        with self._lock:
+            self._zip.writestr(_zip_info(relative_path, len(data)), data)
+        return ExportArtifact(relative_path=relative_path)
+
+    def write_json(self, relative_path: str, payload: dict) -> ExportArtifact:
+        data = json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+        return self.write_bytes(relative_path, data)
+
+    def jsonl(self, prefix: str) -> JsonLinesWriter:
+        """Records written as ``{prefix}-00001.jsonl``, ``-00002``... parts."""
+        return JsonLinesWriter(self, prefix)
+
+    def copy_storage_file(
+        self, file_field, relative_path: str, description: str = ""
+    ) -> ExportArtifact | None:
+        if not file_field:
+            return None
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_FILE_SPOOL_BYTES) as spool:
+                with file_field.open("rb") as src:
+                    shutil.copyfileobj(src, spool)
+                size = spool.tell()
+                spool.seek(0)
+                with self._lock:
+                    with self._zip.open(_zip_info(relative_path, size), "w") as dst:
+                        shutil.copyfileobj(spool, dst)
+        except Exception:
+            logger.exception("Failed to copy file to %s", relative_path)
+            return None
+        return ExportArtifact(relative_path=relative_path, description=description)
+
+
+class JsonLinesWriter:
+    def __init__(self, archive: ExportArchive, prefix: str):
+        self._archive = archive
+        self._prefix = prefix
+        self._buffer = BytesIO()
+        self.artifacts: list[ExportArtifact] = []
+        self.count = 0
+
+    def __enter__(self) -> JsonLinesWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self._flush()
+
+    def write(self, record: dict) -> None:
+        self._buffer.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self._buffer.write(b"\n")
+        self.count += 1
+        if self._buffer.tell() >= self._archive.part_bytes:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer.tell():
+            return
+        part = len(self.artifacts) + 1
+        name = f"{self._prefix}-{part:05d}.jsonl"
+        self.artifacts.append(self._archive.write_bytes(name, self._buffer.getvalue()))
+        self._buffer = BytesIO()
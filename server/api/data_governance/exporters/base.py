@@ -2,16 +2,18 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from datetime import date
-from pathlib import Path
+from typing import TYPE_CHECKING
 
 from api.authenticate.models import Organization
 from api.data_governance.schemas import DataExportManifestSchema
 
+if TYPE_CHECKING:
+    from api.data_governance.exporters.archive import ExportArchive
+
 
 @dataclass
 class ExportArtifact:
-    """A file written under the export temp directory (relative path)."""
+    """An entry written to the export archive (relative path)."""
 
     relative_path: str
     description: str = ""
@@ -32,6 +34,6 @@ class BaseExporter(ABC):
         *,
         organization: Organization,
         manifest: DataExportManifestSchema,
-        output_dir: Path,
+        archive: ExportArchive,
     ) -> ExporterResult:
         ...
@@ -1,17 +1,17 @@
 from __future__ import annotations
 
-import json
 import logging
-import shutil
-import tempfile
-import zipfile
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
 from api.data_governance.constants import EXPORT_FILE_TTL_DAYS
 from api.data_governance.exporters import EXPORTERS
+from api.data_governance.exporters.archive import CountingWriter, ExportArchive
+from api.data_governance.exporters.base import ExporterResult
 from api.data_governance.models import DataExportJob
 from api.data_governance.schemas import parse_export_manifest
 from api.data_governance.services.notifications import notify_export_ready
@@ -24,10 +24,53 @@ def _build_readme() -> str:
         "Masscer Data Export\n"
         "===================\n\n"
         "This archive contains organization data exported per your request.\n"
-        "See export_manifest.json for details on included categories.\n"
+        "Records are stored as JSON Lines (one JSON object per line), split into\n"
+        "numbered parts per category. See export_manifest.json for details on\n"
+        "included categories.\n"
     )
 
 
+def export_max_workers() -> int:
+    return max(1, int(getattr(settings, "DATA_EXPORT_MAX_WORKERS", 3)))
+
+
+def _open_for_write(storage, name: str):
+    """Writable file for ``name``; S3 storage uploads it in multipart chunks as it is written."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return storage.open(name, "wb")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+
+def _run_exporter(key, exporter, *, organization, manifest, archive) -> ExporterResult:
+    try:
+        return exporter.export(organization=organization, manifest=manifest, archive=archive)
+    except Exception as exc:
+        raise RuntimeError(f"{key} export failed: {exc}") from exc
+    finally:
+        # Worker threads open their own database connection.
+        if export_max_workers() > 1:
+            connection.close()
+
+
+def run_exporters(*, organization, manifest, archive: ExportArchive) -> list[ExporterResult]:
+    """Run every exporter into ``archive``; independent exporters run in parallel threads."""
+    kwargs = {"organization": organization, "manifest": manifest, "archive": archive}
+    workers = export_max_workers()
+    if workers == 1:
+        return [
+            _run_exporter(key, exporter, **kwargs) for key, exporter in EXPORTERS.items()
+        ]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data-export") as pool:
+        futures = [
+            pool.submit(_run_exporter, key, exporter, **kwargs)
+            for key, exporter in EXPORTERS.items()
+        ]
+        return [future.result() for future in futures]
+
+
 def run_export_job(job_id: str) -> None:
     job = DataExportJob.objects.select_related("organization", "requested_by").get(
         id=job_id
@@ -39,47 +82,40 @@ def run_export_job(job_id: str) -> None:
     job.error_message = ""
     job.save(update_fields=["status", "error_message"])
 
-    tmpdir = tempfile.mkdtemp(prefix="masscer_export_")
+    storage = job.file.storage
+    name = None
     try:
         manifest = parse_export_manifest(job.manifest)
         org = job.organization
-        output_dir = Path(tmpdir)
-        all_artifacts = []
-        summary: dict = {}
-
-        for key, exporter in EXPORTERS.items():
-            export_result = exporter.export(
-                organization=org,
-                manifest=manifest,
-                output_dir=output_dir,
-            )
-            all_artifacts.extend(export_result.artifacts)
-            summary.update(export_result.summary)
-
-        manifest_payload = {
-            "job_id": str(job.id),
-            "organization_id": str(org.id),
-            "exported_at": timezone.now().isoformat(),
-            "manifest": job.manifest,
-            "summary": summary,
-            "files": [a.relative_path for a in all_artifacts],
-        }
-        (output_dir / "export_manifest.json").write_text(
-            json.dumps(manifest_payload, indent=2, ensure_ascii=False),
-            encoding="utf-8",
+        name = storage.get_available_name(
+            job.file.field.generate_filename(job, f"export-{job.id}.zip")
         )
-        (output_dir / "README.txt").write_text(_build_readme(), encoding="utf-8")
-
-        zip_path = output_dir / f"export-{job.id}.zip"
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for path in output_dir.rglob("*"):
-                if path.is_file() and path != zip_path:
-                    zf.write(path, arcname=path.relative_to(output_dir).as_posix())
-
-        zip_bytes = zip_path.read_bytes()
-        filename = f"export-{job.id}.zip"
-        job.file.save(filename, ContentFile(zip_bytes), save=False)
-        job.file_size_bytes = len(zip_bytes)
+
+        with _open_for_write(storage, name) as raw:
+            out = CountingWriter(raw)
+            with ExportArchive(out) as archive:
+                results = run_exporters(organization=org, manifest=manifest, archive=archive)
+                summary: dict = {}
+                files = []
+                for export_result in results:
+                    summary.update(export_result.summary)
+                    files.extend(a.relative_path for a in export_result.artifacts)
+
+                archive.write_json(
+                    "export_manifest.json",
+                    {
+                        "job_id": str(job.id),
+                        "organization_id": str(org.id),
+                        "exported_at": timezone.now().isoformat(),
+                        "manifest": job.manifest,
+                        "summary": summary,
+                        "files": files,
+                    },
+                )
+                archive.write_bytes("README.txt", _build_readme().encode("utf-8"))
+
+        job.file.name = name
+        job.file_size_bytes = out.bytes_written
         job.status = DataExportJob.Status.READY
         job.completed_at = timezone.now()
         job.expires_at = job.completed_at + timezone.timedelta(days=EXPORT_FILE_TTL_DAYS)
@@ -96,8 +132,11 @@ def run_export_job(job_id: str) -> None:
         notify_export_ready(job)
     except Exception as exc:
         logger.exception("Data export job %s failed", job_id)
+        if name and not job.file:
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.exception("Failed to delete partial export file for job %s", job_id)
         job.status = DataExportJob.Status.FAILED
         job.error_message = str(exc)[:2000]
         job.save(update_fields=["status", "error_message"])
-    finally:
-        shutil.rmtree(tmpdir, ignore_errors=True)
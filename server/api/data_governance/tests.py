@@ -1,12 +1,18 @@
+import io
+import json
+import shutil
+import zipfile
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 
 from api.authenticate.models import Organization, Token, UserProfile
 from api.data_governance.models import DataExportJob, OrganizationDataPolicy
 from api.data_governance.schemas import parse_export_manifest, parse_policy_patch
+from api.data_governance.exporters.archive import CountingWriter, ExportArchive
 from api.data_governance.exporters.conversations import ConversationsExporter
 from api.data_governance.exporters.knowledge_base import (
     CompletionsExporter,
@@ -30,11 +36,41 @@ from api.finetuning.models import Completion, CompletionAssignment
 from api.rag.models import Chunk, Collection, Document
 from api.document_templates.models import DocumentTemplate
 from django.core.files.uploadedfile import SimpleUploadedFile
-from datetime import date
-from pathlib import Path
 import tempfile
 
 
+def _export_to_zip(exporter, organization, manifest):
+    buffer = io.BytesIO()
+    with ExportArchive(CountingWriter(buffer)) as archive:
+        result = exporter.export(organization=organization, manifest=manifest, archive=archive)
+    with zipfile.ZipFile(buffer) as zf:
+        return result, zf.namelist()
+
+
+class ExportArchiveTests(SimpleTestCase):
+    def test_jsonl_records_are_split_into_parts(self):
+        buffer = io.BytesIO()
+        out = CountingWriter(buffer)
+        with ExportArchive(out, part_bytes=64) as archive:
+            with archive.jsonl("items/items") as writer:
+                for i in range(10):
+                    writer.write({"id": i, "text": "x" * 20})
+
+        self.assertEqual(writer.count, 10)
+        self.assertGreater(len(writer.artifacts), 1)
+        self.assertEqual(out.bytes_written, len(buffer.getvalue()))
+        with zipfile.ZipFile(buffer) as zf:
+            names = zf.namelist()
+            self.assertEqual(names, [a.relative_path for a in writer.artifacts])
+            self.assertEqual(names[0], "items/items-00001.jsonl")
+            records = [
+                json.loads(line)
+                for name in names
+                for line in zf.read(name).decode("utf-8").splitlines()
+            ]
+        self.assertEqual([r["id"] for r in records], list(range(10)))
+
+
 class DataGovernanceSchemaTests(TestCase):
     def test_policy_min_attachment_days(self):
         with self.assertRaises(Exception):
@@ -142,14 +178,170 @@ class ConversationsExporterTests(TestCase):
                 agents=AgentsExportCategory(enabled=False),
             ),
         )
-        with tempfile.TemporaryDirectory() as tmp:
-            result = ConversationsExporter().export(
-                organization=self.org,
-                manifest=manifest,
-                output_dir=Path(tmp),
-            )
+        result, names = _export_to_zip(ConversationsExporter(), self.org, manifest)
         self.assertEqual(result.summary.get("conversations_exported"), 1)
-        self.assertTrue(any("conversations" in a.relative_path for a in result.artifacts))
+        self.assertEqual(names, ["conversations/conversations-00001.jsonl"])
+
+
+@override_settings(DATA_EXPORT_MAX_WORKERS=1)
+class RunExportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, name="Export LLM", slug="export-llm")
+        self.user = User.objects.create_user(username="streamexport", password="pass")
+        self.org = Organization.objects.create(name="Stream Org", owner=self.user)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.organization = self.org
+        profile.save(update_fields=["organization"])
+
+    @patch("api.data_governance.services.export_runner.notify_export_ready")
+    def test_streams_conversations_and_attachments_into_stored_zip(self, mock_notify):
+        from api.data_governance.services.export_runner import run_export_job
+        from api.messaging.models import Message, MessageAttachment
+
+        conv = Conversation.objects.create(user=self.user, last_message_at=timezone.now())
+        Message.objects.create(conversation=conv, type="user", text="first")
+        Message.objects.create(conversation=conv, type="assistant", text="second")
+        attachment = MessageAttachment.objects.create(
+            conversation=conv,
+            user=self.user,
+            file=SimpleUploadedFile("notes.txt", b"attachment body"),
+        )
+        today = timezone.now().date()
+        job = DataExportJob.objects.create(
+            organization=self.org,
+            requested_by=self.user,
+            manifest={
+                "date_from": (today - timedelta(days=7)).isoformat(),
+                "date_to": today.isoformat(),
+                "categories": {
+                    "conversations": {"enabled": True, "include_attachments": True},
+                    "agents": {"enabled": True},
+                },
+            },
+        )
+
+        run_export_job(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataExportJob.Status.READY, job.error_message)
+        self.assertEqual(job.file_size_bytes, job.file.size)
+        mock_notify.assert_called_once()
+        with job.file.open("rb") as fh, zipfile.ZipFile(fh) as zf:
+            lines = zf.read("conversations/conversations-00001.jsonl").decode().splitlines()
+            self.assertEqual(zf.read(f"attachments/{attachment.id}.txt"), b"attachment body")
+            manifest = json.loads(zf.read("export_manifest.json"))
+            self.assertIn("README.txt", zf.namelist())
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual([m["text"] for m in record["messages"]], ["first", "second"])
+        self.assertEqual(manifest["summary"]["conversations_exported"], 1)
+        self.assertEqual(manifest["summary"]["conversation_attachments_exported"], 1)
+
+
+@override_settings(DATA_EXPORT_MAX_WORKERS=3)
+class ParallelRunExportJobTests(TransactionTestCase):
+    """Worker threads use their own connections, so the data must be committed."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        self.llm = LanguageModel.objects.create(
+            provider=provider, name="Parallel LLM", slug="parallel-llm"
+        )
+        self.user = User.objects.create_user(username="parallelexport", password="pass")
+        self.org = Organization.objects.create(name="Parallel Org", owner=self.user)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.organization = self.org
+        profile.save(update_fields=["organization"])
+
+    @patch("api.data_governance.services.export_runner.notify_export_ready")
+    def test_parallel_exporters_write_a_complete_archive_in_exporter_order(self, _notify):
+        import time
+
+        from api.data_governance.exporters import EXPORTERS
+        from api.data_governance.services.export_runner import run_export_job
+        from api.messaging.models import Message
+
+        for n in range(3):
+            conv = Conversation.objects.create(user=self.user, last_message_at=timezone.now())
+            for text in ("first", "second", "third"):
+                Message.objects.create(conversation=conv, type="user", text=f"{text}-{n}")
+        Agent.objects.create(
+            name="Parallel Agent",
+            salute="hi",
+            user=self.user,
+            organization=self.org,
+            llm=self.llm,
+            model_slug=self.llm.slug,
+        )
+        completion = Completion.objects.create(prompt="p", answer="a", approved=True)
+        CompletionAssignment.objects.create(
+            completion=completion, agent=Agent.objects.get(name="Parallel Agent")
+        )
+        today = timezone.now().date()
+        job = DataExportJob.objects.create(
+            organization=self.org,
+            requested_by=self.user,
+            manifest={
+                "date_from": (today - timedelta(days=7)).isoformat(),
+                "date_to": today.isoformat(),
+                "categories": {
+                    "conversations": {"enabled": True},
+                    "agents": {"enabled": True},
+                    "completions": {"enabled": True},
+                },
+            },
+        )
+
+        # The first exporter finishes last, after the others have written their parts.
+        conversations = EXPORTERS["conversations"]
+        real_export = conversations.export
+
+        def slow_export(**kwargs):
+            time.sleep(0.3)
+            return real_export(**kwargs)
+
+        with patch.object(conversations, "export", side_effect=slow_export):
+            run_export_job(str(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DataExportJob.Status.READY, job.error_message)
+        with job.file.open("rb") as fh, zipfile.ZipFile(fh) as zf:
+            self.assertIsNone(zf.testzip())
+            manifest = json.loads(zf.read("export_manifest.json"))
+            names = set(zf.namelist())
+            records = [
+                json.loads(line)
+                for line in zf.read("conversations/conversations-00001.jsonl")
+                .decode()
+                .splitlines()
+            ]
+        self.assertEqual(manifest["summary"]["conversations_exported"], 3)
+        self.assertEqual(manifest["summary"]["completions_exported"], 1)
+        self.assertTrue(set(manifest["files"]) <= names)
+        self.assertEqual(len(names), len(manifest["files"]) + 2)
+        categories = [path.split("/")[0] for path in manifest["files"]]
+        self.assertEqual(categories, sorted(categories, key=list(EXPORTERS).index))
+        self.assertEqual(categories[0], "conversations")
+        for record in records:
+            self.assertEqual(
+                [m["text"].split("-")[0] for m in record["messages"]],
+                ["first", "second", "third"],
+            )
 
 
 class KnowledgeBaseExporterTests(TestCase):
@@ -197,14 +389,13 @@ class KnowledgeBaseExporterTests(TestCase):
         completion = Completion.objects.create(prompt="p", answer="a", approved=True)
         CompletionAssignment.objects.create(completion=completion, agent=self.agent)
 
-        with tempfile.TemporaryDirectory() as tmp:
-            result = CompletionsExporter().export(
-                organization=self.org,
-                manifest=self._manifest(
-                    completions=CompletionsExportCategory(enabled=True)
-                ),
-                output_dir=Path(tmp),
-            )
+        result, _ = _export_to_zip(
+            CompletionsExporter(),
+            self.org,
+            self._manifest(
+                completions=CompletionsExportCategory(enabled=True)
+            ),
+        )
         self.assertEqual(result.summary.get("completions_exported"), 1)
 
     def test_exports_member_personal_collection_document(self):
@@ -219,14 +410,13 @@ class KnowledgeBaseExporterTests(TestCase):
         )
         Chunk.objects.create(document=doc, content="chunk one")
 
-        with tempfile.TemporaryDirectory() as tmp:
-            result = DocumentsExporter().export(
-                organization=self.org,
-                manifest=self._manifest(
-                    documents=DocumentsExportCategory(enabled=True)
-                ),
-                output_dir=Path(tmp),
-            )
+        result, _ = _export_to_zip(
+            DocumentsExporter(),
+            self.org,
+            self._manifest(
+                documents=DocumentsExportCategory(enabled=True)
+            ),
+        )
         self.assertEqual(result.summary.get("documents_exported"), 1)
 
     def test_exports_org_document_template(self):
@@ -242,14 +432,13 @@ class KnowledgeBaseExporterTests(TestCase):
             original_filename="contract.docx",
         )
 
-        with tempfile.TemporaryDirectory() as tmp:
-            result = DocumentTemplatesExporter().export(
-                organization=self.org,
-                manifest=self._manifest(
-                    document_templates=DocumentTemplatesExportCategory(enabled=True)
-                ),
-                output_dir=Path(tmp),
-            )
+        result, _ = _export_to_zip(
+            DocumentTemplatesExporter(),
+            self.org,
+            self._manifest(
+                document_templates=DocumentTemplatesExportCategory(enabled=True)
+            ),
+        )
         self.assertEqual(result.summary.get("document_templates_exported"), 1)
         self.assertEqual(result.summary.get("document_template_files_exported"), 1)
 
@@ -0,0 +1,379 @@
+"""
+Conversation analysis: scheduling, shared helpers and batched passes.
+
+The message signal marks a conversation ``pending_analysis`` and records the
+organization whose alert rules apply (``analysis_organization``).
+``check_pending_conversations`` turns that index into work per organization:
+
+- debounce: a conversation is picked up only after ``ANALYSIS_QUIET_SECONDS``
+  without new messages (``last_message_at``), so a burst is analyzed once;
+- concurrency: at most ``ANALYSIS_MAX_IN_FLIGHT_PER_ORG`` conversations of an
+  organization are claimed (``analysis_started_at``) at any time;
+- packing: conversations whose unanalyzed text is small share one LLM call
+  (``analyze_conversation_batch``); larger ones keep their own pass
+  (``analyze_single_conversation``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+
+from api.notify.alert_dispatch import maybe_dispatch_user_notifications
+from api.utils.openai_functions import create_structured_completion
+
+from .models import Conversation, ConversationAlert, ConversationAlertRule, Message
+from .schemas import ConversationBatchAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_QUIET_SECONDS = 120
+ANALYSIS_MAX_IN_FLIGHT_PER_ORG = 5
+# A claim older than this belongs to a lost worker and is taken over.
+ANALYSIS_CLAIM_TIMEOUT_SECONDS = 15 * 60
+# Conversations with at most this much new text are packed into shared calls.
+ANALYSIS_SMALL_DELTA_CHARS = 2000
+ANALYSIS_BATCH_MAX_CONVERSATIONS = 8
+ANALYSIS_BATCH_MAX_CHARS = 8000
+# Upper bound on the rolling summary carried between incremental analysis passes.
+ANALYSIS_STATE_MAX_CHARS = 4000
+# Legacy pending rows without analysis_organization indexed per scheduler run.
+ANALYSIS_INDEX_BATCH = 500
+
+
+def new_messages_for(conversation) -> list[tuple[int, str, str]]:
+    """(id, type, text) of the messages after the conversation's analysis watermark."""
+    return list(
+        Message.objects.filter(
+            conversation=conversation,
+            id__gt=conversation.analysis_watermark or 0,
+        )
+        .order_by("id")
+        .values_list("id", "type", "text")
+    )
+
+
+def format_messages(new_messages) -> str:
+    return "\n".join(f"{message_type}: {text}" for _id, message_type, text in new_messages)
+
+
+def alert_rules_for(organization) -> list[dict]:
+    return [
+        {
+            "id": str(rule["id"]),
+            "name": rule["name"],
+            "trigger": rule["trigger"],
+            "extractions": rule["extractions"] or {},
+        }
+        for rule in ConversationAlertRule.objects.filter(
+            organization=organization, enabled=True
+        ).values("id", "name", "trigger", "extractions")
+    ]
+
+
+def existing_alerts_for(conversation) -> list[dict]:
+    return [
+        {"alert_rule_id": str(alert["alert_rule_id"]), "status": alert["status"]}
+        for alert in ConversationAlert.objects.filter(conversation=conversation).values(
+            "alert_rule_id", "status"
+        )
+    ]
+
+
+_RULE_INSTRUCTIONS = """IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los requerimientos especificados en el campo "trigger" de cada regla."""
+
+
+def analysis_system_prompt(alert_rules: list[dict], existing_alerts: list[dict], state: str) -> str:
+    alert_rules_json = json.dumps(alert_rules, ensure_ascii=False, indent=2)
+    existing_alerts_json = json.dumps(existing_alerts, ensure_ascii=False, indent=2)
+    return f"""Eres un analista experto de conversaciones. Tu tarea es analizar la conversación y:
+1. Determinar si debe levantarse alguna alerta según las reglas proporcionadas
+
+REGLAS DE ALERTA DISPONIBLES:
+{alert_rules_json}
+
+ALERTAS YA LEVANTADAS (NO debes levantar alertas duplicadas para las mismas reglas):
+{existing_alerts_json}
+
+RESUMEN DE LA CONVERSACIÓN HASTA AHORA (mensajes ya analizados en pasadas anteriores):
+{state or "(sin análisis previo; recibes la conversación desde el inicio)"}
+
+INSTRUCCIONES:
+1. Analiza cuidadosamente los mensajes nuevos a la luz del resumen anterior
+2. Evalúa si la conversación cumple con los requerimientos (trigger) de alguna de las reglas de alerta
+3. NO levantes alertas para reglas que ya están en las alertas existentes (a menos que sea necesario por alguna razón especial)
+4. Para cada alerta que levantes, proporciona:
+   - El ID de la regla correspondiente
+   - Los datos extraídos según lo especificado en el campo "extractions" de la regla
+5. En el campo "reasoning", explica claramente por qué se levanta o no cada alerta
+6. En el campo "state_summary", devuelve el resumen actualizado de toda la conversación (resumen anterior más los mensajes nuevos), en pocas frases
+
+{_RULE_INSTRUCTIONS}"""
+
+
+def batch_analysis_system_prompt(alert_rules: list[dict]) -> str:
+    alert_rules_json = json.dumps(alert_rules, ensure_ascii=False, indent=2)
+    return f"""Eres un analista experto de conversaciones. Recibes varias conversaciones independientes de la misma organización y debes analizar cada una por separado para determinar si debe levantarse alguna alerta según las reglas proporcionadas.
+
+REGLAS DE ALERTA DISPONIBLES:
+{alert_rules_json}
+
+Cada conversación empieza con "### CONVERSACIÓN <id>" e incluye sus alertas ya levantadas, el resumen de lo analizado antes y los mensajes nuevos.
+
+INSTRUCCIONES:
+1. Devuelve exactamente un resultado por conversación, con su "conversation_id"
+2. Nunca uses información de una conversación para evaluar otra
+3. NO levantes alertas para reglas que ya están en las alertas existentes de esa conversación
+4. Para cada alerta que levantes, proporciona el ID de la regla y los datos extraídos según su campo "extractions"
+5. En "reasoning", explica por qué se levanta o no cada alerta
+6. En "state_summary", devuelve el resumen actualizado de la conversación (resumen anterior más los mensajes nuevos), en pocas frases
+
+{_RULE_INSTRUCTIONS}"""
+
+
+def raise_alerts(conversation, organization, alerts, reasoning: str) -> int:
+    """Create the alerts returned by the model, skipping rules already raised on the conversation."""
+    alerts_raised = 0
+    for alert_data in alerts:
+        try:
+            alert_rule = ConversationAlertRule.objects.get(
+                id=alert_data.id,
+                organization=organization,
+                enabled=True
+            )
+
+            existing_alert = ConversationAlert.objects.filter(
+                conversation=conversation,
+                alert_rule=alert_rule
+            ).first()
+
+            if existing_alert:
+                logger.info(f"Alert already exists for rule {alert_data.id} in conversation {conversation.id}, skipping")
+                continue
+
+            title = alert_rule.name
+            extractions = alert_data.extractions or {}
+            if extractions:
+                first_key = list(extractions.keys())[0] if extractions else None
+                if first_key:
+                    title = f"{alert_rule.name} - {str(extractions.get(first_key, ''))[:30]}"
+
+            new_alert = ConversationAlert.objects.create(
+                title=title[:50],
+                reasoning=reasoning,
+                extractions=extractions,
+                conversation=conversation,
+                alert_rule=alert_rule,
+                status="PENDING"
+            )
+            maybe_dispatch_user_notifications(new_alert)
+
+            alerts_raised += 1
+            logger.info(f"Alert raised for rule {alert_rule.name} (ID: {alert_data.id}) in conversation {conversation.id}")
+
+        except ConversationAlertRule.DoesNotExist:
+            logger.warning(f"Alert rule {alert_data.id} not found or not enabled, skipping")
+            continue
+        except Exception as alert_error:
+            logger.error(f"Error creating alert for rule {alert_data.id}: {str(alert_error)}")
+            continue
+    return alerts_raised
+
+
+def complete_analysis(conversation, new_messages, state_summary: str) -> None:
+    """Advance the watermark past ``new_messages`` and release the conversation's claim."""
+    watermark = new_messages[-1][0]
+    conversation.analysis_watermark = watermark
+    # A blank summary from the model keeps the state accumulated so far.
+    summary = (state_summary or "").strip()
+    if summary:
+        conversation.analysis_state = summary[:ANALYSIS_STATE_MAX_CHARS]
+    # Messages that arrived during the pass found the conversation still
+    # pending and did not mark it again; keep it pending for them.
+    conversation.pending_analysis = Message.objects.filter(
+        conversation=conversation, id__gt=watermark
+    ).exists()
+    conversation.analysis_started_at = None
+    conversation.save(
+        update_fields=["pending_analysis", "analysis_watermark", "analysis_state", "analysis_started_at"]
+    )
+
+
+def release_analysis(conversation_ids, *, pending: bool = False) -> None:
+    """Drop the claim on conversations whose pass ended without advancing the watermark."""
+    Conversation.objects.filter(id__in=conversation_ids).update(
+        pending_analysis=pending, analysis_started_at=None
+    )
+
+
+def analyze_conversations_batch(conversation_uuids: list[str]) -> dict:
+    """Analyze several small conversations of one organization in a single LLM call."""
+    conversations = list(
+        Conversation.objects.select_related("analysis_organization").filter(
+            id__in=conversation_uuids
+        )
+    )
+    if not conversations:
+        return {"status": "skipped", "reason": "Conversations not found"}
+    organization = conversations[0].analysis_organization
+    if organization is None:
+        release_analysis([c.id for c in conversations])
+        return {"status": "skipped", "reason": "No organization"}
+
+    alert_rules = alert_rules_for(organization)
+    if not alert_rules:
+        logger.info(f"Organization {organization.name} has no alert rules, skipping batched analysis")
+        release_analysis([c.id for c in conversations])
+        return {"status": "skipped", "reason": "No alert rules configured"}
+
+    pending = {}
+    sections = []
+    for conversation in conversations:
+        new_messages = new_messages_for(conversation)
+        if not new_messages:
+            release_analysis([conversation.id])
+            continue
+        pending[str(conversation.id)] = (conversation, new_messages)
+        existing_alerts_json = json.dumps(existing_alerts_for(conversation), ensure_ascii=False)
+        sections.append(
+            f"### CONVERSACIÓN {conversation.id}\n"
+            f"ALERTAS YA LEVANTADAS: {existing_alerts_json}\n"
+            f"RESUMEN PREVIO: {conversation.analysis_state or '(sin análisis previo)'}\n"
+            f"MENSAJES NUEVOS:\n{format_messages(new_messages)}"
+        )
+    if not pending:
+        return {"status": "skipped", "reason": "No new messages"}
+
+    try:
+        analysis = create_structured_completion(
+            model="gpt-4o",
+            system_prompt=batch_analysis_system_prompt(alert_rules),
+            user_prompt="\n\n".join(sections),
+            response_format=ConversationBatchAnalysisResult,
+            api_key=os.environ.get("OPENAI_API_KEY"),
+        )
+    except Exception as openai_error:
+        logger.error(f"OpenAI API error in batched analysis of {len(pending)} conversations: {str(openai_error)}")
+        release_analysis([c.id for c, _messages in pending.values()], pending=True)
+        return {"status": "error", "error": f"OpenAI API error: {str(openai_error)}"}
+
+    alerts_raised = 0
+    for item in analysis.results:
+        entry = pending.pop(item.conversation_id.strip(), None)
+        if entry is None:
+            continue
+        conversation, new_messages = entry
+        with transaction.atomic():
+            alerts_raised += raise_alerts(conversation, organization, item.alerts, item.reasoning)
+            complete_analysis(conversation, new_messages, item.state_summary)
+
+    if pending:
+        # Left out of the answer: keep them pending for the next scheduler run.
+        logger.warning(f"Batched analysis returned no result for {len(pending)} conversations")
+        release_analysis([c.id for c, _messages in pending.values()], pending=True)
+
+    return {
+        "status": "completed",
+        "conversations": len(conversations),
+        "unanswered": len(pending),
+        "alerts_raised": alerts_raised,
+    }
+
+
+def index_unassigned_pending_conversations() -> int:
+    """Fill ``analysis_organization`` on pending rows marked before it was recorded."""
+    from .tasks import get_user_organization
+
+    conversations = list(
+        Conversation.objects.select_related("user").filter(
+            pending_analysis=True, analysis_organization__isnull=True
+        )[:ANALYSIS_INDEX_BATCH]
+    )
+    for conversation in conversations:
+        organization = get_user_organization(conversation.user)
+        Conversation.objects.filter(id=conversation.id).update(
+            analysis_organization=organization,
+            pending_analysis=organization is not None,
+        )
+    return len(conversations)
+
+
+def plan_pending_analysis(organization_ids, *, now=None) -> list[list[str]]:
+    """
+    Claim the quiet pending conversations of the given organizations that fit
+    their concurrency budget and group them into work units: one conversation
+    per unit, or several small ones to be analyzed together.
+    """
+    now = now or timezone.now()
+    stale_before = now - timedelta(seconds=ANALYSIS_CLAIM_TIMEOUT_SECONDS)
+    quiet_before = now - timedelta(seconds=ANALYSIS_QUIET_SECONDS)
+
+    in_flight = dict(
+        Conversation.objects.filter(
+            analysis_organization_id__in=organization_ids,
+            analysis_started_at__gt=stale_before,
+        )
+        .values("analysis_organization_id")
+        .annotate(n=Count("id"))
+        .values_list("analysis_organization_id", "n")
+    )
+
+    with transaction.atomic():
+        ready = list(
+            Conversation.objects.select_for_update(skip_locked=True)
+            .filter(
+                pending_analysis=True,
+                analysis_organization_id__in=organization_ids,
+            )
+            .filter(Q(last_message_at__isnull=True) | Q(last_message_at__lte=quiet_before))
+            .filter(Q(analysis_started_at__isnull=True) | Q(analysis_started_at__lte=stale_before))
+            .order_by(F("last_message_at").asc(nulls_first=True))
+            .values_list("id", "analysis_organization_id")
+        )
+        claimed_by_org: dict = {}
+        for conversation_id, organization_id in ready:
+            claimed = claimed_by_org.setdefault(organization_id, [])
+            if len(claimed) + in_flight.get(organization_id, 0) < ANALYSIS_MAX_IN_FLIGHT_PER_ORG:
+                claimed.append(conversation_id)
+        claimed_ids = [cid for ids in claimed_by_org.values() for cid in ids]
+        if not claimed_ids:
+            return []
+        Conversation.objects.filter(id__in=claimed_ids).update(analysis_started_at=now)
+
+    delta_chars = dict(
+        Message.objects.filter(
+            conversation_id__in=claimed_ids,
+            id__gt=Coalesce(F("conversation__analysis_watermark"), 0),
+        )
+        .values("conversation_id")
+        .annotate(chars=Sum(Length("text")))
+        .values_list("conversation_id", "chars")
+    )
+
+    units: list[list[str]] = []
+    for ids in claimed_by_org.values():
+        batch: list[str] = []
+        batch_chars = 0
+        for conversation_id in ids:
+            chars = delta_chars.get(conversation_id) or 0
+            if chars > ANALYSIS_SMALL_DELTA_CHARS:
+                units.append([str(conversation_id)])
+                continue
+            if batch and (
+                len(batch) >= ANALYSIS_BATCH_MAX_CONVERSATIONS
+                or batch_chars + chars > ANALYSIS_BATCH_MAX_CHARS
+            ):
+                units.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(str(conversation_id))
+            batch_chars += chars
+        if batch:
+            units.append(batch)
+    return units
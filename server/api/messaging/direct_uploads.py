@@ -0,0 +1,291 @@
+"""
+Direct multipart uploads for message attachments.
+
+Instead of posting files as base64 data URLs through Django, a client:
+
+1. starts an upload (``start_attachment_upload``) and receives one URL per
+   part. With S3 storage these are presigned ``UploadPart`` URLs, so the bytes
+   go straight to the bucket. With local storage they point at
+   ``store_local_part``, a signed stand-in used in development.
+2. PUTs each part to its URL and keeps the returned ``ETag`` header.
+3. completes the upload (``complete_attachment_upload``) with the part
+   numbers and ETags; the object is assembled in storage and the
+   ``MessageAttachment`` row is created for it.
+
+Upload sessions live in the cache for ``ATTACHMENT_UPLOAD_TTL``. Parts of
+abandoned S3 uploads are removed by the bucket's abort-incomplete lifecycle rule.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import mimetypes
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from pathlib import PurePath
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
+
+from .models import Conversation, MessageAttachment
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_UPLOAD_TTL = timedelta(hours=1)
+# S3 needs parts of at least 5 MiB (except the last) and at most 10,000 parts.
+ATTACHMENT_UPLOAD_PART_BYTES = 8 * 1024 * 1024
+ATTACHMENT_UPLOAD_MAX_PARTS = 10_000
+ATTACHMENT_UPLOAD_PART_SALT = "message-attachment-upload-part"
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class DirectUploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_upload_bytes() -> int:
+    return int(getattr(settings, "MESSAGE_ATTACHMENT_MAX_UPLOAD_BYTES", 200 * 1024 * 1024))
+
+
+def _session_key(upload_id: str) -> str:
+    return f"messaging:attachment-upload:{upload_id}"
+
+
+def _part_signer() -> TimestampSigner:
+    return TimestampSigner(salt=ATTACHMENT_UPLOAD_PART_SALT)
+
+
+def _is_s3(storage) -> bool:
+    try:
+        from storages.backends.s3 import S3Storage
+    except ImportError:
+        return False
+    return isinstance(storage, S3Storage)
+
+
+def _s3_key(storage, name: str) -> str:
+    location = (getattr(storage, "location", "") or "").strip("/")
+    return f"{location}/{name}" if location else name
+
+
+def _local_part_name(upload_id: str, part_number: int) -> str:
+    return f"attachment_uploads/{upload_id}/{part_number:05d}"
+
+
+def _storage_name(filename: str, content_type: str) -> str:
+    ext = PurePath(filename).suffix.lower()
+    if not _EXTENSION_RE.match(ext):
+        ext = mimetypes.guess_extension(content_type or "") or ".bin"
+    field = MessageAttachment._meta.get_field("file")
+    return field.generate_filename(None, f"{uuid.uuid4().hex}{ext}")
+
+
+def start_attachment_upload(
+    *,
+    conversation: Conversation,
+    owner: str,
+    filename: str,
+    content_type: str | None,
+    size: int,
+    part_url,
+) -> dict:
+    """
+    Open a multipart upload into the conversation. ``owner`` identifies who may
+    complete it; ``part_url(upload_id, part_number, signature)`` builds the
+    local stand-in part URLs.
+    """
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise DirectUploadError("size must be an integer number of bytes")
+    if size <= 0:
+        raise DirectUploadError("size must be greater than 0")
+    if size > max_upload_bytes():
+        raise DirectUploadError(
+            f"File is too large (max {max_upload_bytes() // (1024 * 1024)} MB)", status=413
+        )
+
+    filename = (filename or "").strip()[:255] or "file"
+    content_type = (
+        (content_type or "").strip() or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    )
+    part_bytes = max(ATTACHMENT_UPLOAD_PART_BYTES, math.ceil(size / ATTACHMENT_UPLOAD_MAX_PARTS))
+    part_count = math.ceil(size / part_bytes)
+    upload_id = uuid.uuid4().hex
+    name = _storage_name(filename, content_type)
+    expires_in = int(ATTACHMENT_UPLOAD_TTL.total_seconds())
+
+    storage = default_storage
+    s3_upload_id = ""
+    if _is_s3(storage):
+        client = storage.connection.meta.client
+        key = _s3_key(storage, name)
+        s3_upload_id = client.create_multipart_upload(
+            Bucket=storage.bucket_name, Key=key, ContentType=content_type
+        )["UploadId"]
+        urls = [
+            client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": storage.bucket_name,
+                    "Key": key,
+                    "UploadId": s3_upload_id,
+                    "PartNumber": number,
+                },
+                ExpiresIn=expires_in,
+            )
+            for number in range(1, part_count + 1)
+        ]
+    else:
+        signer = _part_signer()
+        urls = [
+            part_url(upload_id, number, signer.sign(f"{upload_id}:{number}"))
+            for number in range(1, part_count + 1)
+        ]
+
+    cache.set(
+        _session_key(upload_id),
+        {
+            "conversation_id": str(conversation.id),
+            "owner": owner,
+            "name": name,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "part_count": part_count,
+            "s3_upload_id": s3_upload_id,
+        },
+        timeout=expires_in,
+    )
+    return {
+        "upload_id": upload_id,
+        "part_size": part_bytes,
+        "expires_in": expires_in,
+        "parts": [
+            {"part_number": number, "url": url, "method": "PUT"}
+            for number, url in enumerate(urls, start=1)
+        ],
+    }
+
+
+def store_local_part(upload_id: str, part_number: int, signature: str, body: bytes) -> str:
+    """Local-storage stand-in for a presigned part URL; returns the part ETag."""
+    try:
+        signed = _part_signer().unsign(
+            signature, max_age=int(ATTACHMENT_UPLOAD_TTL.total_seconds())
+        )
+    except (BadSignature, SignatureExpired):
+        raise DirectUploadError("Invalid or expired upload URL", status=403)
+    if signed != f"{upload_id}:{part_number}":
+        raise DirectUploadError("Invalid or expired upload URL", status=403)
+    session = cache.get(_session_key(upload_id))
+    if not session or session["s3_upload_id"]:
+        raise DirectUploadError("Upload not found", status=404)
+
+    name = _local_part_name(upload_id, part_number)
+    default_storage.delete(name)
+    default_storage.save(name, ContentFile(body))
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def _validated_parts(parts, part_count: int) -> list[dict]:
+    if not isinstance(parts, list):
+        raise DirectUploadError("parts must be a list of {part_number, etag}")
+    by_number = {}
+    for part in parts:
+        if not isinstance(part, dict):
+            raise DirectUploadError("parts must be a list of {part_number, etag}")
+        try:
+            number = int(part.get("part_number"))
+        except (TypeError, ValueError):
+            raise DirectUploadError("part_number must be an integer")
+        etag = str(part.get("etag") or "")
+        if not etag:
+            raise DirectUploadError(f"etag is required for part {number}")
+        by_number[number] = etag
+    if sorted(by_number) != list(range(1, part_count + 1)):
+        raise DirectUploadError(f"Expected parts 1..{part_count}")
+    return [{"PartNumber": number, "ETag": by_number[number]} for number in sorted(by_number)]
+
+
+def _assemble_local(upload_id: str, session: dict) -> tuple[str, int]:
+    storage = default_storage
+    part_names = [
+        _local_part_name(upload_id, number) for number in range(1, session["part_count"] + 1)
+    ]
+    with tempfile.TemporaryFile() as combined:
+        for part_name in part_names:
+            if not storage.exists(part_name):
+                raise DirectUploadError("Upload is missing parts")
+            with storage.open(part_name, "rb") as src:
+                shutil.copyfileobj(src, combined)
+        size = combined.tell()
+        combined.seek(0)
+        name = storage.save(session["name"], File(combined, name=session["name"]))
+    for part_name in part_names:
+        storage.delete(part_name)
+    return name, size
+
+
+def complete_attachment_upload(
+    *, upload_id: str, owner: str, parts, user=None
+) -> MessageAttachment:
+    """Assemble the uploaded parts and create the attachment row."""
+    key = _session_key(upload_id)
+    session = cache.get(key)
+    if not session or session["owner"] != owner:
+        raise DirectUploadError("Upload not found", status=404)
+    conversation = Conversation.objects.filter(id=session["conversation_id"]).first()
+    if conversation is None:
+        raise DirectUploadError("Conversation not found", status=404)
+    validated = _validated_parts(parts, session["part_count"])
+    # One completion at a time; a failed one (e.g. a wrong ETag) can be retried.
+    if not cache.add(f"{key}:completing", 1, timeout=60):
+        raise DirectUploadError("Upload is already being completed", status=409)
+
+    storage = default_storage
+    name = session["name"]
+    try:
+        if session["s3_upload_id"]:
+            client = storage.connection.meta.client
+            s3_key = _s3_key(storage, name)
+            try:
+                client.complete_multipart_upload(
+                    Bucket=storage.bucket_name,
+                    Key=s3_key,
+                    UploadId=session["s3_upload_id"],
+                    MultipartUpload={"Parts": validated},
+                )
+            except Exception as exc:
+                logger.warning("Could not complete attachment upload %s", upload_id, exc_info=True)
+                raise DirectUploadError(f"Could not complete upload: {exc}")
+            size = client.head_object(Bucket=storage.bucket_name, Key=s3_key)["ContentLength"]
+        else:
+            name, size = _assemble_local(upload_id, session)
+        cache.delete(key)
+    finally:
+        cache.delete(f"{key}:completing")
+
+    if size > max_upload_bytes():
+        storage.delete(name)
+        raise DirectUploadError("Uploaded file is larger than allowed", status=413)
+
+    return MessageAttachment.objects.create(
+        conversation=conversation,
+        user=user,
+        kind="file",
+        file=name,
+        content_type=session["content_type"],
+    )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.messaging.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild ConversationDailyRollup for the whole conversation history. Until this "
+        "has run, dashboard stats only use rollups for days the periodic refresh has "
+        "rebuilt and answer older ranges from the live tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=31,
+            help="Days rebuilt per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        rows = backfill_rollups(chunk_days=max(1, options["chunk_days"]))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} conversation rollup rows."))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from api.messaging.models import Conversation, Message
+from api.messaging.search import conversation_search_vector, message_search_vector
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill Conversation/Message search vectors for rows saved before full-text "
+        "search existed (or written with bulk_create/update, which skip signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows updated per statement.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every vector, not only missing ones.",
+        )
+
+    def _backfill(self, model, vector, batch_size, rebuild_all):
+        qs = model.objects.all() if rebuild_all else model.objects.filter(search_vector__isnull=True)
+        pks = qs.order_by("pk").values_list("pk", flat=True)
+        total = 0
+        last_pk = None
+        while True:
+            batch_qs = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+            batch = list(batch_qs[:batch_size])
+            if not batch:
+                break
+            model.objects.filter(pk__in=batch).update(search_vector=vector)
+            total += len(batch)
+            last_pk = batch[-1]
+        return total
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        rebuild_all = options["all"]
+        conversations = self._backfill(
+            Conversation, conversation_search_vector(), batch_size, rebuild_all
+        )
+        messages = self._backfill(Message, message_search_vector(), batch_size, rebuild_all)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated search vectors: {conversations} conversations, {messages} messages."
+            )
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-19 08:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0036_messageattachment_visibility_db_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, help_text='Full-text index over title, summary and WhatsApp number (see messaging/search.py)', null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, help_text='Full-text index over text (see messaging/search.py)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='conversation_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='message_search_gin'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticate', '0026_userprofile__phone_numbers'),
+        ('messaging', '0037_full_text_search'),
+        ('whatsapp', '0020_wstemplate_copy_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('channel', models.CharField(choices=[('app', 'App'), ('widget', 'Widget'), ('whatsapp', 'WhatsApp')], max_length=10)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive'), ('archived', 'Archived'), ('deleted', 'Deleted')], max_length=20)),
+                ('conversations', models.IntegerField(default=0)),
+                ('messages', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chat_widget', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversation_rollups', to='messaging.chatwidget')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversation_rollups', to='authenticate.organization')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversation_rollups', to=settings.AUTH_USER_MODEL)),
+                ('ws_number', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversation_rollups', to='whatsapp.wsnumber')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='messaging_c_day_911072_idx'), models.Index(fields=['organization', 'day'], name='messaging_c_organiz_ebd298_idx'), models.Index(fields=['user', 'day'], name='messaging_c_user_id_5f40ac_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'organization', 'user', 'chat_widget', 'ws_number', 'status'), name='uniq_conversation_rollup_bucket', nulls_distinct=False)],
+            },
+        ),
+    ]
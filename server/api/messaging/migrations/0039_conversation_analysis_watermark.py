@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0038_conversation_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='analysis_state',
+            field=models.TextField(blank=True, default='', help_text='Rolling summary of the analyzed messages, sent as context with each incremental pass'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='analysis_watermark',
+            field=models.PositiveBigIntegerField(blank=True, help_text='ID of the last message covered by conversation analysis; later passes only send newer messages', null=True),
+        ),
+    ]
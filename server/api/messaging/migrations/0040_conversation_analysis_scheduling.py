@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-19 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticate', '0026_userprofile__phone_numbers'),
+        ('messaging', '0039_conversation_analysis_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='analysis_organization',
+            field=models.ForeignKey(blank=True, help_text='Organization whose alert rules apply; set when the conversation is marked for analysis', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='authenticate.organization'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='analysis_started_at',
+            field=models.DateTimeField(blank=True, help_text='Set while an analysis pass holds this conversation; bounds concurrent analyses per organization', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('pending_analysis', True)), fields=['analysis_organization', 'last_message_at'], name='conversation_pending_analysis'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0040_conversation_analysis_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationRollupCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('covered_from', models.DateField(blank=True, null=True)),
+                ('backfilled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0041_conversation_rollup_coverage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledconversationtask',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When the task was last dispatched or started; stale claims are reclaimed.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='scheduledconversationtask',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('dispatched', 'Dispatched'), ('running', 'Running'), ('done', 'Done'), ('cancelled', 'Cancelled'), ('failed', 'Failed')], db_index=True, default='pending', max_length=16),
+        ),
+    ]
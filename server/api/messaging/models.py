@@ -3,6 +3,8 @@ import os
 import uuid
 
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import Q
 from django.utils import timezone
@@ -92,11 +94,40 @@ class Conversation(models.Model):
         default=False,
         help_text="Indica si la conversación tiene un análisis pendiente de procesar"
     )
+    analysis_watermark = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="ID of the last message covered by conversation analysis; later passes only send newer messages",
+    )
+    analysis_state = models.TextField(
+        blank=True,
+        default="",
+        help_text="Rolling summary of the analyzed messages, sent as context with each incremental pass",
+    )
+    analysis_organization = models.ForeignKey(
+        Organization,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Organization whose alert rules apply; set when the conversation is marked for analysis",
+    )
+    analysis_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while an analysis pass holds this conversation; bounds concurrent analyses per organization",
+    )
     metadata = models.JSONField(
         default=dict,
         blank=True,
         help_text="Structured metadata (validated via ConversationMetadata schema), e.g. related_agents",
     )
+    search_vector = SearchVectorField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Full-text index over title, summary and WhatsApp number (see messaging/search.py)",
+    )
 
     def __str__(self):
         if self.title:
@@ -104,6 +135,13 @@ class Conversation(models.Model):
 
         return f"Conversation({self.id})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored status, so rollups can tell when a save moves the conversation between buckets.
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
     def cut_from(self, message_id):
         Message.objects.filter(conversation=self, id__gt=message_id).delete()
 
@@ -146,6 +184,14 @@ class Conversation(models.Model):
                 name="uniq_whatsapp_thread_active",
             ),
         ]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="conversation_search_gin"),
+            models.Index(
+                fields=["analysis_organization", "last_message_at"],
+                condition=Q(pending_analysis=True),
+                name="conversation_pending_analysis",
+            ),
+        ]
 
 class ConversationTakeover(models.Model):
     """Human operator temporarily replaces the AI agent on a conversation."""
@@ -381,6 +427,17 @@ class Message(models.Model):
     agents = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Full-text index over text (see messaging/search.py)",
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="message_search_gin"),
+        ]
 
     def __str__(self):
         return f"{self.type}: {self.text[:50]}"
@@ -683,6 +740,7 @@ class ScheduledConversationTask(models.Model):
 
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
+        DISPATCHED = "dispatched", "Dispatched"
         RUNNING = "running", "Running"
         DONE = "done", "Done"
         CANCELLED = "cancelled", "Cancelled"
@@ -758,6 +816,11 @@ class ScheduledConversationTask(models.Model):
         db_index=True,
     )
     celery_task_id = models.CharField(max_length=255, null=True, blank=True)
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the task was last dispatched or started; stale claims are reclaimed.",
+    )
     agent_slugs = models.JSONField(default=list, blank=True)
     multiagentic_modality = models.CharField(max_length=32, default="isolated")
     capabilities = models.JSONField(
@@ -787,4 +850,96 @@ class ScheduledConversationTask(models.Model):
 
     def __str__(self):
         label = (self.title or "").strip() or str(self.id)
-        return f"ScheduledConversationTask({label}, {self.schedule_type}, {self.status})"
\ No newline at end of file
+        return f"ScheduledConversationTask({label}, {self.schedule_type}, {self.status})"
+
+class ConversationDailyRollup(models.Model):
+    """
+    Dashboard counters per conversation creation day and dimension.
+
+    Every conversation with at least one message contributes to exactly one row:
+    the one matching its creation day (UTC), owner, organization, widget, WhatsApp
+    line and status. Message signals keep rows current; ``refresh_conversation_rollups``
+    recomputes recent days to correct drift from bulk updates and deletes.
+    """
+
+    CHANNEL_CHOICES = [
+        ("app", "App"),
+        ("widget", "Widget"),
+        ("whatsapp", "WhatsApp"),
+    ]
+
+    day = models.DateField()
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="conversation_rollups",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="conversation_rollups",
+    )
+    chat_widget = models.ForeignKey(
+        ChatWidget,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="conversation_rollups",
+    )
+    ws_number = models.ForeignKey(
+        "whatsapp.WSNumber",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="conversation_rollups",
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=20, choices=Conversation.STATUS_CHOICES)
+    conversations = models.IntegerField(default=0)
+    messages = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "day",
+                    "organization",
+                    "user",
+                    "chat_widget",
+                    "ws_number",
+                    "status",
+                ],
+                name="uniq_conversation_rollup_bucket",
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+            models.Index(fields=["organization", "day"]),
+            models.Index(fields=["user", "day"]),
+        ]
+
+    def __str__(self):
+        return f"ConversationDailyRollup({self.day}, {self.channel}, {self.status})"
+
+
+class ConversationRollupCoverage(models.Model):
+    """
+    Single row recording which creation days ConversationDailyRollup is complete for.
+
+    ``covered_from`` is the first day whose rows were rebuilt from the source tables;
+    ``backfilled_at`` is set once ``backfill_conversation_rollups`` has rebuilt the
+    whole history, after which every day is covered.
+    """
+
+    covered_from = models.DateField(null=True, blank=True)
+    backfilled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ConversationRollupCoverage(from={self.covered_from}, backfilled_at={self.backfilled_at})"
@@ -0,0 +1,179 @@
+"""
+Keyset (cursor) pagination for conversation and message listings.
+
+An ordering is a list of ``(field, descending)`` pairs whose last entry is unique
+(usually the primary key). The cursor is an opaque token carrying the ordering
+name and the sort values of the last row served, so the next page is a range
+scan from that row instead of an ``OFFSET`` that grows with the page number.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+CONVERSATION_ORDERINGS: dict[str, list[tuple[str, bool]]] = {
+    "newest": [("created_at", True), ("id", True)],
+    "oldest": [("created_at", False), ("id", False)],
+    "messages_asc": [("msg_count", False), ("created_at", True), ("id", True)],
+    "messages_desc": [("msg_count", True), ("created_at", True), ("id", True)],
+}
+
+MESSAGE_ORDERINGS: dict[str, list[tuple[str, bool]]] = {
+    "latest": [("id", True)],
+    "earliest": [("id", False)],
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(ordering_name: str, values: list) -> str:
+    payload = {"o": ordering_name, "v": [_json_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    token: str, ordering_name: str, ordering: list[tuple[str, bool]], fields: list
+) -> list:
+    """
+    Return the sort values stored in ``token`` converted by ``fields`` (one model
+    field per ordering entry); raise InvalidCursor if they do not fit ``ordering``.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor("cursor is malformed") from exc
+    if not isinstance(payload, dict) or payload.get("o") != ordering_name:
+        raise InvalidCursor("cursor does not match the requested sort order")
+    values = payload.get("v")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor("cursor is malformed")
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError) as exc:
+        raise InvalidCursor("cursor is malformed") from exc
+    if any(value is None for value in values):
+        raise InvalidCursor("cursor is malformed")
+    return values
+
+
+def _cursor_fields(queryset, ordering: list[tuple[str, bool]]) -> list:
+    """Model or annotation field behind each ordering entry, used to type cursor values."""
+    fields = []
+    for name, _ in ordering:
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            fields.append(annotation.output_field)
+        else:
+            fields.append(queryset.model._meta.get_field(name))
+    return fields
+
+
+def order_by_fields(ordering: list[tuple[str, bool]]) -> list:
+    return [F(field).desc() if desc else F(field).asc() for field, desc in ordering]
+
+
+def keyset_q(ordering: list[tuple[str, bool]], values: list) -> Q:
+    """Rows strictly after ``values`` in ``ordering`` (lexicographic tuple comparison)."""
+    condition = Q(pk__in=[])
+    for i, (field, desc) in enumerate(ordering):
+        step = Q(**{f"{field}__{'lt' if desc else 'gt'}": values[i]})
+        for j, (prev_field, _) in enumerate(ordering[:i]):
+            step &= Q(**{prev_field: values[j]})
+        condition |= step
+    return condition
+
+
+def paginate_by_cursor(
+    queryset,
+    *,
+    ordering_name: str,
+    ordering: list[tuple[str, bool]],
+    cursor: str | None,
+    limit: int,
+):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    ``queryset`` must not be sliced; it is re-ordered by ``ordering`` here.
+    """
+    queryset = queryset.order_by(*order_by_fields(ordering))
+    if cursor:
+        values = decode_cursor(
+            cursor, ordering_name, ordering, _cursor_fields(queryset, ordering)
+        )
+        queryset = queryset.filter(keyset_q(ordering, values))
+    rows = list(queryset[: limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            ordering_name, [getattr(last, field) for field, _ in ordering]
+        )
+    return rows, next_cursor
+
+
+def message_window(
+    messages,
+    *,
+    limit: int,
+    before: str | None = None,
+    after: str | None = None,
+) -> dict:
+    """
+    One window of a conversation's history, oldest first.
+
+    Without cursors this is the latest ``limit`` messages. ``before`` walks back
+    through older history; ``after`` fetches what arrived since a previous window.
+    The ``after`` cursor is set whenever the window has rows, so clients can keep
+    polling it for new messages.
+    """
+    if after:
+        rows, next_cursor = paginate_by_cursor(
+            messages,
+            ordering_name="earliest",
+            ordering=MESSAGE_ORDERINGS["earliest"],
+            cursor=after,
+            limit=limit,
+        )
+        has_more_before = True
+        has_more_after = next_cursor is not None
+    else:
+        rows, next_cursor = paginate_by_cursor(
+            messages,
+            ordering_name="latest",
+            ordering=MESSAGE_ORDERINGS["latest"],
+            cursor=before,
+            limit=limit,
+        )
+        rows.reverse()
+        has_more_before = next_cursor is not None
+        has_more_after = bool(before)
+
+    before_cursor = encode_cursor("latest", [rows[0].pk]) if rows else before
+    after_cursor = encode_cursor("earliest", [rows[-1].pk]) if rows else after
+    return {
+        "messages": rows,
+        "has_more_before": has_more_before,
+        "has_more_after": has_more_after,
+        "before": before_cursor if has_more_before else None,
+        "after": after_cursor,
+    }
@@ -0,0 +1,247 @@
+"""
+Incremental maintenance of ConversationDailyRollup (dashboard stats).
+
+Signals apply small deltas as messages arrive and conversations change status;
+``rebuild_rollups_for_days`` recomputes whole days from the source tables and is
+run periodically by ``refresh_conversation_rollups``. ``backfill_rollups`` rebuilds
+the whole history once; until it has run, ConversationRollupCoverage limits the
+dashboard to the days the rollups are known to be complete for.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Conversation,
+    ConversationDailyRollup,
+    ConversationRollupCoverage,
+    Message,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_channel(chat_widget_id, ws_number_id) -> str:
+    if ws_number_id:
+        return "whatsapp"
+    if chat_widget_id:
+        return "widget"
+    return "app"
+
+
+def rollup_bucket(conversation: Conversation, status: str | None = None) -> dict:
+    """Dimension values of the rollup row a conversation contributes to."""
+    return {
+        "day": conversation.created_at.astimezone(dt_timezone.utc).date(),
+        "organization_id": conversation.organization_id,
+        "user_id": conversation.user_id,
+        "chat_widget_id": conversation.chat_widget_id,
+        "ws_number_id": conversation.ws_number_id,
+        "status": status or conversation.status,
+    }
+
+
+def apply_rollup_delta(bucket: dict, conversations: int = 0, messages: int = 0) -> None:
+    """Add the given counts to a rollup row, creating it on first use."""
+    if not conversations and not messages:
+        return
+    update = {
+        "conversations": F("conversations") + conversations,
+        "messages": F("messages") + messages,
+        "updated_at": timezone.now(),
+    }
+    if ConversationDailyRollup.objects.filter(**bucket).update(**update):
+        return
+    try:
+        with transaction.atomic():
+            ConversationDailyRollup.objects.create(
+                **bucket,
+                channel=conversation_channel(bucket["chat_widget_id"], bucket["ws_number_id"]),
+                conversations=conversations,
+                messages=messages,
+            )
+    except IntegrityError:
+        # Another worker created the row between our update and insert.
+        ConversationDailyRollup.objects.filter(**bucket).update(**update)
+
+
+def record_message_created(message: Message) -> None:
+    conversation = message.conversation
+    # Message.save() stamps last_message_at after post_save, so None means first message.
+    is_first_message = conversation.last_message_at is None
+    apply_rollup_delta(
+        rollup_bucket(conversation),
+        conversations=1 if is_first_message else 0,
+        messages=1,
+    )
+
+
+def record_status_change(conversation: Conversation, old_status: str) -> None:
+    """Move a conversation's whole contribution from its old status bucket to the new one."""
+    if conversation.last_message_at is None:
+        return
+    message_count = conversation.messages.count()
+    apply_rollup_delta(
+        rollup_bucket(conversation, status=old_status),
+        conversations=-1,
+        messages=-message_count,
+    )
+    apply_rollup_delta(rollup_bucket(conversation), conversations=1, messages=message_count)
+
+
+def _day_bounds(day_from: date, day_to: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day_from, time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(day_to + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def rebuild_rollups_for_days(day_from: date, day_to: date) -> int:
+    """Recompute every rollup row for conversations created in [day_from, day_to]."""
+    start, end = _day_bounds(day_from, day_to)
+    rows = (
+        Message.objects.filter(
+            conversation__created_at__gte=start, conversation__created_at__lt=end
+        )
+        .annotate(day=TruncDate("conversation__created_at", tzinfo=dt_timezone.utc))
+        .values(
+            "day",
+            "conversation__organization_id",
+            "conversation__user_id",
+            "conversation__chat_widget_id",
+            "conversation__ws_number_id",
+            "conversation__status",
+        )
+        .annotate(
+            conversation_total=Count("conversation_id", distinct=True),
+            message_total=Count("id"),
+        )
+        .order_by()
+    )
+    rollups = [
+        ConversationDailyRollup(
+            day=row["day"],
+            organization_id=row["conversation__organization_id"],
+            user_id=row["conversation__user_id"],
+            chat_widget_id=row["conversation__chat_widget_id"],
+            ws_number_id=row["conversation__ws_number_id"],
+            status=row["conversation__status"],
+            channel=conversation_channel(
+                row["conversation__chat_widget_id"], row["conversation__ws_number_id"]
+            ),
+            conversations=row["conversation_total"],
+            messages=row["message_total"],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        ConversationDailyRollup.objects.filter(day__gte=day_from, day__lte=day_to).delete()
+        ConversationDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+    logger.info(
+        "Rebuilt %d conversation rollup rows for %s..%s", len(rollups), day_from, day_to
+    )
+    return len(rollups)
+
+
+def utc_today() -> date:
+    return timezone.now().astimezone(dt_timezone.utc).date()
+
+
+def stats_week_days(now: datetime | None = None) -> list[date]:
+    """
+    The seven UTC calendar days (today and the six before) behind the dashboard's
+    ``last_7_days``; the rollup and live stats both count these days.
+    """
+    today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+    return [today - timedelta(days=6 - i) for i in range(7)]
+
+
+def mark_rollups_covered_from(day: date, *, backfilled: bool = False) -> None:
+    """Record that every rollup day from ``day`` to today has been rebuilt."""
+    with transaction.atomic():
+        coverage, _ = ConversationRollupCoverage.objects.select_for_update().get_or_create(pk=1)
+        if coverage.covered_from is None or day < coverage.covered_from:
+            coverage.covered_from = day
+        if backfilled:
+            coverage.backfilled_at = timezone.now()
+        coverage.save()
+
+
+def rollups_cover(day_from: date | None) -> bool:
+    """Whether rollups are complete for every day from ``day_from`` (None: all history)."""
+    coverage = ConversationRollupCoverage.objects.filter(pk=1).first()
+    if coverage is None:
+        return False
+    if coverage.backfilled_at is not None:
+        return True
+    return (
+        day_from is not None
+        and coverage.covered_from is not None
+        and day_from >= coverage.covered_from
+    )
+
+
+def backfill_rollups(chunk_days: int = 31) -> int:
+    """Rebuild the rollups of every day since the first conversation, a chunk of days at a time."""
+    today = utc_today()
+    first = Conversation.objects.aggregate(first=Min("created_at"))["first"]
+    first_day = min(first.astimezone(dt_timezone.utc).date(), today) if first else today
+    total = 0
+    day = first_day
+    while day <= today:
+        last = min(day + timedelta(days=max(chunk_days, 1) - 1), today)
+        total += rebuild_rollups_for_days(day, last)
+        day = last + timedelta(days=1)
+    mark_rollups_covered_from(first_day, backfilled=True)
+    return total
+
+
+def rollup_stats(rollups, now: datetime | None = None) -> dict:
+    """Dashboard payload (same shape as the live ConversationStatsView) from rollup rows."""
+    now = now or timezone.now()
+    totals = rollups.aggregate(
+        total_conversations=Sum("conversations"), total_messages=Sum("messages")
+    )
+    week_days = stats_week_days(now)
+    day_counts = dict(
+        rollups.filter(day__gte=week_days[0])
+        .values("day")
+        .annotate(count=Sum("conversations"))
+        .values_list("day", "count")
+    )
+    week_points = [
+        {"date": d.isoformat(), "count": day_counts.get(d) or 0} for d in week_days
+    ]
+
+    top_users_rows = list(
+        rollups.filter(~Q(user_id=None))
+        .values("user_id")
+        .annotate(conv_count=Sum("conversations"), msg_count=Sum("messages"))
+        .order_by("-conv_count", "-msg_count")[:5]
+    )
+    user_ids = [r["user_id"] for r in top_users_rows]
+    user_map = {u.id: u.username for u in User.objects.filter(id__in=user_ids)}
+    return {
+        "total_conversations": totals["total_conversations"] or 0,
+        "total_messages": totals["total_messages"] or 0,
+        "last_7_days": sum(p["count"] for p in week_points),
+        "last_7_days_breakdown": week_points,
+        "top_users": [
+            {
+                "user_id": r["user_id"],
+                "label": user_map.get(r["user_id"]) or f"User {r['user_id']}",
+                "conversations": r["conv_count"],
+                "messages": r["msg_count"],
+            }
+            for r in top_users_rows
+        ],
+    }
@@ -47,6 +47,7 @@ def list_scheduled_tasks_for_conversation(
         qs = qs.filter(
             status__in=[
                 ScheduledConversationTask.Status.PENDING,
+                ScheduledConversationTask.Status.DISPATCHED,
                 ScheduledConversationTask.Status.RUNNING,
             ]
         )
@@ -82,6 +83,7 @@ def list_scheduled_tasks_for_user(
         qs = qs.filter(
             status__in=[
                 ScheduledConversationTask.Status.PENDING,
+                ScheduledConversationTask.Status.DISPATCHED,
                 ScheduledConversationTask.Status.RUNNING,
             ]
         )
@@ -164,6 +166,9 @@ def cancel_scheduled_task(
                 exc_info=True,
             )
 
+    from api.messaging.scheduler import unschedule_conversation_task
+
+    unschedule_conversation_task(task.id)
     task.status = ScheduledConversationTask.Status.CANCELLED
     task.celery_task_id = None
     task.save(update_fields=["status", "celery_task_id", "updated_at"])
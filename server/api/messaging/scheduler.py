@@ -0,0 +1,263 @@
+"""
+Dispatcher for ``ScheduledConversationTask``.
+
+Pending tasks live in a Redis sorted set scored by ``next_run_at``.
+``dispatch_scheduled_conversation_tasks`` runs every second from beat. Each run
+atomically pops the members due within the next second, in batches and
+without a fixed ceiling. Members due in the past are sent right away; members
+due within the next second are sent with that exact ETA. This keeps
+sub-second precision without parking long ETAs in the workers.
+
+Sent tasks are marked ``dispatched`` (with their Celery id and ``claimed_at``)
+before the message goes out, and ``running`` once a worker starts them. Each
+organization has at most ``SCHEDULED_TASKS_MAX_RUNNING_PER_ORG`` tasks in
+either state; due tasks over that budget go back into the set a few seconds
+later.
+
+The database stays the source of truth: ``run_due_scheduled_conversation_tasks``
+re-adds pending rows that will soon be due, which covers a lost enqueue or a
+Redis restart, and ``reap_stale_scheduled_tasks`` releases claims whose Celery
+message was lost or whose worker died mid-run.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import ScheduledConversationTask
+
+logger = logging.getLogger(__name__)
+
+# Members due this far ahead are dispatched now with an exact ETA.
+SCHEDULER_LOOKAHEAD_SECONDS = 1.0
+SCHEDULER_CLAIM_BATCH = 500
+# Bounds one dispatcher run; anything left is picked up by the next tick.
+SCHEDULER_MAX_PER_RUN = 10000
+# Delay before re-checking a task deferred by its organization's budget.
+SCHEDULER_DEFER_SECONDS = 5
+# Pending rows due within this window are re-added on every reconcile pass.
+SCHEDULER_RECONCILE_HORIZON = timedelta(minutes=5)
+SCHEDULER_RECONCILE_CHUNK = 1000
+# A dispatched task no worker has started after this long goes back to pending.
+SCHEDULER_DISPATCH_TIMEOUT = timedelta(minutes=10)
+# A run still marked running after this long is assumed lost with its worker.
+SCHEDULER_RUNNING_TIMEOUT = timedelta(hours=1)
+
+
+def _queue_key() -> str:
+    return cache.make_key("messaging:scheduled-tasks")
+
+
+def max_running_per_org() -> int:
+    return int(getattr(settings, "SCHEDULED_TASKS_MAX_RUNNING_PER_ORG", 5))
+
+
+# KEYS: queue. ARGV: max score, limit. Pops the due members in one step so
+# concurrent dispatchers never send the same task twice.
+_CLAIM_DUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #ids > 0 then
+  redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+
+def _add(members: dict[str, float], *, nx: bool = False) -> None:
+    if members:
+        get_redis_connection("default").zadd(_queue_key(), members, nx=nx)
+
+
+def _claim_due(max_score: float, limit: int) -> list[str]:
+    ids = get_redis_connection("default").eval(
+        _CLAIM_DUE_SCRIPT, 1, _queue_key(), repr(max_score), limit
+    )
+    return [i.decode() if isinstance(i, bytes) else i for i in ids]
+
+
+def schedule_conversation_task(task: ScheduledConversationTask) -> None:
+    """Queue (or move) a pending task at its ``next_run_at`` once the current transaction commits."""
+    members = {str(task.id): task.next_run_at.timestamp()}
+
+    def _schedule():
+        try:
+            _add(members)
+        except Exception:
+            # The reconcile pass re-adds the task before it is due.
+            logger.warning("Could not queue scheduled task %s", task.id, exc_info=True)
+
+    transaction.on_commit(_schedule)
+
+
+def unschedule_conversation_task(task_id) -> None:
+    try:
+        get_redis_connection("default").zrem(_queue_key(), str(task_id))
+    except Exception:
+        # A stale member is dropped at dispatch time: the row is no longer pending.
+        logger.warning("Could not unqueue scheduled task %s", task_id, exc_info=True)
+
+
+def _send(tasks: list[tuple[str, object]], now) -> None:
+    """Mark ``(task_id, next_run_at)`` pairs dispatched with their Celery ids, then send them."""
+    from .tasks import run_scheduled_conversation_task
+
+    if not tasks:
+        return
+    celery_ids = {task_id: str(uuid.uuid4()) for task_id, _next_run_at in tasks}
+    ScheduledConversationTask.objects.filter(
+        id__in=list(celery_ids), status=ScheduledConversationTask.Status.PENDING
+    ).update(
+        status=ScheduledConversationTask.Status.DISPATCHED,
+        claimed_at=now,
+        celery_task_id=Case(
+            *[When(id=task_id, then=Value(celery_id)) for task_id, celery_id in celery_ids.items()],
+            output_field=CharField(),
+        ),
+        updated_at=now,
+    )
+    for task_id, next_run_at in tasks:
+        options = {"eta": next_run_at} if next_run_at > now else {}
+        run_scheduled_conversation_task.apply_async(
+            args=[task_id], task_id=celery_ids[task_id], **options
+        )
+
+
+def dispatch_due_scheduled_tasks(*, now=None) -> dict:
+    now = now or timezone.now()
+    max_score = now.timestamp() + SCHEDULER_LOOKAHEAD_SECONDS
+    budget = max_running_per_org()
+    # Dispatched tasks count too: they are already on their way to a worker.
+    running = dict(
+        ScheduledConversationTask.objects.filter(
+            status__in=[
+                ScheduledConversationTask.Status.DISPATCHED,
+                ScheduledConversationTask.Status.RUNNING,
+            ]
+        )
+        .values("organization_id")
+        .annotate(n=Count("id"))
+        .values_list("organization_id", "n")
+    )
+
+    dispatched = deferred = dropped = claimed_total = 0
+    while claimed_total < SCHEDULER_MAX_PER_RUN:
+        ids = _claim_due(max_score, SCHEDULER_CLAIM_BATCH)
+        if not ids:
+            break
+        claimed_total += len(ids)
+        rows = ScheduledConversationTask.objects.filter(
+            id__in=ids, status=ScheduledConversationTask.Status.PENDING
+        ).values_list("id", "organization_id", "next_run_at")
+
+        requeue: dict[str, float] = {}
+        send: list[tuple[str, object]] = []
+        found = 0
+        for task_id, organization_id, next_run_at in rows:
+            found += 1
+            task_id = str(task_id)
+            if next_run_at.timestamp() > max_score:
+                # Rescheduled after it was queued; keep the newer time.
+                requeue[task_id] = next_run_at.timestamp()
+                continue
+            if running.get(organization_id, 0) >= budget:
+                requeue[task_id] = now.timestamp() + SCHEDULER_DEFER_SECONDS
+                deferred += 1
+                continue
+            running[organization_id] = running.get(organization_id, 0) + 1
+            send.append((task_id, next_run_at))
+        _send(send, now)
+        dispatched += len(send)
+        # Cancelled, finished or deleted rows simply leave the queue.
+        dropped += len(ids) - found
+        _add(requeue)
+
+    if dispatched or deferred:
+        logger.info(
+            "Scheduled task dispatcher: dispatched=%d deferred=%d dropped=%d",
+            dispatched,
+            deferred,
+            dropped,
+        )
+    return {"dispatched": dispatched, "deferred": deferred, "dropped": dropped}
+
+
+def _stale_claim_q(timeout: timedelta, now) -> Q:
+    cutoff = now - timeout
+    # Rows claimed before claimed_at existed fall back to their last update.
+    return Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True, updated_at__lt=cutoff)
+
+
+def reap_stale_scheduled_tasks(*, now=None) -> dict:
+    """
+    Release claims nobody is working on: dispatched tasks no worker started go
+    back to pending, and runs whose worker died are failed (one-off) or moved to
+    their next occurrence (recurring) so they stop counting against the budget.
+    """
+    from .schedule_helpers import compute_next_run_at
+
+    now = now or timezone.now()
+    Status = ScheduledConversationTask.Status
+    released = ScheduledConversationTask.objects.filter(
+        _stale_claim_q(SCHEDULER_DISPATCH_TIMEOUT, now), status=Status.DISPATCHED
+    ).update(status=Status.PENDING, claimed_at=None, celery_task_id=None, updated_at=now)
+
+    abandoned = 0
+    stale_runs = ScheduledConversationTask.objects.filter(
+        _stale_claim_q(SCHEDULER_RUNNING_TIMEOUT, now), status=Status.RUNNING
+    )[:SCHEDULER_RECONCILE_CHUNK]
+    for task in stale_runs:
+        next_run_at = None
+        if task.schedule_type == ScheduledConversationTask.ScheduleType.RECURRING:
+            try:
+                next_run_at = compute_next_run_at(
+                    schedule_type="recurring", tz_name=task.timezone, cron=task.cron, after=now
+                )
+            except Exception:
+                logger.warning("Could not advance stale scheduled task %s", task.id, exc_info=True)
+        updated = ScheduledConversationTask.objects.filter(id=task.id, status=Status.RUNNING).update(
+            status=Status.PENDING if next_run_at else Status.FAILED,
+            next_run_at=next_run_at or task.next_run_at,
+            last_error="Run did not finish; its worker stopped",
+            claimed_at=None,
+            celery_task_id=None,
+            updated_at=now,
+        )
+        if updated and next_run_at:
+            task.status, task.next_run_at = Status.PENDING, next_run_at
+            schedule_conversation_task(task)
+        abandoned += updated
+
+    if released or abandoned:
+        logger.warning(
+            "Scheduled task reaper: released=%d abandoned_runs=%d", released, abandoned
+        )
+    return {"released": released, "abandoned_runs": abandoned}
+
+
+def reconcile_scheduled_tasks(*, now=None) -> int:
+    """Re-add pending rows due within the horizon; members already queued keep their score."""
+    now = now or timezone.now()
+    qs = ScheduledConversationTask.objects.filter(
+        status=ScheduledConversationTask.Status.PENDING,
+        next_run_at__lte=now + SCHEDULER_RECONCILE_HORIZON,
+    ).order_by("id")
+    added = 0
+    last_id = None
+    while True:
+        chunk_qs = qs if last_id is None else qs.filter(id__gt=last_id)
+        chunk = list(chunk_qs.values_list("id", "next_run_at")[:SCHEDULER_RECONCILE_CHUNK])
+        if not chunk:
+            break
+        _add({str(task_id): next_run_at.timestamp() for task_id, next_run_at in chunk}, nx=True)
+        added += len(chunk)
+        last_id = chunk[-1][0]
+    return added
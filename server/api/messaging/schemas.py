@@ -24,6 +24,41 @@ class ConversationAnalysisResult(BaseModel):
         default_factory=list,
         description="Lista de alertas que se deben levantar para esta conversación"
     )
+    state_summary: str = Field(
+        default="",
+        description=(
+            "Resumen breve y acumulado de la conversación completa (estado anterior más "
+            "los mensajes nuevos), con los hechos relevantes para las reglas de alerta"
+        ),
+    )
+
+
+class ConversationBatchAnalysisItem(BaseModel):
+    """Resultado del análisis de una conversación dentro de un lote."""
+
+    conversation_id: str = Field(
+        description="ID de la conversación, tal como aparece en su encabezado"
+    )
+    reasoning: str = Field(
+        description="Explicación de por qué la conversación levanta o no una o varias alertas"
+    )
+    alerts: list[Alert] = Field(
+        default_factory=list,
+        description="Lista de alertas que se deben levantar para esta conversación"
+    )
+    state_summary: str = Field(
+        default="",
+        description="Resumen actualizado de la conversación completa (resumen anterior más los mensajes nuevos)",
+    )
+
+
+class ConversationBatchAnalysisResult(BaseModel):
+    """Schema para el análisis de varias conversaciones en una sola llamada."""
+
+    results: list[ConversationBatchAnalysisItem] = Field(
+        default_factory=list,
+        description="Un resultado por cada conversación recibida"
+    )
 
 
 class ChatWidgetStyle(BaseModel):
@@ -0,0 +1,196 @@
+"""
+Full-text search over conversations and message bodies (Postgres tsvector + GIN).
+
+``Conversation.search_vector`` covers title, summary and the WhatsApp number;
+``Message.search_vector`` covers the message text. Both are refreshed by the
+post_save signals in ``signals.py`` and can be rebuilt with the
+``backfill_search_vectors`` management command.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Conversation, Message
+
+# "simple" keeps tokens as typed (no stemming); conversations mix languages.
+SEARCH_CONFIG = "simple"
+
+CONVERSATION_SEARCH_FIELDS = ("title", "summary", "whatsapp_user_number")
+MESSAGE_SEARCH_FIELDS = ("text",)
+
+# Inputs shorter than this, or made only of hex digits and dashes (a pasted piece
+# of a conversation id), also fall back to a substring match on id and title.
+SEARCH_SUBSTRING_MAX_CHARS = 2
+_UUID_FRAGMENT_RE = re.compile(r"^[0-9a-fA-F-]{4,36}$")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Phone numbers as operators type them: digits with an optional leading "+",
+# spaces or dashes. They match anywhere in the stored WhatsApp number, since the
+# national part is searched more often than the country code.
+_PHONE_FRAGMENT_RE = re.compile(r"^\+?[\d\s-]+$")
+
+SNIPPET_START = "<mark>"
+SNIPPET_STOP = "</mark>"
+
+
+def conversation_search_vector():
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("summary", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("whatsapp_user_number", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def message_search_vector():
+    return SearchVector("text", config=SEARCH_CONFIG)
+
+
+def refresh_conversation_search_vector(conversation_id) -> None:
+    Conversation.objects.filter(pk=conversation_id).update(
+        search_vector=conversation_search_vector()
+    )
+
+
+def refresh_message_search_vector(message_id) -> None:
+    Message.objects.filter(pk=message_id).update(search_vector=message_search_vector())
+
+
+def build_search_query(text: str) -> SearchQuery:
+    """
+    Websearch syntax over the whole input, OR'd with a prefix match on the last
+    word so results appear while the user is still typing it.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    tokens = _TOKEN_RE.findall(text)
+    if tokens:
+        # Tokens are word characters only, so they are safe in a raw tsquery.
+        raw = " & ".join([*tokens[:-1], f"{tokens[-1]}:*"])
+        query |= SearchQuery(raw, config=SEARCH_CONFIG, search_type="raw")
+    return query
+
+
+def _substring_fallback(text: str) -> bool:
+    text = text.strip()
+    return len(text) <= SEARCH_SUBSTRING_MAX_CHARS or bool(_UUID_FRAGMENT_RE.match(text))
+
+
+def _phone_fragment(text: str) -> str:
+    text = text.strip()
+    if not _PHONE_FRAGMENT_RE.match(text):
+        return ""
+    return re.sub(r"\D", "", text)
+
+
+def _exact_conversation_id(text: str):
+    try:
+        return uuid.UUID(text.strip())
+    except ValueError:
+        return None
+
+
+def conversation_search_q(text: str) -> Q:
+    """
+    Match conversations by metadata or by what was said in any of their messages.
+
+    A full UUID matches the conversation id directly; a number matches WhatsApp
+    threads whose user number contains it. Very short or UUID-like input also
+    matches conversations whose id or title contains it.
+    """
+    query = build_search_query(text)
+    q = (
+        Q(search_vector=query)
+        | Q(
+            id__in=Message.objects.filter(search_vector=query).values(
+                "conversation_id"
+            )
+        )
+    )
+    conversation_id = _exact_conversation_id(text)
+    if conversation_id:
+        q |= Q(id=conversation_id)
+    elif _substring_fallback(text):
+        fragment = text.strip()
+        q |= Q(id__icontains=fragment) | Q(title__icontains=fragment)
+    digits = _phone_fragment(text)
+    if digits:
+        q |= Q(whatsapp_user_number__icontains=digits)
+    return q
+
+
+def search_conversations(conversations, text: str, limit: int = 20) -> list[dict]:
+    """
+    Rank ``conversations`` against ``text`` and return the best ``limit`` hits.
+
+    Each hit carries the conversation, its rank, and, when the match came from a
+    message, the best matching message id with a highlighted snippet. Hit
+    conversations are loaded from ``conversations`` itself, so its annotations and
+    prefetches carry through to the results. Ranking and the limit run in SQL;
+    best messages and snippets are only looked up for the returned hits.
+    """
+    query = build_search_query(text)
+    best_message_rank = (
+        Message.objects.filter(conversation_id=OuterRef("pk"), search_vector=query)
+        .annotate(rank=SearchRank("search_vector", query))
+        .order_by("-rank")
+        .values("rank")[:1]
+    )
+    zero = Value(0.0, output_field=FloatField())
+    top = list(
+        conversations.filter(conversation_search_q(text))
+        .annotate(
+            search_rank=Greatest(
+                Coalesce(SearchRank("search_vector", query), zero),
+                Coalesce(Subquery(best_message_rank, output_field=FloatField()), zero),
+            )
+        )
+        .order_by("-search_rank", "-id")[:limit]
+    )
+
+    best_message = {
+        row["conversation_id"]: row["id"]
+        for row in Message.objects.filter(
+            conversation_id__in=[conversation.id for conversation in top],
+            search_vector=query,
+        )
+        .annotate(rank=SearchRank("search_vector", query))
+        .order_by("conversation_id", "-rank", "-id")
+        .distinct("conversation_id")
+        .values("id", "conversation_id")
+    }
+    snippets = dict(
+        Message.objects.filter(id__in=best_message.values())
+        .annotate(
+            snippet=SearchHeadline(
+                "text",
+                query,
+                config=SEARCH_CONFIG,
+                start_sel=SNIPPET_START,
+                stop_sel=SNIPPET_STOP,
+                max_fragments=2,
+            )
+        )
+        .values_list("id", "snippet")
+    )
+
+    hits = []
+    for conversation in top:
+        message_id = best_message.get(conversation.id)
+        hits.append(
+            {
+                "conversation": conversation,
+                "rank": conversation.search_rank,
+                "message_id": message_id,
+                "snippet": snippets.get(message_id) if message_id else None,
+            }
+        )
+    return hits
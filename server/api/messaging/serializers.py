@@ -2,18 +2,33 @@ from urllib.parse import urlparse
 
 from rest_framework import serializers
 from pydantic import ValidationError as PydanticValidationError
-from .models import Message, Conversation, ChatWidget, ConversationAlert, ConversationAlertRule, Tag
+from django.db.models import Prefetch
+
+from .models import (
+    Message,
+    Conversation,
+    ChatWidget,
+    ConversationAlert,
+    ConversationAlertRule,
+    ConversationTakeover,
+    Tag,
+)
 from api.ai_layers.models import Agent
 from api.feedback.serializers import ReactionSerializer
 from api.utils.timezone_utils import format_datetime_for_organization, get_organization_timezone_from_request
 from api.ai_layers.tools import canonical_tool_name, list_available_tools
+from .pagination import message_window
 from .schemas import ChatWidgetStyle, ChatWidgetCapabilitiesPayload
 from .widget_avatar_urls import clear_widget_uploaded_avatar, resolved_avatar_image
 
 def serialize_active_takeover(conversation) -> dict | None:
     from .takeover import get_active_takeover, operator_display_name
 
-    takeover = get_active_takeover(conversation)
+    prefetched = getattr(conversation, "prefetched_active_takeovers", None)
+    if prefetched is not None:
+        takeover = prefetched[0] if prefetched else None
+    else:
+        takeover = get_active_takeover(conversation)
     if not takeover:
         return None
     return {
@@ -25,26 +40,61 @@ def serialize_active_takeover(conversation) -> dict | None:
         "started_at": takeover.started_at.isoformat() if takeover.started_at else None,
     }
 
-class MessageSerializer(serializers.ModelSerializer):
+def prefetch_conversation_list(queryset):
+    """
+    Eager-load everything ConversationSerializer reads per row, so serializing a
+    page costs a fixed number of queries regardless of its size.
+    """
+    return queryset.select_related("user", "widget_visitor_session").prefetch_related(
+        Prefetch(
+            "alerts",
+            queryset=ConversationAlert.objects.only(
+                "id", "conversation_id", "alert_rule_id", "status"
+            ),
+            to_attr="prefetched_alerts",
+        ),
+        Prefetch(
+            "takeovers",
+            queryset=ConversationTakeover.objects.filter(
+                status=ConversationTakeover.Status.ACTIVE
+            ).select_related("user"),
+            to_attr="prefetched_active_takeovers",
+        ),
+    )
+
+class OrganizationTimezoneMixin:
+    """Resolves the request organization's timezone once per serializer context."""
+
+    def get_org_timezone(self):
+        context = self.context
+        if "org_timezone" not in context:
+            request = context.get("request")
+            context["org_timezone"] = (
+                get_organization_timezone_from_request(request) if request else "UTC"
+            )
+        return context["org_timezone"]
+
+    def format_for_organization(self, value):
+        return format_datetime_for_organization(
+            value,
+            self.get_org_timezone(),
+            '%Y-%m-%d %H:%M:%S %Z'
+        )
+
+class MessageSerializer(OrganizationTimezoneMixin, serializers.ModelSerializer):
     reactions = serializers.SerializerMethodField()
     created_at_formatted = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
-        fields = "__all__"
+        exclude = ["search_vector"]
 
     def get_reactions(self, obj):
         return ReactionSerializer(obj.reaction_set.all(), many=True).data
     
     def get_created_at_formatted(self, obj):
         """Retorna el created_at formateado según la zona horaria de la organización"""
-        request = self.context.get('request')
-        org_timezone = get_organization_timezone_from_request(request) if request else 'UTC'
-        return format_datetime_for_organization(
-            obj.created_at,
-            org_timezone,
-            '%Y-%m-%d %H:%M:%S %Z'
-        )
+        return self.format_for_organization(obj.created_at)
 
     def validate(self, data):
         if data["type"] not in ["user", "assistant"]:
@@ -55,7 +105,7 @@ class MessageSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Text field cannot be empty.")
         return data
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(OrganizationTimezoneMixin, serializers.ModelSerializer):
     number_of_messages = serializers.SerializerMethodField()
     summary = serializers.SerializerMethodField()
     created_at_formatted = serializers.SerializerMethodField()
@@ -70,7 +120,13 @@ class ConversationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Conversation
-        fields = "__all__"
+        exclude = [
+            "search_vector",
+            "analysis_watermark",
+            "analysis_state",
+            "analysis_organization",
+            "analysis_started_at",
+        ]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -82,6 +138,9 @@ class ConversationSerializer(serializers.ModelSerializer):
         return serialize_active_takeover(obj)
 
     def get_number_of_messages(self, obj):
+        msg_count = getattr(obj, "msg_count", None)
+        if msg_count is not None:
+            return msg_count
         return obj.messages.count()
 
     def get_summary(self, obj):
@@ -89,37 +148,34 @@ class ConversationSerializer(serializers.ModelSerializer):
         return obj.summary or ""
 
     def get_alerts_count(self, obj):
+        alerts = getattr(obj, "prefetched_alerts", None)
+        if alerts is not None:
+            return len(alerts)
         return obj.alerts.count()
 
     def get_alert_rule_ids(self, obj):
         """Return distinct alert rule IDs triggered on this conversation."""
+        alerts = getattr(obj, "prefetched_alerts", None)
+        if alerts is not None:
+            return list(dict.fromkeys(alert.alert_rule_id for alert in alerts))
         return list(
             obj.alerts.values_list("alert_rule_id", flat=True).distinct()
         )
 
     def get_has_pending_alerts(self, obj):
         """True if any alert is PENDING or NOTIFIED (needs action)."""
+        alerts = getattr(obj, "prefetched_alerts", None)
+        if alerts is not None:
+            return any(alert.status in ("PENDING", "NOTIFIED") for alert in alerts)
         return obj.alerts.filter(status__in=["PENDING", "NOTIFIED"]).exists()
     
     def get_created_at_formatted(self, obj):
         """Retorna el created_at formateado según la zona horaria de la organización"""
-        request = self.context.get('request')
-        org_timezone = get_organization_timezone_from_request(request) if request else 'UTC'
-        return format_datetime_for_organization(
-            obj.created_at,
-            org_timezone,
-            '%Y-%m-%d %H:%M:%S %Z'
-        )
+        return self.format_for_organization(obj.created_at)
     
     def get_updated_at_formatted(self, obj):
         """Retorna el updated_at formateado según la zona horaria de la organización"""
-        request = self.context.get('request')
-        org_timezone = get_organization_timezone_from_request(request) if request else 'UTC'
-        return format_datetime_for_organization(
-            obj.updated_at,
-            org_timezone,
-            '%Y-%m-%d %H:%M:%S %Z'
-        )
+        return self.format_for_organization(obj.updated_at)
 
     def get_is_anonymous_widget(self, obj):
         return obj.user_id is None and obj.chat_widget_id is not None
@@ -142,6 +198,14 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 class BigConversationSerializer(serializers.ModelSerializer):
+    """
+    Conversation detail with its message history.
+
+    Pass ``messages_limit`` (and optionally ``messages_before`` / ``messages_after``
+    cursors) in the context to serialize a window of history instead of every message;
+    the window's cursors are returned under ``messages_window``.
+    """
+
     messages = serializers.SerializerMethodField()
     number_of_messages = serializers.SerializerMethodField()
     is_anonymous_widget = serializers.SerializerMethodField()
@@ -151,19 +215,40 @@ class BigConversationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Conversation
-        fields = "__all__"
+        exclude = [
+            "search_vector",
+            "analysis_watermark",
+            "analysis_state",
+            "analysis_organization",
+            "analysis_started_at",
+        ]
 
     def to_representation(self, instance):
+        self._messages_window = None
         data = super().to_representation(instance)
         data["user_id"] = instance.user_id if instance.user_id else None
         data["user_username"] = instance.user.username if instance.user else None
+        if self._messages_window is not None:
+            data["messages_window"] = self._messages_window
         return data
 
     def get_active_takeover(self, obj):
         return serialize_active_takeover(obj)
 
     def get_messages(self, obj):
-        ordered_messages = obj.messages.order_by('id')
+        messages = obj.messages.prefetch_related("reaction_set")
+        limit = self.context.get("messages_limit")
+        if limit:
+            window = message_window(
+                messages,
+                limit=limit,
+                before=self.context.get("messages_before"),
+                after=self.context.get("messages_after"),
+            )
+            ordered_messages = window.pop("messages")
+            self._messages_window = window
+        else:
+            ordered_messages = messages.order_by('id')
         return MessageSerializer(ordered_messages, many=True, context=self.context).data
 
     def get_number_of_messages(self, obj):
@@ -203,7 +288,13 @@ class SharedConversationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Conversation
-        fields = "__all__"
+        exclude = [
+            "search_vector",
+            "analysis_watermark",
+            "analysis_state",
+            "analysis_organization",
+            "analysis_started_at",
+        ]
 
 class ChatWidgetConfigSerializer(serializers.ModelSerializer):
     agent_slug = serializers.SerializerMethodField()
@@ -492,7 +583,7 @@ class ConversationAlertRuleSerializer(serializers.ModelSerializer):
             self._set_agents(instance, agent_ids)
         return instance
 
-class ConversationAlertSerializer(serializers.ModelSerializer):
+class ConversationAlertSerializer(OrganizationTimezoneMixin, serializers.ModelSerializer):
     alert_rule = ConversationAlertRuleSerializer(read_only=True)
     conversation_title = serializers.SerializerMethodField()
     conversation_id = serializers.SerializerMethodField()
@@ -537,20 +628,8 @@ class ConversationAlertSerializer(serializers.ModelSerializer):
     
     def get_created_at_formatted(self, obj):
         """Retorna el created_at formateado según la zona horaria de la organización"""
-        request = self.context.get('request')
-        org_timezone = get_organization_timezone_from_request(request) if request else 'UTC'
-        return format_datetime_for_organization(
-            obj.created_at,
-            org_timezone,
-            '%Y-%m-%d %H:%M:%S %Z'
-        )
+        return self.format_for_organization(obj.created_at)
     
     def get_updated_at_formatted(self, obj):
         """Retorna el updated_at formateado según la zona horaria de la organización"""
-        request = self.context.get('request')
-        org_timezone = get_organization_timezone_from_request(request) if request else 'UTC'
-        return format_datetime_for_organization(
-            obj.updated_at,
-            org_timezone,
-            '%Y-%m-%d %H:%M:%S %Z'
-        )
\ No newline at end of file
+        return self.format_for_organization(obj.updated_at)
\ No newline at end of file
@@ -1,86 +1,102 @@
 import logging
 
+from django.core.cache import cache
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from api.authenticate.services import FeatureFlagService
-from api.consumption.tasks import async_register_llm_interaction
 from api.messaging.tasks import get_user_organization
 from api.utils.color_printer import printer
 
 from .models import Conversation, Message
+from .rollups import record_message_created, record_status_change
+from .search import (
+    CONVERSATION_SEARCH_FIELDS,
+    MESSAGE_SEARCH_FIELDS,
+    refresh_conversation_search_vector,
+    refresh_message_search_vector,
+)
 
 logger = logging.getLogger(__name__)
 
-def _resolve_billing_context(conversation: Conversation) -> tuple[int | None, int | None]:
-    """
-    Return (billing_user_id, organization_id) for consumption registration.
+# Feature flag assignments change rarely; re-checking them on every message
+# save was most of this signal's cost.
+ANALYSIS_FLAG_CACHE_SECONDS = 5 * 60
+# Saves touching only other fields (metadata, reactions, ...) do not mark the
+# conversation for analysis again.
+ANALYSIS_MESSAGE_FIELDS = ("text", "versions", "attachments")
+
+def _analysis_flag_key(user_id) -> str:
+    return f"messaging:conversation-analysis-org:{user_id}"
 
-    Anonymous channels (widget/WhatsApp) have conversation.user=None; charge the org wallet
-    using organization.owner_id when available.
+def conversation_analysis_organization_id(user):
+    """
+    Organization whose alert rules analyze this user's conversations, or None
+    when ``conversation-analysis`` is off for them. Cached.
     """
-    organization_id = conversation.organization_id
-    if conversation.user_id:
-        if not organization_id and conversation.user:
-            org = get_user_organization(conversation.user)
-            organization_id = org.id if org else None
-        return conversation.user_id, organization_id
-    if organization_id:
-        owner_id = conversation.organization.owner_id
-        if owner_id:
-            return owner_id, organization_id
-    return None, organization_id
+    key = _analysis_flag_key(user.id)
+    organization_id = cache.get(key)
+    if organization_id is None:
+        organization = get_user_organization(user)
+        enabled = False
+        if organization:
+            enabled, _ = FeatureFlagService.is_feature_enabled(
+                "conversation-analysis", organization=organization, user=user
+            )
+        # 0 caches "disabled" (None would read back as a miss).
+        organization_id = organization.id if enabled else 0
+        cache.set(key, organization_id, ANALYSIS_FLAG_CACHE_SECONDS)
+    return organization_id or None
 
-@receiver(post_save, sender=Message)
-def message_post_save(sender, instance, **kwargs):
-    try:
-        if instance.type == "assistant":
-            for version in instance.versions:
-                usage = version.get("usage")
-                if not usage:
-                    continue
+def _touches_search_fields(update_fields, search_fields) -> bool:
+    return update_fields is None or bool(set(update_fields) & set(search_fields))
+
+@receiver(post_save, sender=Conversation)
+def conversation_search_post_save(sender, instance, update_fields=None, **kwargs):
+    if _touches_search_fields(update_fields, CONVERSATION_SEARCH_FIELDS):
+        refresh_conversation_search_vector(instance.pk)
 
-                model_slug = usage.get("model_slug")
-                input_tokens = usage.get("prompt_tokens")
-                output_tokens = usage.get("completion_tokens")
+@receiver(post_save, sender=Message)
+def message_search_post_save(sender, instance, update_fields=None, **kwargs):
+    if _touches_search_fields(update_fields, MESSAGE_SEARCH_FIELDS):
+        refresh_message_search_vector(instance.pk)
 
-                if not input_tokens or not output_tokens:
-                    continue
+@receiver(post_save, sender=Conversation)
+def conversation_rollup_post_save(sender, instance, created=False, **kwargs):
+    old_status = getattr(instance, "_loaded_status", None)
+    instance._loaded_status = instance.status
+    if created or old_status is None or old_status == instance.status:
+        return
+    try:
+        record_status_change(instance, old_status)
+    except Exception:
+        # Rollups are rebuilt periodically; never fail the save over them.
+        logger.exception("Could not update rollups for conversation %s", instance.pk)
 
-                billing_user_id, organization_id = _resolve_billing_context(
-                    instance.conversation
-                )
-                if billing_user_id is None:
-                    logger.warning(
-                        "Skipping LLM usage billing: no billing user for conversation_id=%s "
-                        "(organization_id=%s)",
-                        instance.conversation_id,
-                        organization_id,
-                    )
-                    continue
+@receiver(post_save, sender=Message)
+def message_rollup_post_save(sender, instance, created=False, **kwargs):
+    if not created or not instance.conversation_id:
+        return
+    try:
+        record_message_created(instance)
+    except Exception:
+        logger.exception("Could not update rollups for message %s", instance.pk)
 
-                async_register_llm_interaction.delay(
-                    billing_user_id,
-                    input_tokens,
-                    output_tokens,
-                    model_slug,
-                    organization_id,
-                )
-        
+@receiver(post_save, sender=Message)
+def message_post_save(sender, instance, update_fields=None, **kwargs):
+    # LLM usage is billed per agent session (api.consumption.usage_capture), not here.
+    if not _touches_search_fields(update_fields, ANALYSIS_MESSAGE_FIELDS):
+        return
+    try:
         conversation = instance.conversation
-        if conversation.user:
-            organization = get_user_organization(conversation.user)
-            if organization:
-                enabled, _ = FeatureFlagService.is_feature_enabled(
-                    "conversation-analysis", organization=organization, user=conversation.user
-                )
-            else:
-                enabled = False
-            if enabled:
-                if not conversation.pending_analysis:
-                    conversation.pending_analysis = True
-                    conversation.save(update_fields=['pending_analysis'])
-                    printer.info(f"Conversation {conversation.id} marked for analysis")
+        if conversation.pending_analysis or not conversation.user_id:
+            return
+        organization_id = conversation_analysis_organization_id(conversation.user)
+        if organization_id:
+            conversation.pending_analysis = True
+            conversation.analysis_organization_id = organization_id
+            conversation.save(update_fields=['pending_analysis', 'analysis_organization'])
+            printer.info(f"Conversation {conversation.id} marked for analysis")
 
     except Exception as e:
         printer.error(f"Error in post_save message signal: {str(e)}")
@@ -27,6 +27,7 @@ CAN_REPLACE_AGENT_IN_CONVERSATIONS_FLAG = "can-replace-agent-in-conversations"
 TAKEOVER_EVENT_UPDATED = "conversation_takeover_updated"
 TAKEOVER_EVENT_INBOUND = "conversation_takeover_inbound"
 TAKEOVER_EVENT_MESSAGE_CREATED = "conversation_message_created"
+TAKEOVER_EVENT_MESSAGE_DELIVERY_FAILED = "conversation_message_delivery_failed"
 
 def operator_display_name(user) -> str:
     full = (user.get_full_name() or "").strip()
@@ -72,13 +73,9 @@ def validate_takeover_metadata(raw: dict | None) -> dict:
     return model.model_dump(mode="json", exclude_none=True)
 
 def _clear_whatsapp_inbound_buffer(conversation_id: str) -> None:
-    from api.whatsapp.inbound import (
-        whatsapp_inbound_buffer_key,
-        whatsapp_inbound_schedule_lock_key,
-    )
+    from api.whatsapp.inbound import clear_whatsapp_inbound_buffer
 
-    cache.delete(whatsapp_inbound_buffer_key(conversation_id))
-    cache.delete(whatsapp_inbound_schedule_lock_key(conversation_id))
+    clear_whatsapp_inbound_buffer(conversation_id)
 
 def _emit_staff_event(user_id: int, event_type: str, payload: dict[str, Any]) -> None:
     notify_user(user_id, event_type, payload)
@@ -166,6 +163,19 @@ def emit_message_created(
     for uid in targets:
         _emit_staff_event(uid, TAKEOVER_EVENT_MESSAGE_CREATED, payload)
 
+def emit_message_delivery_failed(
+    conversation: Conversation,
+    message: Message,
+    error: str,
+) -> None:
+    payload = {
+        "conversation_id": str(conversation.id),
+        "message_id": message.id,
+        "error": error,
+    }
+    for uid in get_conversation_staff_user_ids(conversation):
+        _emit_staff_event(uid, TAKEOVER_EVENT_MESSAGE_DELIVERY_FAILED, payload)
+
 def persist_inbound_from_user_inputs(
     conversation: Conversation,
     user_inputs: list[dict],
@@ -232,16 +242,11 @@ def send_takeover_announcement(
     msg_metadata = {"human_takeover": True, "takeover_announcement": True}
 
     if conversation.ws_number_id and conversation.whatsapp_user_number:
-        conversation.ws_number.send_message(
+        msg = conversation.ws_number.send_message(
             conversation,
             text,
             reply_to_last_inbound=False,
         )
-        msg = (
-            conversation.messages.filter(type="assistant")
-            .order_by("-id")
-            .first()
-        )
     elif conversation.widget_visitor_session_id:
         msg = Message.objects.create(
             conversation=conversation,
@@ -397,34 +402,23 @@ def deliver_human_message(
         ).update(message=msg)
 
     if conversation.ws_number_id and conversation.whatsapp_user_number:
-        from api.whatsapp.actions import send_message as send_text_message
-        from api.whatsapp.outbound_media import deliver_whatsapp_attachments
-
-        media_wamids = []
-        if attachment_objects:
-            media_wamids = deliver_whatsapp_attachments(
+        from api.whatsapp.outbound import enqueue_whatsapp_outbound, outbound_reply_steps
+        from api.whatsapp.outbound_media import collect_assistant_file_attachments
+
+        # Same queue as agent replies: ordered per conversation, WAMIDs stored as sent.
+        enqueue_whatsapp_outbound(
+            str(conversation.id),
+            outbound_reply_steps(
+                message_id=msg.id,
                 phone_number_id=conversation.ws_number.platform_id,
                 to=conversation.whatsapp_user_number,
-                assistant_message=msg,
-                reply_to_message_id=None,
-            )
-
-        text_wamid = None
-        if text:
-            text_wamid = send_text_message(
-                conversation.ws_number.platform_id,
-                conversation.whatsapp_user_number,
-                text,
-                None,
-            )
-
-        merged = dict(msg.metadata or {})
-        if media_wamids:
-            merged["whatsapp_media_wamids"] = media_wamids
-        if text_wamid:
-            merged["whatsapp_wamid"] = text_wamid
-        msg.metadata = merged
-        msg.save(update_fields=["metadata"])
+                body=text,
+                attachment_ids=[
+                    str(att.id) for att in collect_assistant_file_attachments(msg)
+                ],
+                reply_to=None,
+            ),
+        )
     elif conversation.widget_visitor_session_id:
         notify_widget_human_reply(conversation, msg)
 
@@ -1,13 +1,9 @@
 import logging
-import json
 import os
 from celery import shared_task
 from .actions import generate_conversation_title
 from .models import (
     Conversation,
-    Message,
-    ConversationAlertRule,
-    ConversationAlert,
     ScheduledConversationTask,
 )
 from .schedule_helpers import build_scheduled_task_execution_message
@@ -15,7 +11,6 @@ from .schemas import ConversationAnalysisResult
 from api.authenticate.models import Organization, FeatureFlag, FeatureFlagAssignment
 from api.authenticate.services import FeatureFlagService
 from api.utils.openai_functions import create_structured_completion
-from api.notify.alert_dispatch import maybe_dispatch_user_notifications
 from django.db import transaction
 from django.utils import timezone
 
@@ -42,17 +37,13 @@ def _resolve_agent_slugs_for_scheduled_task(task: ScheduledConversationTask) ->
     by_id = {a.id: a.slug for a in agents}
     return [by_id[i] for i in agent_ids if i in by_id]
 
-def enqueue_scheduled_conversation_task(task: ScheduledConversationTask) -> str | None:
-    """Enqueue Celery ETA for a pending scheduled task; persist celery_task_id."""
+def enqueue_scheduled_conversation_task(task: ScheduledConversationTask) -> None:
+    """Queue a pending scheduled task for the dispatcher (see ``api.messaging.scheduler``)."""
+    from .scheduler import schedule_conversation_task
+
     if task.status != ScheduledConversationTask.Status.PENDING or not task.next_run_at:
-        return None
-    async_result = run_scheduled_conversation_task.apply_async(
-        args=[str(task.id)],
-        eta=task.next_run_at,
-    )
-    task.celery_task_id = async_result.id
-    task.save(update_fields=["celery_task_id", "updated_at"])
-    return async_result.id
+        return
+    schedule_conversation_task(task)
 
 @shared_task
 def async_generate_conversation_title(conversation_id: str):
@@ -148,10 +139,15 @@ def get_organizations_with_feature_flag(feature_flag_name: str):
 @shared_task
 def check_pending_conversations():
     """
-    Busca todas las conversaciones pendientes de análisis de todas las organizaciones
+    Programa el análisis de las conversaciones pendientes de las organizaciones
     con el feature flag 'conversation-analysis' activado.
-    Para cada conversación encontrada, orquesta la tarea analyze_single_conversation.
+
+    Solo toma conversaciones sin mensajes nuevos desde hace un rato, respeta un
+    máximo de análisis simultáneos por organización y agrupa las conversaciones
+    pequeñas en una sola llamada (ver ``api.messaging.analysis``).
     """
+    from .analysis import index_unassigned_pending_conversations, plan_pending_analysis
+
     feature_flag_name = "conversation-analysis"
     
     organizations = get_organizations_with_feature_flag(feature_flag_name)
@@ -162,46 +158,29 @@ def check_pending_conversations():
     
     logger.info(f"Found {len(organizations)} organizations with '{feature_flag_name}' enabled")
     
-    from django.contrib.auth.models import User
-    
-    owner_users = Organization.objects.filter(
-        id__in=[org.id for org in organizations]
-    ).values_list('owner', flat=True)
-    
-    member_users = User.objects.filter(
-        profile__organization__in=organizations
-    ).values_list('id', flat=True)
-    
-    all_users = set(list(owner_users) + list(member_users))
-    
-    if not all_users:
-        logger.info("No users found in organizations with the feature flag enabled")
-        return {"processed": 0, "organizations_checked": len(organizations)}
-    
-    with transaction.atomic():
-        pending_conversations = list(
-            Conversation.objects.select_for_update(skip_locked=True).filter(
-                user__in=all_users,
-                pending_analysis=True
-            ).select_related('user')
-        )
-    conversation_count = len(pending_conversations)
-    logger.info(f"Found {conversation_count} conversations pending analysis")
+    index_unassigned_pending_conversations()
+    units = plan_pending_analysis([org.id for org in organizations])
+    conversation_count = sum(len(unit) for unit in units)
+    logger.info(f"Claimed {conversation_count} conversations for analysis in {len(units)} tasks")
     
     processed = 0
-    for conversation in pending_conversations:
+    for unit in units:
         try:
-            analyze_single_conversation.delay(str(conversation.id))
-            processed += 1
+            if len(unit) == 1:
+                analyze_single_conversation.delay(unit[0])
+            else:
+                analyze_conversation_batch.delay(unit)
+            processed += len(unit)
         except Exception as e:
-            logger.error(f"Error scheduling analysis for conversation {conversation.id}: {str(e)}")
+            logger.error(f"Error scheduling analysis for conversations {unit}: {str(e)}")
     
     logger.info(f"Successfully scheduled {processed} conversations for analysis")
     
     return {
         "processed": processed,
         "organizations_checked": len(organizations),
-        "conversations_found": conversation_count
+        "conversations_found": conversation_count,
+        "tasks": len(units),
     }
 
 def get_user_organization(user):
@@ -235,31 +214,47 @@ def analyze_single_conversation(conversation_uuid: str):
     - Usa OpenAI para analizar si la conversación debe levantar alertas
     - Guarda las alertas levantadas en la base de datos
     - Marca la conversación como analizada
+
+    El análisis es incremental: solo se envían los mensajes posteriores a
+    ``analysis_watermark`` junto con ``analysis_state``, el resumen acumulado
+    de las pasadas anteriores.
     """
+    from .analysis import (
+        alert_rules_for,
+        analysis_system_prompt,
+        complete_analysis,
+        existing_alerts_for,
+        format_messages,
+        new_messages_for,
+        raise_alerts,
+        release_analysis,
+    )
+
     try:
-        conversation = Conversation.objects.select_related('user').get(id=conversation_uuid)
+        conversation = Conversation.objects.select_related(
+            'user', 'analysis_organization'
+        ).get(id=conversation_uuid)
         
-        message_count = Message.objects.filter(conversation=conversation).count()
+        new_messages = new_messages_for(conversation)
+        message_count = len(new_messages)
         
         if message_count == 0:
-            logger.warning(f"Conversation {conversation_uuid} has no messages, skipping analysis")
-            conversation.pending_analysis = False
-            conversation.save()
+            logger.warning(f"Conversation {conversation_uuid} has no new messages, skipping analysis")
+            release_analysis([conversation.id])
             return {
                 "conversation_uuid": conversation_uuid,
                 "message_count": 0,
                 "status": "skipped",
-                "reason": "No messages"
+                "reason": "No new messages"
             }
         
         logger.info(f"Analyzing conversation {conversation_uuid}: {message_count} messages to analyze")
         
-        organization = get_user_organization(conversation.user)
+        organization = conversation.analysis_organization or get_user_organization(conversation.user)
         
         if not organization:
             logger.warning(f"User {conversation.user} has no organization, skipping analysis")
-            conversation.pending_analysis = False
-            conversation.save()
+            release_analysis([conversation.id])
             return {
                 "conversation_uuid": conversation_uuid,
                 "status": "skipped",
@@ -268,18 +263,12 @@ def analyze_single_conversation(conversation_uuid: str):
         
         api_key = os.environ.get("OPENAI_API_KEY")
 
-        alert_rules = ConversationAlertRule.objects.filter(
-            organization=organization,
-            enabled=True
-        ).values('id', 'name', 'trigger', 'extractions')
+        alert_rules_info = alert_rules_for(organization)
+        logger.info(f"Found {len(alert_rules_info)} active alert rules for organization {organization.name}")
         
-        alert_rules_list = list(alert_rules)
-        logger.info(f"Found {len(alert_rules_list)} active alert rules for organization {organization.name}")
-        
-        if not alert_rules_list:
+        if not alert_rules_info:
             logger.info(f"Organization {organization.name} has no alert rules, skipping analysis for conversation {conversation_uuid}")
-            conversation.pending_analysis = False
-            conversation.save(update_fields=['pending_analysis'])
+            release_analysis([conversation.id])
             return {
                 "conversation_uuid": conversation_uuid,
                 "message_count": message_count,
@@ -287,63 +276,18 @@ def analyze_single_conversation(conversation_uuid: str):
                 "reason": "No alert rules configured"
             }
         
-        existing_alerts = ConversationAlert.objects.filter(
-            conversation=conversation
-        ).values('alert_rule_id', 'status')
-        
-        existing_alert_rule_ids = {str(alert['alert_rule_id']) for alert in existing_alerts}
-        logger.info(f"Found {len(existing_alert_rule_ids)} existing alerts for conversation {conversation_uuid}")
+        existing_alerts_info = existing_alerts_for(conversation)
+        logger.info(f"Found {len(existing_alerts_info)} existing alerts for conversation {conversation_uuid}")
         
-        messages = Message.objects.filter(conversation=conversation).order_by('created_at')
-        messages_context = "\n".join(
-            [f"{message.type}: {message.text}" for message in messages]
+        system_prompt = analysis_system_prompt(
+            alert_rules_info, existing_alerts_info, conversation.analysis_state
         )
         
-        alert_rules_info = []
-        for rule in alert_rules_list:
-            rule_info = {
-                "id": str(rule['id']),
-                "name": rule['name'],
-                "trigger": rule['trigger'],
-                "extractions": rule['extractions'] or {}
-            }
-            alert_rules_info.append(rule_info)
-        
-        existing_alerts_info = []
-        for alert in existing_alerts:
-            existing_alerts_info.append({
-                "alert_rule_id": str(alert['alert_rule_id']),
-                "status": alert['status']
-            })
-        
-        alert_rules_json = json.dumps(alert_rules_info, ensure_ascii=False, indent=2)
-        existing_alerts_json = json.dumps(existing_alerts_info, ensure_ascii=False, indent=2)
-        
-        system_prompt = f"""Eres un analista experto de conversaciones. Tu tarea es analizar la conversación y:
-1. Determinar si debe levantarse alguna alerta según las reglas proporcionadas
-
-REGLAS DE ALERTA DISPONIBLES:
-{alert_rules_json}
-
-ALERTAS YA LEVANTADAS (NO debes levantar alertas duplicadas para las mismas reglas):
-{existing_alerts_json}
-
-INSTRUCCIONES:
-1. Analiza cuidadosamente la conversación
-2. Evalúa si la conversación cumple con los requerimientos (trigger) de alguna de las reglas de alerta
-3. NO levantes alertas para reglas que ya están en las alertas existentes (a menos que sea necesario por alguna razón especial)
-4. Para cada alerta que levantes, proporciona:
-   - El ID de la regla correspondiente
-   - Los datos extraídos según lo especificado en el campo "extractions" de la regla
-5. En el campo "reasoning", explica claramente por qué se levanta o no cada alerta
-
-IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los requerimientos especificados en el campo "trigger" de cada regla."""
-        
         try:
             analysis = create_structured_completion(
                 model="gpt-4o",
                 system_prompt=system_prompt,
-                user_prompt=messages_context,
+                user_prompt=format_messages(new_messages),
                 response_format=ConversationAnalysisResult,
                 api_key=api_key,
             )
@@ -352,54 +296,11 @@ IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los re
             logger.info(f"Reasoning: {(analysis.reasoning or '')[:200]}...")
             logger.info(f"Alerts to raise: {len(analysis.alerts)}")
             
-            alerts_raised = 0
             with transaction.atomic():
-                for alert_data in analysis.alerts:
-                    try:
-                        alert_rule = ConversationAlertRule.objects.get(
-                            id=alert_data.id,
-                            organization=organization,
-                            enabled=True
-                        )
-                        
-                        existing_alert = ConversationAlert.objects.filter(
-                            conversation=conversation,
-                            alert_rule=alert_rule
-                        ).first()
-                        
-                        if existing_alert:
-                            logger.info(f"Alert already exists for rule {alert_data.id} in conversation {conversation_uuid}, skipping")
-                            continue
-                        
-                        title = alert_rule.name
-                        extractions = alert_data.extractions or {}
-                        if extractions:
-                            first_key = list(extractions.keys())[0] if extractions else None
-                            if first_key:
-                                title = f"{alert_rule.name} - {str(extractions.get(first_key, ''))[:30]}"
-                        
-                        new_alert = ConversationAlert.objects.create(
-                            title=title[:50],
-                            reasoning=analysis.reasoning,
-                            extractions=extractions,
-                            conversation=conversation,
-                            alert_rule=alert_rule,
-                            status="PENDING"
-                        )
-                        maybe_dispatch_user_notifications(new_alert)
-
-                        alerts_raised += 1
-                        logger.info(f"Alert raised for rule {alert_rule.name} (ID: {alert_data.id}) in conversation {conversation_uuid}")
-                        
-                    except ConversationAlertRule.DoesNotExist:
-                        logger.warning(f"Alert rule {alert_data.id} not found or not enabled, skipping")
-                        continue
-                    except Exception as alert_error:
-                        logger.error(f"Error creating alert for rule {alert_data.id}: {str(alert_error)}")
-                        continue
-                
-                conversation.pending_analysis = False
-                conversation.save(update_fields=['pending_analysis'])
+                alerts_raised = raise_alerts(
+                    conversation, organization, analysis.alerts, analysis.reasoning
+                )
+                complete_analysis(conversation, new_messages, analysis.state_summary)
             
             logger.info(f"Conversation {conversation_uuid} analysis completed: {alerts_raised} alerts raised")
             
@@ -413,8 +314,7 @@ IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los re
             
         except Exception as openai_error:
             logger.error(f"OpenAI API error analyzing conversation {conversation_uuid}: {str(openai_error)}")
-            conversation.pending_analysis = False
-            conversation.save()
+            release_analysis([conversation.id], pending=True)
             return {
                 "conversation_uuid": conversation_uuid,
                 "status": "error",
@@ -431,9 +331,7 @@ IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los re
     except Exception as e:
         logger.error(f"Error analyzing conversation {conversation_uuid}: {str(e)}")
         try:
-            conversation = Conversation.objects.get(id=conversation_uuid)
-            conversation.pending_analysis = False
-            conversation.save()
+            release_analysis([conversation_uuid], pending=True)
         except Exception as cleanup_error:
             logger.warning(f"Failed to mark conversation {conversation_uuid} as processed: {cleanup_error}")
         return {
@@ -442,24 +340,38 @@ IMPORTANTE: Solo levanta alertas si la conversación realmente cumple con los re
             "error": str(e)
         }
 
+@shared_task
+def analyze_conversation_batch(conversation_uuids: list[str]):
+    """Analiza en una sola llamada varias conversaciones pequeñas de una misma organización."""
+    from .analysis import analyze_conversations_batch
+
+    return analyze_conversations_batch(conversation_uuids)
+
+@shared_task
+def dispatch_scheduled_conversation_tasks():
+    """Send scheduled conversation tasks that are due now or within the next second."""
+    from .scheduler import dispatch_due_scheduled_tasks
+
+    return dispatch_due_scheduled_tasks()
+
 @shared_task
 def run_due_scheduled_conversation_tasks():
-    """Beat catch-up: enqueue overdue pending scheduled conversation tasks."""
-    now = timezone.now()
-    due_ids = list(
-        ScheduledConversationTask.objects.filter(
-            status=ScheduledConversationTask.Status.PENDING,
-            next_run_at__lte=now,
-        ).values_list("id", flat=True)[:200]
+    """Beat catch-up: release stale claims, re-queue pending tasks due soon, then dispatch the overdue ones."""
+    from .scheduler import (
+        dispatch_due_scheduled_tasks,
+        reap_stale_scheduled_tasks,
+        reconcile_scheduled_tasks,
     )
-    for task_id in due_ids:
-        run_scheduled_conversation_task.delay(str(task_id))
-    if due_ids:
+
+    reap_stale_scheduled_tasks()
+    queued = reconcile_scheduled_tasks()
+    result = dispatch_due_scheduled_tasks()
+    if result["dispatched"]:
         logger.info(
             "run_due_scheduled_conversation_tasks enqueued %d overdue task(s)",
-            len(due_ids),
+            result["dispatched"],
         )
-    return {"enqueued": len(due_ids)}
+    return {"enqueued": result["dispatched"], "deferred": result["deferred"], "queued": queued}
 
 @shared_task
 def run_scheduled_conversation_task(scheduled_task_id: str):
@@ -491,9 +403,15 @@ def run_scheduled_conversation_task(scheduled_task_id: str):
             )
             return {"status": "error", "error": "not_found"}
 
-        if task.status != ScheduledConversationTask.Status.PENDING:
+        if task.status not in (
+            ScheduledConversationTask.Status.PENDING,
+            ScheduledConversationTask.Status.DISPATCHED,
+        ):
             return {"status": "skipped", "reason": f"status_{task.status}"}
         if task.next_run_at and task.next_run_at > now:
+            task.status = ScheduledConversationTask.Status.PENDING
+            task.save(update_fields=["status", "updated_at"])
+            enqueue_scheduled_conversation_task(task)
             return {"status": "skipped", "reason": "not_due"}
 
         conversation = task.conversation
@@ -504,9 +422,11 @@ def run_scheduled_conversation_task(scheduled_task_id: str):
             return {"status": "skipped", "reason": "conversation_unavailable"}
 
         if is_takeover_active(conversation):
+            task.status = ScheduledConversationTask.Status.PENDING
             task.next_run_at = now + timedelta(minutes=5)
             task.last_error = "Takeover active; deferred"
-            task.save(update_fields=["next_run_at", "last_error", "updated_at"])
+            task.save(update_fields=["status", "next_run_at", "last_error", "updated_at"])
+            enqueue_scheduled_conversation_task(task)
             logger.info(
                 "run_scheduled_conversation_task deferred: takeover active task=%s",
                 scheduled_task_id,
@@ -514,7 +434,8 @@ def run_scheduled_conversation_task(scheduled_task_id: str):
             return {"status": "skipped", "reason": "takeover_active"}
 
         task.status = ScheduledConversationTask.Status.RUNNING
-        task.save(update_fields=["status", "updated_at"])
+        task.claimed_at = now
+        task.save(update_fields=["status", "claimed_at", "updated_at"])
 
     agent_slugs = _resolve_agent_slugs_for_scheduled_task(task)
     if not agent_slugs:
@@ -640,3 +561,19 @@ def run_scheduled_conversation_task(scheduled_task_id: str):
         "agent_status": agent_status,
         "next_run_at": task.next_run_at.isoformat() if task.next_run_at else None,
     }
+
+@shared_task
+def refresh_conversation_rollups(days: int = 2):
+    """
+    Beat: recompute the dashboard rollups of the last ``days`` UTC days from the
+    source tables, correcting any drift left by the incremental signal updates.
+    """
+    from datetime import timedelta
+
+    from .rollups import mark_rollups_covered_from, rebuild_rollups_for_days, utc_today
+
+    today = utc_today()
+    day_from = today - timedelta(days=max(int(days), 1) - 1)
+    rows = rebuild_rollups_for_days(day_from, today)
+    mark_rollups_covered_from(day_from)
+    return {"day_from": day_from.isoformat(), "day_to": today.isoformat(), "rows": rows}
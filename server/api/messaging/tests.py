@@ -2,17 +2,23 @@ import base64
 import json
 import tempfile
 from datetime import timedelta
+from io import StringIO
 from unittest.mock import Mock, patch
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APIClient
 
 from api.ai_layers.models import Agent, LanguageModel
 from api.authenticate.models import Organization, Token, UserProfile
 from api.messaging.models import ChatWidget, Conversation, Message, WidgetVisitorSession
+from api.messaging.pagination import encode_cursor
+from api.messaging.rollups import backfill_rollups
 from api.messaging.serializers import ChatWidgetSerializer
 from api.messaging.widget_avatar_urls import resolved_avatar_image
 from api.providers.models import AIProvider
@@ -257,14 +263,90 @@ class ChatWidgetCapabilitiesTests(TestCase):
         self.assertEqual(task_response.status_code, 403)
 
 
-class MessagePostSaveBillingTests(TestCase):
-    @patch("api.messaging.signals.async_register_llm_interaction")
-    def test_anonymous_conversation_bills_org_owner(self, delay_mock):
+class AgentSessionUsageCaptureTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+
+        cache.clear()
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, slug="gpt-4o-mini", name="GPT 4o mini")
+
+    def _session(self, conversation, prompt_tokens=10, completion_tokens=20):
+        from api.ai_layers.models import AgentSession
+
+        return AgentSession.objects.create(
+            conversation=conversation,
+            inputs={"model": {"slug": "gpt-4o-mini", "provider": "openai"}},
+            outputs={
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                }
+            },
+        )
+
+    @patch("api.consumption.usage_capture.register_llm_interaction")
+    def test_anonymous_conversation_bills_org_owner(self, register_mock):
+        from api.consumption.usage_capture import record_agent_session_usage
+
         owner = User.objects.create_user(username="org-owner-bill", password="x")
         org = Organization.objects.create(name="Bill Org", owner=owner)
         conversation = Conversation.objects.create(user=None, organization=org)
+        session = self._session(conversation)
 
-        Message.objects.create(
+        outcomes = record_agent_session_usage([str(session.id)])
+
+        self.assertEqual(outcomes, {"recorded": 1})
+        register_mock.assert_called_once_with(owner.id, 10, 20, "gpt-4o-mini", org.id)
+
+    @patch("api.consumption.usage_capture.register_llm_interaction")
+    def test_conversation_without_user_or_org_skips_billing(self, register_mock):
+        from api.consumption.usage_capture import record_agent_session_usage
+
+        conversation = Conversation.objects.create(user=None, organization=None)
+        session = self._session(conversation, prompt_tokens=5, completion_tokens=7)
+
+        outcomes = record_agent_session_usage([str(session.id)])
+
+        self.assertEqual(outcomes, {"no_billing_user": 1})
+        register_mock.assert_not_called()
+
+    @patch("api.consumption.usage_capture.register_llm_interaction")
+    def test_session_is_billed_once(self, register_mock):
+        from api.consumption.usage_capture import record_agent_session_usage
+
+        owner = User.objects.create_user(username="org-owner-once", password="x")
+        org = Organization.objects.create(name="Once Org", owner=owner)
+        conversation = Conversation.objects.create(user=None, organization=org)
+        first = self._session(conversation)
+        second = self._session(conversation, prompt_tokens=3, completion_tokens=4)
+
+        record_agent_session_usage([str(first.id)])
+        outcomes = record_agent_session_usage([str(first.id), str(second.id)])
+
+        self.assertEqual(outcomes, {"duplicate": 1, "recorded": 1})
+        self.assertEqual(register_mock.call_count, 2)
+        first.refresh_from_db()
+        self.assertIsNotNone(first.usage_recorded_at)
+
+    @patch("api.consumption.tasks.async_register_agent_session_usage")
+    def test_turn_sessions_are_enqueued_as_one_batch_on_commit(self, task_mock):
+        from api.consumption.usage_capture import enqueue_agent_session_usage
+
+        conversation = Conversation.objects.create(user=None, organization=None)
+        sessions = [self._session(conversation), self._session(conversation)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_agent_session_usage(sessions)
+            task_mock.delay.assert_not_called()
+
+        task_mock.delay.assert_called_once_with([str(s.id) for s in sessions])
+
+    @patch("api.consumption.tasks.async_register_agent_session_usage")
+    def test_saving_assistant_message_does_not_bill(self, task_mock):
+        conversation = Conversation.objects.create(user=None, organization=None)
+        message = Message.objects.create(
             conversation=conversation,
             type="assistant",
             versions=[
@@ -277,33 +359,216 @@ class MessagePostSaveBillingTests(TestCase):
                 }
             ],
         )
+        message.save()
+
+        task_mock.delay.assert_not_called()
+
+    @patch("api.messaging.signals.FeatureFlagService.is_feature_enabled", return_value=(False, "not-assigned"))
+    def test_analysis_flag_check_is_cached_and_skipped_for_metadata_saves(self, flag_mock):
+        owner = User.objects.create_user(username="analysis-owner", password="x")
+        Organization.objects.create(name="Analysis Org", owner=owner)
+        conversation = Conversation.objects.create(user=owner)
+
+        message = Message.objects.create(conversation=conversation, type="user", text="hi")
+        Message.objects.create(conversation=conversation, type="user", text="again")
+        message.metadata = {"seen": True}
+        message.save(update_fields=["metadata"])
+
+        self.assertEqual(flag_mock.call_count, 1)
+        conversation.refresh_from_db()
+        self.assertFalse(conversation.pending_analysis)
+
+
+class IncrementalConversationAnalysisTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+        from api.messaging.models import ConversationAlertRule
+
+        cache.clear()
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, slug="gpt-4o-mini", name="GPT 4o mini")
+        self.owner = User.objects.create_user(username="analysis-inc-owner", password="x")
+        self.org = Organization.objects.create(name="Incremental Org", owner=self.owner)
+        ConversationAlertRule.objects.create(
+            name="Refund", trigger="The user asks for a refund", organization=self.org
+        )
+        self.conversation = Conversation.objects.create(user=self.owner)
 
-        delay_mock.delay.assert_called_once_with(
-            owner.id,
-            10,
-            20,
-            "gpt-4o-mini",
-            org.id,
+    def _analyze(self, completion_mock, summary):
+        from api.messaging.schemas import ConversationAnalysisResult
+        from api.messaging.tasks import analyze_single_conversation
+
+        completion_mock.return_value = ConversationAnalysisResult(
+            reasoning="nothing to raise", alerts=[], state_summary=summary
         )
+        return analyze_single_conversation(str(self.conversation.id))
 
-    @patch("api.messaging.signals.async_register_llm_interaction")
-    def test_conversation_without_user_or_org_skips_billing(self, delay_mock):
-        conversation = Conversation.objects.create(user=None, organization=None)
-        Message.objects.create(
-            conversation=conversation,
-            type="assistant",
-            versions=[
-                {
-                    "usage": {
-                        "model_slug": "gpt-4o-mini",
-                        "prompt_tokens": 5,
-                        "completion_tokens": 7,
-                    }
-                }
-            ],
+    @patch("api.messaging.tasks.create_structured_completion")
+    def test_second_pass_sends_only_new_messages_and_previous_state(self, completion_mock):
+        Message.objects.create(conversation=self.conversation, type="user", text="first question")
+        Message.objects.create(conversation=self.conversation, type="assistant", text="first answer")
+
+        result = self._analyze(completion_mock, "User asked a first question.")
+        self.assertEqual(result["message_count"], 2)
+
+        latest = Message.objects.create(conversation=self.conversation, type="user", text="second question")
+        result = self._analyze(completion_mock, "Two questions so far.")
+
+        self.assertEqual(result["message_count"], 1)
+        kwargs = completion_mock.call_args.kwargs
+        self.assertEqual(kwargs["user_prompt"], "user: second question")
+        self.assertIn("User asked a first question.", kwargs["system_prompt"])
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.analysis_watermark, latest.id)
+        self.assertEqual(self.conversation.analysis_state, "Two questions so far.")
+        self.assertFalse(self.conversation.pending_analysis)
+
+    @patch("api.messaging.tasks.create_structured_completion")
+    def test_blank_summary_keeps_previous_state(self, completion_mock):
+        Message.objects.create(conversation=self.conversation, type="user", text="first question")
+        self._analyze(completion_mock, "User asked a first question.")
+
+        Message.objects.create(conversation=self.conversation, type="user", text="ok")
+        self._analyze(completion_mock, "  ")
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.analysis_state, "User asked a first question.")
+
+    @patch("api.messaging.tasks.create_structured_completion")
+    def test_failed_pass_stays_pending_for_retry(self, completion_mock):
+        Message.objects.create(conversation=self.conversation, type="user", text="refund please")
+        completion_mock.side_effect = RuntimeError("upstream timeout")
+        from api.messaging.tasks import analyze_single_conversation
+
+        result = analyze_single_conversation(str(self.conversation.id))
+
+        self.assertEqual(result["status"], "error")
+        self.conversation.refresh_from_db()
+        self.assertTrue(self.conversation.pending_analysis)
+        self.assertIsNone(self.conversation.analysis_watermark)
+
+    @patch("api.messaging.tasks.create_structured_completion")
+    def test_pass_without_new_messages_skips_the_llm(self, completion_mock):
+        Message.objects.create(conversation=self.conversation, type="user", text="hello")
+        self._analyze(completion_mock, "Greeting.")
+        completion_mock.reset_mock()
+
+        result = self._analyze(completion_mock, "unused")
+
+        self.assertEqual(result["status"], "skipped")
+        completion_mock.assert_not_called()
+
+
+class ConversationAnalysisSchedulerTests(TestCase):
+    def setUp(self):
+        from api.authenticate.models import FeatureFlag, FeatureFlagAssignment
+        from api.consumption.models import Currency
+        from api.messaging.models import ConversationAlertRule
+
+        cache.clear()
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI")
+        LanguageModel.objects.create(provider=provider, slug="gpt-4o-mini", name="GPT 4o mini")
+        self.owner = User.objects.create_user(username="analysis-sched-owner", password="x")
+        self.org = Organization.objects.create(name="Scheduler Org", owner=self.owner)
+        flag = FeatureFlag.objects.create(name="conversation-analysis")
+        FeatureFlagAssignment.objects.create(organization=self.org, feature_flag=flag, enabled=True)
+        ConversationAlertRule.objects.create(
+            name="Refund", trigger="The user asks for a refund", organization=self.org
+        )
+
+    def _pending(self, text="hello", quiet=True):
+        conversation = Conversation.objects.create(user=self.owner)
+        Message.objects.create(conversation=conversation, type="user", text=text)
+        last_message_at = timezone.now() - timedelta(minutes=10 if quiet else 0)
+        Conversation.objects.filter(id=conversation.id).update(
+            pending_analysis=True,
+            analysis_organization=self.org,
+            last_message_at=last_message_at,
+        )
+        return conversation
+
+    def test_message_marks_conversation_pending_for_its_organization(self):
+        conversation = Conversation.objects.create(user=self.owner)
+        Message.objects.create(conversation=conversation, type="user", text="hi")
+
+        conversation.refresh_from_db()
+        self.assertTrue(conversation.pending_analysis)
+        self.assertEqual(conversation.analysis_organization_id, self.org.id)
+
+    def test_plan_waits_for_quiet_conversations_and_caps_in_flight(self):
+        from api.messaging.analysis import ANALYSIS_MAX_IN_FLIGHT_PER_ORG, plan_pending_analysis
+
+        busy = self._pending(quiet=False)
+        quiet = [self._pending() for _ in range(ANALYSIS_MAX_IN_FLIGHT_PER_ORG + 2)]
+
+        units = plan_pending_analysis([self.org.id])
+
+        claimed = {cid for unit in units for cid in unit}
+        self.assertEqual(len(claimed), ANALYSIS_MAX_IN_FLIGHT_PER_ORG)
+        self.assertNotIn(str(busy.id), claimed)
+        self.assertTrue(claimed <= {str(c.id) for c in quiet})
+        self.assertEqual(plan_pending_analysis([self.org.id]), [])
+
+    @patch("api.messaging.tasks.analyze_single_conversation")
+    @patch("api.messaging.tasks.analyze_conversation_batch")
+    def test_small_conversations_are_packed_into_one_task(self, batch_mock, single_mock):
+        from api.messaging.analysis import ANALYSIS_SMALL_DELTA_CHARS
+        from api.messaging.tasks import check_pending_conversations
+
+        small = [self._pending(), self._pending()]
+        large = self._pending(text="x" * (ANALYSIS_SMALL_DELTA_CHARS + 1))
+
+        result = check_pending_conversations()
+
+        self.assertEqual(result["processed"], 3)
+        single_mock.delay.assert_called_once_with(str(large.id))
+        batch_mock.delay.assert_called_once()
+        self.assertCountEqual(batch_mock.delay.call_args.args[0], [str(c.id) for c in small])
+
+    @patch("api.messaging.analysis.create_structured_completion")
+    def test_batch_completes_answered_conversations_and_retries_the_rest(self, completion_mock):
+        from api.messaging.analysis import analyze_conversations_batch
+        from api.messaging.schemas import (
+            ConversationBatchAnalysisItem,
+            ConversationBatchAnalysisResult,
+        )
+
+        answered, unanswered = self._pending(), self._pending()
+        completion_mock.return_value = ConversationBatchAnalysisResult(
+            results=[
+                ConversationBatchAnalysisItem(
+                    conversation_id=str(answered.id), reasoning="fine", state_summary="Said hello."
+                )
+            ]
         )
 
-        delay_mock.delay.assert_not_called()
+        result = analyze_conversations_batch([str(answered.id), str(unanswered.id)])
+
+        self.assertEqual(result["unanswered"], 1)
+        self.assertEqual(completion_mock.call_count, 1)
+        answered.refresh_from_db()
+        unanswered.refresh_from_db()
+        self.assertFalse(answered.pending_analysis)
+        self.assertEqual(answered.analysis_state, "Said hello.")
+        self.assertTrue(unanswered.pending_analysis)
+        self.assertIsNone(unanswered.analysis_started_at)
+
+    @patch("api.messaging.analysis.create_structured_completion")
+    def test_batch_error_keeps_conversations_pending(self, completion_mock):
+        from api.messaging.analysis import analyze_conversations_batch
+
+        conversations = [self._pending(), self._pending()]
+        completion_mock.side_effect = RuntimeError("rate limited")
+
+        result = analyze_conversations_batch([str(c.id) for c in conversations])
+
+        self.assertEqual(result["status"], "error")
+        for conversation in conversations:
+            conversation.refresh_from_db()
+            self.assertTrue(conversation.pending_analysis)
+            self.assertIsNone(conversation.analysis_started_at)
 
 
 class ConversationTakeoverTests(TestCase):
@@ -633,6 +898,400 @@ class ChatWidgetAvatarUploadTests(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+class ConversationListTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI List")
+        LanguageModel.objects.create(
+            provider=provider,
+            slug="gpt-4o-mini-list",
+            name="GPT 4o mini list",
+        )
+        self.owner = User.objects.create_user(
+            username="list-owner",
+            email="list-owner@example.com",
+            password="pass-123456",
+        )
+        self.member = User.objects.create_user(
+            username="list-member",
+            email="list-member@example.com",
+            password="pass-123456",
+        )
+        self.org = Organization.objects.create(
+            name="List Org", owner=self.owner, timezone="America/Bogota"
+        )
+        UserProfile.objects.filter(user=self.member).update(organization=self.org)
+        login_token, _ = Token.get_or_create(user=self.owner, token_type="login")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {login_token.key}"}
+        self.client = APIClient()
+        cache.clear()
+
+    def _create_conversation(self, user, with_takeover=False):
+        from api.messaging.models import (
+            ConversationAlert,
+            ConversationAlertRule,
+            ConversationTakeover,
+        )
+
+        conversation = Conversation.objects.create(user=user, organization=self.org)
+        Message.objects.create(conversation=conversation, type="user", text="hi")
+        rule, _ = ConversationAlertRule.objects.get_or_create(
+            name="Rule",
+            organization=self.org,
+            defaults={"trigger": "always"},
+        )
+        ConversationAlert.objects.create(
+            title="Alert",
+            reasoning="because",
+            conversation=conversation,
+            alert_rule=rule,
+        )
+        if with_takeover:
+            ConversationTakeover.objects.create(conversation=conversation, user=self.owner)
+        return conversation
+
+    def _list_query_count(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/v1/messaging/conversations", **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._create_conversation(self.owner, with_takeover=True)
+        small_count, body = self._list_query_count()
+        self.assertEqual(len(body["results"]), 1)
+
+        for i in range(4):
+            self._create_conversation(self.member, with_takeover=i % 2 == 0)
+        large_count, body = self._list_query_count()
+        self.assertEqual(len(body["results"]), 5)
+        self.assertEqual(small_count, large_count)
+
+    def test_list_rows_keep_serialized_fields(self):
+        conversation = self._create_conversation(self.member, with_takeover=True)
+        _, body = self._list_query_count()
+        row = body["results"][0]
+        self.assertEqual(row["id"], str(conversation.id))
+        self.assertEqual(row["number_of_messages"], 1)
+        self.assertEqual(row["alerts_count"], 1)
+        self.assertTrue(row["has_pending_alerts"])
+        self.assertEqual(len(row["alert_rule_ids"]), 1)
+        self.assertEqual(row["user_username"], "list-member")
+        self.assertEqual(row["active_takeover"]["operator_username"], "list-owner")
+        self.assertTrue(row["created_at_formatted"].endswith("-05"))
+
+    def _walk_cursor_pages(self, extra_params=""):
+        seen = []
+        cursor = ""
+        for _ in range(10):
+            response = self.client.get(
+                f"/v1/messaging/conversations?limit=2&cursor={cursor}{extra_params}",
+                **self.auth,
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            seen.extend(row["id"] for row in body["results"])
+            if not body["has_next"]:
+                self.assertIsNone(body["next_cursor"])
+                return seen
+            cursor = body["next_cursor"]
+        self.fail("cursor pagination did not terminate")
+
+    def test_cursor_pagination_walks_every_conversation_once(self):
+        created = [self._create_conversation(self.member) for _ in range(5)]
+        seen = self._walk_cursor_pages()
+        expected = [
+            str(c.id)
+            for c in sorted(created, key=lambda c: (c.created_at, c.id), reverse=True)
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pagination_by_message_count(self):
+        created = [self._create_conversation(self.member) for _ in range(4)]
+        for conversation in created[:2]:
+            Message.objects.create(conversation=conversation, type="user", text="more")
+        seen = self._walk_cursor_pages("&messages_sort=desc")
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(set(seen[:2]), {str(c.id) for c in created[:2]})
+
+    def test_cursor_page_omits_total_unless_requested(self):
+        self._create_conversation(self.member)
+        body = self.client.get(
+            "/v1/messaging/conversations?cursor=", **self.auth
+        ).json()
+        self.assertIsNone(body["total"])
+
+        body = self.client.get(
+            "/v1/messaging/conversations?cursor=&include_total=true", **self.auth
+        ).json()
+        self.assertEqual(body["total"], 1)
+        self.assertTrue(body["total_is_approximate"])
+
+    def test_cursor_rejects_mismatched_sort_order(self):
+        self._create_conversation(self.member)
+        self._create_conversation(self.member)
+        body = self.client.get(
+            "/v1/messaging/conversations?limit=1&cursor=", **self.auth
+        ).json()
+        response = self.client.get(
+            f"/v1/messaging/conversations?limit=1&sort_by=oldest&cursor={body['next_cursor']}",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_cursor_rejects_tampered_values(self):
+        for values in ([None, "x"], ["garbage", "not-a-uuid"], [[], {}]):
+            cursor = encode_cursor("newest", values)
+            response = self.client.get(
+                f"/v1/messaging/conversations?limit=1&cursor={cursor}", **self.auth
+            )
+            self.assertEqual(response.status_code, 400, values)
+
+
+class ConversationMessageWindowTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI Window")
+        LanguageModel.objects.create(
+            provider=provider,
+            slug="gpt-4o-mini-window",
+            name="GPT 4o mini window",
+        )
+        self.user = User.objects.create_user(
+            username="window-user",
+            email="window@example.com",
+            password="pass-123456",
+        )
+        login_token, _ = Token.get_or_create(user=self.user, token_type="login")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {login_token.key}"}
+        self.client = APIClient()
+        self.conversation = Conversation.objects.create(user=self.user)
+        self.messages = [self._add_message(f"message {i}") for i in range(7)]
+
+    def _add_message(self, text):
+        from api.feedback.models import Reaction
+
+        message = Message.objects.create(
+            conversation=self.conversation, type="user", text=text
+        )
+        Reaction.objects.create(
+            user=self.user, conversation=self.conversation, message=message
+        )
+        return message
+
+    def _get_window(self, query=""):
+        url = f"/v1/messaging/conversations/{self.conversation.id}/messages/{query}"
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_latest_window_then_walk_back_with_before(self):
+        body = self._get_window("?limit=3")
+        self.assertEqual(
+            [m["text"] for m in body["results"]],
+            ["message 4", "message 5", "message 6"],
+        )
+        self.assertTrue(body["has_more_before"])
+        self.assertFalse(body["has_more_after"])
+        self.assertEqual(len(body["results"][0]["reactions"]), 1)
+
+        older = self._get_window(f"?limit=3&before={body['before']}")
+        self.assertEqual(
+            [m["text"] for m in older["results"]],
+            ["message 1", "message 2", "message 3"],
+        )
+        oldest = self._get_window(f"?limit=3&before={older['before']}")
+        self.assertEqual([m["text"] for m in oldest["results"]], ["message 0"])
+        self.assertFalse(oldest["has_more_before"])
+        self.assertIsNone(oldest["before"])
+
+    def test_after_cursor_returns_new_messages(self):
+        body = self._get_window("?limit=3")
+        self._add_message("message 7")
+        newer = self._get_window(f"?after={body['after']}")
+        self.assertEqual([m["text"] for m in newer["results"]], ["message 7"])
+        self.assertFalse(newer["has_more_after"])
+
+    def test_window_query_count_does_not_grow_with_window_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self._get_window("?limit=2")
+        with CaptureQueriesContext(connection) as large:
+            self._get_window("?limit=7")
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_rejects_invalid_cursor(self):
+        url = f"/v1/messaging/conversations/{self.conversation.id}/messages/?before=nope"
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_tampered_cursor_value(self):
+        cursor = encode_cursor("latest", ["not-a-number"])
+        url = f"/v1/messaging/conversations/{self.conversation.id}/messages/?before={cursor}"
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_serializes_message_window_when_limited(self):
+        response = self.client.get(
+            f"/v1/messaging/conversations/{self.conversation.id}/?messages_limit=2",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(
+            [m["text"] for m in body["messages"]], ["message 5", "message 6"]
+        )
+        self.assertEqual(body["number_of_messages"], 7)
+        self.assertTrue(body["messages_window"]["has_more_before"])
+
+    def test_detail_without_limit_returns_full_history(self):
+        response = self.client.get(
+            f"/v1/messaging/conversations/{self.conversation.id}/", **self.auth
+        )
+        body = response.json()
+        self.assertEqual(len(body["messages"]), 7)
+        self.assertNotIn("messages_window", body)
+
+
+class ConversationSearchTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI Search")
+        LanguageModel.objects.create(
+            provider=provider,
+            slug="gpt-4o-mini-search",
+            name="GPT 4o mini search",
+        )
+        self.user = User.objects.create_user(
+            username="search-user",
+            email="search@example.com",
+            password="pass-123456",
+        )
+        login_token, _ = Token.get_or_create(user=self.user, token_type="login")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {login_token.key}"}
+        self.client = APIClient()
+
+        self.refund = Conversation.objects.create(user=self.user, title="Billing question")
+        Message.objects.create(conversation=self.refund, type="user", text="hello")
+        Message.objects.create(
+            conversation=self.refund,
+            type="user",
+            text="I was charged twice and want a refund for the second payment",
+        )
+        self.titled = Conversation.objects.create(user=self.user, title="Refund policy")
+        Message.objects.create(conversation=self.titled, type="user", text="hi there")
+        self.unrelated = Conversation.objects.create(user=self.user, title="Greetings")
+        Message.objects.create(conversation=self.unrelated, type="user", text="good morning")
+
+    def test_list_search_matches_message_bodies(self):
+        response = self.client.get(
+            "/v1/messaging/conversations?search=charged", **self.auth
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(self.refund.id)])
+        self.assertNotIn("search_vector", response.json()["results"][0])
+
+    def test_list_search_matches_full_conversation_id(self):
+        response = self.client.get(
+            f"/v1/messaging/conversations?search={self.unrelated.id}", **self.auth
+        )
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(self.unrelated.id)])
+
+    def test_search_endpoint_ranks_and_highlights(self):
+        response = self.client.get(
+            "/v1/messaging/conversations/search/?q=refund", **self.auth
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()["results"]
+        self.assertEqual(
+            {r["conversation"]["id"] for r in results},
+            {str(self.refund.id), str(self.titled.id)},
+        )
+        by_id = {r["conversation"]["id"]: r for r in results}
+        self.assertIn("<mark>refund</mark>", by_id[str(self.refund.id)]["snippet"])
+        self.assertIsNone(by_id[str(self.titled.id)]["snippet"])
+        self.assertGreater(results[0]["rank"], 0)
+
+    def test_list_search_matches_whatsapp_number_prefix(self):
+        whatsapp = Conversation.objects.create(
+            user=self.user, whatsapp_user_number="573001234567"
+        )
+        Message.objects.create(conversation=whatsapp, type="user", text="hola")
+        response = self.client.get(
+            "/v1/messaging/conversations?search=%2B57300", **self.auth
+        )
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(whatsapp.id)])
+
+    def test_list_search_matches_whatsapp_number_mid_fragment(self):
+        whatsapp = Conversation.objects.create(
+            user=self.user, whatsapp_user_number="593991234567"
+        )
+        Message.objects.create(conversation=whatsapp, type="user", text="hola")
+        response = self.client.get(
+            "/v1/messaging/conversations?search=99%20123-4", **self.auth
+        )
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(whatsapp.id)])
+
+    def test_search_endpoint_limit_keeps_best_ranked(self):
+        response = self.client.get(
+            "/v1/messaging/conversations/search/?q=refund&limit=1", **self.auth
+        )
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        full = self.client.get(
+            "/v1/messaging/conversations/search/?q=refund", **self.auth
+        ).json()["results"]
+        self.assertEqual(results[0]["conversation"]["id"], full[0]["conversation"]["id"])
+        self.assertGreaterEqual(full[0]["rank"], full[1]["rank"])
+
+    def test_list_search_prefix_matches_partial_last_word(self):
+        response = self.client.get(
+            "/v1/messaging/conversations?search=charg", **self.auth
+        )
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(self.refund.id)])
+
+    def test_search_endpoint_prefix_matches_partial_title(self):
+        response = self.client.get(
+            "/v1/messaging/conversations/search/?q=refund%20pol", **self.auth
+        )
+        ids = [r["conversation"]["id"] for r in response.json()["results"]]
+        self.assertEqual(ids, [str(self.titled.id)])
+
+    def test_list_search_matches_partial_conversation_id(self):
+        fragment = str(self.unrelated.id)[4:13]
+        response = self.client.get(
+            f"/v1/messaging/conversations?search={fragment}", **self.auth
+        )
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [str(self.unrelated.id)])
+
+    def test_edited_message_is_reindexed(self):
+        message = self.unrelated.messages.get()
+        message.text = "please escalate this"
+        message.save(update_fields=["text"])
+        response = self.client.get(
+            "/v1/messaging/conversations/search/?q=escalate", **self.auth
+        )
+        ids = [r["conversation"]["id"] for r in response.json()["results"]]
+        self.assertEqual(ids, [str(self.unrelated.id)])
+
+    def test_search_endpoint_requires_query(self):
+        response = self.client.get("/v1/messaging/conversations/search/", **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+
 class MessageAttachmentXlsxUploadTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="u-xlsx", password="x")
@@ -879,3 +1538,140 @@ class GalleryViewTests(TestCase):
             **self.auth,
         )
         self.assertEqual(response.status_code, 403)
+
+
+class ConversationStatsRollupTests(TestCase):
+    def setUp(self):
+        from api.consumption.models import Currency
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI Stats")
+        LanguageModel.objects.create(
+            provider=provider,
+            slug="gpt-4o-mini-stats",
+            name="GPT 4o mini stats",
+        )
+        self.user = User.objects.create_user(
+            username="stats-user",
+            email="stats@example.com",
+            password="pass-123456",
+        )
+        login_token, _ = Token.get_or_create(user=self.user, token_type="login")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {login_token.key}"}
+        self.client = APIClient()
+
+        self.busy = Conversation.objects.create(user=self.user, title="Busy")
+        for i in range(3):
+            Message.objects.create(conversation=self.busy, type="user", text=f"m{i}")
+        self.quiet = Conversation.objects.create(user=self.user, title="Quiet")
+        Message.objects.create(conversation=self.quiet, type="user", text="hi")
+        Conversation.objects.create(user=self.user, title="Empty")
+        backfill_rollups()
+
+    def _stats(self, query=""):
+        response = self.client.get(f"/v1/messaging/conversations/stats/{query}", **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_rollup_stats_match_live_stats(self):
+        rollup = self._stats()
+        live = self._stats("?source=live")
+        self.assertEqual(rollup.pop("source"), "rollup")
+        self.assertEqual(live.pop("source"), "live")
+        for key in ("total_conversations", "total_messages", "last_7_days"):
+            self.assertEqual(rollup[key], live[key], key)
+        self.assertEqual(
+            sum(p["count"] for p in rollup["last_7_days_breakdown"]), rollup["last_7_days"]
+        )
+        self.assertEqual(rollup["total_conversations"], 2)
+        self.assertEqual(rollup["total_messages"], 4)
+        self.assertEqual(rollup["top_users"][0]["conversations"], 2)
+
+    def test_rollup_and_live_payloads_are_identical(self):
+        from datetime import datetime, time
+        from datetime import timezone as dt_timezone
+
+        from api.messaging.rollups import stats_week_days
+
+        week_start = datetime.combine(
+            stats_week_days()[0], time.min, tzinfo=dt_timezone.utc
+        )
+        # Inside a rolling 168h window but before the first of the seven UTC days.
+        edge = Conversation.objects.create(user=self.user, title="Edge")
+        Message.objects.create(conversation=edge, type="user", text="old")
+        Conversation.objects.filter(pk=edge.pk).update(
+            created_at=week_start - timedelta(seconds=1)
+        )
+        backfill_rollups()
+
+        rollup = self._stats()
+        live = self._stats("?source=live")
+        self.maxDiff = None
+        self.assertEqual(rollup.pop("source"), "rollup")
+        self.assertEqual(live.pop("source"), "live")
+        self.assertEqual(rollup, live)
+        self.assertEqual(rollup["total_conversations"], 3)
+        self.assertEqual(rollup["last_7_days"], 2)
+
+    def test_status_change_moves_conversation_between_buckets(self):
+        self.busy.status = "archived"
+        self.busy.save()
+
+        active = self._stats()
+        self.assertEqual(active["total_conversations"], 1)
+        self.assertEqual(active["total_messages"], 1)
+        archived = self._stats("?status=archived")
+        self.assertEqual(archived["total_conversations"], 1)
+        self.assertEqual(archived["total_messages"], 3)
+
+    def test_content_filters_fall_back_to_live(self):
+        self.assertEqual(self._stats("?min_messages=2")["source"], "live")
+
+    def test_uncovered_history_falls_back_to_live(self):
+        from api.messaging.models import ConversationDailyRollup, ConversationRollupCoverage
+        from api.messaging.tasks import refresh_conversation_rollups
+
+        ConversationRollupCoverage.objects.all().delete()
+        ConversationDailyRollup.objects.all().delete()
+        self.assertEqual(self._stats()["source"], "live")
+
+        refresh_conversation_rollups()
+        self.assertEqual(self._stats()["source"], "live")
+        today = timezone.now().date().isoformat()
+        covered = self._stats(f"?date_from={today}")
+        self.assertEqual(covered["source"], "rollup")
+        self.assertEqual(covered["total_conversations"], 2)
+
+    def test_ranges_off_utc_day_boundaries_use_live(self):
+        today = timezone.now().date().isoformat()
+        self.assertEqual(self._stats(f"?date_from={today}T00:00:00Z")["source"], "rollup")
+        self.assertEqual(self._stats(f"?date_from={today}T06:00:00Z")["source"], "live")
+        self.assertEqual(self._stats(f"?date_to={today}T00:00:00%2B02:00")["source"], "live")
+        with timezone.override("America/Bogota"):
+            self.assertEqual(self._stats()["source"], "live")
+
+    def test_backfill_command_rebuilds_history(self):
+        from django.core.management import call_command
+
+        from api.messaging.models import ConversationDailyRollup, ConversationRollupCoverage
+
+        ConversationRollupCoverage.objects.all().delete()
+        ConversationDailyRollup.objects.all().delete()
+        call_command("backfill_conversation_rollups", stdout=StringIO())
+
+        stats = self._stats()
+        self.assertEqual(stats["source"], "rollup")
+        self.assertEqual(stats["total_conversations"], 2)
+        self.assertEqual(stats["total_messages"], 4)
+
+    def test_rebuild_corrects_drift(self):
+        from api.messaging.models import ConversationDailyRollup
+        from api.messaging.tasks import refresh_conversation_rollups
+
+        ConversationDailyRollup.objects.update(conversations=99, messages=99)
+        Message.objects.filter(conversation=self.quiet).delete()
+
+        refresh_conversation_rollups()
+        stats = self._stats()
+        self.assertEqual(stats["total_conversations"], 1)
+        self.assertEqual(stats["total_messages"], 3)
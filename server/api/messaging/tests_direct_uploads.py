@@ -0,0 +1,160 @@
+"""Tests for direct multipart attachment uploads."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+from unittest.mock import Mock, patch
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.ai_layers.models import LanguageModel
+from api.authenticate.models import Token
+from api.consumption.models import Currency
+from api.messaging import direct_uploads
+from api.messaging.models import Conversation, MessageAttachment
+from api.providers.models import AIProvider
+
+
+class DirectAttachmentUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        Currency.objects.get_or_create(name="Compute Unit", defaults={"one_usd_is": 1000})
+        provider = AIProvider.objects.create(name="OpenAI Uploads")
+        LanguageModel.objects.create(provider=provider, slug="gpt-uploads", name="GPT Uploads")
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="uploader", password="x")
+        token, _ = Token.get_or_create(user=self.user, token_type="login")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+        self.conversation = Conversation.objects.create(user=self.user)
+
+    def _start(self, size, filename="notes.txt", auth=None):
+        return self.client.post(
+            "/v1/messaging/attachments/uploads/",
+            {
+                "conversation_id": str(self.conversation.id),
+                "filename": filename,
+                "content_type": "text/plain",
+                "size": size,
+            },
+            format="json",
+            **(auth or self.auth),
+        )
+
+    def _put_part(self, part, body):
+        url = urlsplit(part["url"])
+        return self.client.put(
+            f"{url.path}?{url.query}", body, content_type="application/octet-stream"
+        )
+
+    def _complete(self, upload_id, parts, auth=None):
+        return self.client.post(
+            f"/v1/messaging/attachments/uploads/{upload_id}/complete/",
+            {"parts": parts},
+            format="json",
+            **(auth or self.auth),
+        )
+
+    @patch.object(direct_uploads, "ATTACHMENT_UPLOAD_PART_BYTES", 4)
+    def test_local_parts_are_assembled_into_an_attachment(self):
+        content = b"hello world"
+        start = self._start(len(content))
+        self.assertEqual(start.status_code, 201, start.content)
+        upload = start.json()
+        self.assertEqual(len(upload["parts"]), 3)
+
+        parts = []
+        for part in upload["parts"]:
+            offset = (part["part_number"] - 1) * upload["part_size"]
+            response = self._put_part(part, content[offset : offset + upload["part_size"]])
+            self.assertEqual(response.status_code, 200, response.content)
+            parts.append({"part_number": part["part_number"], "etag": response["ETag"]})
+
+        response = self._complete(upload["upload_id"], parts)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        att = MessageAttachment.objects.get(id=response.json()["attachment"]["id"])
+        self.assertEqual(att.conversation_id, self.conversation.id)
+        self.assertEqual(att.user, self.user)
+        self.assertEqual(att.content_type, "text/plain")
+        self.assertTrue(att.file.name.endswith(".txt"))
+        with att.file.open("rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_part_url_requires_a_valid_signature(self):
+        upload = self._start(5).json()
+        part = dict(upload["parts"][0])
+        part["url"] = part["url"].split("?")[0] + "?signature=forged"
+
+        response = self._put_part(part, b"hello")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_missing_parts_are_rejected_and_completion_can_be_retried(self):
+        upload = self._start(5).json()
+
+        missing = self._complete(upload["upload_id"], [])
+        self.assertEqual(missing.status_code, 400)
+
+        etag = self._put_part(upload["parts"][0], b"hello")["ETag"]
+        response = self._complete(upload["upload_id"], [{"part_number": 1, "etag": etag}])
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_only_the_starting_user_can_complete(self):
+        upload = self._start(5).json()
+        etag = self._put_part(upload["parts"][0], b"hello")["ETag"]
+        other = User.objects.create_user(username="other-uploader", password="x")
+        other_token, _ = Token.get_or_create(user=other, token_type="login")
+
+        response = self._complete(
+            upload["upload_id"],
+            [{"part_number": 1, "etag": etag}],
+            auth={"HTTP_AUTHORIZATION": f"Token {other_token.key}"},
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(MessageAttachment.objects.exists())
+
+    @override_settings(MESSAGE_ATTACHMENT_MAX_UPLOAD_BYTES=10)
+    def test_oversized_upload_is_refused_up_front(self):
+        response = self._start(11)
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_s3_storage_hands_out_presigned_part_urls(self):
+        s3 = Mock()
+        s3.create_multipart_upload.return_value = {"UploadId": "s3-upload"}
+        s3.generate_presigned_url.return_value = "https://bucket.s3.amazonaws.com/part"
+        s3.head_object.return_value = {"ContentLength": 5}
+        storage = Mock(bucket_name="media", location="")
+        storage.connection.meta.client = s3
+
+        with patch.object(direct_uploads, "default_storage", storage), patch.object(
+            direct_uploads, "_is_s3", return_value=True
+        ):
+            upload = self._start(5).json()
+            response = self._complete(
+                upload["upload_id"], [{"part_number": 1, "etag": '"abc"'}]
+            )
+
+        self.assertEqual(upload["parts"][0]["url"], "https://bucket.s3.amazonaws.com/part")
+        self.assertEqual(
+            s3.generate_presigned_url.call_args.kwargs["Params"]["UploadId"], "s3-upload"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        complete_kwargs = s3.complete_multipart_upload.call_args.kwargs
+        self.assertEqual(complete_kwargs["UploadId"], "s3-upload")
+        self.assertEqual(
+            complete_kwargs["MultipartUpload"], {"Parts": [{"PartNumber": 1, "ETag": '"abc"'}]}
+        )
+        att = MessageAttachment.objects.get(id=response.json()["attachment"]["id"])
+        self.assertEqual(att.file.name, complete_kwargs["Key"])
@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import (
     ConversationView,
+    ConversationMessagesView,
+    ConversationSearchView,
     ConversationTakeoverView,
     ConversationHumanMessageView,
     ConversationStatsView,
@@ -9,6 +11,9 @@ from .views import (
     upload_audio,
     upload_message_attachments,
     link_message_attachment,
+    start_message_attachment_upload,
+    complete_message_attachment_upload,
+    upload_message_attachment_part,
     get_suggestion,
     SharedConversationView,
     ChatWidgetConfigView,
@@ -18,6 +23,7 @@ from .views import (
     ChatWidgetConversationDetailView,
     ChatWidgetAgentTaskView,
     ChatWidgetAttachmentsUploadView,
+    ChatWidgetAttachmentDirectUploadView,
     ChatWidgetSocketAuthView,
     ChatWidgetView,
     ChatWidgetAvatarView,
@@ -37,12 +43,18 @@ app_name = "messaging"
 urlpatterns = [
     path("conversations", ConversationView.as_view(), name="conversation_list"),
     path("conversations/stats/", ConversationStatsView.as_view(), name="conversation_stats"),
+    path("conversations/search/", ConversationSearchView.as_view(), name="conversation_search"),
     path("conversations/bulk/", ConversationBulkView.as_view(), name="conversation_bulk"),
     path(
         "conversations/<uuid:id>/",
         ConversationView.as_view(),
         name="conversation_detail",
     ),
+    path(
+        "conversations/<uuid:id>/messages/",
+        ConversationMessagesView.as_view(),
+        name="conversation_messages",
+    ),
     path(
         "conversations/<uuid:id>/takeover/",
         ConversationTakeoverView.as_view(),
@@ -73,6 +85,21 @@ urlpatterns = [
     path("upload-audio/", upload_audio, name="upload_audio"),
     path("attachments/upload/", upload_message_attachments, name="upload_message_attachments"),
     path("attachments/link/", link_message_attachment, name="link_message_attachment"),
+    path(
+        "attachments/uploads/",
+        start_message_attachment_upload,
+        name="start_attachment_upload",
+    ),
+    path(
+        "attachments/uploads/<str:upload_id>/complete/",
+        complete_message_attachment_upload,
+        name="complete_attachment_upload",
+    ),
+    path(
+        "attachments/uploads/<str:upload_id>/parts/<int:part_number>/",
+        upload_message_attachment_part,
+        name="attachment_upload_part",
+    ),
     path("gallery/", GalleryView.as_view(), name="gallery"),
     path(
         "gallery/<uuid:attachment_id>/",
@@ -115,6 +142,16 @@ urlpatterns = [
         ChatWidgetAttachmentsUploadView.as_view(),
         name="widget_attachments_upload",
     ),
+    path(
+        "widgets/<str:token>/attachments/uploads/",
+        ChatWidgetAttachmentDirectUploadView.as_view(),
+        name="widget_start_attachment_upload",
+    ),
+    path(
+        "widgets/<str:token>/attachments/uploads/<str:upload_id>/complete/",
+        ChatWidgetAttachmentDirectUploadView.as_view(),
+        name="widget_complete_attachment_upload",
+    ),
     path(
         "widgets/<str:token>/socket-auth/",
         ChatWidgetSocketAuthView.as_view(),
@@ -1,4 +1,5 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
 from functools import reduce
 from operator import or_
 from django.utils import timezone
@@ -18,8 +19,18 @@ from .models import (
     ConversationAlertRule,
     Tag,
     ScheduledConversationTask,
+    ConversationDailyRollup,
 )
+from .pagination import (
+    CONVERSATION_ORDERINGS,
+    InvalidCursor,
+    message_window,
+    order_by_fields,
+    paginate_by_cursor,
+)
+from .rollups import rollup_stats, rollups_cover, stats_week_days
 from .schemas import ConversationMetadata
+from .search import conversation_search_q, search_conversations
 from .serializers import (
     ConversationSerializer,
     MessageSerializer,
@@ -31,6 +42,7 @@ from .serializers import (
     ConversationAlertSerializer,
     ConversationAlertRuleSerializer,
     TagSerializer,
+    prefetch_conversation_list,
 )
 from api.authenticate.models import Organization
 from api.authenticate.services import FeatureFlagService
@@ -74,6 +86,9 @@ logger = logging.getLogger(__name__)
 
 CAN_EDIT_CONVERSATION_DATA_FLAG = "can-edit-conversation-data"
 
+MESSAGE_WINDOW_DEFAULT_LIMIT = 50
+MESSAGE_WINDOW_MAX_LIMIT = 200
+
 def _deny_unless_can_replace_agent(request, conversation=None):
     user = request.user
     if not user_can_replace_agent(user, conversation):
@@ -235,22 +250,27 @@ def _whatsapp_line_filter_options(user) -> list[dict]:
         out.append({"id": ws.id, "label": label})
     return out
 
-def _build_conversation_list_queryset(request, user):
+def _apply_conversation_dimension_filters(request, user, conversations, date_field="created_at"):
     """
-    Build the filtered, annotated, ordered queryset for conversation list.
-    Returns a queryset or JsonResponse on validation error.
+    Apply the list filters that only depend on a conversation's scope, status, channel,
+    owner and creation date. ``conversations`` may be Conversation rows or
+    ConversationDailyRollup rows, which share these field names; for rollups pass
+    ``date_field="day"``. Returns a queryset or JsonResponse on validation error.
     """
     scope = request.GET.get("scope", "org")
     chat_widget_id = (request.GET.get("chat_widget_id") or "").strip()
     status_param = (request.GET.get("status") or "").strip().lower()
+    date_only = (
+        conversations.model._meta.get_field(date_field).get_internal_type() == "DateField"
+    )
 
     if scope == "personal":
-        conversations = Conversation.objects.filter(user=user)
+        conversations = conversations.filter(user=user)
     else:
         org_user_ids = _get_org_user_ids(user)
         org_org_ids = _organization_ids_accessible_by_user(user)
         if org_user_ids:
-            conversations = Conversation.objects.filter(
+            conversations = conversations.filter(
                 Q(user_id__in=org_user_ids)
                 | Q(
                     user__isnull=True,
@@ -266,7 +286,7 @@ def _build_conversation_list_queryset(request, user):
                 )
             )
         else:
-            conversations = Conversation.objects.filter(user=user)
+            conversations = conversations.filter(user=user)
 
     if status_param in ("", "active_inactive"):
         conversations = conversations.filter(status__in=["active", "inactive"])
@@ -336,18 +356,6 @@ def _build_conversation_list_queryset(request, user):
             status=400,
         )
 
-    search = (request.GET.get("search") or "").strip()
-    if search:
-        search_q = Q()
-        if search:
-            search_q = (
-                Q(title__icontains=search)
-                | Q(id__icontains=search)
-                | Q(summary__icontains=search)
-                | Q(whatsapp_user_number__icontains=search)
-            )
-        conversations = conversations.filter(search_q)
-
     user_id_param = (request.GET.get("user_id") or "").strip()
     if user_id_param and user_id_param.isdigit():
         conversations = conversations.filter(user_id=int(user_id_param))
@@ -362,7 +370,9 @@ def _build_conversation_list_queryset(request, user):
                 dt = dt_module.fromisoformat(date_from.replace("Z", "+00:00"))
             if timezone.is_naive(dt):
                 dt = timezone.make_aware(dt)
-            conversations = conversations.filter(created_at__gte=dt)
+            conversations = conversations.filter(
+                **{f"{date_field}__gte": dt.date() if date_only else dt}
+            )
         except (ValueError, TypeError):
             pass
     date_to = (request.GET.get("date_to") or "").strip()
@@ -378,10 +388,29 @@ def _build_conversation_list_queryset(request, user):
                 dt = dt.replace(hour=23, minute=59, second=59, microsecond=999999)
             if timezone.is_naive(dt):
                 dt = timezone.make_aware(dt)
-            conversations = conversations.filter(created_at__lte=dt)
+            conversations = conversations.filter(
+                **{f"{date_field}__lte": dt.date() if date_only else dt}
+            )
         except (ValueError, TypeError):
             pass
 
+    return conversations
+
+def _build_conversation_list_queryset(request, user):
+    """
+    Build the filtered, annotated, ordered queryset for conversation list.
+    Returns a queryset or JsonResponse on validation error.
+    """
+    conversations = _apply_conversation_dimension_filters(
+        request, user, Conversation.objects.all()
+    )
+    if isinstance(conversations, JsonResponse):
+        return conversations
+
+    search = (request.GET.get("search") or "").strip()
+    if search:
+        conversations = conversations.filter(conversation_search_q(search))
+
     tags_param = (request.GET.get("tags") or "").strip()
     if tags_param:
         tag_ids = []
@@ -411,18 +440,70 @@ def _build_conversation_list_queryset(request, user):
     if max_messages is not None and str(max_messages).isdigit():
         conversations = conversations.filter(msg_count__lte=int(max_messages))
 
+    conversations = conversations.order_by(
+        *order_by_fields(CONVERSATION_ORDERINGS[_conversation_list_ordering_name(request)])
+    )
+
+    return conversations
+
+def _conversation_list_ordering_name(request) -> str:
     sort_by = (request.GET.get("sort_by") or "newest").lower()
     messages_sort = (request.GET.get("messages_sort") or "none").lower()
     if messages_sort in ("asc", "desc"):
-        order = "msg_count" if messages_sort == "asc" else "-msg_count"
-        conversations = conversations.order_by(order, "-created_at")
-    else:
-        if sort_by == "oldest":
-            conversations = conversations.order_by("created_at", "id")
-        else:
-            conversations = conversations.order_by("-created_at", "-id")
+        return f"messages_{messages_sort}"
+    return "oldest" if sort_by == "oldest" else "newest"
 
-    return conversations
+CONVERSATION_LIST_PAGING_PARAMS = {"limit", "offset", "cursor", "include_total"}
+CONVERSATION_FILTER_OPTIONS_CACHE_TIMEOUT = 300
+CONVERSATION_TOTAL_CACHE_TIMEOUT = 60
+
+def _conversation_list_cache_suffix(request, user) -> str:
+    """Stable digest of the list filters (paging params excluded) for per-user side caches."""
+    import hashlib
+
+    filters = sorted(
+        (key, value)
+        for key, value in request.GET.items()
+        if key not in CONVERSATION_LIST_PAGING_PARAMS
+    )
+    digest = hashlib.sha1(json.dumps(filters).encode("utf-8")).hexdigest()
+    return f"{user.id}_{digest}"
+
+def _conversation_list_filter_options(request, user, conversations) -> dict:
+    cache_key = (
+        f"conversation_filter_options_{_conversation_list_cache_suffix(request, user)}"
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    user_ids = list(
+        conversations.order_by().values_list("user_id", flat=True).distinct()[:100]
+    )
+    user_ids = [uid for uid in user_ids if uid is not None]
+    user_options = (
+        list(User.objects.filter(id__in=user_ids).values("id", "username"))
+        if user_ids
+        else []
+    )
+    filter_options = {
+        "users": [
+            {"id": u["id"], "label": u["username"] or f"User {u['id']}"}
+            for u in user_options
+        ],
+        "whatsapp_lines": _whatsapp_line_filter_options(user),
+    }
+    cache.set(cache_key, filter_options, timeout=CONVERSATION_FILTER_OPTIONS_CACHE_TIMEOUT)
+    return filter_options
+
+def _approximate_conversation_total(request, user, conversations) -> int:
+    """Exact count cached briefly; may lag behind inserts by up to the cache timeout."""
+    cache_key = f"conversation_total_{_conversation_list_cache_suffix(request, user)}"
+    total = cache.get(cache_key)
+    if total is None:
+        total = conversations.order_by().count()
+        cache.set(cache_key, total, timeout=CONVERSATION_TOTAL_CACHE_TIMEOUT)
+    return total
 
 def _rate_limit_widget_request(
     *,
@@ -445,13 +526,69 @@ def _rate_limit_widget_request(
     cache.incr(key)
     return None
 
+STATS_LIVE_ONLY_PARAMS = ("search", "tags", "alert_rules", "min_messages", "max_messages")
+
+def _stats_utc_day_range(request):
+    """
+    ``(aligned, first_day)`` for the date_from/date_to filters. Rollup days are UTC
+    days, so they only answer ranges that start and end on UTC day boundaries;
+    values the list filters ignore as invalid are ignored here too.
+    """
+    from datetime import datetime as dt_module, time as dt_time
+
+    if timezone.get_current_timezone_name() not in ("UTC", "Etc/UTC"):
+        return False, None
+    first_day = None
+    for param in ("date_from", "date_to"):
+        value = (request.GET.get(param) or "").strip()
+        if not value:
+            continue
+        try:
+            if len(value) == 10 and value[4] == "-" and value[7] == "-":
+                dt = dt_module.strptime(value, "%Y-%m-%d")
+            else:
+                dt = dt_module.fromisoformat(value.replace("Z", "+00:00"))
+        except (ValueError, TypeError):
+            continue
+        if dt.utcoffset() not in (None, timedelta(0)):
+            return False, None
+        if param == "date_from":
+            if dt.time() != dt_time.min:
+                return False, None
+            first_day = dt.date()
+    return True, first_day
+
+def _stats_can_use_rollups(request) -> bool:
+    """Rollups answer the stats when no content filter is set and they cover the whole range."""
+    if (request.GET.get("source") or "").strip().lower() == "live":
+        return False
+    if any((request.GET.get(param) or "").strip() for param in STATS_LIVE_ONLY_PARAMS):
+        return False
+    aligned, first_day = _stats_utc_day_range(request)
+    return aligned and rollups_cover(first_day)
+
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(token_required, name="dispatch")
 class ConversationStatsView(View):
-    """Separate endpoint for dashboard metrics. Accepts same filters as list for consistency."""
+    """
+    Separate endpoint for dashboard metrics. Accepts same filters as list for consistency.
+
+    Filters that only touch a conversation's dimensions are answered from
+    ConversationDailyRollup when the rollups cover the requested UTC days; content
+    filters (search, tags, alert rules, message bounds), ranges the rollups do not
+    cover or ``source=live`` fall back to aggregating the live tables.
+    """
 
     def get(self, request):
         user = request.user
+        if _stats_can_use_rollups(request):
+            rollups = _apply_conversation_dimension_filters(
+                request, user, ConversationDailyRollup.objects.all(), date_field="day"
+            )
+            if isinstance(rollups, JsonResponse):
+                return rollups
+            return JsonResponse({**rollup_stats(rollups), "source": "rollup"}, safe=False)
+
         conversations = _build_conversation_list_queryset(request, user)
         if isinstance(conversations, JsonResponse):
             return conversations
@@ -460,26 +597,30 @@ class ConversationStatsView(View):
         agg = conversations.aggregate(total_msgs=Count("messages"))
         total_messages = agg.get("total_msgs") or 0
 
-        now = timezone.now()
-        week_ago = now - timedelta(days=7)
-        last_7_days = conversations.filter(created_at__gte=week_ago).count()
+        # Same UTC calendar days as the rollup path, so both answer alike.
+        week_days = stats_week_days()
+        week_start = datetime.combine(week_days[0], time.min, tzinfo=dt_timezone.utc)
+
+        # Group over the matching ids: grouping ``conversations`` by day or user
+        # directly would apply its msg_count filters per group, not per conversation.
+        matching = Conversation.objects.filter(id__in=conversations.values("id"))
 
         from django.db.models.functions import TruncDate
         last_7_days_breakdown = list(
-            conversations.filter(created_at__gte=week_ago)
-            .annotate(day=TruncDate("created_at"))
+            matching.filter(created_at__gte=week_start)
+            .annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
             .values("day")
             .annotate(count=Count("id"))
             .values_list("day", "count")
         )
         day_counts = {str(d): c for d, c in last_7_days_breakdown if d}
-        week_points = []
-        for i in range(7):
-            d = (now - timedelta(days=(6 - i))).date()
-            week_points.append({"date": d.isoformat(), "count": day_counts.get(str(d), 0)})
+        week_points = [
+            {"date": d.isoformat(), "count": day_counts.get(str(d), 0)} for d in week_days
+        ]
+        last_7_days = sum(p["count"] for p in week_points)
 
         top_users_rows = (
-            conversations.exclude(user_id__isnull=True)
+            matching.exclude(user_id__isnull=True)
             .values("user_id")
             .annotate(
                 conv_count=Count("id", distinct=True),
@@ -506,10 +647,51 @@ class ConversationStatsView(View):
                 "last_7_days": last_7_days,
                 "last_7_days_breakdown": week_points,
                 "top_users": top_users,
+                "source": "live",
             },
             safe=False,
         )
 
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(token_required, name="dispatch")
+class ConversationSearchView(View):
+    """
+    Ranked full-text search over conversation metadata and message bodies.
+    Accepts the same filters as the conversation list; the query goes in ``q``.
+    """
+
+    def get(self, request):
+        user = request.user
+        text = (request.GET.get("q") or "").strip()
+        if not text:
+            return JsonResponse({"message": "q is required", "status": 400}, status=400)
+
+        conversations = _build_conversation_list_queryset(request, user)
+        if isinstance(conversations, JsonResponse):
+            return conversations
+
+        limit_param = (request.GET.get("limit") or "").strip()
+        limit = min(max(1, int(limit_param)), 50) if limit_param.isdigit() else 20
+        hits = search_conversations(
+            prefetch_conversation_list(conversations), text, limit=limit
+        )
+        context = {"request": request}
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "conversation": ConversationSerializer(
+                            hit["conversation"], context=context
+                        ).data,
+                        "rank": hit["rank"],
+                        "message_id": hit["message_id"],
+                        "snippet": hit["snippet"],
+                    }
+                    for hit in hits
+                ],
+            }
+        )
+
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(token_required, name="dispatch")
 class ConversationView(View):
@@ -520,29 +702,74 @@ class ConversationView(View):
             conversation, err = _get_conversation_for_user(request, conversation_id)
             if err:
                 return err
-            serialized_conversation = BigConversationSerializer(
-                conversation, context={"request": request}
-            ).data
+            context = {"request": request}
+            messages_limit = (request.GET.get("messages_limit") or "").strip()
+            if messages_limit.isdigit():
+                context.update(
+                    messages_limit=min(max(1, int(messages_limit)), MESSAGE_WINDOW_MAX_LIMIT),
+                    messages_before=request.GET.get("messages_before") or None,
+                    messages_after=request.GET.get("messages_after") or None,
+                )
+            try:
+                serialized_conversation = BigConversationSerializer(
+                    conversation, context=context
+                ).data
+            except InvalidCursor as exc:
+                return JsonResponse({"message": str(exc), "status": 400}, status=400)
             return JsonResponse(serialized_conversation, safe=False)
         else:
             conversations = _build_conversation_list_queryset(request, user)
             if isinstance(conversations, JsonResponse):
                 return conversations
 
-            user_ids = list(
-                conversations.values_list("user_id", flat=True).distinct()
-            )[:100]
-            user_ids = [uid for uid in user_ids if uid is not None]
-            user_options = (
-                list(User.objects.filter(id__in=user_ids).values("id", "username"))
-                if user_ids
-                else []
+            filter_options = _conversation_list_filter_options(
+                request, user, conversations
             )
-
             limit = min(max(1, int(request.GET.get("limit", 50))), 100)
+            cursor = (request.GET.get("cursor") or "").strip()
+
+            if "cursor" in request.GET:
+                ordering_name = _conversation_list_ordering_name(request)
+                try:
+                    page, next_cursor = paginate_by_cursor(
+                        prefetch_conversation_list(conversations),
+                        ordering_name=ordering_name,
+                        ordering=CONVERSATION_ORDERINGS[ordering_name],
+                        cursor=cursor or None,
+                        limit=limit,
+                    )
+                except InvalidCursor as exc:
+                    return JsonResponse({"message": str(exc), "status": 400}, status=400)
+                include_total = (request.GET.get("include_total") or "").lower() in (
+                    "1",
+                    "true",
+                )
+                total = (
+                    _approximate_conversation_total(request, user, conversations)
+                    if include_total
+                    else None
+                )
+                serialized_conversations = ConversationSerializer(
+                    page, many=True, context={"request": request}
+                ).data
+                return JsonResponse(
+                    {
+                        "results": serialized_conversations,
+                        "total": total,
+                        "total_is_approximate": include_total,
+                        "limit": limit,
+                        "next_cursor": next_cursor,
+                        "has_next": next_cursor is not None,
+                        "filter_options": filter_options,
+                    },
+                    safe=False,
+                )
+
             offset = max(0, int(request.GET.get("offset", 0)))
             total = conversations.count()
-            conversations = conversations[offset : offset + limit]
+            conversations = prefetch_conversation_list(conversations)[
+                offset : offset + limit
+            ]
 
             serialized_conversations = ConversationSerializer(
                 conversations, many=True, context={"request": request}
@@ -555,13 +782,7 @@ class ConversationView(View):
                     "limit": limit,
                     "offset": offset,
                     "has_next": offset + limit < total,
-                    "filter_options": {
-                        "users": [
-                            {"id": u["id"], "label": u["username"] or f"User {u['id']}"}
-                            for u in user_options
-                        ],
-                        "whatsapp_lines": _whatsapp_line_filter_options(user),
-                    },
+                    "filter_options": filter_options,
                 },
                 safe=False,
             )
@@ -699,6 +920,52 @@ class ConversationView(View):
         conversation.save(update_fields=["status", "deleted_at", "updated_at"])
         return JsonResponse({"status": "deleted"})
 
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(token_required, name="dispatch")
+class ConversationMessagesView(View):
+    """
+    Windowed message history: the latest ``limit`` messages, then older pages via
+    ``before`` or newer ones via ``after`` (cursors returned by the previous window).
+    """
+
+    def get(self, request, id):
+        conversation, err = _get_conversation_for_user(request, id)
+        if err:
+            return err
+
+        limit_param = (request.GET.get("limit") or "").strip()
+        limit = (
+            min(max(1, int(limit_param)), MESSAGE_WINDOW_MAX_LIMIT)
+            if limit_param.isdigit()
+            else MESSAGE_WINDOW_DEFAULT_LIMIT
+        )
+        before = request.GET.get("before") or None
+        after = request.GET.get("after") or None
+        if before and after:
+            return JsonResponse(
+                {"message": "Use either before or after, not both", "status": 400},
+                status=400,
+            )
+        try:
+            window = message_window(
+                conversation.messages.prefetch_related("reaction_set"),
+                limit=limit,
+                before=before,
+                after=after,
+            )
+        except InvalidCursor as exc:
+            return JsonResponse({"message": str(exc), "status": 400}, status=400)
+
+        messages = window.pop("messages")
+        return JsonResponse(
+            {
+                "results": MessageSerializer(
+                    messages, many=True, context={"request": request}
+                ).data,
+                **window,
+            }
+        )
+
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(token_required, name="dispatch")
 class ConversationBulkView(View):
@@ -1007,6 +1274,115 @@ def upload_message_attachments(request):
         return resp_err
     return JsonResponse({"attachments": uploaded_attachments})
 
+def _attachment_upload_part_url(request):
+    from urllib.parse import urlencode
+
+    from django.urls import reverse
+
+    def part_url(upload_id, part_number, signature):
+        path = reverse(
+            "messaging:attachment_upload_part", args=[upload_id, part_number]
+        )
+        return request.build_absolute_uri(f"{path}?{urlencode({'signature': signature})}")
+
+    return part_url
+
+def _start_direct_attachment_upload(request, conversation, owner, upload_payload):
+    from .direct_uploads import DirectUploadError, start_attachment_upload
+
+    try:
+        upload = start_attachment_upload(
+            conversation=conversation,
+            owner=owner,
+            filename=upload_payload.get("filename") or "",
+            content_type=upload_payload.get("content_type"),
+            size=upload_payload.get("size"),
+            part_url=_attachment_upload_part_url(request),
+        )
+    except DirectUploadError as e:
+        return JsonResponse({"error": str(e)}, status=e.status)
+    return JsonResponse(upload, status=201)
+
+def _complete_direct_attachment_upload(request, upload_id, owner, user):
+    from .direct_uploads import DirectUploadError, complete_attachment_upload
+
+    try:
+        complete_payload = json.loads(request.body) if request.body else {}
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    try:
+        attachment = complete_attachment_upload(
+            upload_id=upload_id,
+            owner=owner,
+            parts=complete_payload.get("parts"),
+            user=user,
+        )
+    except DirectUploadError as e:
+        return JsonResponse({"error": str(e)}, status=e.status)
+    url = request.build_absolute_uri(attachment.file.url)
+    return JsonResponse({"attachment": {"id": str(attachment.id), "url": url}}, status=201)
+
+@csrf_exempt
+@token_required
+def start_message_attachment_upload(request):
+    """
+    Start a direct multipart upload for one attachment.
+    Accepts JSON: { conversation_id, filename, content_type, size }
+    Returns: { upload_id, part_size, expires_in, parts: [{ part_number, url, method }] }
+    PUT each part to its URL, then call the complete endpoint with the part ETags.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if request.user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    try:
+        upload_payload = json.loads(request.body) if request.body else {}
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    conversation_id = upload_payload.get("conversation_id")
+    if not conversation_id:
+        return JsonResponse({"error": "conversation_id is required"}, status=400)
+    conv, err = _get_conversation_for_user(request, conversation_id)
+    if err:
+        return err
+    return _start_direct_attachment_upload(
+        request, conv, f"user:{request.user.id}", upload_payload
+    )
+
+@csrf_exempt
+@token_required
+def complete_message_attachment_upload(request, upload_id):
+    """
+    Finish a direct upload and create its MessageAttachment.
+    Accepts JSON: { parts: [{ part_number, etag }] }
+    Returns: { attachment: { id, url } }
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if request.user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    return _complete_direct_attachment_upload(
+        request, upload_id, f"user:{request.user.id}", request.user
+    )
+
+@csrf_exempt
+def upload_message_attachment_part(request, upload_id, part_number):
+    """Local-storage stand-in for a presigned S3 part URL (signed, no auth header)."""
+    from .direct_uploads import DirectUploadError, store_local_part
+
+    if request.method != "PUT":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    try:
+        etag = store_local_part(
+            upload_id, part_number, request.GET.get("signature", ""), request.body
+        )
+    except DirectUploadError as e:
+        return JsonResponse({"error": str(e)}, status=e.status)
+    response = JsonResponse({"part_number": part_number})
+    response["ETag"] = etag
+    return response
+
 @csrf_exempt
 @token_required
 def link_message_attachment(request):
@@ -1460,6 +1836,54 @@ class ChatWidgetAttachmentsUploadView(View):
             return resp_err
         return JsonResponse({"attachments": uploaded_attachments})
 
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(widget_session_required, name="dispatch")
+class ChatWidgetAttachmentDirectUploadView(View):
+    """Direct multipart visitor uploads (start, then complete with part ETags)."""
+
+    def _check(self, request, token):
+        rate_limit_resp = _rate_limit_widget_request(
+            request=request,
+            scope_key=f"attachments:{token}",
+            limit=30,
+            window_seconds=60,
+        )
+        if rate_limit_resp:
+            return rate_limit_resp
+        if request.widget.token != token:
+            return JsonResponse({"error": "Widget token mismatch"}, status=403)
+        if not _widget_allow_visitor_attachments(request.widget):
+            return JsonResponse(
+                {"error": "Visitor attachments are disabled for this widget"},
+                status=403,
+            )
+        return None
+
+    def post(self, request, token, upload_id=None):
+        err = self._check(request, token)
+        if err:
+            return err
+        owner = f"widget_session:{request.widget_visitor_session.id}"
+        if upload_id:
+            return _complete_direct_attachment_upload(request, upload_id, owner, None)
+
+        try:
+            upload_payload = json.loads(request.body) if request.body else {}
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        conversation_id = upload_payload.get("conversation_id")
+        if not conversation_id:
+            return JsonResponse({"error": "conversation_id is required"}, status=400)
+        try:
+            conversation = Conversation.objects.get(
+                id=conversation_id,
+                chat_widget=request.widget,
+                widget_visitor_session=request.widget_visitor_session,
+            )
+        except Conversation.DoesNotExist:
+            return JsonResponse({"error": "Conversation not found"}, status=404)
+        return _start_direct_attachment_upload(request, conversation, owner, upload_payload)
+
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(widget_session_required, name="dispatch")
 class ChatWidgetSocketAuthView(View):
@@ -66,6 +66,7 @@ def recharge_org_wallet_compute_units(
     Add compute units to the given wallet bucket under row lock.
     Creates wallet if missing. Writes a ledger row when delta is non-zero.
     """
+    from api.consumption.billing_status import invalidate_billing_status
     from api.consumption.models import (
         Currency,
         OrganizationWallet,
@@ -107,6 +108,7 @@ def recharge_org_wallet_compute_units(
             **{field: F(field) + compute_units},
             updated_at=django_tz.now(),
         )
+        invalidate_billing_status(organization.id, subscription=False)
         _ledger_tx(organization, bucket=bucket, delta=compute_units, reason=reason, subscription=subscription)
         return True
 
@@ -173,6 +175,7 @@ def forfeit_subscription_credits(organization) -> Decimal:
     Zero the subscription bucket for this org (idempotent). Purchased balance unchanged.
     Returns compute units forfeited (0 if already empty / no wallet).
     """
+    from api.consumption.billing_status import invalidate_billing_status
     from api.consumption.models import OrganizationWallet, OrganizationWalletTransaction
 
     with transaction.atomic():
@@ -190,6 +193,7 @@ def forfeit_subscription_credits(organization) -> Decimal:
             subscription_balance=Decimal("0"),
             updated_at=django_tz.now(),
         )
+        invalidate_billing_status(organization.id, subscription=False)
         _ledger_tx(
             organization,
             bucket=OrganizationWalletTransaction.BUCKET_SUBSCRIPTION,
@@ -7,6 +7,7 @@ from django.db import transaction
 from django.utils import timezone as django_tz
 
 from api.authenticate.models import Organization
+from api.consumption.billing_status import invalidate_billing_status
 from api.payments.billing_helpers import forfeit_subscription_credits
 from api.payments.models import Subscription
 
@@ -42,3 +43,4 @@ def expire_subscriptions_past_end_date():
                 continue
             forfeit_subscription_credits(org)
             subs_qs.update(status="expired", end_date=now, updated_at=now)
+            invalidate_billing_status(org_id)
@@ -14,6 +14,7 @@ from api.authenticate.models import Organization
 from api.authenticate.views import _can_manage_organization
 from api.payments.models import Subscription, SubscriptionPlan
 from api.utils.error_response import error_response
+from api.consumption.billing_status import invalidate_billing_status
 from api.consumption.models import OrganizationWallet, Currency
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -489,6 +490,15 @@ def _handle_invoice_paid(invoice):
         reason=OrganizationWalletTransaction.REASON_STRIPE_RENEW,
     )
 
+def _invalidate_billing_for_stripe_subscription(stripe_sub_id):
+    """Queryset updates skip model signals; drop the cached billing state explicitly."""
+    for oid in (
+        Subscription.objects.filter(stripe_subscription_id=stripe_sub_id)
+        .values_list("organization_id", flat=True)
+        .distinct()
+    ):
+        invalidate_billing_status(oid)
+
 def _handle_subscription_cancelled(stripe_sub):
     from api.payments.billing_helpers import forfeit_subscription_credits
 
@@ -502,6 +512,7 @@ def _handle_subscription_cancelled(stripe_sub):
         status="cancelled", updated_at=tz.now()
     )
     for oid in org_ids:
+        invalidate_billing_status(oid)
         org = Organization.objects.filter(pk=oid).first()
         if org:
             forfeit_subscription_credits(org)
@@ -521,6 +532,7 @@ def _handle_subscription_updated(stripe_sub):
         end_date=end_date,
         updated_at=tz.now(),
     )
+    _invalidate_billing_for_stripe_subscription(stripe_sub_id)
 
 def _handle_payment_failed(invoice):
     stripe_sub_id = invoice.get("subscription")
@@ -528,6 +540,7 @@ def _handle_payment_failed(invoice):
         Subscription.objects.filter(stripe_subscription_id=stripe_sub_id).update(
             status="pending_payment", updated_at=tz.now()
         )
+        _invalidate_billing_for_stripe_subscription(stripe_sub_id)
 
 def _get_stripe_subscription_state(subscription):
     if (
@@ -153,6 +153,8 @@ TEMPLATES = [
 WSGI_APPLICATION = "api.wsgi.application"
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Direct attachment uploads read each part's ETag (api.messaging.direct_uploads).
+CORS_EXPOSE_HEADERS = ["ETag"]
 
 DATABASES = {
     "default": dj_database_url.config(
@@ -269,6 +271,32 @@ CACHES = {
     }
 }
 
+# Journal org compute-unit debits and settle them into OrganizationWallet in
+# batches (api.consumption.ledger) instead of locking the wallet per usage event.
+ORGANIZATION_WALLET_LEDGER_ENABLED = os.environ.get(
+    "ORGANIZATION_WALLET_LEDGER_ENABLED", "false"
+).strip().lower() in {"1", "true", "yes", "on"}
+
+# Scheduled conversation tasks one organization may run at the same time
+# (api.messaging.scheduler); due tasks over the budget wait a few seconds.
+SCHEDULED_TASKS_MAX_RUNNING_PER_ORG = int(
+    os.environ.get("SCHEDULED_TASKS_MAX_RUNNING_PER_ORG", "5")
+)
+
+# Exporters one data export job runs in parallel threads
+# (api.data_governance.services.export_runner); 1 runs them in order.
+DATA_EXPORT_MAX_WORKERS = int(os.environ.get("DATA_EXPORT_MAX_WORKERS", "3"))
+
+# Largest message attachment accepted by direct multipart uploads
+# (api.messaging.direct_uploads).
+MESSAGE_ATTACHMENT_MAX_UPLOAD_BYTES = int(
+    os.environ.get("MESSAGE_ATTACHMENT_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024))
+)
+
+# Characters of extracted document or website text read_attachment sends to the
+# model (api.ai_layers.tools.read_attachment); longer text is cut and flagged.
+READ_ATTACHMENT_MAX_CHARS = int(os.environ.get("READ_ATTACHMENT_MAX_CHARS", "120000"))
+
 FIRECRAWL_API_KEY = os.environ.get("FIRECRAWL_API_KEY", "")
 
 ELEVENLABS_API_KEY = os.environ.get("ELEVENLABS_API_KEY", "")
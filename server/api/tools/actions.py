@@ -24,11 +24,12 @@ from .models import (
     Video,
     VideoChunk,
 )
+from django.db import transaction
 from django.utils import timezone
 
 import os
 from api.utils.openai_functions import create_structured_completion, generate_speech_api
-from api.utils.runway_functions import image_to_video
+from api.utils.runway_functions import get_task, start_image_to_video
 from api.utils.document_tools import convert_html
 from api.messaging.models import Message
 import threading
@@ -329,42 +330,82 @@ def append_attachment_to_message(message_id, attachment_type, extra_data={}):
 def generate_video_from_image(
     prompt_image_b64, prompt_text, ratio, user_id, provider="runway", message_id=None
 ):
+    """
+    Submit an image-to-video generation and track it as a MediaGenerationJob;
+    finish_runway_job attaches the video to the message once Runway is done.
+    """
+    from api.ai_layers.media_jobs import start_media_job
+    from api.ai_layers.models import MediaGenerationJob
+
     try:
         if provider == "runway":
             user = User.objects.get(pk=user_id)
-            task = image_to_video(prompt_image_b64, prompt_text, ratio)
-            result_url = task.output[0]
-
-            video_path = f"generations/videos/{uuid.uuid4()}.mp4"
-            os.makedirs(
-                os.path.join(settings.MEDIA_ROOT, "generations/videos"), exist_ok=True
+            message = Message.objects.select_related("conversation").get(pk=message_id)
+            task_id = start_image_to_video(prompt_image_b64, prompt_text, ratio)
+            start_media_job(
+                provider=MediaGenerationJob.Provider.RUNWAY,
+                operation_id=str(task_id),
+                conversation=message.conversation,
+                user=user,
+                message=message,
+                params={"prompt_text": prompt_text, "ratio": ratio},
             )
+            return True
+        else:
+            raise Exception(f"The provider {provider} is not supported yet!")
+    except Exception as e:
+        printer.red(e)
+        return None
 
-            with open(os.path.join(settings.MEDIA_ROOT, video_path), "wb") as f:
-                f.write(requests.get(result_url).content)
+def check_runway_job(job):
+    from api.ai_layers.media_jobs import MediaGenerationFailed
 
-            video_generation = VideoGeneration.objects.create(
-                name=f"Video generated from image {message_id}",
-                prompt=prompt_text,
-                message_id=message_id,
-                user=user,
-                ratio=ratio,
-                engine="runway",
-                file=video_path,
-            )
-            m = Message.objects.get(pk=message_id)
-            m.attachments.append(
-                {
-                    "type": "video_generation",
-                    "id": str(video_generation.id),
-                    "content": f"{settings.MEDIA_URL}{video_path}",
-                    "name": f"Video generated from image {message_id}",
-                    "text": prompt_text,
-                }
-            )
-            m.save()
+    task = get_task(job.operation_id)
+    if task.status == "SUCCEEDED":
+        return task.output[0]
+    if task.status == "FAILED":
+        raise MediaGenerationFailed(
+            f"Runway generation failed: {getattr(task, 'failure', None) or 'unknown error'}"
+        )
+    return None
 
-            notify_user(
+def finish_runway_job(job, result_url):
+    message_id = job.message_id
+    prompt_text = (job.params or {}).get("prompt_text", "")
+
+    video_path = f"generations/videos/{uuid.uuid4()}.mp4"
+    os.makedirs(
+        os.path.join(settings.MEDIA_ROOT, "generations/videos"), exist_ok=True
+    )
+
+    with open(os.path.join(settings.MEDIA_ROOT, video_path), "wb") as f:
+        f.write(requests.get(result_url, timeout=120).content)
+
+    video_generation = VideoGeneration.objects.create(
+        name=f"Video generated from image {message_id}",
+        prompt=prompt_text,
+        message_id=message_id,
+        user_id=job.user_id,
+        ratio=(job.params or {}).get("ratio"),
+        engine="runway",
+        file=video_path,
+    )
+    if message_id:
+        append_attachment_to_message(
+            message_id,
+            "video_generation",
+            {
+                "id": str(video_generation.id),
+                "content": f"{settings.MEDIA_URL}{video_path}",
+                "name": f"Video generated from image {message_id}",
+                "text": prompt_text,
+            },
+        )
+
+    if job.user_id:
+        user_id = job.user_id
+        transaction.on_commit(
+            lambda: notify_user(
                 user_id,
                 event_type="video_generated",
                 data={
@@ -372,13 +413,9 @@ def generate_video_from_image(
                     "public_url": f"{settings.MEDIA_URL}{video_path}",
                 },
             )
-
-            return True
-        else:
-            raise Exception(f"The provider {provider} is not supported yet!")
-    except Exception as e:
-        printer.red(e)
-        return None
+        )
+    # Delivered on the originating message; nothing for media_jobs to post.
+    return None
 
 def generate_audio(text, voice, provider, user_id, message_id):
 
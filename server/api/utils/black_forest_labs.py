@@ -62,25 +62,41 @@ def request_flux_generation(
 
     return None
 
-def get_result_url(result_id: str, api_key: str = os.environ.get("BFL_API_KEY")):
-    url = f"https://api.bfl.ml/v1/get_result?id={result_id}"
-
+BFL_PENDING_STATUSES = ("Pending", "Queued", "Processing")
+
+def get_result_status(result_id: str, api_key: str = os.environ.get("BFL_API_KEY")):
+    """One status check of a BFL request: (status, sample URL or None)."""
+    response = requests.get(
+        f"https://api.bfl.ml/v1/get_result?id={result_id}",
+        headers={
+            "accept": "application/json",
+            "x-key": api_key,
+        },
+        timeout=30,
+    ).json()
+    status = response.get("status")
+    if status == "Ready":
+        return status, response["result"]["sample"]
+    return status, None
+
+def get_result_url(
+    result_id: str,
+    api_key: str = os.environ.get("BFL_API_KEY"),
+    max_wait_seconds: float = 120,
+):
+    # Used by request/response views that must return the image URL, so this
+    # still waits, but gives up on terminal statuses and after max_wait_seconds.
+    deadline = time.monotonic() + max_wait_seconds
     while True:
-        response = requests.get(
-            url,
-            headers={
-                "accept": "application/json",
-                "x-key": api_key,
-            },
-        ).json()
-
-        if response.get("status") == "Ready":
-            return response["result"]["sample"]
-        else:
-            printer.blue(
-                "Waiting to retry...", "STATUS NOT READY", response.get("status")
-            )
-            time.sleep(1.5)
+        status, sample = get_result_status(result_id, api_key)
+        if sample:
+            return sample
+        if status not in BFL_PENDING_STATUSES:
+            raise ValueError(f"Flux generation {result_id} ended with status {status!r}")
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Flux generation {result_id} not ready after {max_wait_seconds}s")
+        printer.blue("Waiting to retry...", "STATUS NOT READY", status)
+        time.sleep(1.5)
 
 def request_image_edit_with_mask(
     image_base64: str,
@@ -1,9 +1,13 @@
-import time
 import os
 from runwayml import RunwayML
 from typing import Literal
 
-def image_to_video(
+def _client(api_key):
+    if not api_key:
+        raise ValueError("RUNWAY_API_KEY is not set in the environment variables")
+    return RunwayML(api_key=api_key)
+
+def start_image_to_video(
     prompt_image_b64,
     prompt_text,
     ratio: Literal[
@@ -12,23 +16,16 @@ def image_to_video(
     ] = "768:1280",
     api_key=os.getenv("RUNWAY_API_KEY"),
 ):
-    if not api_key:
-        raise ValueError("RUNWAY_API_KEY is not set in the environment variables")
-    client = RunwayML(api_key=api_key)
-    task = client.image_to_video.create(
+    """Submit an image-to-video task and return its Runway task id."""
+    task = _client(api_key).image_to_video.create(
         model="gen3a_turbo",
         prompt_image=prompt_image_b64,
         prompt_text=prompt_text,
         duration=5,
         ratio=ratio,
     )
-    task_id = task.id
-
-    time.sleep(10)
-    task = client.tasks.retrieve(task_id)
-    while task.status not in ["SUCCEEDED", "FAILED"]:
-        print("Waiting for video generation task to complete...")
-        time.sleep(10)
-        task = client.tasks.retrieve(task_id)
+    return task.id
 
-    return task
+def get_task(task_id, api_key=os.getenv("RUNWAY_API_KEY")):
+    """Current state of a Runway task (status is SUCCEEDED, FAILED or still running)."""
+    return _client(api_key).tasks.retrieve(task_id)
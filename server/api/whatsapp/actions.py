@@ -1,10 +1,10 @@
-import json
 import logging
 import os
 import re
+import shutil
 
 import requests
-from django.conf import settings
+from django.db import transaction
 from pydantic import BaseModel, Field
 
 from api.messaging.actions import transcribe_audio
@@ -12,13 +12,11 @@ from api.messaging.models import Conversation, Message
 from api.utils.color_printer import printer
 from api.utils.openai_functions import create_structured_completion
 
+from .graph import GraphRequestError, send_graph_message
 from .models import WSNumber
 
 logger = logging.getLogger(__name__)
 
-def _graph_token() -> str:
-    return (getattr(settings, "WHATSAPP_GRAPH_API_TOKEN", None) or "").strip()
-
 def send_reaction(business_phone_number_id, to, message_id, emoji):
     """
     Send a reaction to a WhatsApp user message.
@@ -28,11 +26,6 @@ def send_reaction(business_phone_number_id, to, message_id, emoji):
     :param message_id: The ID of the message to react to
     :param emoji: The emoji to apply as a reaction
     """
-    url = f"https://graph.facebook.com/v18.0/{business_phone_number_id}/messages"
-    headers = {
-        "Authorization": f"Bearer {_graph_token()}",
-        "Content-Type": "application/json",
-    }
     data = {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
@@ -44,7 +37,7 @@ def send_reaction(business_phone_number_id, to, message_id, emoji):
         },
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    response = send_graph_message(business_phone_number_id, data)
     if response.status_code != 200:
         print("Error sending reaction:", response.json())
         raise Exception("Failed to send reaction.")
@@ -59,13 +52,6 @@ def send_interactive_message(
     footer_text,
     buttons,
 ):
-    url = (
-        f"https://graph.facebook.com/v21.0/{whatsapp_business_phone_number_id}/messages"
-    )
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {_graph_token()}",
-    }
     printer.red("Sending interactive message")
     message_payload = {
         "messaging_product": "whatsapp",
@@ -81,7 +67,7 @@ def send_interactive_message(
         },
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(message_payload))
+    response = send_graph_message(whatsapp_business_phone_number_id, message_payload)
 
     if response.status_code == 200:
         printer.success("Interactive message sent successfully!")
@@ -101,11 +87,6 @@ def send_message(
     if not to or not message:
         raise ValueError("To and message fields are required.")
 
-    url = f"https://graph.facebook.com/v21.0/{business_phone_number_id}/messages"
-    headers = {
-        "Authorization": f"Bearer {_graph_token()}",
-        "Content-Type": "application/json",
-    }
     data: dict = {
         "messaging_product": "whatsapp",
         "to": to,
@@ -114,10 +95,10 @@ def send_message(
     if message_platform_id:
         data["context"] = {"message_id": message_platform_id}
 
-    response = requests.post(url, headers=headers, json=data)
+    response = send_graph_message(business_phone_number_id, data)
     if response.status_code != 200:
         print("Error sending message:", response.json())
-        raise Exception("Failed to send message.")
+        raise GraphRequestError("Failed to send message.", response)
     printer.success("Message sent successfully.")
 
     return response.json().get("messages")[0].get("id")
@@ -145,11 +126,6 @@ def send_template_message(
     if not language_code:
         raise ValueError("language_code is required")
 
-    url = f"https://graph.facebook.com/v21.0/{business_phone_number_id}/messages"
-    headers = {
-        "Authorization": f"Bearer {_graph_token()}",
-        "Content-Type": "application/json",
-    }
     template_payload: dict = {
         "name": template_name,
         "language": {"code": language_code},
@@ -164,7 +140,7 @@ def send_template_message(
         "template": template_payload,
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    response = send_graph_message(business_phone_number_id, data)
     if response.status_code != 200:
         try:
             err_body = response.json()
@@ -176,9 +152,10 @@ def send_template_message(
             if isinstance(err_body, dict)
             else None
         )
-        raise Exception(
+        raise GraphRequestError(
             meta_error
-            or f"Failed to send WhatsApp template message (HTTP {response.status_code})."
+            or f"Failed to send WhatsApp template message (HTTP {response.status_code}).",
+            response,
         )
 
     logger.info("Template '%s' sent successfully.", template_name)
@@ -210,12 +187,12 @@ def verify_whatsapp_number(country_code, phone_number, method, cert, pin=None):
         return {"error": response.status_code, "message": response.text}
 
 def download_audio(business_phone_number_id, audio_id):
-    from .media import fetch_whatsapp_media_bytes
+    from .media import WHATSAPP_MEDIA_CHUNK_BYTES, download_whatsapp_media
 
-    data, _mime = fetch_whatsapp_media_bytes(str(audio_id))
     audio_file_path = f"/tmp/{audio_id}.ogg"
-    with open(audio_file_path, "wb") as audio_file:
-        audio_file.write(data)
+    with download_whatsapp_media(str(audio_id)) as media:
+        with open(audio_file_path, "wb") as audio_file:
+            shutil.copyfileobj(media.file, audio_file, WHATSAPP_MEDIA_CHUNK_BYTES)
     return audio_file_path
 
 def _strip_markdown_for_whatsapp(text: str) -> str:
@@ -305,8 +282,12 @@ def deliver_whatsapp_reply(
     assistant_message_id: int,
     inbound_wamid: str | None,
 ):
-    """Send assistant attachments and text to WhatsApp; store WAMIDs; optional reaction."""
-    from .outbound_media import deliver_whatsapp_attachments
+    """
+    Queue the assistant's attachments and text on the conversation's outbound
+    delivery queue (``api.whatsapp.outbound``); WAMIDs are stored as they are sent.
+    """
+    from .outbound import enqueue_whatsapp_outbound, outbound_reply_steps
+    from .outbound_media import collect_assistant_file_attachments
 
     ws_number = conversation.ws_number
     if not ws_number or not ws_number.platform_id:
@@ -334,45 +315,52 @@ def deliver_whatsapp_reply(
     body = _strip_markdown_for_whatsapp(assistant.text or "")
     body = _strip_attachment_manifest_for_whatsapp(body)
     body = _strip_attachment_links_for_whatsapp(body)
-    reply_to = conversation.whatsapp_last_inbound_wamid
-    to = conversation.whatsapp_user_number
-    phone_id = ws_number.platform_id
-
-    media_wamids = deliver_whatsapp_attachments(
-        phone_number_id=phone_id,
-        to=to,
-        assistant_message=assistant,
-        reply_to_message_id=reply_to,
-    )
-
-    out_wamid: str | None = None
-    if body:
-        text_reply_to = reply_to if not media_wamids else None
-        out_wamid = send_message(phone_id, to, body, text_reply_to)
 
-    ameta = dict(assistant.metadata or {})
-    if media_wamids:
-        ameta["whatsapp_media_wamids"] = media_wamids
-    if out_wamid:
-        ameta["whatsapp_wamid"] = out_wamid
-    assistant.metadata = ameta
-    assistant.save(update_fields=["metadata"])
+    enqueue_whatsapp_outbound(
+        str(conversation.id),
+        outbound_reply_steps(
+            message_id=assistant.id,
+            phone_number_id=ws_number.platform_id,
+            to=conversation.whatsapp_user_number,
+            body=body,
+            attachment_ids=[
+                str(att.id) for att in collect_assistant_file_attachments(assistant)
+            ],
+            reply_to=conversation.whatsapp_last_inbound_wamid,
+        ),
+    )
 
     if inbound_wamid and user_msg and user_msg.text:
-        try:
-            emoji = _pick_whatsapp_reaction(user_msg.text, body)
-            send_reaction(
-                ws_number.platform_id,
-                conversation.whatsapp_user_number,
-                inbound_wamid,
-                emoji,
-            )
-            umeta = dict(user_msg.metadata or {})
-            umeta["whatsapp_reaction"] = emoji
-            user_msg.metadata = umeta
-            user_msg.save(update_fields=["metadata"])
-        except Exception as e:
-            printer.red(f"WhatsApp reaction skipped: {e}")
+        from .tasks import whatsapp_send_reaction_task
+
+        # Picking the emoji is an LLM call; keep it off the reply path.
+        defer_whatsapp_task(
+            whatsapp_send_reaction_task,
+            user_message_id=user_msg.id,
+            inbound_wamid=inbound_wamid,
+            reply_text=body,
+        )
+
+def send_reply_reaction(user_message_id: int, inbound_wamid: str, reply_text: str) -> None:
+    """React to the user's inbound message with an emoji matching the exchange."""
+    user_msg = Message.objects.select_related("conversation__ws_number").get(id=user_message_id)
+    conversation = user_msg.conversation
+    ws_number = conversation.ws_number
+    if not ws_number or not ws_number.platform_id:
+        return
+    try:
+        emoji = _pick_whatsapp_reaction(user_msg.text, reply_text)
+        send_reaction(
+            ws_number.platform_id,
+            conversation.whatsapp_user_number,
+            inbound_wamid,
+            emoji,
+        )
+        umeta = dict(user_msg.metadata or {})
+        umeta["whatsapp_reaction"] = emoji
+        Message.objects.filter(id=user_msg.id).update(metadata=umeta)
+    except Exception as e:
+        printer.red(f"WhatsApp reaction skipped: {e}")
 
 def send_whatsapp_fallback_text(
     conversation: Conversation,
@@ -480,161 +468,269 @@ def _gate_whatsapp_inbound(
     Return True if the sender may proceed (and autolink contact when matched).
     On deny, send the restricted-access reply and return False.
     """
-    from .access import (
-        ensure_ws_contact_for_inbound,
-        resolve_whatsapp_sender_access,
-    )
+    from .routing import ensure_routed_contact, routed_sender_access
 
-    access = resolve_whatsapp_sender_access(ws_number, user_phone)
+    access = routed_sender_access(ws_number, user_phone)
     if not access.allowed:
         _reject_restricted_whatsapp_sender(ws_number, user_phone, inbound_wamid)
         return False
-    ensure_ws_contact_for_inbound(ws_number, user_phone, user=access.user)
+    ensure_routed_contact(ws_number, user_phone, user=access.user)
     return True
 
-def handle_image_message(webhook_data, message):
-    business_phone_number_id = webhook_data["entry"][0]["changes"][0]["value"][
-        "metadata"
-    ]["phone_number_id"]
-    try:
-        ws_number = WSNumber.objects.get(platform_id=business_phone_number_id)
-    except WSNumber.DoesNotExist:
+def defer_whatsapp_task(task, **kwargs) -> None:
+    """Queue ``task`` once the current transaction commits (right away outside one)."""
+    transaction.on_commit(lambda: task.delay(**kwargs))
+
+def queue_mark_message_as_read(business_number_id, ws_message_id) -> None:
+    from .tasks import whatsapp_mark_read_task
+
+    defer_whatsapp_task(
+        whatsapp_mark_read_task,
+        business_number_id=business_number_id,
+        ws_message_id=ws_message_id,
+    )
+
+def _webhook_phone_number_id(webhook_data) -> str:
+    return webhook_data["entry"][0]["changes"][0]["value"]["metadata"]["phone_number_id"]
+
+def resolve_inbound_conversation(webhook_data, message):
+    """
+    Cheap inbound stage shared by every message type: business number lookup,
+    sender access gate and active thread. Returns ``(ws_number, conversation)``
+    or None when the message must be dropped. Served from the routing cache
+    (``api.whatsapp.routing``) in the steady state.
+    """
+    from .routing import routed_conversation, routed_ws_number
+
+    business_phone_number_id = _webhook_phone_number_id(webhook_data)
+    ws_number = routed_ws_number(business_phone_number_id)
+    if ws_number is None:
         printer.red(
             f"WSNumber with platform_id {business_phone_number_id} not found"
         )
-        return
+        return None
 
     user_phone = message["from"]
-    inbound_wamid = message.get("id")
-    if not _gate_whatsapp_inbound(ws_number, user_phone, inbound_wamid):
-        return
+    if not _gate_whatsapp_inbound(ws_number, user_phone, message.get("id")):
+        return None
+    return ws_number, routed_conversation(ws_number, user_phone)
 
-    from .conversations import get_or_create_whatsapp_conversation
-    from .inbound import process_image_inbound
+def _handle_media_message(webhook_data, message, kind: str):
+    """
+    Acknowledge a media message now; download and buffer it in a worker task.
+    Its arrival slot is reserved here, so it keeps its place among the
+    messages around it however long the download takes.
+    """
+    from .inbound import inbound_wamid_already_processed, reserve_whatsapp_inbound_slot
+    from .tasks import whatsapp_media_inbound_task
+
+    resolved = resolve_inbound_conversation(webhook_data, message)
+    if resolved is None:
+        return
+    ws_number, conv = resolved
+    if inbound_wamid_already_processed(conv, message["id"]):
+        return
 
-    conv = get_or_create_whatsapp_conversation(ws_number, user_phone)
     conv.whatsapp_last_inbound_wamid = message["id"]
     conv.save(update_fields=["whatsapp_last_inbound_wamid", "updated_at"])
+    queue_mark_message_as_read(ws_number.platform_id, message["id"])
+
+    media = message.get(kind) or {}
+    defer_whatsapp_task(
+        whatsapp_media_inbound_task,
+        kind=kind,
+        ws_number_id=ws_number.id,
+        conversation_id=str(conv.id),
+        user_phone=message["from"],
+        inbound_wamid=message["id"],
+        media=media if isinstance(media, dict) else {},
+        inbound_seq=reserve_whatsapp_inbound_slot(str(conv.id)),
+    )
 
-    mark_message_as_read(business_phone_number_id, message["id"])
+def process_media_message(
+    *,
+    kind: str,
+    ws_number_id: int,
+    conversation_id: str,
+    user_phone: str,
+    inbound_wamid: str,
+    media: dict,
+    inbound_seq: int | None = None,
+) -> None:
+    """Deferred stage of image/document inbound: fetch the media and buffer it for the agent."""
+    from .inbound import (
+        process_document_inbound,
+        process_image_inbound,
+        release_whatsapp_inbound_slot,
+    )
 
-    image = message.get("image") or {}
     try:
-        process_image_inbound(
+        ws_number = WSNumber.objects.get(id=ws_number_id)
+        conv = Conversation.objects.get(id=conversation_id)
+    except (WSNumber.DoesNotExist, Conversation.DoesNotExist):
+        printer.red(f"WhatsApp {kind} inbound dropped: number or conversation is gone")
+        return
+    process = process_image_inbound if kind == "image" else process_document_inbound
+    try:
+        process(
             ws_number=ws_number,
             conversation=conv,
             user_phone=user_phone,
-            inbound_wamid=message["id"],
-            image=image if isinstance(image, dict) else {},
+            inbound_wamid=inbound_wamid,
+            inbound_seq=inbound_seq,
+            **{kind: media},
         )
     except Exception as e:
-        printer.red(f"WhatsApp image inbound failed: {e}")
-
-def handle_audio_message(webhook_data, message):
-    audio_url = message["audio"]["id"]
-    business_phone_number_id = webhook_data["entry"][0]["changes"][0]["value"][
-        "metadata"
-    ]["phone_number_id"]
-
-    audio_file_path = download_audio(business_phone_number_id, audio_url)
-    transcription = (transcribe_audio(audio_file_path) or "").strip()
-    if not transcription:
-        printer.red("Empty transcription for inbound WhatsApp audio; skipping")
-        return
-    printer.green("Transcription: ", transcription)
+        printer.red(f"WhatsApp {kind} inbound failed: {e}")
+    finally:
+        if inbound_seq is not None:
+            # No-op when the payload was buffered; otherwise stop holding the flush.
+            release_whatsapp_inbound_slot(conversation_id, inbound_seq)
 
-    synthetic = dict(message)
-    synthetic["type"] = "text"
-    synthetic["text"] = {"body": transcription}
-    handle_message_received(webhook_data, synthetic)
+def handle_image_message(webhook_data, message):
+    _handle_media_message(webhook_data, message, "image")
 
 def handle_document_message(webhook_data, message):
-    business_phone_number_id = webhook_data["entry"][0]["changes"][0]["value"][
-        "metadata"
-    ]["phone_number_id"]
-    try:
-        ws_number = WSNumber.objects.get(platform_id=business_phone_number_id)
-    except WSNumber.DoesNotExist:
-        printer.red(
-            f"WSNumber with platform_id {business_phone_number_id} not found"
-        )
-        return
-
-    user_phone = message["from"]
-    inbound_wamid = message.get("id")
-    if not _gate_whatsapp_inbound(ws_number, user_phone, inbound_wamid):
-        return
+    _handle_media_message(webhook_data, message, "document")
 
-    from .conversations import get_or_create_whatsapp_conversation
-    from .inbound import process_document_inbound
+def queue_audio_message(webhook_data, message):
+    """Reserve the audio's arrival slot now; download and transcribe it in a worker task."""
+    from .inbound import reserve_whatsapp_inbound_slot
+    from .tasks import whatsapp_audio_inbound_task
 
-    conv = get_or_create_whatsapp_conversation(ws_number, user_phone)
-    conv.whatsapp_last_inbound_wamid = message["id"]
-    conv.save(update_fields=["whatsapp_last_inbound_wamid", "updated_at"])
+    resolved = resolve_inbound_conversation(webhook_data, message)
+    if resolved is None:
+        return
+    _ws_number, conv = resolved
+    defer_whatsapp_task(
+        whatsapp_audio_inbound_task,
+        webhook_data=webhook_data,
+        message=message,
+        conversation_id=str(conv.id),
+        inbound_seq=reserve_whatsapp_inbound_slot(str(conv.id)),
+    )
 
-    mark_message_as_read(business_phone_number_id, message["id"])
+def handle_audio_message(
+    webhook_data, message, *, conversation_id: str | None = None, inbound_seq: int | None = None
+):
+    from .inbound import release_whatsapp_inbound_slot
 
-    document = message.get("document") or {}
     try:
-        process_document_inbound(
-            ws_number=ws_number,
-            conversation=conv,
-            user_phone=user_phone,
-            inbound_wamid=message["id"],
-            document=document if isinstance(document, dict) else {},
-        )
-    except Exception as e:
-        printer.red(f"WhatsApp document inbound failed: {e}")
-
-def handle_webhook(webhook_data):
-    printer.blue("Handling webhook")
-    printer.green(webhook_data)
-    value = (
-        webhook_data.get("entry", [{}])[0]
-        .get("changes", [{}])[0]
-        .get("value", {})
-    )
-    messages = value.get("messages") or []
-    if not messages:
-        return
-    message = messages[0]
-    if message.get("type") == "text":
+        audio_url = message["audio"]["id"]
+        business_phone_number_id = webhook_data["entry"][0]["changes"][0]["value"][
+            "metadata"
+        ]["phone_number_id"]
+
+        audio_file_path = download_audio(business_phone_number_id, audio_url)
+        transcription = (transcribe_audio(audio_file_path) or "").strip()
+        if not transcription:
+            printer.red("Empty transcription for inbound WhatsApp audio; skipping")
+            return
+        printer.green("Transcription: ", transcription)
+
+        synthetic = dict(message)
+        synthetic["type"] = "text"
+        synthetic["text"] = {"body": transcription}
+        handle_message_received(webhook_data, synthetic, inbound_seq=inbound_seq)
+    finally:
+        if conversation_id and inbound_seq is not None:
+            release_whatsapp_inbound_slot(conversation_id, inbound_seq)
+
+def iter_webhook_items(webhook_data):
+    """
+    Yield every item of a Meta webhook delivery as ``(kind, envelope, payload)``.
+
+    Meta batches several entries (phone numbers), changes and messages into one
+    POST under load. Each yielded ``envelope`` is a single-entry, single-change
+    copy of the delivery whose ``value`` carries just that item, so handlers that
+    read ``entry[0].changes[0].value`` see the right ``metadata``. ``kind`` is
+    ``"message"`` (payload: one message dict) or ``"statuses"`` (payload: the
+    change's list of delivery statuses).
+    """
+    for entry in webhook_data.get("entry") or []:
+        if not isinstance(entry, dict):
+            continue
+        for change in entry.get("changes") or []:
+            if not isinstance(change, dict):
+                continue
+            value = change.get("value") or {}
+            if not isinstance(value, dict):
+                continue
+            base_value = {
+                k: v for k, v in value.items() if k not in ("messages", "statuses")
+            }
+
+            def envelope(**items):
+                return {
+                    "object": webhook_data.get("object"),
+                    "entry": [
+                        {
+                            "id": entry.get("id"),
+                            "changes": [
+                                {
+                                    "field": change.get("field"),
+                                    "value": {**base_value, **items},
+                                }
+                            ],
+                        }
+                    ],
+                }
+
+            for message in value.get("messages") or []:
+                if isinstance(message, dict):
+                    yield "message", envelope(messages=[message]), message
+            statuses = [s for s in value.get("statuses") or [] if isinstance(s, dict)]
+            if statuses:
+                yield "statuses", envelope(statuses=statuses), statuses
+
+def handle_webhook_message(webhook_data, message):
+    message_type = message.get("type")
+    if message_type == "text":
         handle_message_received(webhook_data=webhook_data, message=message)
-    elif message.get("type") == "audio":
-        handle_audio_message(webhook_data=webhook_data, message=message)
-    elif message.get("type") == "image":
+    elif message_type == "audio":
+        # Download + transcription take seconds; run them in their own task.
+        queue_audio_message(webhook_data=webhook_data, message=message)
+    elif message_type == "image":
         handle_image_message(webhook_data=webhook_data, message=message)
-    elif message.get("type") == "document":
+    elif message_type == "document":
         handle_document_message(webhook_data=webhook_data, message=message)
-    elif message.get("type") == "interactive":
+    elif message_type == "interactive":
         handle_interactive_message(webhook_data=webhook_data, message=message)
-    elif message.get("type") == "button":
+    elif message_type == "button":
         handle_button_message(webhook_data=webhook_data, message=message)
 
-def handle_message_received(webhook_data, message):
-    from .conversations import get_or_create_whatsapp_conversation
-    from .inbound import is_clear_command, process_text_inbound
+def handle_webhook_statuses(webhook_data, statuses):
+    from .statuses import apply_whatsapp_statuses
 
-    business_phone_number_id = webhook_data["entry"][0]["changes"][0]["value"][
-        "metadata"
-    ]["phone_number_id"]
+    phone_number_id = (
+        webhook_data["entry"][0]["changes"][0]["value"].get("metadata") or {}
+    ).get("phone_number_id")
+    return apply_whatsapp_statuses(phone_number_id, statuses)
 
-    try:
-        ws_number = WSNumber.objects.get(platform_id=business_phone_number_id)
-    except WSNumber.DoesNotExist:
-        printer.red(
-            f"WSNumber with platform_id {business_phone_number_id} not found, maybe we need to create it? Why I'm receiving webhooks from it?"
-        )
-        return
+def handle_webhook(webhook_data):
+    """Process every message and status in a delivery, inline and in order."""
+    printer.blue("Handling webhook")
+    printer.green(webhook_data)
+    for kind, envelope, payload in iter_webhook_items(webhook_data):
+        try:
+            if kind == "message":
+                handle_webhook_message(envelope, payload)
+            else:
+                handle_webhook_statuses(envelope, payload)
+        except Exception:
+            # One bad item must not drop the rest of the batch.
+            logger.exception("WhatsApp webhook %s item failed", kind)
 
-    user_phone = message["from"]
-    inbound_wamid = message.get("id")
-    if not _gate_whatsapp_inbound(ws_number, user_phone, inbound_wamid):
-        return
+def handle_message_received(webhook_data, message, *, inbound_seq: int | None = None):
+    from .inbound import is_clear_command, process_text_inbound
 
-    conv = get_or_create_whatsapp_conversation(ws_number, user_phone)
+    resolved = resolve_inbound_conversation(webhook_data, message)
+    if resolved is None:
+        return
+    ws_number, conv = resolved
+    user_phone = message["from"]
 
-    mark_message_as_read(business_phone_number_id, message["id"])
+    queue_mark_message_as_read(ws_number.platform_id, message["id"])
 
     body = (message.get("text") or {}).get("body") or ""
     if is_clear_command(body):
@@ -656,22 +752,18 @@ def handle_message_received(webhook_data, message):
         user_phone=user_phone,
         inbound_wamid=message["id"],
         body=body,
+        inbound_seq=inbound_seq,
     )
 
 def mark_message_as_read(business_number_id, ws_message_id):
     try:
-        url = f"https://graph.facebook.com/v21.0/{business_number_id}/messages"
-        headers = {
-            "Authorization": f"Bearer {_graph_token()}",
-            "Content-Type": "application/json",
-        }
         data = {
             "messaging_product": "whatsapp",
             "status": "read",
             "message_id": ws_message_id,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = send_graph_message(business_number_id, data)
 
         if response.status_code == 200:
             printer.success(
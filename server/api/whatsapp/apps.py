@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WhatsappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api.whatsapp'
+
+    def ready(self):
+        import api.whatsapp.signals
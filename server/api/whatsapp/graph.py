@@ -0,0 +1,332 @@
+"""
+Shared Meta Graph API client for every WhatsApp Cloud API call.
+
+One pooled keep-alive ``requests.Session`` per process, a Redis token bucket per
+business phone number (shared by all workers) so sends stay under Meta's
+per-number throughput, retries with jittered exponential backoff on 429,
+throughput error codes and gateway errors, and in-process latency/error
+counters (``graph_client().metrics.snapshot()``).
+
+Callers get the final ``requests.Response`` back and keep their own handling of
+non-2xx responses; only exhausted throttling raises ``GraphRateLimited``. Send
+helpers report a failed response as ``GraphRequestError``, whose ``permanent``
+flag tells queue workers not to retry it.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Any
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+GRAPH_API_VERSION = "v21.0"
+GRAPH_API_BASE = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
+
+GRAPH_DEFAULT_TIMEOUT = (5, 30)
+GRAPH_POOL_SIZE = 32
+GRAPH_MAX_RETRIES = 3
+GRAPH_BACKOFF_BASE_SECONDS = 0.5
+GRAPH_BACKOFF_MAX_SECONDS = 8.0
+GRAPH_SLOW_CALL_SECONDS = 2.0
+
+# Cloud API default throughput is 80 messages/second per business number.
+WHATSAPP_GRAPH_MESSAGES_PER_SECOND = 80
+WHATSAPP_GRAPH_MAX_THROTTLE_WAIT_SECONDS = 30.0
+
+# Graph error codes that mean "slow down" rather than "bad request".
+GRAPH_THROTTLE_ERROR_CODES = frozenset({4, 17, 32, 613, 80007, 130429, 131048, 131056})
+GRAPH_RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+
+
+class GraphRateLimited(RuntimeError):
+    """The per-number send budget stayed exhausted for longer than we are willing to wait."""
+
+
+class GraphRequestError(RuntimeError):
+    """A Graph call answered with a non-2xx status after the client's own retries."""
+
+    def __init__(self, message: str, response: requests.Response):
+        super().__init__(message)
+        self.status_code = response.status_code
+        self.error_code = graph_error_code(response)
+
+    @property
+    def permanent(self) -> bool:
+        """4xx other than throttling: the same request will be refused again."""
+        return (
+            400 <= self.status_code < 500
+            and self.status_code != 429
+            and self.error_code not in GRAPH_THROTTLE_ERROR_CODES
+        )
+
+
+def _graph_token() -> str:
+    token = (getattr(settings, "WHATSAPP_GRAPH_API_TOKEN", None) or "").strip()
+    if not token:
+        raise RuntimeError("WHATSAPP_GRAPH_API_TOKEN is not configured")
+    return token
+
+
+def graph_url(path_or_url: str) -> str:
+    if path_or_url.startswith(("http://", "https://")):
+        return path_or_url
+    return f"{GRAPH_API_BASE}/{path_or_url.lstrip('/')}"
+
+
+def graph_error_code(response: requests.Response) -> int | None:
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    error = body.get("error") if isinstance(body, dict) else None
+    code = error.get("code") if isinstance(error, dict) else None
+    return code if isinstance(code, int) else None
+
+
+# KEYS: bucket hash. ARGV: refill rate per second, burst size.
+# Takes one token; returns 0, or the milliseconds to wait for the next token.
+_TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+def graph_bucket_key(phone_number_id: str) -> str:
+    return f"whatsapp:graph:bucket:{phone_number_id}"
+
+
+class GraphMetrics:
+    """Per-process counters; cheap enough to update on every call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.retries = 0
+            self.throttled = 0
+            self.throttle_wait_seconds = 0.0
+            self.latency_seconds = 0.0
+            self.max_latency_seconds = 0.0
+
+    def observe(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latency_seconds += latency
+            self.max_latency_seconds = max(self.max_latency_seconds, latency)
+            if not ok:
+                self.errors += 1
+
+    def count_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def count_throttle(self, waited: float) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.throttle_wait_seconds += waited
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "throttle_wait_seconds": round(self.throttle_wait_seconds, 3),
+                "avg_latency_seconds": (
+                    round(self.latency_seconds / self.calls, 4) if self.calls else 0.0
+                ),
+                "max_latency_seconds": round(self.max_latency_seconds, 4),
+            }
+
+
+class GraphClient:
+    def __init__(self, *, pool_size: int = GRAPH_POOL_SIZE, max_retries: int = GRAPH_MAX_RETRIES):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.max_retries = max_retries
+        self.metrics = GraphMetrics()
+
+    def throttle(self, phone_number_id: str) -> None:
+        """Block until the number's token bucket has a send slot (shared across workers)."""
+        rate = float(
+            getattr(settings, "WHATSAPP_GRAPH_MESSAGES_PER_SECOND", None)
+            or WHATSAPP_GRAPH_MESSAGES_PER_SECOND
+        )
+        key = cache.make_key(graph_bucket_key(phone_number_id))
+        waited = 0.0
+        while True:
+            try:
+                wait_ms = get_redis_connection("default").eval(
+                    _TOKEN_BUCKET_SCRIPT, 1, key, rate, rate
+                )
+            except Exception:
+                # Redis trouble must not stop outbound messages; Meta's 429s still apply.
+                logger.warning("Graph throttle unavailable for %s", phone_number_id, exc_info=True)
+                return
+            if not wait_ms:
+                if waited:
+                    self.metrics.count_throttle(waited)
+                return
+            if waited >= WHATSAPP_GRAPH_MAX_THROTTLE_WAIT_SECONDS:
+                self.metrics.count_throttle(waited)
+                raise GraphRateLimited(
+                    f"WhatsApp send budget exhausted for phone number {phone_number_id}"
+                )
+            delay = wait_ms / 1000
+            time.sleep(delay)
+            waited += delay
+
+    def _backoff(self, attempt: int, response: requests.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), GRAPH_BACKOFF_MAX_SECONDS)
+        ceiling = min(GRAPH_BACKOFF_MAX_SECONDS, GRAPH_BACKOFF_BASE_SECONDS * (2**attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def _should_retry(self, method: str, response: requests.Response) -> bool:
+        if response.status_code in GRAPH_RETRYABLE_STATUS:
+            return True
+        if response.status_code >= 400 and graph_error_code(response) in GRAPH_THROTTLE_ERROR_CODES:
+            return True
+        # A 500 on a send may still have been delivered; only retry reads.
+        return response.status_code >= 500 and method == "GET"
+
+    def _should_retry_connection_error(self, method: str, exc: requests.ConnectionError) -> bool:
+        if method == "GET" or isinstance(exc, requests.ConnectTimeout):
+            return True
+        # A reset after the body went out may still have delivered a send; only
+        # retry when the connection was never established.
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method, url, **kwargs)
+
+    def request(
+        self,
+        method: str,
+        path_or_url: str,
+        *,
+        phone_number_id: str | None = None,
+        authenticated: bool = True,
+        token: str | None = None,
+        headers: dict[str, str] | None = None,
+        timeout=GRAPH_DEFAULT_TIMEOUT,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send one Graph request. ``phone_number_id`` marks a message send that
+        counts against that number's throughput; ``authenticated=False`` skips the
+        bearer header (e.g. presigned CDN URLs).
+        """
+        method = method.upper()
+        url = graph_url(path_or_url)
+        request_headers = dict(headers or {})
+        if authenticated:
+            request_headers.setdefault("Authorization", f"Bearer {token or _graph_token()}")
+
+        attempt = 0
+        while True:
+            if phone_number_id:
+                self.throttle(str(phone_number_id))
+            if attempt and hasattr(kwargs.get("data"), "seek"):
+                # Streamed upload bodies were consumed by the previous attempt.
+                kwargs["data"].seek(0)
+            started = time.monotonic()
+            try:
+                response = self._send(
+                    method, url, headers=request_headers, timeout=timeout, **kwargs
+                )
+            except requests.ConnectionError as exc:
+                self.metrics.observe(time.monotonic() - started, ok=False)
+                if attempt >= self.max_retries or not self._should_retry_connection_error(
+                    method, exc
+                ):
+                    raise
+                response = None
+            else:
+                latency = time.monotonic() - started
+                self.metrics.observe(latency, ok=response.status_code < 400)
+                if latency >= GRAPH_SLOW_CALL_SECONDS:
+                    logger.warning(
+                        "Slow Graph call %s %s took %.2fs", method, url.split("?")[0], latency
+                    )
+                if response.status_code < 400 or attempt >= self.max_retries:
+                    return response
+                if not self._should_retry(method, response):
+                    return response
+
+            delay = self._backoff(attempt, response)
+            logger.info(
+                "Retrying Graph %s %s in %.2fs (attempt %d, status %s)",
+                method,
+                url.split("?")[0],
+                delay,
+                attempt + 1,
+                response.status_code if response is not None else "connection error",
+            )
+            self.metrics.count_retry()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path_or_url: str, **kwargs) -> requests.Response:
+        return self.request("GET", path_or_url, **kwargs)
+
+    def post(self, path_or_url: str, **kwargs) -> requests.Response:
+        return self.request("POST", path_or_url, **kwargs)
+
+
+_client: GraphClient | None = None
+_client_lock = threading.Lock()
+
+
+def graph_client() -> GraphClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GraphClient()
+    return _client
+
+
+def send_graph_message(phone_number_id: str, payload: dict[str, Any], **kwargs) -> requests.Response:
+    """POST ``/{phone_number_id}/messages`` through the per-number throttle."""
+    return graph_client().post(
+        f"{phone_number_id}/messages",
+        phone_number_id=phone_number_id,
+        json=payload,
+        **kwargs,
+    )
@@ -14,15 +14,7 @@ from typing import Any
 import requests
 from django.conf import settings
 
-_GRAPH_VERSION = "v21.0"
-_GRAPH_BASE = f"https://graph.facebook.com/{_GRAPH_VERSION}"
-
-
-def _graph_token() -> str:
-    token = (getattr(settings, "WHATSAPP_GRAPH_API_TOKEN", "") or "").strip()
-    if not token:
-        raise RuntimeError("WHATSAPP_GRAPH_API_TOKEN is not configured.")
-    return token
+from .graph import _graph_token, graph_client
 
 
 def _app_secret() -> str:
@@ -51,14 +43,7 @@ def _graph_request(
     token: str,
     json_body: dict[str, Any] | None = None,
 ) -> requests.Response:
-    url = f"{_GRAPH_BASE}/{path.lstrip('/')}"
-    response = requests.request(
-        method,
-        url,
-        headers={"Authorization": f"Bearer {token}"},
-        json=json_body,
-        timeout=30,
-    )
+    response = graph_client().request(method, path, token=token, json=json_body)
     if not response.ok:
         raise RuntimeError(f"Graph API error {response.status_code}: {response.text}")
     return response
@@ -73,13 +58,7 @@ def fetch_waba_id_for_phone_number_id(phone_number_id: str) -> str | None:
     pid = phone_number_id.strip()
     if not pid:
         return None
-    url = f"{_GRAPH_BASE}/{pid}"
-    r = requests.get(
-        url,
-        params={"fields": "whatsapp_business_account{id}"},
-        headers={"Authorization": f"Bearer {_graph_token()}"},
-        timeout=30,
-    )
+    r = graph_client().get(pid, params={"fields": "whatsapp_business_account{id}"})
     if not r.ok:
         raise RuntimeError(f"Graph API error {r.status_code}: {r.text}")
     data = r.json()
@@ -4,23 +4,34 @@ Darwin-style WhatsApp inbound: idempotent user row + agent task with regenerate_
 
 from __future__ import annotations
 
+import json
 import mimetypes
 import uuid
 from typing import Any
 
-from django.core.files.base import ContentFile
 from django.core.cache import cache
+from django_redis import get_redis_connection
 
 from api.messaging.models import Conversation, Message, MessageAttachment
 
-from .media import fetch_whatsapp_media_bytes
+from .media import download_whatsapp_media
 from .models import WSNumber
 
 _ALLOWED_IMAGE_MIMES = frozenset(
     {"image/jpeg", "image/png", "image/webp", "image/gif"}
 )
+# Meta's inbound image limit.
+_MAX_IMAGE_BYTES = 5 * 1024 * 1024
 WHATSAPP_INBOUND_DEBOUNCE_SECONDS = 3
+# The debounce window slides while messages keep arriving, up to this long.
+WHATSAPP_INBOUND_DEBOUNCE_MAX_SECONDS = 15
 WHATSAPP_INBOUND_BUFFER_TTL_SECONDS = 120
+# Media and audio still being fetched hold the flush at most this long, counted
+# from the first message of the window, so they are answered with what came
+# before and after them instead of in a later turn.
+WHATSAPP_INBOUND_MEDIA_WAIT_SECONDS = 60
+WHATSAPP_INBOUND_MEDIA_POLL_MS = 1000
+WHATSAPP_INBOUND_SEQ_TTL_SECONDS = 24 * 60 * 60
 
 WHATSAPP_CLEAR_COMMAND = "/clear"
 WHATSAPP_CLEAR_REPLY = "A new chat has started!"
@@ -34,13 +45,176 @@ def whatsapp_inbound_schedule_lock_key(conversation_id: str) -> str:
     return f"whatsapp:inbound:flush_scheduled:{conversation_id}"
 
 
+def whatsapp_inbound_window_key(conversation_id: str) -> str:
+    return f"whatsapp:inbound:window:{conversation_id}"
+
+
+def whatsapp_inbound_pending_key(conversation_id: str) -> str:
+    return f"whatsapp:inbound:pending:{conversation_id}"
+
+
+def whatsapp_inbound_seq_key(conversation_id: str) -> str:
+    return f"whatsapp:inbound:seq:{conversation_id}"
+
+
+def _inbound_redis_keys(conversation_id: str) -> list[str]:
+    # Same namespace as the Django cache, so cache.clear() also drops these.
+    return [
+        cache.make_key(whatsapp_inbound_buffer_key(conversation_id)),
+        cache.make_key(whatsapp_inbound_schedule_lock_key(conversation_id)),
+        cache.make_key(whatsapp_inbound_window_key(conversation_id)),
+        cache.make_key(whatsapp_inbound_pending_key(conversation_id)),
+    ]
+
+
+# KEYS: buffer list, schedule lock, window hash (first_ms, deadline_ms), pending set
+# ARGV: payload json, debounce ms, max window ms, ttl seconds, arrival seq or ''
+# Returns 1 when the caller must schedule the flush task, else 0.
+_PUSH_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+if ARGV[5] ~= '' then
+  redis.call('SREM', KEYS[4], ARGV[5])
+end
+local first = tonumber(redis.call('HGET', KEYS[3], 'first_ms')) or now
+local deadline = math.min(now + tonumber(ARGV[2]), first + tonumber(ARGV[3]))
+redis.call('HSET', KEYS[3], 'first_ms', first, 'deadline_ms', deadline)
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+if redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[4]) then
+  return 1
+end
+return 0
+"""
+
+# KEYS: window hash, seq counter, pending set
+# ARGV: window ttl seconds, seq ttl seconds, pending ttl seconds
+# Returns the arrival seq reserved for a message whose payload is pushed later.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local seq = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('SADD', KEYS[3], seq)
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+redis.call('HSETNX', KEYS[1], 'first_ms', now)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return seq
+"""
+
+# KEYS: buffer list, schedule lock, window hash, pending set
+# ARGV: media wait ms, media poll ms
+# Returns {wait_ms, items}: wait_ms > 0 means the window is still open (or a
+# reserved message is still being fetched) and nothing was drained; otherwise
+# items is the whole buffer and the buffer keys are gone.
+_DRAIN_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local deadline = tonumber(redis.call('HGET', KEYS[3], 'deadline_ms'))
+if deadline and deadline > now then
+  return {deadline - now, {}}
+end
+local first = tonumber(redis.call('HGET', KEYS[3], 'first_ms'))
+if first and redis.call('SCARD', KEYS[4]) > 0 then
+  local media_deadline = first + tonumber(ARGV[1])
+  if media_deadline > now then
+    return {math.min(tonumber(ARGV[2]), media_deadline - now), {}}
+  end
+end
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+return {0, items}
+"""
+
+
+def push_whatsapp_inbound_payload(conversation_id: str, payload: dict[str, Any]) -> bool:
+    """
+    Atomically append ``payload`` to the conversation's inbound buffer and extend
+    its debounce window. Returns True if no flush is scheduled yet (the caller
+    schedules it).
+    """
+    inbound_seq = payload.get("inbound_seq")
+    scheduled = get_redis_connection("default").eval(
+        _PUSH_SCRIPT,
+        4,
+        *_inbound_redis_keys(conversation_id),
+        json.dumps(payload),
+        WHATSAPP_INBOUND_DEBOUNCE_SECONDS * 1000,
+        WHATSAPP_INBOUND_DEBOUNCE_MAX_SECONDS * 1000,
+        WHATSAPP_INBOUND_BUFFER_TTL_SECONDS,
+        "" if inbound_seq is None else str(inbound_seq),
+    )
+    return bool(scheduled)
+
+
+def next_whatsapp_inbound_seq(conversation_id: str) -> int:
+    """Arrival number of an inbound message; buffered payloads are merged in this order."""
+    key = cache.make_key(whatsapp_inbound_seq_key(conversation_id))
+    pipe = get_redis_connection("default").pipeline()
+    pipe.incr(key)
+    pipe.expire(key, WHATSAPP_INBOUND_SEQ_TTL_SECONDS)
+    return pipe.execute()[0]
+
+
+def reserve_whatsapp_inbound_slot(conversation_id: str) -> int:
+    """
+    Take the arrival number for a message whose payload is built in a worker
+    (media download, audio transcription). The flush waits for it until its
+    payload is pushed or the slot is released, at most
+    ``WHATSAPP_INBOUND_MEDIA_WAIT_SECONDS``.
+    """
+    return get_redis_connection("default").eval(
+        _RESERVE_SCRIPT,
+        3,
+        cache.make_key(whatsapp_inbound_window_key(conversation_id)),
+        cache.make_key(whatsapp_inbound_seq_key(conversation_id)),
+        cache.make_key(whatsapp_inbound_pending_key(conversation_id)),
+        WHATSAPP_INBOUND_BUFFER_TTL_SECONDS,
+        WHATSAPP_INBOUND_SEQ_TTL_SECONDS,
+        WHATSAPP_INBOUND_MEDIA_WAIT_SECONDS,
+    )
+
+
+def release_whatsapp_inbound_slot(conversation_id: str, inbound_seq: int) -> None:
+    """Stop holding the flush for a reserved message; a no-op once its payload was pushed."""
+    get_redis_connection("default").srem(
+        cache.make_key(whatsapp_inbound_pending_key(conversation_id)), inbound_seq
+    )
+
+
+def drain_whatsapp_inbound_buffer(conversation_id: str) -> tuple[list[dict[str, Any]], float]:
+    """
+    Return ``(payloads, 0)`` and empty the buffer once its debounce window has
+    closed, or ``([], seconds_left)`` while messages are still arriving or a
+    reserved media message is still being fetched.
+    """
+    wait_ms, items = get_redis_connection("default").eval(
+        _DRAIN_SCRIPT,
+        4,
+        *_inbound_redis_keys(conversation_id),
+        WHATSAPP_INBOUND_MEDIA_WAIT_SECONDS * 1000,
+        WHATSAPP_INBOUND_MEDIA_POLL_MS,
+    )
+    if wait_ms > 0:
+        return [], wait_ms / 1000
+    return [json.loads(item) for item in items], 0
+
+
+def peek_whatsapp_inbound_buffer(conversation_id: str) -> list[dict[str, Any]]:
+    buffer_key = _inbound_redis_keys(conversation_id)[0]
+    return [
+        json.loads(item)
+        for item in get_redis_connection("default").lrange(buffer_key, 0, -1)
+    ]
+
+
 def is_clear_command(body: str) -> bool:
     return body.strip() == WHATSAPP_CLEAR_COMMAND
 
 
 def clear_whatsapp_inbound_buffer(conversation_id: str) -> None:
-    cache.delete(whatsapp_inbound_buffer_key(conversation_id))
-    cache.delete(whatsapp_inbound_schedule_lock_key(conversation_id))
+    get_redis_connection("default").delete(*_inbound_redis_keys(conversation_id))
 
 
 def handle_whatsapp_clear(
@@ -131,18 +305,22 @@ def _build_user_inputs_image(
     media_url: str | None,
     caption: str,
 ) -> list[dict[str, Any]]:
-    data, mime = fetch_whatsapp_media_bytes(media_id, direct_url=media_url)
-    if mime not in _ALLOWED_IMAGE_MIMES:
-        raise ValueError(f"Unsupported WhatsApp image mime type: {mime}")
-    ext = mime.split("/")[-1] if "/" in mime else "jpg"
-    fname = f"whatsapp-in-{uuid.uuid4().hex}.{ext}"
-    att = MessageAttachment.objects.create(
-        conversation=conversation,
-        user=None,
-        kind="file",
-        content_type=mime,
-        file=ContentFile(data, name=fname),
-    )
+    with download_whatsapp_media(
+        media_id,
+        direct_url=media_url,
+        max_bytes=_MAX_IMAGE_BYTES,
+        allowed_mime_types=_ALLOWED_IMAGE_MIMES,
+    ) as media:
+        mime = media.mime_type
+        ext = mime.split("/")[-1] if "/" in mime else "jpg"
+        media.file.name = f"whatsapp-in-{uuid.uuid4().hex}.{ext}"
+        att = MessageAttachment.objects.create(
+            conversation=conversation,
+            user=None,
+            kind="file",
+            content_type=mime,
+            file=media.file,
+        )
     text = caption.strip() if caption.strip() else "See attached image(s)."
     return [
         {"type": "input_text", "text": text},
@@ -158,17 +336,18 @@ def _build_user_inputs_document(
     caption: str,
     filename: str | None,
 ) -> list[dict[str, Any]]:
-    data, mime = fetch_whatsapp_media_bytes(media_id, direct_url=media_url)
-    guessed_ext = mimetypes.guess_extension(mime or "") or ""
-    ext = guessed_ext if guessed_ext else ".bin"
-    fname = f"whatsapp-doc-{uuid.uuid4().hex}{ext}"
-    att = MessageAttachment.objects.create(
-        conversation=conversation,
-        user=None,
-        kind="file",
-        content_type=mime,
-        file=ContentFile(data, name=fname),
-    )
+    with download_whatsapp_media(media_id, direct_url=media_url) as media:
+        mime = media.mime_type
+        guessed_ext = mimetypes.guess_extension(mime or "") or ""
+        ext = guessed_ext if guessed_ext else ".bin"
+        media.file.name = f"whatsapp-doc-{uuid.uuid4().hex}{ext}"
+        att = MessageAttachment.objects.create(
+            conversation=conversation,
+            user=None,
+            kind="file",
+            content_type=mime,
+            file=media.file,
+        )
     if caption.strip():
         text = caption.strip()
     elif filename:
@@ -188,8 +367,14 @@ def enqueue_whatsapp_inbound_agent(
     whatsapp_user_number: str,
     inbound_wamid: str,
     user_inputs: list[dict[str, Any]],
+    inbound_seq: int | None = None,
 ) -> None:
-    """Create placeholder user Message, buffer inbound payload, and schedule debounced flush."""
+    """
+    Create placeholder user Message, buffer inbound payload, and schedule debounced flush.
+
+    ``inbound_seq`` is the arrival number reserved at webhook time for deferred
+    media; messages handled inline take the next one here.
+    """
     from api.messaging.takeover import (
         emit_message_created,
         get_active_takeover,
@@ -217,20 +402,18 @@ def enqueue_whatsapp_inbound_agent(
     )
     emit_message_created(None, conversation, stub)
     conversation_id = str(conversation.id)
-    buffer_key = whatsapp_inbound_buffer_key(conversation_id)
-    schedule_lock_key = whatsapp_inbound_schedule_lock_key(conversation_id)
-
-    buffered_payloads = cache.get(buffer_key) or []
-    buffered_payloads.append(
+    if inbound_seq is None:
+        inbound_seq = next_whatsapp_inbound_seq(conversation_id)
+    must_schedule = push_whatsapp_inbound_payload(
+        conversation_id,
         {
             "inbound_wamid": inbound_wamid,
             "user_inputs": user_inputs,
             "regenerate_message_id": stub.id,
-        }
+            "inbound_seq": inbound_seq,
+        },
     )
-    cache.set(buffer_key, buffered_payloads, timeout=WHATSAPP_INBOUND_BUFFER_TTL_SECONDS)
-
-    if cache.add(schedule_lock_key, True, timeout=WHATSAPP_INBOUND_BUFFER_TTL_SECONDS):
+    if must_schedule:
         whatsapp_flush_inbound_agent_task.apply_async(
             kwargs={
                 "conversation_id": conversation_id,
@@ -248,6 +431,7 @@ def process_text_inbound(
     user_phone: str,
     inbound_wamid: str,
     body: str,
+    inbound_seq: int | None = None,
 ) -> None:
     if not body.strip():
         return
@@ -268,6 +452,7 @@ def process_text_inbound(
         whatsapp_user_number=user_phone,
         inbound_wamid=inbound_wamid,
         user_inputs=user_inputs,
+        inbound_seq=inbound_seq,
     )
 
 
@@ -278,6 +463,7 @@ def process_image_inbound(
     user_phone: str,
     inbound_wamid: str,
     image: dict[str, Any],
+    inbound_seq: int | None = None,
 ) -> None:
     if inbound_wamid_already_processed(conversation, inbound_wamid):
         return
@@ -299,6 +485,7 @@ def process_image_inbound(
         whatsapp_user_number=user_phone,
         inbound_wamid=inbound_wamid,
         user_inputs=user_inputs,
+        inbound_seq=inbound_seq,
     )
 
 
@@ -309,6 +496,7 @@ def process_document_inbound(
     user_phone: str,
     inbound_wamid: str,
     document: dict[str, Any],
+    inbound_seq: int | None = None,
 ) -> None:
     if inbound_wamid_already_processed(conversation, inbound_wamid):
         return
@@ -331,4 +519,5 @@ def process_document_inbound(
         whatsapp_user_number=user_phone,
         inbound_wamid=inbound_wamid,
         user_inputs=user_inputs,
+        inbound_seq=inbound_seq,
     )
@@ -1,46 +1,168 @@
-"""Download WhatsApp Cloud API media (Graph + CDN URL)."""
+"""
+Stream WhatsApp Cloud API media (Graph + CDN URL) without holding whole files in memory.
+
+Downloads are copied chunk by chunk into a spooled temp file (RAM for small
+files, disk above ``WHATSAPP_MEDIA_SPOOL_BYTES``) that Django storage/S3 can
+read incrementally. Uploads send a ``multipart/form-data`` body that reads the
+file part lazily with an exact Content-Length.
+"""
 
 from __future__ import annotations
 
+import tempfile
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterator
 from urllib.parse import urlparse
 
-import requests
-from django.conf import settings
+from django.core.files import File
+
+from .graph import graph_client
 
-_GRAPH_API_BASE = "https://graph.facebook.com/v21.0"
 _WHATSAPP_MEDIA_HOST_SUFFIXES = ("fbsbx.com", "fbcdn.net", "facebook.com")
 
+WHATSAPP_MEDIA_CHUNK_BYTES = 64 * 1024
+WHATSAPP_MEDIA_SPOOL_BYTES = 1024 * 1024
+# Largest inbound media Meta delivers (documents).
+WHATSAPP_MEDIA_MAX_BYTES = 100 * 1024 * 1024
+
 def _allowed_media_host(host: str) -> bool:
     host = (host or "").lower()
     return any(
         host == s or host.endswith(f".{s}") for s in _WHATSAPP_MEDIA_HOST_SUFFIXES
     )
 
-def fetch_whatsapp_media_bytes(
-    media_id: str, *, direct_url: str | None = None
-) -> tuple[bytes, str]:
+@dataclass
+class WhatsAppMedia:
+    file: File
+    mime_type: str
+    size: int
+
+@contextmanager
+def download_whatsapp_media(
+    media_id: str,
+    *,
+    direct_url: str | None = None,
+    max_bytes: int = WHATSAPP_MEDIA_MAX_BYTES,
+    allowed_mime_types: frozenset[str] | None = None,
+) -> Iterator[WhatsAppMedia]:
     """
-    Fetch media bytes. If ``direct_url`` is omitted, resolves URL via Graph ``/{media_id}``.
+    Stream media into a temp file. If ``direct_url`` is omitted, resolves the URL
+    via Graph ``/{media_id}``. Oversized or disallowed media is rejected from the
+    response headers before the body is read. The file is closed when the block exits.
     """
-    token = (getattr(settings, "WHATSAPP_GRAPH_API_TOKEN", None) or "").strip()
-    if not token:
-        raise RuntimeError("WHATSAPP_GRAPH_API_TOKEN is not configured")
-    headers = {"Authorization": f"Bearer {token}"}
+    client = graph_client()
     url = direct_url
     if not url:
-        meta = requests.get(
-            f"{_GRAPH_API_BASE}/{media_id}",
-            headers=headers,
-            timeout=30,
-        )
+        meta = client.get(media_id, timeout=(5, 30))
         meta.raise_for_status()
         url = meta.json().get("url") or ""
     host = urlparse(url).hostname or ""
     if not _allowed_media_host(host):
         raise ValueError(f"WhatsApp media URL has unexpected host: {host!r}")
-    download = requests.get(url, headers=headers, timeout=120)
-    download.raise_for_status()
-    mime = (download.headers.get("Content-Type") or "application/octet-stream").split(
-        ";"
-    )[0].strip()
-    return download.content, mime
+
+    download = client.get(url, timeout=(5, 120), stream=True)
+    # Owns the spool from creation, so it is closed (and any disk file removed)
+    # whether the download fails mid-stream or the caller's block raises.
+    with tempfile.SpooledTemporaryFile(max_size=WHATSAPP_MEDIA_SPOOL_BYTES) as spool:
+        try:
+            download.raise_for_status()
+            declared = download.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError(f"WhatsApp media too large ({declared} bytes, max {max_bytes})")
+            mime = (download.headers.get("Content-Type") or "application/octet-stream").split(
+                ";"
+            )[0].strip()
+            if allowed_mime_types is not None and mime not in allowed_mime_types:
+                raise ValueError(f"Unsupported WhatsApp media mime type: {mime}")
+            size = 0
+            for chunk in download.iter_content(chunk_size=WHATSAPP_MEDIA_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"WhatsApp media too large (over {max_bytes} bytes)")
+                spool.write(chunk)
+        finally:
+            download.close()
+
+        spool.seek(0)
+        yield WhatsAppMedia(file=File(spool), mime_type=mime, size=size)
+
+class MultipartFileStream:
+    """
+    ``multipart/form-data`` request body whose file part is read lazily.
+
+    ``len()`` is exact, so requests sends a Content-Length header and streams the
+    body from ``read()`` instead of encoding it in memory. ``seek(0)`` rewinds
+    it for retries.
+    """
+
+    def __init__(
+        self,
+        fields: dict[str, str],
+        *,
+        field_name: str,
+        filename: str,
+        content_type: str,
+        fileobj: IO[bytes],
+        size: int,
+    ):
+        boundary = uuid.uuid4().hex
+        safe_name = filename.replace('"', "").replace("\r", "").replace("\n", "")
+        head = b"".join(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+            for name, value in fields.items()
+        )
+        head += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{safe_name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._head = head
+        self._tail = tail
+        self._file = fileobj
+        self._file_start = fileobj.tell()
+        self._size = size
+        self._length = len(head) + size + len(tail)
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if offset != 0 or whence != 0:
+            raise ValueError("MultipartFileStream can only be rewound to the start")
+        self._file.seek(self._file_start)
+        self._part = 0
+        self._offset = 0
+        self._file_read = 0
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length
+        out = bytearray()
+        while len(out) < size and self._part < 3:
+            want = size - len(out)
+            if self._part == 1:
+                chunk = self._file.read(min(want, self._size - self._file_read))
+                self._file_read += len(chunk)
+                out += chunk
+                if not chunk or self._file_read >= self._size:
+                    self._part += 1
+                continue
+            part = self._head if self._part == 0 else self._tail
+            chunk = part[self._offset : self._offset + want]
+            out += chunk
+            self._offset += len(chunk)
+            if self._offset >= len(part):
+                self._part += 1
+                self._offset = 0
+        return bytes(out)
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-19 09:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticate', '0026_userprofile__phone_numbers'),
+        ('messaging', '0038_conversation_daily_rollups'),
+        ('whatsapp', '0020_wstemplate_copy_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WSTemplateBroadcast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('template_slug', models.CharField(max_length=100)),
+                ('template_name', models.CharField(max_length=200)),
+                ('language_code', models.CharField(max_length=20)),
+                ('components', models.JSONField(blank=True, default=list)),
+                ('message_text', models.TextField(blank=True, default='')),
+                ('source_conversation_id', models.UUIDField(blank=True, null=True)),
+                ('audience', models.JSONField(blank=True, default=dict, help_text='Requested audience: {role_id, tag_id, ws_contact_ids}.')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='whatsapp_template_broadcasts', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='whatsapp_template_broadcasts', to='authenticate.organization')),
+                ('ws_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='template_broadcasts', to='whatsapp.wsnumber')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WSTemplateBroadcastRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(blank=True, default='', max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20)),
+                ('wamid', models.CharField(blank=True, max_length=128, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='whatsapp.wstemplatebroadcast')),
+                ('delivery_conversation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.conversation')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='whatsapp_template_broadcast_deliveries', to=settings.AUTH_USER_MODEL)),
+                ('ws_contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='template_broadcast_deliveries', to='whatsapp.wscontact')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['broadcast', 'status'], name='wsbroadcast_recipient_status')],
+            },
+        ),
+    ]
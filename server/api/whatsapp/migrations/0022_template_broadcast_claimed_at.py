@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0021_template_broadcasts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wstemplatebroadcastrecipient',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 import re
+import uuid
 
 from django.db import models
 from django.contrib.auth.models import User
@@ -132,6 +133,13 @@ class WSNumber(models.Model):
     def clean(self):
         self.number = _normalize_phone(self.number)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored platform_id, so a re-pointed line also drops its old routing cache entry.
+        instance._loaded_platform_id = instance.__dict__.get("platform_id")
+        return instance
+
     def save(self, *args, **kwargs):
         self.number = _normalize_phone(self.number)
         super().save(*args, **kwargs)
@@ -146,27 +154,36 @@ class WSNumber(models.Model):
         *,
         reply_to_last_inbound: bool = True,
     ):
+        """
+        Record ``message`` as an assistant reply and queue it on the conversation's
+        outbound queue; the WAMID is stored on the message once it is sent.
+        """
         from api.messaging.models import Message
 
-        from .actions import send_message as send_message_action
+        from .outbound import enqueue_whatsapp_outbound, outbound_reply_steps
 
         if not conversation.whatsapp_user_number:
             raise ValueError("Conversation is not linked to a WhatsApp user number")
         reply_message_platform_id = (
             conversation.whatsapp_last_inbound_wamid if reply_to_last_inbound else None
         )
-        wamid = send_message_action(
-            self.platform_id,
-            conversation.whatsapp_user_number,
-            message,
-            reply_message_platform_id,
-        )
-        Message.objects.create(
+        msg = Message.objects.create(
             conversation=conversation,
             type="assistant",
             text=message,
-            metadata={"whatsapp_wamid": wamid} if wamid else {},
         )
+        enqueue_whatsapp_outbound(
+            str(conversation.id),
+            outbound_reply_steps(
+                message_id=msg.id,
+                phone_number_id=self.platform_id,
+                to=conversation.whatsapp_user_number,
+                body=message,
+                attachment_ids=[],
+                reply_to=reply_message_platform_id,
+            ),
+        )
+        return msg
 
 
 class WSTemplate(models.Model):
@@ -270,3 +287,130 @@ class WSTemplateSubscription(models.Model):
 
     def __str__(self):
         return f"WSTemplateSubscription({self.template_id} → org {self.organization_id})"
+
+
+class WSTemplateBroadcast(models.Model):
+    """
+    One allowlisted template sent from a WSNumber to an audience of verified contacts.
+
+    Components and the stored delivery text are computed once at creation; the
+    recipients are sent by worker tasks (see template_broadcast).
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        "authenticate.Organization",
+        on_delete=models.CASCADE,
+        related_name="whatsapp_template_broadcasts",
+    )
+    ws_number = models.ForeignKey(
+        WSNumber,
+        on_delete=models.CASCADE,
+        related_name="template_broadcasts",
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="whatsapp_template_broadcasts",
+    )
+    template_slug = models.CharField(max_length=100)
+    template_name = models.CharField(max_length=200)
+    language_code = models.CharField(max_length=20)
+    components = models.JSONField(default=list, blank=True)
+    message_text = models.TextField(blank=True, default="")
+    source_conversation_id = models.UUIDField(null=True, blank=True)
+    audience = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Requested audience: {role_id, tag_id, ws_contact_ids}.",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"WSTemplateBroadcast({self.template_slug} → {self.total} recipients)"
+
+
+class WSTemplateBroadcastRecipient(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_SKIPPED, "Skipped"),
+    ]
+
+    broadcast = models.ForeignKey(
+        WSTemplateBroadcast,
+        on_delete=models.CASCADE,
+        related_name="recipients",
+    )
+    ws_contact = models.ForeignKey(
+        WSContact,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="template_broadcast_deliveries",
+    )
+    phone = models.CharField(max_length=30, blank=True, default="")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="whatsapp_template_broadcast_deliveries",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    wamid = models.CharField(max_length=128, null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    delivery_conversation = models.ForeignKey(
+        "messaging.Conversation",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Set when a chunk worker claims the row; stale claims are reclaimed.
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["broadcast", "status"],
+                name="wsbroadcast_recipient_status",
+            ),
+        ]
+
+    def __str__(self):
+        return f"WSTemplateBroadcastRecipient({self.phone} {self.status})"
@@ -0,0 +1,292 @@
+"""
+Outbound WhatsApp delivery queue.
+
+The agent worker turns a reply into send steps (each attachment, then the text),
+pushes them on a per-conversation Redis list and returns. ``drain_whatsapp_outbound``
+(run by ``whatsapp_outbound_drain_task``) sends them in order with one drainer
+per conversation, so a reply never overtakes an earlier one while different
+conversations drain in parallel. A failed step is retried on its own with
+backoff; later steps of the same conversation wait behind it. A step Meta
+refuses outright (a 4xx other than throttling) is recorded as failed at once.
+
+Operator replies (``WSNumber.send_message`` and human takeover messages) go
+through the same queue, so they share its ordering and the per-number budget.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Any
+
+from django.core.cache import cache
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from api.messaging.models import Message, MessageAttachment
+
+from .graph import GraphRequestError
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_OUTBOUND_MAX_ATTEMPTS = 5
+WHATSAPP_OUTBOUND_RETRY_BASE_SECONDS = 2
+WHATSAPP_OUTBOUND_RETRY_MAX_SECONDS = 60
+# Longer than any single Graph call (upload timeout included); renewed per step.
+WHATSAPP_OUTBOUND_LOCK_SECONDS = 180
+WHATSAPP_OUTBOUND_QUEUE_TTL_SECONDS = 24 * 60 * 60
+
+
+def _outbound_redis_keys(conversation_id: str) -> tuple[str, str]:
+    return (
+        cache.make_key(f"whatsapp:outbound:{conversation_id}"),
+        cache.make_key(f"whatsapp:outbound:lock:{conversation_id}"),
+    )
+
+
+# KEYS: queue, lock. ARGV: lock token.
+# Keeps the lock while steps remain so a push racing the release is never stranded.
+# Returns the queue length, or -1 when the lock is no longer ours.
+_RELEASE_IF_EMPTY_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+  return -1
+end
+local n = redis.call('LLEN', KEYS[1])
+if n == 0 then
+  redis.call('DEL', KEYS[2])
+end
+return n
+"""
+
+# KEYS: lock. ARGV: lock token.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def outbound_reply_steps(
+    *,
+    message_id: int,
+    phone_number_id: str,
+    to: str,
+    body: str,
+    attachment_ids: list[str],
+    reply_to: str | None,
+) -> list[dict[str, Any]]:
+    """Send steps for one assistant reply: attachments first, then the text."""
+    base = {"message_id": message_id, "phone_number_id": phone_number_id, "to": to}
+    steps: list[dict[str, Any]] = []
+    for index, attachment_id in enumerate(attachment_ids):
+        steps.append(
+            {
+                **base,
+                "kind": "attachment",
+                "attachment_id": attachment_id,
+                # Only the first message of the reply quotes the inbound message.
+                "reply_to": reply_to if index == 0 else None,
+            }
+        )
+    if body:
+        steps.append(
+            {**base, "kind": "text", "text": body, "reply_to": None if attachment_ids else reply_to}
+        )
+    return steps
+
+
+def enqueue_whatsapp_outbound(conversation_id: str, steps: list[dict[str, Any]]) -> int:
+    """Append send steps to the conversation's queue and schedule a drain after commit."""
+    from .actions import defer_whatsapp_task
+    from .tasks import whatsapp_outbound_drain_task
+
+    if not steps:
+        return 0
+    queue_key, _lock_key = _outbound_redis_keys(conversation_id)
+    now = time.time()
+    redis = get_redis_connection("default")
+    pipe = redis.pipeline()
+    pipe.rpush(
+        queue_key,
+        *[json.dumps({**step, "queued_at": now, "attempts": 0}) for step in steps],
+    )
+    pipe.expire(queue_key, WHATSAPP_OUTBOUND_QUEUE_TTL_SECONDS)
+    pipe.execute()
+    defer_whatsapp_task(whatsapp_outbound_drain_task, conversation_id=conversation_id)
+    return len(steps)
+
+
+def pending_whatsapp_outbound(conversation_id: str) -> list[dict[str, Any]]:
+    queue_key, _lock_key = _outbound_redis_keys(conversation_id)
+    return [json.loads(raw) for raw in get_redis_connection("default").lrange(queue_key, 0, -1)]
+
+
+def _retry_delay(attempts: int) -> float:
+    ceiling = min(
+        WHATSAPP_OUTBOUND_RETRY_MAX_SECONDS,
+        WHATSAPP_OUTBOUND_RETRY_BASE_SECONDS * (2 ** (attempts - 1)),
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _schedule_drain(conversation_id: str, countdown: float) -> None:
+    from .tasks import whatsapp_outbound_drain_task
+
+    whatsapp_outbound_drain_task.apply_async(
+        kwargs={"conversation_id": conversation_id}, countdown=max(1, round(countdown))
+    )
+
+
+def _send_step(step: dict[str, Any]) -> str | None:
+    """Send one step; ValueError means it can never succeed and is not retried."""
+    if step["kind"] == "attachment":
+        from . import outbound_media
+
+        try:
+            att = MessageAttachment.objects.get(id=step["attachment_id"])
+        except MessageAttachment.DoesNotExist as exc:
+            raise ValueError(f"Attachment {step['attachment_id']} no longer exists") from exc
+        return outbound_media.send_attachment_to_whatsapp(
+            step["phone_number_id"],
+            step["to"],
+            att,
+            reply_to_message_id=step.get("reply_to"),
+        )
+    if step["kind"] == "text":
+        from .actions import send_message
+
+        return send_message(step["phone_number_id"], step["to"], step["text"], step.get("reply_to"))
+    raise ValueError(f"Unknown WhatsApp outbound step: {step['kind']!r}")
+
+
+def _notify_delivery_failed(message: Message, error: str) -> None:
+    """Tell the conversation's staff that a queued reply will not reach the user."""
+    from api.messaging.takeover import emit_message_delivery_failed
+
+    try:
+        emit_message_delivery_failed(message.conversation, message, error)
+    except Exception:
+        logger.exception("Could not notify staff of failed WhatsApp message %s", message.id)
+
+
+def _record_step_result(step: dict[str, Any], *, wamid: str | None, error: str | None) -> None:
+    latency_ms = int((time.time() - step["queued_at"]) * 1000)
+    with transaction.atomic():
+        message = Message.objects.select_for_update().filter(id=step["message_id"]).first()
+        if message is None:
+            return
+        metadata = dict(message.metadata or {})
+        if error:
+            failures = list(metadata.get("whatsapp_outbound_failures") or [])
+            failure = {"kind": step["kind"], "error": error[:500], "attempts": step["attempts"]}
+            if step.get("attachment_id"):
+                failure["attachment_id"] = step["attachment_id"]
+            failures.append(failure)
+            metadata["whatsapp_outbound_failures"] = failures
+        elif wamid and step["kind"] == "attachment":
+            metadata["whatsapp_media_wamids"] = [
+                *(metadata.get("whatsapp_media_wamids") or []),
+                wamid,
+            ]
+        elif wamid:
+            metadata["whatsapp_wamid"] = wamid
+        # Queue-to-Graph time of the most recent step, i.e. of the whole reply once drained.
+        metadata["whatsapp_outbound_latency_ms"] = latency_ms
+        # queryset update: a Message save re-runs the usage/analysis signals.
+        Message.objects.filter(id=message.id).update(metadata=metadata)
+    if error:
+        _notify_delivery_failed(message, error[:500])
+    logger.info(
+        "WhatsApp outbound %s for message %s %s after %d ms (attempt %d)",
+        step["kind"],
+        step["message_id"],
+        "failed" if error else "delivered",
+        latency_ms,
+        step["attempts"],
+    )
+
+
+def drain_whatsapp_outbound(conversation_id: str) -> dict[str, Any]:
+    """Send queued steps in order until the queue is empty or a step must wait for a retry."""
+    queue_key, lock_key = _outbound_redis_keys(conversation_id)
+    redis = get_redis_connection("default")
+    token = uuid.uuid4().hex
+    if not redis.set(lock_key, token, nx=True, ex=WHATSAPP_OUTBOUND_LOCK_SECONDS):
+        # The current drainer keeps going until the queue is empty.
+        return {"status": "busy", "conversation_id": conversation_id}
+
+    counts = {"delivered": 0, "failed": 0}
+    while True:
+        raw = redis.lindex(queue_key, 0)
+        if raw is None:
+            remaining = redis.eval(_RELEASE_IF_EMPTY_SCRIPT, 2, queue_key, lock_key, token)
+            if remaining:
+                if remaining < 0:
+                    break
+                continue
+            return {"status": "drained", "conversation_id": conversation_id, **counts}
+
+        step = json.loads(raw)
+        wait = step.get("not_before", 0) - time.time()
+        if wait > 0:
+            redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            _schedule_drain(conversation_id, wait)
+            return {"status": "waiting", "conversation_id": conversation_id, **counts}
+
+        redis.expire(lock_key, WHATSAPP_OUTBOUND_LOCK_SECONDS)
+        step["attempts"] += 1
+        try:
+            wamid = _send_step(step)
+        except ValueError as exc:
+            _record_step_result(step, wamid=None, error=str(exc))
+            counts["failed"] += 1
+            redis.lpop(queue_key)
+            continue
+        except Exception as exc:
+            if isinstance(exc, GraphRequestError) and exc.permanent:
+                logger.warning(
+                    "WhatsApp outbound %s for message %s refused by Graph (HTTP %s): %s",
+                    step["kind"],
+                    step["message_id"],
+                    exc.status_code,
+                    exc,
+                )
+                _record_step_result(step, wamid=None, error=str(exc))
+                counts["failed"] += 1
+            elif step["attempts"] >= WHATSAPP_OUTBOUND_MAX_ATTEMPTS:
+                logger.exception(
+                    "WhatsApp outbound %s for message %s gave up after %d attempts",
+                    step["kind"],
+                    step["message_id"],
+                    step["attempts"],
+                )
+                _record_step_result(step, wamid=None, error=str(exc))
+                counts["failed"] += 1
+            else:
+                delay = _retry_delay(step["attempts"])
+                logger.warning(
+                    "WhatsApp outbound %s for message %s failed (attempt %d); retrying in %.1fs",
+                    step["kind"],
+                    step["message_id"],
+                    step["attempts"],
+                    delay,
+                    exc_info=True,
+                )
+                step["not_before"] = time.time() + delay
+                redis.lset(queue_key, 0, json.dumps(step))
+                redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                _schedule_drain(conversation_id, delay)
+                return {"status": "retrying", "conversation_id": conversation_id, **counts}
+            redis.lpop(queue_key)
+            continue
+
+        _record_step_result(step, wamid=wamid, error=None)
+        counts["delivered"] += 1
+        redis.lpop(queue_key)
+
+    logger.warning("WhatsApp outbound lock for %s expired mid-drain", conversation_id)
+    return {"status": "lock_lost", "conversation_id": conversation_id, **counts}
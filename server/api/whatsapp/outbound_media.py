@@ -5,14 +5,14 @@ from __future__ import annotations
 import logging
 import mimetypes
 import re
-from typing import Any
-
-import requests
-from django.conf import settings
+from typing import IO, Any
 
 from api.messaging.attachment_urls import absolute_file_url_for_attachment
 from api.messaging.models import Message, MessageAttachment
 
+from .graph import GraphRequestError, graph_client, send_graph_message
+from .media import MultipartFileStream
+
 _ATTACHMENT_ID_RE = re.compile(
     r"attachment:([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
     r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
@@ -20,8 +20,6 @@ _ATTACHMENT_ID_RE = re.compile(
 
 logger = logging.getLogger(__name__)
 
-_GRAPH_API_BASE = "https://graph.facebook.com/v21.0"
-
 _MAX_BYTES: dict[str, int] = {
     "image": 5 * 1024 * 1024,
     "audio": 16 * 1024 * 1024,
@@ -29,12 +27,6 @@ _MAX_BYTES: dict[str, int] = {
     "document": 100 * 1024 * 1024,
 }
 
-def _graph_token() -> str:
-    token = (getattr(settings, "WHATSAPP_GRAPH_API_TOKEN", None) or "").strip()
-    if not token:
-        raise RuntimeError("WHATSAPP_GRAPH_API_TOKEN is not configured")
-    return token
-
 def whatsapp_media_type_for_attachment(att: MessageAttachment) -> str | None:
     """
     Map attachment to WhatsApp message type: image | audio | video | document.
@@ -68,8 +60,8 @@ def _filename_for_attachment(att: MessageAttachment, wa_type: str) -> str:
     }.get(wa_type, ".bin")
     return f"file{ext}"
 
-def read_attachment_file_bytes(att: MessageAttachment) -> tuple[bytes, str, str]:
-    """Return (bytes, mime_type, filename)."""
+def attachment_upload_info(att: MessageAttachment) -> tuple[str, str]:
+    """Return (mime_type, filename) for uploading an attachment to WhatsApp."""
     if not att.file:
         raise ValueError("Attachment has no file")
     filename = _filename_for_attachment(att, whatsapp_media_type_for_attachment(att) or "document")
@@ -77,31 +69,56 @@ def read_attachment_file_bytes(att: MessageAttachment) -> tuple[bytes, str, str]
     if not ctype:
         guessed, _ = mimetypes.guess_type(filename)
         ctype = guessed or "application/octet-stream"
-    with att.file.open("rb") as fh:
-        data = fh.read()
-    return data, ctype, filename
+    return ctype, filename
 
 def upload_whatsapp_media(
     phone_number_id: str,
     *,
-    file_bytes: bytes,
+    fileobj: IO[bytes],
+    size: int,
     mime_type: str,
     wa_type: str,
     filename: str,
 ) -> str:
-    """Upload bytes to Graph /media; returns media id."""
-    url = f"{_GRAPH_API_BASE}/{phone_number_id}/media"
-    headers = {"Authorization": f"Bearer {_graph_token()}"}
-    files = {"file": (filename, file_bytes, mime_type)}
-    data = {"messaging_product": "whatsapp", "type": wa_type}
-    response = requests.post(url, headers=headers, data=data, files=files, timeout=120)
+    """Stream a file to Graph /media; returns media id."""
+    body = MultipartFileStream(
+        {"messaging_product": "whatsapp", "type": wa_type},
+        field_name="file",
+        filename=filename,
+        content_type=mime_type,
+        fileobj=fileobj,
+        size=size,
+    )
+    response = graph_client().post(
+        f"{phone_number_id}/media",
+        data=body,
+        headers={"Content-Type": body.content_type},
+        timeout=(5, 120),
+    )
     if response.status_code != 200:
-        raise RuntimeError(f"WhatsApp media upload failed: {response.status_code} {response.text}")
+        raise GraphRequestError(
+            f"WhatsApp media upload failed: {response.status_code} {response.text}", response
+        )
     media_id = (response.json() or {}).get("id")
     if not media_id:
         raise ValueError("WhatsApp media upload returned no id")
     return str(media_id)
 
+def upload_attachment_to_whatsapp(
+    phone_number_id: str, att: MessageAttachment, *, wa_type: str
+) -> str:
+    """Upload a stored attachment without reading it into memory; returns media id."""
+    mime_type, filename = attachment_upload_info(att)
+    with att.file.open("rb") as fh:
+        return upload_whatsapp_media(
+            phone_number_id,
+            fileobj=fh,
+            size=att.file.size,
+            mime_type=mime_type,
+            wa_type=wa_type,
+            filename=filename,
+        )
+
 def send_whatsapp_media_message(
     phone_number_id: str,
     to: str,
@@ -139,15 +156,10 @@ def send_whatsapp_media_message(
     if reply_to_message_id:
         payload["context"] = {"message_id": reply_to_message_id}
 
-    url = f"{_GRAPH_API_BASE}/{phone_number_id}/messages"
-    headers = {
-        "Authorization": f"Bearer {_graph_token()}",
-        "Content-Type": "application/json",
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=60)
+    response = send_graph_message(phone_number_id, payload, timeout=(5, 60))
     if response.status_code != 200:
-        raise RuntimeError(
-            f"WhatsApp media message failed: {response.status_code} {response.text}"
+        raise GraphRequestError(
+            f"WhatsApp media message failed: {response.status_code} {response.text}", response
         )
     messages = (response.json() or {}).get("messages") or []
     if not messages:
@@ -174,11 +186,12 @@ def send_attachment_to_whatsapp(
         )
         return None
 
-    file_bytes, mime_type, filename = read_attachment_file_bytes(att)
+    _mime_type, filename = attachment_upload_info(att)
+    size = att.file.size
     max_size = _MAX_BYTES.get(wa_type, _MAX_BYTES["document"])
-    if len(file_bytes) > max_size:
+    if size > max_size:
         raise ValueError(
-            f"Attachment too large for WhatsApp {wa_type} ({len(file_bytes)} bytes, max {max_size})"
+            f"Attachment too large for WhatsApp {wa_type} ({size} bytes, max {max_size})"
         )
 
     public_url = absolute_file_url_for_attachment(att)
@@ -200,13 +213,7 @@ def send_attachment_to_whatsapp(
                 exc_info=True,
             )
 
-    media_id = upload_whatsapp_media(
-        phone_number_id,
-        file_bytes=file_bytes,
-        mime_type=mime_type,
-        wa_type=wa_type,
-        filename=filename,
-    )
+    media_id = upload_attachment_to_whatsapp(phone_number_id, att, wa_type=wa_type)
     return send_whatsapp_media_message(
         phone_number_id,
         to,
@@ -0,0 +1,218 @@
+"""
+Cached inbound routing for WhatsApp webhooks.
+
+Resolves ``phone_number_id`` → WSNumber, (line, sender) → access decision,
+(line, sender) → WSContact and (line, sender) → active Conversation from the
+cache, falling back to the database on a miss. Entries are kept coherent by the
+signal receivers in ``api.whatsapp.signals``; the TTLs only bound how long an
+entry can outlive a change made outside the ORM.
+"""
+
+from __future__ import annotations
+
+import copy
+import re
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from api.messaging.models import Conversation
+
+from .models import WSContact, WSNumber
+
+WHATSAPP_ROUTING_TTL_SECONDS = 60 * 60
+WHATSAPP_ACCESS_TTL_SECONDS = 10 * 60
+# Webhooks for unknown numbers are remembered briefly so they skip the database too.
+WHATSAPP_UNKNOWN_NUMBER_TTL_SECONDS = 60
+
+_MISSING = "missing"
+
+
+def _digits_only(value: str) -> str:
+    return re.sub(r"[^\d]", "", value or "")
+
+
+def ws_number_route_key(platform_id: str) -> str:
+    return f"whatsapp:route:number:{platform_id}"
+
+
+def contact_route_key(ws_number_id, phone: str) -> str:
+    return f"whatsapp:route:contact:{ws_number_id}:{_digits_only(phone)}"
+
+
+def conversation_route_key(ws_number_id, phone: str) -> str:
+    return f"whatsapp:route:conversation:{ws_number_id}:{_digits_only(phone)}"
+
+
+def _access_generation_key(ws_number_id) -> str:
+    return f"whatsapp:route:access-generation:{ws_number_id}"
+
+
+def _access_route_key(generation: str, ws_number_id, phone: str) -> str:
+    return f"whatsapp:route:access:{generation}:{ws_number_id}:{_digits_only(phone)}"
+
+
+def routing_snapshot(instance):
+    """Copy of a model instance without cached relations, small enough to pickle."""
+    snapshot = copy.copy(instance)
+    snapshot._state = copy.copy(instance._state)
+    snapshot._state.fields_cache = {}
+    snapshot.__dict__.pop("_prefetched_objects_cache", None)
+    return snapshot
+
+
+def after_commit(func) -> None:
+    """Run an invalidation now and again once the surrounding transaction commits."""
+    func()
+    transaction.on_commit(func)
+
+
+# --- business numbers -------------------------------------------------------
+
+
+def routed_ws_number(platform_id: str) -> WSNumber | None:
+    key = ws_number_route_key(platform_id)
+    cached = cache.get(key)
+    if cached == _MISSING:
+        return None
+    if cached is not None:
+        return cached
+    ws_number = WSNumber.objects.filter(platform_id=platform_id).first()
+    if ws_number is None:
+        cache.set(key, _MISSING, WHATSAPP_UNKNOWN_NUMBER_TTL_SECONDS)
+        return None
+    cache.set(key, routing_snapshot(ws_number), WHATSAPP_ROUTING_TTL_SECONDS)
+    return ws_number
+
+
+def forget_ws_number(platform_id: str | None) -> None:
+    if platform_id:
+        cache.delete(ws_number_route_key(platform_id))
+
+
+# --- sender access ----------------------------------------------------------
+
+
+def bump_access_generation(ws_number_ids) -> None:
+    """Invalidate the cached access decisions of these lines."""
+    generations = {_access_generation_key(i): uuid.uuid4().hex for i in set(ws_number_ids)}
+    if generations:
+        cache.set_many(generations, None)
+
+
+def access_lines_for(*, organization_ids=(), user_ids=()) -> list:
+    """
+    Lines whose access decisions read the members, roles or phones of these
+    organizations, or the profiles of these users.
+    """
+    organization_ids = {i for i in organization_ids if i}
+    user_ids = {i for i in user_ids if i}
+    if not organization_ids and not user_ids:
+        return []
+    # Personal lines take their organization from the line owner.
+    personal = Q(organization__isnull=True) & (
+        Q(user__organization__id__in=organization_ids)
+        | Q(user__profile__organization_id__in=organization_ids)
+        | Q(user_id__in=user_ids)
+    )
+    lines = Q(organization_id__in=organization_ids) | Q(access_user_id__in=user_ids) | personal
+    return list(WSNumber.objects.filter(lines).values_list("id", flat=True).distinct())
+
+
+def _access_generation(ws_number_id) -> str:
+    key = _access_generation_key(ws_number_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(key, generation, None):
+            generation = cache.get(key) or generation
+    return generation
+
+
+def routed_sender_access(ws_number: WSNumber, phone: str):
+    """Cached ``resolve_whatsapp_sender_access``; public lines never touch the cache."""
+    from .access import WhatsAppSenderAccessResult, resolve_whatsapp_sender_access
+
+    mode = (ws_number.access_mode or WSNumber.ACCESS_MODE_PUBLIC).strip()
+    if mode == WSNumber.ACCESS_MODE_PUBLIC:
+        return WhatsAppSenderAccessResult(allowed=True, user=None)
+
+    key = _access_route_key(_access_generation(ws_number.id), ws_number.id, phone)
+    cached = cache.get(key)
+    if cached is not None:
+        allowed, user_id = cached
+        user = User(id=user_id) if user_id else None
+        return WhatsAppSenderAccessResult(allowed=allowed, user=user)
+
+    access = resolve_whatsapp_sender_access(ws_number, phone)
+    cache.set(
+        key,
+        (access.allowed, access.user.id if access.user else None),
+        WHATSAPP_ACCESS_TTL_SECONDS,
+    )
+    return access
+
+
+# --- contacts ---------------------------------------------------------------
+
+
+def ensure_routed_contact(ws_number: WSNumber, phone: str, *, user: User | None = None) -> int:
+    """
+    Cached ``ensure_ws_contact_for_inbound``; returns the contact id. Only reaches
+    the database on a miss or when an unlinked contact must be autolinked.
+    """
+    from .access import ensure_ws_contact_for_inbound
+
+    key = contact_route_key(ws_number.id, phone)
+    cached = cache.get(key)
+    if cached is not None:
+        contact_id, linked_user_id = cached
+        if user is None or linked_user_id is not None:
+            return contact_id
+    contact = ensure_ws_contact_for_inbound(ws_number, phone, user=user)
+    cache.set(key, (contact.id, contact.user_id), WHATSAPP_ROUTING_TTL_SECONDS)
+    return contact.id
+
+
+def forget_contact(contact: WSContact) -> None:
+    cache.delete(contact_route_key(contact.ws_number_id, contact.number))
+
+
+# --- conversations ----------------------------------------------------------
+
+
+def routed_conversation(ws_number: WSNumber, phone: str) -> Conversation:
+    """Cached ``get_or_create_whatsapp_conversation`` for the active thread."""
+    from .conversations import get_or_create_whatsapp_conversation
+
+    key = conversation_route_key(ws_number.id, phone)
+    cached = cache.get(key)
+    if cached is not None and cached.status == "active":
+        return cached
+    conversation = get_or_create_whatsapp_conversation(ws_number, phone)
+    remember_conversation(conversation)
+    return conversation
+
+
+def remember_conversation(conversation: Conversation) -> None:
+    if not conversation.ws_number_id or not conversation.whatsapp_user_number:
+        return
+    snapshot = routing_snapshot(conversation)
+    # The snapshot is what the database holds now; rollups diff status against this.
+    snapshot._loaded_status = conversation.status
+    cache.set(
+        conversation_route_key(conversation.ws_number_id, conversation.whatsapp_user_number),
+        snapshot,
+        WHATSAPP_ROUTING_TTL_SECONDS,
+    )
+
+
+def forget_conversation(conversation: Conversation) -> None:
+    if not conversation.ws_number_id or not conversation.whatsapp_user_number:
+        return
+    cache.delete(
+        conversation_route_key(conversation.ws_number_id, conversation.whatsapp_user_number)
+    )
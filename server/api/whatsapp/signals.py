@@ -0,0 +1,138 @@
+"""Keep the inbound routing cache (``api.whatsapp.routing``) in step with the database."""
+
+import copy
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from api.authenticate.models import Organization, RoleAssignment, UserProfile
+from api.messaging.models import Conversation
+
+from .models import WSContact, WSNumber
+from .routing import (
+    access_lines_for,
+    after_commit,
+    bump_access_generation,
+    forget_contact,
+    forget_conversation,
+    forget_ws_number,
+    remember_conversation,
+    routing_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=WSNumber)
+@receiver(post_delete, sender=WSNumber)
+def ws_number_routing_changed(sender, instance, **kwargs):
+    loaded_platform_id = getattr(instance, "_loaded_platform_id", None)
+    after_commit(lambda: forget_ws_number(instance.platform_id))
+    if loaded_platform_id != instance.platform_id:
+        after_commit(lambda: forget_ws_number(loaded_platform_id))
+        instance._loaded_platform_id = instance.platform_id
+    line_id = instance.pk
+    after_commit(lambda: bump_access_generation([line_id]))
+
+
+@receiver(m2m_changed, sender=WSNumber.allowed_roles.through)
+def ws_number_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        line_ids = [instance.pk]
+    elif pk_set:
+        line_ids = list(pk_set)
+    else:
+        # A role cleared from every line: its organization's lines.
+        line_ids = access_lines_for(organization_ids=[instance.organization_id])
+    after_commit(lambda: bump_access_generation(line_ids))
+
+
+# Fields each model contributes to WhatsApp access decisions; saves that leave
+# them unchanged keep the cached decisions.
+_ACCESS_FIELDS = {
+    UserProfile: ("organization_id", "is_active", "_phone_numbers"),
+    RoleAssignment: ("user_id", "organization_id", "role_id", "from_date", "to_date"),
+    Organization: ("owner_id",),
+}
+
+
+def _access_values(instance) -> dict:
+    # Deferred fields are absent from __dict__ and were not changed by the save.
+    return {
+        name: copy.deepcopy(instance.__dict__.get(name)) for name in _ACCESS_FIELDS[type(instance)]
+    }
+
+
+def _bump_access_lines(*, organization_ids=(), user_ids=()) -> None:
+    line_ids = access_lines_for(organization_ids=organization_ids, user_ids=user_ids)
+    if line_ids:
+        after_commit(lambda: bump_access_generation(line_ids))
+
+
+@receiver(post_init, sender=UserProfile)
+@receiver(post_init, sender=RoleAssignment)
+@receiver(post_init, sender=Organization)
+def remember_whatsapp_access_inputs(sender, instance, **kwargs):
+    instance._whatsapp_access_values = _access_values(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=RoleAssignment)
+@receiver(post_save, sender=Organization)
+def whatsapp_access_inputs_saved(sender, instance, created, **kwargs):
+    before = getattr(instance, "_whatsapp_access_values", {})
+    after = _access_values(instance)
+    instance._whatsapp_access_values = after
+    if created and sender is Organization:
+        return  # No lines yet.
+    if not created and before == after:
+        return
+    if sender is Organization:
+        _bump_access_lines(
+            organization_ids=[instance.pk],
+            user_ids=[before.get("owner_id"), after["owner_id"]],
+        )
+    else:
+        _bump_access_lines(
+            organization_ids=[before.get("organization_id"), after["organization_id"]],
+            user_ids=[before.get("user_id"), instance.user_id],
+        )
+
+
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=RoleAssignment)
+def whatsapp_access_inputs_deleted(sender, instance, **kwargs):
+    _bump_access_lines(
+        organization_ids=[instance.organization_id], user_ids=[instance.user_id]
+    )
+
+
+@receiver(post_save, sender=WSContact)
+@receiver(post_delete, sender=WSContact)
+def ws_contact_routing_changed(sender, instance, **kwargs):
+    after_commit(lambda: forget_contact(instance))
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_routing_post_save(sender, instance, **kwargs):
+    if not instance.ws_number_id or not instance.whatsapp_user_number:
+        return
+    try:
+        if instance.status == "active":
+            # Every message bumps its conversation; refresh rather than drop the
+            # route so steady-state inbound traffic keeps hitting the cache.
+            snapshot = routing_snapshot(instance)
+            transaction.on_commit(lambda: remember_conversation(snapshot))
+        else:
+            after_commit(lambda: forget_conversation(instance))
+    except Exception:
+        logger.exception("WhatsApp routing cache update failed for %s", instance.pk)
+
+
+@receiver(post_delete, sender=Conversation)
+def conversation_routing_post_delete(sender, instance, **kwargs):
+    after_commit(lambda: forget_conversation(instance))
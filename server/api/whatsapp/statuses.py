@@ -0,0 +1,98 @@
+"""
+WhatsApp delivery statuses (sent / delivered / read / failed) from webhook ``statuses``.
+
+Each outbound Message stores the WAMIDs Graph returned in ``metadata.whatsapp_wamid``
+and ``metadata.whatsapp_media_wamids``; the latest status per WAMID is kept in
+``metadata.whatsapp_delivery``. Statuses only move forward, so duplicated or
+out-of-order deliveries from Meta are harmless.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Q
+
+from api.messaging.models import Message
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+# Statuses refer to recent sends; bound the per-thread scan.
+WHATSAPP_STATUS_LOOKBACK_MESSAGES = 200
+
+
+def _status_rank(status: str | None) -> int:
+    return WHATSAPP_STATUS_RANK.get(status or "", 0)
+
+
+def _find_outbound_message_ids(phone_number_id: str, recipient_id: str, wamids: list[str]):
+    wamid_q = Q()
+    for wamid in wamids:
+        wamid_q |= Q(metadata__whatsapp_wamid=wamid) | Q(
+            metadata__whatsapp_media_wamids__contains=[wamid]
+        )
+    recent_ids = (
+        Message.objects.filter(
+            conversation__ws_number__platform_id=phone_number_id,
+            conversation__whatsapp_user_number=recipient_id,
+        )
+        .order_by("-id")
+        .values("id")[:WHATSAPP_STATUS_LOOKBACK_MESSAGES]
+    )
+    return list(
+        Message.objects.filter(id__in=recent_ids).filter(wamid_q).values_list("id", flat=True)
+    )
+
+
+def _message_wamids(metadata: dict) -> set[str]:
+    wamids = set(metadata.get("whatsapp_media_wamids") or [])
+    if metadata.get("whatsapp_wamid"):
+        wamids.add(metadata["whatsapp_wamid"])
+    return wamids
+
+
+def apply_whatsapp_statuses(phone_number_id: str | None, statuses: list[dict[str, Any]]) -> int:
+    """Record a batch of webhook statuses; returns how many message rows changed."""
+    if not phone_number_id:
+        return 0
+
+    by_recipient: dict[str, dict[str, dict[str, Any]]] = {}
+    for status in statuses:
+        wamid = status.get("id")
+        recipient = status.get("recipient_id")
+        if not wamid or not recipient or not _status_rank(status.get("status")):
+            continue
+        current = by_recipient.setdefault(recipient, {}).get(wamid)
+        if current is None or _status_rank(status.get("status")) > _status_rank(current.get("status")):
+            by_recipient[recipient][wamid] = status
+
+    updated = 0
+    for recipient, latest in by_recipient.items():
+        message_ids = _find_outbound_message_ids(phone_number_id, recipient, list(latest))
+        if not message_ids:
+            continue
+        with transaction.atomic():
+            for message in Message.objects.select_for_update().filter(id__in=message_ids):
+                metadata = dict(message.metadata or {})
+                delivery = dict(metadata.get("whatsapp_delivery") or {})
+                changed = False
+                for wamid in _message_wamids(metadata) & set(latest):
+                    status = latest[wamid]
+                    previous = delivery.get(wamid) or {}
+                    if _status_rank(status["status"]) <= _status_rank(previous.get("status")):
+                        continue
+                    record = {"status": status["status"], "timestamp": status.get("timestamp")}
+                    if status.get("errors"):
+                        record["errors"] = status["errors"]
+                    delivery[wamid] = record
+                    changed = True
+                if changed:
+                    metadata["whatsapp_delivery"] = delivery
+                    # queryset update: a Message save re-runs the usage/analysis signals.
+                    Message.objects.filter(id=message.id).update(metadata=metadata)
+                    updated += 1
+    return updated
@@ -3,14 +3,137 @@ import logging
 from celery import shared_task
 from django.core.cache import cache
 
-from .actions import deliver_whatsapp_reply, handle_webhook, send_whatsapp_fallback_text
+from .actions import (
+    deliver_whatsapp_reply,
+    handle_webhook_message,
+    handle_webhook_statuses,
+    iter_webhook_items,
+    send_whatsapp_fallback_text,
+)
 
 logger = logging.getLogger(__name__)
 
+# Meta retries undelivered webhooks for up to a day.
+WHATSAPP_WEBHOOK_WAMID_CLAIM_TTL_SECONDS = 24 * 60 * 60
+# An in-flight claim expires after this long, so a message whose worker died
+# mid-processing is handled again on Meta's next redelivery.
+WHATSAPP_WEBHOOK_WAMID_PROCESSING_TTL_SECONDS = 10 * 60
+WHATSAPP_WEBHOOK_WAMID_PROCESSING = "processing"
+WHATSAPP_WEBHOOK_WAMID_DONE = "done"
+
+
+def whatsapp_webhook_wamid_claim_key(wamid: str) -> str:
+    return f"whatsapp:webhook:wamid:{wamid}"
+
 @shared_task
 def async_handle_webhook(webhook_data):
-    webhook_result = handle_webhook(webhook_data=webhook_data)
-    return webhook_result
+    """Fan a webhook delivery out into one task per inbound message and per status batch."""
+    counts = {"messages": 0, "statuses": 0}
+    for kind, envelope, payload in iter_webhook_items(webhook_data):
+        if kind == "message":
+            async_handle_webhook_message.delay(
+                webhook_data=envelope, wamid=payload.get("id") or ""
+            )
+            counts["messages"] += 1
+        else:
+            async_handle_webhook_statuses.delay(webhook_data=envelope)
+            counts["statuses"] += len(payload)
+    return counts
+
+@shared_task
+def async_handle_webhook_message(webhook_data, wamid: str):
+    """
+    Process one inbound message envelope at most once per WAMID.
+
+    The claim is short-lived while processing and only held for Meta's full
+    redelivery window once the message is handled. It is released if processing
+    fails, and expires on its own if the worker dies, so a redelivery can retry.
+    """
+    claim_key = whatsapp_webhook_wamid_claim_key(wamid) if wamid else None
+    if claim_key and not cache.add(
+        claim_key,
+        WHATSAPP_WEBHOOK_WAMID_PROCESSING,
+        timeout=WHATSAPP_WEBHOOK_WAMID_PROCESSING_TTL_SECONDS,
+    ):
+        return {"status": "skipped", "reason": "duplicate", "wamid": wamid}
+    message = webhook_data["entry"][0]["changes"][0]["value"]["messages"][0]
+    try:
+        handle_webhook_message(webhook_data, message)
+    except Exception:
+        if claim_key:
+            cache.delete(claim_key)
+        raise
+    if claim_key:
+        cache.set(
+            claim_key,
+            WHATSAPP_WEBHOOK_WAMID_DONE,
+            timeout=WHATSAPP_WEBHOOK_WAMID_CLAIM_TTL_SECONDS,
+        )
+    return {"status": "processed", "wamid": wamid}
+
+@shared_task
+def async_handle_webhook_statuses(webhook_data):
+    statuses = webhook_data["entry"][0]["changes"][0]["value"].get("statuses") or []
+    return {"updated": handle_webhook_statuses(webhook_data, statuses)}
+
+@shared_task
+def whatsapp_mark_read_task(*, business_number_id: str, ws_message_id: str):
+    from .actions import mark_message_as_read
+
+    mark_message_as_read(business_number_id, ws_message_id)
+
+@shared_task
+def whatsapp_media_inbound_task(
+    *,
+    kind: str,
+    ws_number_id: int,
+    conversation_id: str,
+    user_phone: str,
+    inbound_wamid: str,
+    media: dict,
+    inbound_seq: int | None = None,
+):
+    from .actions import process_media_message
+
+    process_media_message(
+        kind=kind,
+        ws_number_id=ws_number_id,
+        conversation_id=conversation_id,
+        user_phone=user_phone,
+        inbound_wamid=inbound_wamid,
+        media=media,
+        inbound_seq=inbound_seq,
+    )
+
+@shared_task
+def whatsapp_audio_inbound_task(
+    *,
+    webhook_data: dict,
+    message: dict,
+    conversation_id: str | None = None,
+    inbound_seq: int | None = None,
+):
+    from .actions import handle_audio_message
+
+    handle_audio_message(
+        webhook_data, message, conversation_id=conversation_id, inbound_seq=inbound_seq
+    )
+
+@shared_task
+def whatsapp_send_reaction_task(*, user_message_id: int, inbound_wamid: str, reply_text: str):
+    from .actions import send_reply_reaction
+
+    send_reply_reaction(user_message_id, inbound_wamid, reply_text)
+
+def _buffered_payload_order(payload: dict):
+    # Arrival numbers are taken at webhook time, so media fetched in a worker
+    # keeps its place; stub ids order payloads buffered without one.
+    inbound_seq = payload.get("inbound_seq")
+    regenerate_id = payload.get("regenerate_message_id")
+    return (
+        inbound_seq if isinstance(inbound_seq, int) else float("inf"),
+        regenerate_id if isinstance(regenerate_id, int) else float("inf"),
+    )
 
 @shared_task
 def whatsapp_flush_inbound_agent_task(
@@ -19,21 +142,26 @@ def whatsapp_flush_inbound_agent_task(
     ws_number_id: int,
     whatsapp_user_number: str,
 ):
-    from .inbound import (
-        whatsapp_inbound_buffer_key,
-        whatsapp_inbound_schedule_lock_key,
-    )
-
-    buffer_key = whatsapp_inbound_buffer_key(conversation_id)
-    schedule_lock_key = whatsapp_inbound_schedule_lock_key(conversation_id)
+    from .inbound import drain_whatsapp_inbound_buffer
 
-    buffered_payloads = cache.get(buffer_key) or []
-    cache.delete(buffer_key)
-    cache.delete(schedule_lock_key)
+    buffered_payloads, retry_in = drain_whatsapp_inbound_buffer(conversation_id)
+    if retry_in:
+        # The user is still typing: the window slid forward, check again when it closes.
+        whatsapp_flush_inbound_agent_task.apply_async(
+            kwargs={
+                "conversation_id": conversation_id,
+                "ws_number_id": ws_number_id,
+                "whatsapp_user_number": whatsapp_user_number,
+            },
+            countdown=retry_in,
+        )
+        return {"status": "deferred", "retry_in": retry_in}
 
     if not buffered_payloads:
         return {"status": "skipped", "reason": "empty_buffer"}
 
+    buffered_payloads.sort(key=_buffered_payload_order)
+
     merged_user_inputs: list[dict] = []
     regenerate_ids: list[int] = []
     latest_inbound_wamid: str | None = None
@@ -181,3 +309,45 @@ def whatsapp_conversation_agent_task(
             )
 
     return agent_task_result
+
+@shared_task
+def whatsapp_outbound_drain_task(*, conversation_id: str):
+    """Send a conversation's queued WhatsApp replies in order (see ``api.whatsapp.outbound``)."""
+    from .outbound import drain_whatsapp_outbound
+
+    return drain_whatsapp_outbound(conversation_id)
+
+@shared_task
+def whatsapp_template_broadcast_task(*, broadcast_id: str):
+    """Fan a template broadcast out into chunk tasks (see ``api.whatsapp.template_broadcast``)."""
+    from .template_broadcast import start_template_broadcast
+
+    chunks = start_template_broadcast(broadcast_id)
+    for recipient_ids in chunks:
+        whatsapp_template_broadcast_chunk_task.delay(
+            broadcast_id=broadcast_id, recipient_ids=recipient_ids
+        )
+    return {"status": "started", "broadcast_id": broadcast_id, "chunks": len(chunks)}
+
+@shared_task
+def whatsapp_template_broadcast_chunk_task(*, broadcast_id: str, recipient_ids: list[int]):
+    from .template_broadcast import (
+        WHATSAPP_BROADCAST_THROTTLED_RETRY_SECONDS,
+        send_template_broadcast_chunk,
+    )
+
+    result = send_template_broadcast_chunk(broadcast_id, recipient_ids)
+    retry_ids = result.pop("retry_ids", None)
+    if retry_ids:
+        whatsapp_template_broadcast_chunk_task.apply_async(
+            kwargs={"broadcast_id": broadcast_id, "recipient_ids": retry_ids},
+            countdown=WHATSAPP_BROADCAST_THROTTLED_RETRY_SECONDS,
+        )
+    return result
+
+@shared_task
+def reclaim_stale_template_broadcast_recipients():
+    """Settle broadcast recipients left ``sending`` by a dead chunk worker."""
+    from .template_broadcast import reclaim_stale_broadcast_recipients
+
+    return reclaim_stale_broadcast_recipients()
@@ -0,0 +1,563 @@
+"""
+Bulk delivery of one allowlisted WhatsApp template to an audience.
+
+``create_template_broadcast`` validates the actor, sender and template once,
+resolves the audience (an organization role, a conversation tag or an explicit
+contact list) to verified contacts, builds the Meta components and the stored
+delivery text once, and records one ``WSTemplateBroadcastRecipient`` row per
+target. ``whatsapp_template_broadcast_task`` then fans the pending rows out in
+chunks; every chunk worker sends through the shared Graph client, whose
+per-number token bucket keeps all workers together under Meta's throughput.
+
+Recipients are claimed ``pending`` → ``sending`` (stamping ``claimed_at``)
+before the Graph call, so a redelivered chunk task cannot message anyone twice.
+The Graph message id is stored as soon as the send returns; a claim left behind
+by a dead worker is settled by ``reclaim_stale_broadcast_recipients``, which
+marks it sent when the id was recorded and re-queues it otherwise. Progress
+lives on the broadcast row (``broadcast_progress``).
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Any
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from api.authenticate.models import Organization
+from api.authenticate.org_membership import iter_organization_member_users, users_with_role
+from api.messaging.models import Conversation, Message, Tag
+
+from .actions import defer_whatsapp_task, send_template_message
+from .graph import GraphRateLimited
+from .models import WSContact, WSNumber, WSTemplateBroadcast, WSTemplateBroadcastRecipient
+from .template_send import (
+    TemplateVariables,
+    build_template_components,
+    coerce_template_variables,
+    format_template_delivery_message,
+    get_or_create_delivery_conversation,
+    resolve_header_image_from_attachment,
+    resolve_template_send_context,
+)
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_BROADCAST_CHUNK_SIZE = 25
+WHATSAPP_BROADCAST_MAX_RECIPIENTS = 5000
+# How long a chunk waits before resuming after the per-number budget ran dry.
+WHATSAPP_BROADCAST_THROTTLED_RETRY_SECONDS = 30
+# A recipient still marked sending after this long is assumed lost with its worker.
+WHATSAPP_BROADCAST_SENDING_TIMEOUT = timedelta(minutes=10)
+
+
+class BroadcastAudience(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    role_id: str | None = Field(
+        default=None,
+        description="Organization role id; every active member holding it.",
+    )
+    tag_id: int | None = Field(
+        default=None,
+        description="Conversation tag id; contacts of conversations on the sender carrying it.",
+    )
+    ws_contact_ids: list[int] | None = Field(
+        default=None,
+        description="Explicit WSContact ids on the sender.",
+    )
+
+    @model_validator(mode="after")
+    def _exactly_one(self) -> "BroadcastAudience":
+        chosen = [
+            self.role_id is not None,
+            self.tag_id is not None,
+            self.ws_contact_ids is not None,
+        ]
+        if sum(chosen) != 1:
+            raise ValueError("Audience needs exactly one of role_id, tag_id or ws_contact_ids")
+        return self
+
+
+def _skipped(contact: WSContact | None, *, error: str, user_id=None, phone: str = ""):
+    return WSTemplateBroadcastRecipient(
+        ws_contact=contact,
+        user_id=user_id if user_id is not None else (contact.user_id if contact else None),
+        phone=phone or (contact.number if contact else ""),
+        status=WSTemplateBroadcastRecipient.STATUS_SKIPPED,
+        error=error,
+    )
+
+
+def _pending(contact: WSContact):
+    return WSTemplateBroadcastRecipient(
+        ws_contact=contact,
+        user_id=contact.user_id,
+        phone=contact.number,
+        status=WSTemplateBroadcastRecipient.STATUS_PENDING,
+    )
+
+
+def _contact_recipients(
+    contacts: list[WSContact], member_ids: set[int]
+) -> list[WSTemplateBroadcastRecipient]:
+    recipients = []
+    for contact in contacts:
+        if not contact.user_id:
+            recipients.append(
+                _skipped(contact, error="Contact is not verified (no linked organization member)")
+            )
+        elif contact.user_id not in member_ids:
+            recipients.append(
+                _skipped(contact, error="Linked user is not an active organization member")
+            )
+        else:
+            recipients.append(_pending(contact))
+    return recipients
+
+
+def resolve_broadcast_recipients(
+    audience: BroadcastAudience,
+    *,
+    ws_number: WSNumber,
+    organization: Organization,
+) -> list[WSTemplateBroadcastRecipient]:
+    """Unsaved recipient rows for ``audience``: pending for verified members, skipped otherwise."""
+    member_ids = {u.id for u in iter_organization_member_users(organization)}
+
+    if audience.role_id is not None:
+        role_user_ids = {
+            u.id for u in users_with_role(organization.id, audience.role_id)
+        } & member_ids
+        # Members may own several phones on the line; the most recently used one wins.
+        contact_by_user: dict[int, WSContact] = {}
+        for contact in WSContact.objects.filter(
+            ws_number=ws_number, user_id__in=role_user_ids
+        ).order_by("-updated_at", "-id"):
+            contact_by_user.setdefault(contact.user_id, contact)
+        recipients = [_pending(contact_by_user[uid]) for uid in sorted(contact_by_user)]
+        recipients.extend(
+            _skipped(None, user_id=uid, error="Member has no WhatsApp contact on this sender")
+            for uid in sorted(role_user_ids - set(contact_by_user))
+        )
+        return recipients
+
+    if audience.tag_id is not None:
+        if not Tag.objects.filter(
+            id=audience.tag_id, organization=organization, enabled=True
+        ).exists():
+            raise ValueError(f"Tag {audience.tag_id} not found in this organization")
+        numbers = set(
+            Conversation.objects.filter(ws_number=ws_number)
+            .filter(Q(tags__contains=[audience.tag_id]) | Q(tags__contains=[str(audience.tag_id)]))
+            .exclude(whatsapp_user_number__isnull=True)
+            .values_list("whatsapp_user_number", flat=True)
+        )
+        contacts = list(
+            WSContact.objects.filter(ws_number=ws_number, number__in=numbers).order_by("id")
+        )
+        return _contact_recipients(contacts, member_ids)
+
+    requested = list(dict.fromkeys(audience.ws_contact_ids or []))
+    found = {
+        c.id: c
+        for c in WSContact.objects.filter(ws_number=ws_number, id__in=requested)
+    }
+    recipients = _contact_recipients(
+        [found[pk] for pk in requested if pk in found], member_ids
+    )
+    recipients.extend(
+        _skipped(None, error=f"WhatsApp contact {pk} not found on this sender")
+        for pk in requested
+        if pk not in found
+    )
+    return recipients
+
+
+def create_template_broadcast(
+    *,
+    actor_user_id: int,
+    organization_id,
+    agent_id: int,
+    sender_id: int | str,
+    template_id: str,
+    template_variables: TemplateVariables | dict[str, Any] | None,
+    audience: BroadcastAudience | dict[str, Any],
+    source_conversation_id: str | None,
+) -> WSTemplateBroadcast:
+    """Validate, resolve the audience, record the recipients and queue the send."""
+    organization, template, ws_number = resolve_template_send_context(
+        actor_user_id=actor_user_id,
+        organization_id=organization_id,
+        agent_id=agent_id,
+        sender_id=sender_id,
+        template_id=template_id,
+    )
+    variables = coerce_template_variables(template_variables)
+    if not isinstance(audience, BroadcastAudience):
+        audience = BroadcastAudience.model_validate(audience or {})
+
+    recipients = resolve_broadcast_recipients(
+        audience, ws_number=ws_number, organization=organization
+    )
+    # Dedupe by phone: one member may be reachable through several contact rows.
+    seen_phones: set[str] = set()
+    unique_recipients = []
+    for recipient in recipients:
+        if recipient.phone and recipient.phone in seen_phones:
+            continue
+        if recipient.phone:
+            seen_phones.add(recipient.phone)
+        unique_recipients.append(recipient)
+    recipients = unique_recipients
+
+    pending_count = sum(
+        1 for r in recipients if r.status == WSTemplateBroadcastRecipient.STATUS_PENDING
+    )
+    if pending_count > WHATSAPP_BROADCAST_MAX_RECIPIENTS:
+        raise ValueError(
+            f"Audience has {pending_count} recipients; the limit is "
+            f"{WHATSAPP_BROADCAST_MAX_RECIPIENTS} per broadcast"
+        )
+
+    # Shared by every recipient: the header image is uploaded at most once.
+    header_image: dict[str, Any] | None = None
+    if template.header_type == "image":
+        header_image = resolve_header_image_from_attachment(
+            attachment_id=variables.header_image_attachment_id or "",
+            conversation_id=source_conversation_id,
+            phone_number_id=ws_number.platform_id,
+        )
+    components = build_template_components(
+        template,
+        variables,
+        source_conversation_id=source_conversation_id,
+        header_image=header_image,
+    )
+    message_text = format_template_delivery_message(
+        template,
+        variables,
+        source_conversation_id=source_conversation_id,
+    )
+
+    skipped_count = len(recipients) - pending_count
+    with transaction.atomic():
+        broadcast = WSTemplateBroadcast.objects.create(
+            organization=organization,
+            ws_number=ws_number,
+            created_by_id=actor_user_id,
+            template_slug=template.id,
+            template_name=template.meta_name,
+            language_code=template.language_code,
+            components=components,
+            message_text=message_text,
+            source_conversation_id=source_conversation_id or None,
+            audience=audience.model_dump(exclude_none=True),
+            total=len(recipients),
+            skipped=skipped_count,
+            status=(
+                WSTemplateBroadcast.STATUS_PENDING
+                if pending_count
+                else WSTemplateBroadcast.STATUS_COMPLETED
+            ),
+            completed_at=None if pending_count else timezone.now(),
+        )
+        for recipient in recipients:
+            recipient.broadcast = broadcast
+        WSTemplateBroadcastRecipient.objects.bulk_create(recipients)
+        if pending_count:
+            from .tasks import whatsapp_template_broadcast_task
+
+            defer_whatsapp_task(whatsapp_template_broadcast_task, broadcast_id=str(broadcast.id))
+
+    logger.info(
+        "WhatsApp template broadcast %s created: %d to send, %d skipped",
+        broadcast.id,
+        pending_count,
+        skipped_count,
+    )
+    return broadcast
+
+
+def start_template_broadcast(broadcast_id: str) -> list[list[int]]:
+    """Mark the broadcast running and split its pending recipients into chunks."""
+    WSTemplateBroadcast.objects.filter(
+        id=broadcast_id, status=WSTemplateBroadcast.STATUS_PENDING
+    ).update(status=WSTemplateBroadcast.STATUS_RUNNING, updated_at=timezone.now())
+    pending_ids = list(
+        WSTemplateBroadcastRecipient.objects.filter(
+            broadcast_id=broadcast_id,
+            status=WSTemplateBroadcastRecipient.STATUS_PENDING,
+        )
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if not pending_ids:
+        finish_template_broadcast_if_done(broadcast_id)
+    return [
+        pending_ids[i : i + WHATSAPP_BROADCAST_CHUNK_SIZE]
+        for i in range(0, len(pending_ids), WHATSAPP_BROADCAST_CHUNK_SIZE)
+    ]
+
+
+def _count(broadcast_id, field: str) -> None:
+    WSTemplateBroadcast.objects.filter(id=broadcast_id).update(
+        **{field: F(field) + 1}, updated_at=timezone.now()
+    )
+
+
+def _send_to_recipient(
+    broadcast: WSTemplateBroadcast, recipient: WSTemplateBroadcastRecipient
+) -> None:
+    ws_number = broadcast.ws_number
+    conversation = get_or_create_delivery_conversation(
+        ws_number, recipient.phone, ws_contact=recipient.ws_contact
+    )
+    wamid = send_template_message(
+        ws_number.platform_id,
+        recipient.phone,
+        template_name=broadcast.template_name,
+        language_code=broadcast.language_code,
+        components=broadcast.components or None,
+    )
+    # Recorded before anything else can fail, so the send is never repeated.
+    recipient.wamid = wamid
+    WSTemplateBroadcastRecipient.objects.filter(id=recipient.id).update(
+        wamid=wamid, delivery_conversation=conversation
+    )
+    source_conversation_id = (
+        str(broadcast.source_conversation_id) if broadcast.source_conversation_id else None
+    )
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation=conversation,
+            type="assistant",
+            text=broadcast.message_text,
+            metadata={
+                "whatsapp_wamid": wamid,
+                "whatsapp_template_id": broadcast.template_slug,
+                "whatsapp_template_name": broadcast.template_name,
+                "whatsapp_template_broadcast_id": str(broadcast.id),
+                "source_conversation_id": source_conversation_id,
+                "target_user_id": recipient.user_id,
+                "ws_contact_id": recipient.ws_contact_id,
+                "delivery_conversation_id": str(conversation.id),
+            },
+        )
+        WSTemplateBroadcastRecipient.objects.filter(id=recipient.id).update(
+            status=WSTemplateBroadcastRecipient.STATUS_SENT,
+            wamid=wamid,
+            delivery_conversation=conversation,
+            sent_at=timezone.now(),
+        )
+        _count(broadcast.id, "sent")
+    try:
+        from api.messaging.takeover import emit_message_created
+
+        emit_message_created(None, conversation, message)
+    except Exception:
+        logger.exception(
+            "emit_message_created failed after template broadcast conversation=%s",
+            conversation.id,
+        )
+
+
+def send_template_broadcast_chunk(broadcast_id: str, recipient_ids: list[int]) -> dict[str, Any]:
+    """
+    Send to each still-pending recipient in ``recipient_ids``.
+
+    When the sender's send budget stays exhausted, the unsent rest of the chunk
+    is handed back to the caller as ``retry_ids`` instead of failing it.
+    """
+    broadcast = (
+        WSTemplateBroadcast.objects.select_related("ws_number")
+        .filter(id=broadcast_id)
+        .first()
+    )
+    if broadcast is None:
+        return {"status": "skipped", "reason": "broadcast_not_found"}
+
+    counts = {"sent": 0, "failed": 0}
+    recipient_ids = sorted(recipient_ids)
+    for index, recipient_id in enumerate(recipient_ids):
+        claimed = WSTemplateBroadcastRecipient.objects.filter(
+            id=recipient_id,
+            broadcast_id=broadcast.id,
+            status=WSTemplateBroadcastRecipient.STATUS_PENDING,
+        ).update(
+            status=WSTemplateBroadcastRecipient.STATUS_SENDING, claimed_at=timezone.now()
+        )
+        if not claimed:
+            continue
+        recipient = WSTemplateBroadcastRecipient.objects.select_related("ws_contact").get(
+            id=recipient_id
+        )
+        try:
+            _send_to_recipient(broadcast, recipient)
+        except GraphRateLimited:
+            WSTemplateBroadcastRecipient.objects.filter(id=recipient_id).update(
+                status=WSTemplateBroadcastRecipient.STATUS_PENDING, claimed_at=None
+            )
+            logger.warning(
+                "WhatsApp template broadcast %s throttled; %d recipient(s) deferred",
+                broadcast.id,
+                len(recipient_ids) - index,
+            )
+            return {"status": "throttled", "retry_ids": recipient_ids[index:], **counts}
+        except Exception as exc:
+            if recipient.wamid:
+                # Meta accepted the message; only the bookkeeping after it failed.
+                logger.exception(
+                    "WhatsApp template broadcast %s sent to recipient %s but recording it failed",
+                    broadcast.id,
+                    recipient_id,
+                )
+                _mark_sent(broadcast.id, recipient_id, recipient.wamid)
+                counts["sent"] += 1
+                continue
+            logger.warning(
+                "WhatsApp template broadcast %s failed for recipient %s: %s",
+                broadcast.id,
+                recipient_id,
+                exc,
+            )
+            WSTemplateBroadcastRecipient.objects.filter(id=recipient_id).update(
+                status=WSTemplateBroadcastRecipient.STATUS_FAILED,
+                error=str(exc)[:1000],
+            )
+            _count(broadcast.id, "failed")
+            counts["failed"] += 1
+            continue
+        counts["sent"] += 1
+
+    finish_template_broadcast_if_done(broadcast.id)
+    return {"status": "done", **counts}
+
+
+def _mark_sent(broadcast_id, recipient_id: int, wamid: str) -> None:
+    updated = WSTemplateBroadcastRecipient.objects.filter(
+        id=recipient_id, status=WSTemplateBroadcastRecipient.STATUS_SENDING
+    ).update(
+        status=WSTemplateBroadcastRecipient.STATUS_SENT, wamid=wamid, sent_at=timezone.now()
+    )
+    if updated:
+        _count(broadcast_id, "sent")
+
+
+def reclaim_stale_broadcast_recipients(*, now=None) -> dict[str, Any]:
+    """
+    Settle recipients whose chunk worker died between claim and completion.
+
+    A stale claim with a recorded Graph message id was delivered and is marked
+    sent; one without goes back to pending and is re-queued in id order.
+    """
+    from .tasks import whatsapp_template_broadcast_chunk_task
+
+    now = now or timezone.now()
+    stale = WSTemplateBroadcastRecipient.objects.filter(
+        status=WSTemplateBroadcastRecipient.STATUS_SENDING
+    ).filter(
+        Q(claimed_at__lt=now - WHATSAPP_BROADCAST_SENDING_TIMEOUT)
+        | Q(claimed_at__isnull=True)
+    )
+
+    affected = set()
+    marked_sent = 0
+    delivered = stale.exclude(Q(wamid__isnull=True) | Q(wamid=""))
+    for broadcast_id in set(delivered.values_list("broadcast_id", flat=True)):
+        with transaction.atomic():
+            marked = delivered.filter(broadcast_id=broadcast_id).update(
+                status=WSTemplateBroadcastRecipient.STATUS_SENT, sent_at=now
+            )
+            WSTemplateBroadcast.objects.filter(id=broadcast_id).update(
+                sent=F("sent") + marked, updated_at=now
+            )
+        marked_sent += marked
+        affected.add(broadcast_id)
+
+    requeued = 0
+    lost = list(
+        stale.filter(Q(wamid__isnull=True) | Q(wamid=""))
+        .order_by("broadcast_id", "id")
+        .values_list("broadcast_id", "id")
+    )
+    by_broadcast: dict[Any, list[int]] = {}
+    for broadcast_id, recipient_id in lost:
+        by_broadcast.setdefault(broadcast_id, []).append(recipient_id)
+    for broadcast_id, ids in by_broadcast.items():
+        reset = WSTemplateBroadcastRecipient.objects.filter(
+            id__in=ids, status=WSTemplateBroadcastRecipient.STATUS_SENDING
+        ).update(status=WSTemplateBroadcastRecipient.STATUS_PENDING, claimed_at=None)
+        if not reset:
+            continue
+        requeued += reset
+        for i in range(0, len(ids), WHATSAPP_BROADCAST_CHUNK_SIZE):
+            defer_whatsapp_task(
+                whatsapp_template_broadcast_chunk_task,
+                broadcast_id=str(broadcast_id),
+                recipient_ids=ids[i : i + WHATSAPP_BROADCAST_CHUNK_SIZE],
+            )
+    affected.update(by_broadcast)
+
+    for broadcast_id in affected:
+        finish_template_broadcast_if_done(broadcast_id)
+    return {"marked_sent": marked_sent, "requeued": requeued}
+
+
+def finish_template_broadcast_if_done(broadcast_id) -> bool:
+    outstanding = WSTemplateBroadcastRecipient.objects.filter(
+        broadcast_id=broadcast_id,
+        status__in=(
+            WSTemplateBroadcastRecipient.STATUS_PENDING,
+            WSTemplateBroadcastRecipient.STATUS_SENDING,
+        ),
+    ).exists()
+    if outstanding:
+        return False
+    now = timezone.now()
+    return bool(
+        WSTemplateBroadcast.objects.exclude(status=WSTemplateBroadcast.STATUS_COMPLETED)
+        .filter(id=broadcast_id)
+        .update(status=WSTemplateBroadcast.STATUS_COMPLETED, completed_at=now, updated_at=now)
+    )
+
+
+def broadcast_progress(
+    broadcast: WSTemplateBroadcast, *, include_recipients: bool = False
+) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "broadcast_id": str(broadcast.id),
+        "status": broadcast.status,
+        "template_id": broadcast.template_slug,
+        "sender_id": broadcast.ws_number_id,
+        "audience": broadcast.audience,
+        "total": broadcast.total,
+        "sent": broadcast.sent,
+        "failed": broadcast.failed,
+        "skipped": broadcast.skipped,
+        "pending": max(
+            0, broadcast.total - broadcast.sent - broadcast.failed - broadcast.skipped
+        ),
+        "created_at": broadcast.created_at.isoformat() if broadcast.created_at else None,
+        "completed_at": broadcast.completed_at.isoformat() if broadcast.completed_at else None,
+    }
+    if include_recipients:
+        data["recipients"] = [
+            {
+                "ws_contact_id": r.ws_contact_id,
+                "user_id": r.user_id,
+                "phone": r.phone,
+                "status": r.status,
+                "wamid": r.wamid,
+                "error": r.error or None,
+                "delivery_conversation_id": (
+                    str(r.delivery_conversation_id) if r.delivery_conversation_id else None
+                ),
+            }
+            for r in broadcast.recipients.all()
+        ]
+    return data
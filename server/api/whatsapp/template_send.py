@@ -154,13 +154,12 @@ def resolve_header_image_from_attachment(
     """
     Resolve a MessageAttachment UUID into a Meta template header image param.
 
-    Prefers a public HTTPS link; falls back to uploading bytes to WhatsApp media.
+    Prefers a public HTTPS link; falls back to streaming the file to WhatsApp media.
     """
     from api.messaging.attachment_urls import absolute_file_url_for_attachment
     from api.messaging.models import MessageAttachment
     from api.whatsapp.outbound_media import (
-        read_attachment_file_bytes,
-        upload_whatsapp_media,
+        upload_attachment_to_whatsapp,
         whatsapp_media_type_for_attachment,
     )
 
@@ -194,14 +193,7 @@ def resolve_header_image_from_attachment(
     if link and link.startswith("https://"):
         return {"link": link}
 
-    file_bytes, mime_type, filename = read_attachment_file_bytes(att)
-    media_id = upload_whatsapp_media(
-        phone_number_id,
-        file_bytes=file_bytes,
-        mime_type=mime_type,
-        wa_type="image",
-        filename=filename,
-    )
+    media_id = upload_attachment_to_whatsapp(phone_number_id, att, wa_type="image")
     return {"id": media_id}
 
 def build_template_components(
@@ -380,17 +372,15 @@ def get_or_create_delivery_conversation(
         )
     return create_whatsapp_conversation(ws_number, phone)
 
-def send_ws_template_to_member(
+def resolve_template_send_context(
     *,
     actor_user_id: int,
     organization_id,
     agent_id: int,
     sender_id: int | str,
-    ws_contact_id: int | str,
     template_id: str,
-    template_variables: TemplateVariables | dict[str, Any],
-    source_conversation_id: str | None,
-) -> SendWsTemplateResult:
+) -> tuple[Organization, WhatsAppTemplateDefinition, WSNumber]:
+    """Validate actor, organization, template and sender for a template send."""
     actor = User.objects.filter(pk=actor_user_id).first()
     if not actor:
         raise ValueError("Authenticated actor not found")
@@ -413,16 +403,39 @@ def send_ws_template_to_member(
             f"Unknown, disabled, or unavailable WhatsApp template id: {template_id}"
         )
 
-    if isinstance(template_variables, TemplateVariables):
-        variables = template_variables
-    else:
-        variables = TemplateVariables.model_validate(template_variables or {})
-
     ws_number = _resolve_sender(
         sender_id=sender_id,
         organization=organization,
         agent_id=resolved_agent_id,
     )
+    return organization, template, ws_number
+
+def coerce_template_variables(
+    template_variables: TemplateVariables | dict[str, Any] | None,
+) -> TemplateVariables:
+    if isinstance(template_variables, TemplateVariables):
+        return template_variables
+    return TemplateVariables.model_validate(template_variables or {})
+
+def send_ws_template_to_member(
+    *,
+    actor_user_id: int,
+    organization_id,
+    agent_id: int,
+    sender_id: int | str,
+    ws_contact_id: int | str,
+    template_id: str,
+    template_variables: TemplateVariables | dict[str, Any],
+    source_conversation_id: str | None,
+) -> SendWsTemplateResult:
+    organization, template, ws_number = resolve_template_send_context(
+        actor_user_id=actor_user_id,
+        organization_id=organization_id,
+        agent_id=agent_id,
+        sender_id=sender_id,
+        template_id=template_id,
+    )
+    variables = coerce_template_variables(template_variables)
     contact = _resolve_verified_contact(
         ws_contact_id=ws_contact_id,
         ws_number=ws_number,
@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, patch
 import json
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from rest_framework.test import APIClient
 
 from api.authenticate.models import Organization, Token
@@ -365,13 +365,20 @@ class WhatsappWebhookEnqueueTests(TestCase):
         handle_message_received(webhook_data, message)
         self.assertEqual(mock_apply_async.call_count, 1)
 
-    @patch("api.whatsapp.inbound.fetch_whatsapp_media_bytes")
-    @patch("api.whatsapp.actions.mark_message_as_read")
+    @patch("api.whatsapp.graph._graph_token", return_value="token")
+    @patch("api.whatsapp.graph.GraphClient._send")
+    @patch("api.whatsapp.tasks.whatsapp_media_inbound_task.delay")
+    @patch("api.whatsapp.tasks.whatsapp_mark_read_task.delay")
     @patch("api.whatsapp.tasks.whatsapp_flush_inbound_agent_task.apply_async")
     def test_handle_document_message_enqueues_task_with_attachment(
-        self, mock_apply_async, _mock_read, mock_fetch_media
+        self, mock_apply_async, mock_read_delay, mock_media_delay, mock_graph_send, _token
     ):
-        mock_fetch_media.return_value = (b"%PDF-1.4 test", "application/pdf")
+        from api.whatsapp.tasks import whatsapp_media_inbound_task
+
+        mock_media_delay.side_effect = lambda **kwargs: whatsapp_media_inbound_task(**kwargs)
+        mock_graph_send.return_value = _media_download_response(
+            [b"%PDF-1.4 ", b"test"], "application/pdf"
+        )
         from api.whatsapp.actions import handle_webhook
 
         webhook_data = {
@@ -400,7 +407,16 @@ class WhatsappWebhookEnqueueTests(TestCase):
                 }
             ]
         }
-        handle_webhook(webhook_data)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            handle_webhook(webhook_data)
+        # The webhook only queues work: nothing is downloaded before commit.
+        mock_graph_send.assert_not_called()
+        for callback in callbacks:
+            callback()
+        mock_media_delay.assert_called_once()
+        mock_read_delay.assert_called_once_with(
+            business_number_id="pnid-enqueue", ws_message_id="wamid.doc.inbound"
+        )
 
         conv = Conversation.objects.get(
             ws_number=self.ws,
@@ -415,10 +431,9 @@ class WhatsappWebhookEnqueueTests(TestCase):
             type="user",
             metadata__whatsapp_inbound_wamid="wamid.doc.inbound",
         )
-        from django.core.cache import cache
-        from api.whatsapp.inbound import whatsapp_inbound_buffer_key
+        from api.whatsapp.inbound import peek_whatsapp_inbound_buffer
 
-        buffered = cache.get(whatsapp_inbound_buffer_key(str(conv.id))) or []
+        buffered = peek_whatsapp_inbound_buffer(str(conv.id))
         self.assertEqual(len(buffered), 1)
         user_inputs = buffered[0]["user_inputs"]
         self.assertEqual(user_inputs[0]["type"], "input_text")
@@ -426,59 +441,60 @@ class WhatsappWebhookEnqueueTests(TestCase):
         att = MessageAttachment.objects.get(id=user_inputs[1]["attachment_id"])
         self.assertEqual(att.conversation_id, conv.id)
         self.assertEqual(att.content_type, "application/pdf")
+        self.assertTrue(mock_graph_send.call_args.kwargs["stream"])
+        with att.file.open("rb") as fh:
+            self.assertEqual(fh.read(), b"%PDF-1.4 test")
         self.assertEqual(buffered[0]["regenerate_message_id"], stub.id)
 
-    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
-    def test_flush_task_merges_buffered_inbounds(self, mock_agent_task):
-        from django.core.cache import cache
-
-        from api.whatsapp.inbound import (
-            whatsapp_inbound_buffer_key,
-            whatsapp_inbound_schedule_lock_key,
-        )
-        from api.whatsapp.tasks import whatsapp_flush_inbound_agent_task
+    def _buffered_stubs(self, wamids):
+        from api.whatsapp.inbound import push_whatsapp_inbound_payload
 
         conv = Conversation.objects.create(
             user=None,
             ws_number=self.ws,
             whatsapp_user_number="5490000000001",
         )
-        first = Message.objects.create(
-            conversation=conv,
-            type="user",
-            text=".",
-            metadata={"whatsapp_inbound_wamid": "wamid.1"},
-        )
-        second = Message.objects.create(
-            conversation=conv,
-            type="user",
-            text=".",
-            metadata={"whatsapp_inbound_wamid": "wamid.2"},
-        )
-        cache.set(
-            whatsapp_inbound_buffer_key(str(conv.id)),
-            [
-                {
-                    "inbound_wamid": "wamid.1",
-                    "user_inputs": [{"type": "input_text", "text": "Hello"}],
-                    "regenerate_message_id": first.id,
-                },
+        stubs = [
+            Message.objects.create(
+                conversation=conv,
+                type="user",
+                text=".",
+                metadata={"whatsapp_inbound_wamid": wamid},
+            )
+            for wamid in wamids
+        ]
+        scheduled = [
+            push_whatsapp_inbound_payload(
+                str(conv.id),
                 {
-                    "inbound_wamid": "wamid.2",
-                    "user_inputs": [{"type": "input_text", "text": "there"}],
-                    "regenerate_message_id": second.id,
+                    "inbound_wamid": stub.metadata["whatsapp_inbound_wamid"],
+                    "user_inputs": [{"type": "input_text", "text": text}],
+                    "regenerate_message_id": stub.id,
                 },
-            ],
-            timeout=120,
-        )
-        cache.set(whatsapp_inbound_schedule_lock_key(str(conv.id)), True, timeout=120)
+            )
+            for stub, text in zip(stubs, ["Hello", "there"])
+        ]
+        return conv, stubs, scheduled
 
-        whatsapp_flush_inbound_agent_task(
+    def _flush(self, conv):
+        from api.whatsapp.tasks import whatsapp_flush_inbound_agent_task
+
+        return whatsapp_flush_inbound_agent_task(
             conversation_id=str(conv.id),
             ws_number_id=self.ws.id,
             whatsapp_user_number="5490000000001",
         )
 
+    @patch("api.whatsapp.inbound.WHATSAPP_INBOUND_DEBOUNCE_SECONDS", 0)
+    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
+    def test_flush_task_merges_buffered_inbounds(self, mock_agent_task):
+        from api.whatsapp.inbound import peek_whatsapp_inbound_buffer
+
+        conv, (first, _second), scheduled = self._buffered_stubs(["wamid.1", "wamid.2"])
+        self.assertEqual(scheduled, [True, False])
+
+        self._flush(conv)
+
         mock_agent_task.assert_called_once_with(
             conversation_id=str(conv.id),
             user_inputs=[
@@ -490,6 +506,144 @@ class WhatsappWebhookEnqueueTests(TestCase):
             inbound_wamid="wamid.2",
             regenerate_message_id=first.id,
         )
+        self.assertEqual(peek_whatsapp_inbound_buffer(str(conv.id)), [])
+        self.assertEqual(self._flush(conv)["reason"], "empty_buffer")
+
+    @patch("api.whatsapp.inbound.WHATSAPP_INBOUND_DEBOUNCE_SECONDS", 0)
+    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
+    def test_flush_orders_payloads_by_stub_not_push_order(self, mock_agent_task):
+        from api.whatsapp.inbound import (
+            clear_whatsapp_inbound_buffer,
+            drain_whatsapp_inbound_buffer,
+            push_whatsapp_inbound_payload,
+        )
+
+        conv, stubs, _ = self._buffered_stubs(["wamid.1", "wamid.2"])
+        payloads, _ = drain_whatsapp_inbound_buffer(str(conv.id))
+        clear_whatsapp_inbound_buffer(str(conv.id))
+        for payload in reversed(payloads):
+            push_whatsapp_inbound_payload(str(conv.id), payload)
+
+        self._flush(conv)
+
+        kwargs = mock_agent_task.call_args.kwargs
+        self.assertEqual([i["text"] for i in kwargs["user_inputs"]], ["Hello", "there"])
+        self.assertEqual(kwargs["inbound_wamid"], "wamid.2")
+        self.assertEqual(kwargs["regenerate_message_id"], stubs[0].id)
+
+    @patch("api.whatsapp.inbound.WHATSAPP_INBOUND_DEBOUNCE_SECONDS", 0)
+    @patch("api.whatsapp.tasks.whatsapp_flush_inbound_agent_task.apply_async")
+    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
+    def test_flush_waits_for_deferred_media_and_keeps_arrival_order(
+        self, mock_agent_task, _mock_apply_async
+    ):
+        from api.whatsapp.inbound import (
+            enqueue_whatsapp_inbound_agent,
+            reserve_whatsapp_inbound_slot,
+        )
+
+        conv = Conversation.objects.create(
+            user=None, ws_number=self.ws, whatsapp_user_number="5490000000001"
+        )
+        image_seq = reserve_whatsapp_inbound_slot(str(conv.id))
+        enqueue_whatsapp_inbound_agent(
+            conversation=conv,
+            ws_number=self.ws,
+            whatsapp_user_number="5490000000001",
+            inbound_wamid="wamid.text.after",
+            user_inputs=[{"type": "input_text", "text": "what is this?"}],
+        )
+
+        self.assertEqual(self._flush(conv)["status"], "deferred")
+        mock_agent_task.assert_not_called()
+
+        enqueue_whatsapp_inbound_agent(
+            conversation=conv,
+            ws_number=self.ws,
+            whatsapp_user_number="5490000000001",
+            inbound_wamid="wamid.image.before",
+            user_inputs=[{"type": "input_text", "text": "See attached image(s)."}],
+            inbound_seq=image_seq,
+        )
+        self._flush(conv)
+
+        kwargs = mock_agent_task.call_args.kwargs
+        self.assertEqual(
+            [i["text"] for i in kwargs["user_inputs"]],
+            ["See attached image(s).", "what is this?"],
+        )
+
+    @patch("api.whatsapp.inbound.WHATSAPP_INBOUND_DEBOUNCE_SECONDS", 0)
+    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
+    @patch("api.whatsapp.inbound.download_whatsapp_media", side_effect=ValueError("gone"))
+    def test_failed_media_download_releases_its_slot(self, _mock_download, mock_agent_task):
+        from api.whatsapp.actions import process_media_message
+        from api.whatsapp.inbound import reserve_whatsapp_inbound_slot
+
+        conv, _stubs, _ = self._buffered_stubs(["wamid.1", "wamid.2"])
+        image_seq = reserve_whatsapp_inbound_slot(str(conv.id))
+
+        process_media_message(
+            kind="image",
+            ws_number_id=self.ws.id,
+            conversation_id=str(conv.id),
+            user_phone="5490000000001",
+            inbound_wamid="wamid.image.broken",
+            media={"id": "media-1"},
+            inbound_seq=image_seq,
+        )
+
+        self.assertNotEqual(self._flush(conv)["status"], "deferred")
+        mock_agent_task.assert_called_once()
+
+    @patch("api.whatsapp.tasks.whatsapp_flush_inbound_agent_task.apply_async")
+    @patch("api.whatsapp.tasks.whatsapp_conversation_agent_task")
+    def test_flush_defers_while_window_is_open(self, mock_agent_task, mock_apply_async):
+        from api.whatsapp.inbound import peek_whatsapp_inbound_buffer
+
+        conv, _, _ = self._buffered_stubs(["wamid.1", "wamid.2"])
+
+        result = self._flush(conv)
+
+        self.assertEqual(result["status"], "deferred")
+        self.assertGreater(result["retry_in"], 0)
+        mock_agent_task.assert_not_called()
+        mock_apply_async.assert_called_once()
+        self.assertEqual(len(peek_whatsapp_inbound_buffer(str(conv.id))), 2)
+
+    @patch("api.whatsapp.tasks.whatsapp_audio_inbound_task.delay")
+    @patch("api.whatsapp.actions.download_audio")
+    def test_webhook_defers_audio_download_and_transcription(
+        self, mock_download, mock_audio_delay
+    ):
+        from api.whatsapp.actions import handle_webhook
+
+        message = {
+            "from": "5490000000000",
+            "id": "wamid.audio.deferred",
+            "type": "audio",
+            "audio": {"id": "media-audio-2"},
+        }
+        webhook_data = {
+            "entry": [
+                {
+                    "changes": [
+                        {
+                            "value": {
+                                "metadata": {"phone_number_id": "pnid-enqueue"},
+                                "messages": [message],
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            handle_webhook(webhook_data)
+
+        mock_download.assert_not_called()
+        mock_audio_delay.assert_called_once()
+        self.assertEqual(mock_audio_delay.call_args.kwargs["message"], message)
 
     @patch("api.whatsapp.actions.handle_message_received")
     @patch("api.whatsapp.actions.transcribe_audio", return_value="Hola desde audio")
@@ -612,6 +766,441 @@ class WhatsappWebhookEnqueueTests(TestCase):
         handle_webhook(webhook_data)
         mock_handle_message.assert_called_once()
 
+def _text_message(wamid: str, sender: str, body: str) -> dict:
+    return {"from": sender, "id": wamid, "type": "text", "text": {"body": body}}
+
+class WhatsappWebhookBatchTests(TestCase):
+    """Deliveries carrying several entries, changes, messages and statuses."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.webhook_data = {
+            "object": "whatsapp_business_account",
+            "entry": [
+                {
+                    "id": "waba-1",
+                    "changes": [
+                        {
+                            "field": "messages",
+                            "value": {
+                                "metadata": {"phone_number_id": "pnid-a"},
+                                "messages": [
+                                    _text_message("wamid.a1", "5491", "one"),
+                                    _text_message("wamid.a2", "5492", "two"),
+                                ],
+                                "statuses": [
+                                    {"id": "wamid.out", "status": "read", "recipient_id": "5491"},
+                                ],
+                            },
+                        }
+                    ],
+                },
+                {
+                    "id": "waba-2",
+                    "changes": [
+                        {
+                            "field": "messages",
+                            "value": {
+                                "metadata": {"phone_number_id": "pnid-b"},
+                                "messages": [_text_message("wamid.b1", "5493", "three")],
+                            },
+                        }
+                    ],
+                },
+            ],
+        }
+
+    @patch("api.whatsapp.actions.handle_message_received")
+    def test_handle_webhook_processes_every_message(self, mock_handle):
+        from api.whatsapp.actions import handle_webhook
+
+        handle_webhook(self.webhook_data)
+
+        seen = [
+            (
+                call.kwargs["webhook_data"]["entry"][0]["changes"][0]["value"]["metadata"][
+                    "phone_number_id"
+                ],
+                call.kwargs["message"]["id"],
+            )
+            for call in mock_handle.call_args_list
+        ]
+        self.assertEqual(
+            seen,
+            [("pnid-a", "wamid.a1"), ("pnid-a", "wamid.a2"), ("pnid-b", "wamid.b1")],
+        )
+
+    @patch("api.whatsapp.actions.handle_message_received")
+    def test_one_failing_message_does_not_drop_the_rest(self, mock_handle):
+        from api.whatsapp.actions import handle_webhook
+
+        mock_handle.side_effect = [RuntimeError("boom"), None, None]
+        handle_webhook(self.webhook_data)
+        self.assertEqual(mock_handle.call_count, 3)
+
+    @patch("api.whatsapp.tasks.async_handle_webhook_statuses.delay")
+    @patch("api.whatsapp.tasks.async_handle_webhook_message.delay")
+    def test_async_webhook_fans_out_one_task_per_item(self, mock_message, mock_statuses):
+        from api.whatsapp.tasks import async_handle_webhook
+
+        result = async_handle_webhook(self.webhook_data)
+
+        self.assertEqual(result, {"messages": 3, "statuses": 1})
+        self.assertEqual(
+            [c.kwargs["wamid"] for c in mock_message.call_args_list],
+            ["wamid.a1", "wamid.a2", "wamid.b1"],
+        )
+        envelope = mock_message.call_args_list[1].kwargs["webhook_data"]
+        value = envelope["entry"][0]["changes"][0]["value"]
+        self.assertEqual(value["messages"], [_text_message("wamid.a2", "5492", "two")])
+        self.assertNotIn("statuses", value)
+        mock_statuses.assert_called_once()
+
+    @patch("api.whatsapp.tasks.handle_webhook_message")
+    def test_message_task_is_idempotent_per_wamid(self, mock_handle):
+        from api.whatsapp.actions import iter_webhook_items
+        from api.whatsapp.tasks import async_handle_webhook_message
+
+        _, envelope, _ = next(iter_webhook_items(self.webhook_data))
+        first = async_handle_webhook_message(envelope, "wamid.a1")
+        second = async_handle_webhook_message(envelope, "wamid.a1")
+
+        self.assertEqual(first["status"], "processed")
+        self.assertEqual(second["reason"], "duplicate")
+        mock_handle.assert_called_once()
+
+    @patch("api.whatsapp.tasks.handle_webhook_message")
+    def test_failed_message_task_releases_wamid_claim(self, mock_handle):
+        from api.whatsapp.actions import iter_webhook_items
+        from api.whatsapp.tasks import async_handle_webhook_message
+
+        _, envelope, _ = next(iter_webhook_items(self.webhook_data))
+        mock_handle.side_effect = [RuntimeError("boom"), None]
+        with self.assertRaises(RuntimeError):
+            async_handle_webhook_message(envelope, "wamid.a1")
+        self.assertEqual(
+            async_handle_webhook_message(envelope, "wamid.a1")["status"], "processed"
+        )
+
+    @patch("api.whatsapp.tasks.handle_webhook_message")
+    def test_in_flight_wamid_claim_expires_before_the_done_marker(self, mock_handle):
+        from django.core.cache import cache
+
+        from api.whatsapp.actions import iter_webhook_items
+        from api.whatsapp.tasks import (
+            WHATSAPP_WEBHOOK_WAMID_CLAIM_TTL_SECONDS,
+            WHATSAPP_WEBHOOK_WAMID_PROCESSING_TTL_SECONDS,
+            async_handle_webhook_message,
+            whatsapp_webhook_wamid_claim_key,
+        )
+
+        _, envelope, _ = next(iter_webhook_items(self.webhook_data))
+        key = whatsapp_webhook_wamid_claim_key("wamid.a1")
+        in_flight_ttls = []
+        mock_handle.side_effect = lambda *args: in_flight_ttls.append(cache.ttl(key))
+
+        async_handle_webhook_message(envelope, "wamid.a1")
+
+        self.assertLessEqual(in_flight_ttls[0], WHATSAPP_WEBHOOK_WAMID_PROCESSING_TTL_SECONDS)
+        self.assertGreater(cache.ttl(key), WHATSAPP_WEBHOOK_WAMID_PROCESSING_TTL_SECONDS)
+        self.assertLessEqual(cache.ttl(key), WHATSAPP_WEBHOOK_WAMID_CLAIM_TTL_SECONDS)
+
+def _graph_response(status_code: int, body: dict | None = None, headers: dict | None = None):
+    return MagicMock(status_code=status_code, json=lambda: body or {}, headers=headers or {})
+
+def _media_download_response(chunks: list[bytes], content_type: str, content_length=None):
+    headers = {"Content-Type": content_type}
+    if content_length is not None:
+        headers["Content-Length"] = str(content_length)
+    response = _graph_response(200, headers=headers)
+    response.iter_content.side_effect = lambda chunk_size: iter(chunks)
+    return response
+
+@patch("api.whatsapp.graph._graph_token", return_value="token")
+@patch("api.whatsapp.graph.time.sleep")
+class WhatsappGraphClientTests(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        from api.whatsapp.graph import GraphClient
+
+        cache.clear()
+        self.client = GraphClient()
+
+    def test_retries_rate_limited_send_then_succeeds(self, mock_sleep, _token):
+        with patch.object(
+            self.client,
+            "_send",
+            side_effect=[_graph_response(429), _graph_response(200, {"ok": True})],
+        ) as mock_send:
+            response = self.client.post("pnid/messages", phone_number_id="pnid", json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(mock_send.call_args.kwargs["headers"]["Authorization"], "Bearer token")
+        mock_sleep.assert_called_once()
+        snapshot = self.client.metrics.snapshot()
+        self.assertEqual((snapshot["calls"], snapshot["errors"], snapshot["retries"]), (2, 1, 1))
+
+    def test_retries_throughput_error_code_and_honors_retry_after(self, mock_sleep, _token):
+        throttled = _graph_response(400, {"error": {"code": 130429}}, {"Retry-After": "3"})
+        with patch.object(
+            self.client, "_send", side_effect=[throttled, _graph_response(200)]
+        ):
+            self.client.post("pnid/messages", phone_number_id="pnid", json={})
+        mock_sleep.assert_called_once_with(3.0)
+
+    def test_server_error_is_retried_for_reads_only(self, mock_sleep, _token):
+        with patch.object(self.client, "_send", return_value=_graph_response(500)) as mock_send:
+            self.assertEqual(self.client.post("pnid/messages", json={}).status_code, 500)
+            self.assertEqual(mock_send.call_count, 1)
+
+            mock_send.reset_mock()
+            self.client.get("media-id")
+            self.assertEqual(mock_send.call_count, self.client.max_retries + 1)
+
+    def test_connection_reset_is_retried_for_reads_only(self, mock_sleep, _token):
+        import requests
+
+        reset = requests.ConnectionError("Connection reset by peer")
+        with patch.object(self.client, "_send", side_effect=reset) as mock_send:
+            with self.assertRaises(requests.ConnectionError):
+                self.client.post("pnid/messages", json={})
+            self.assertEqual(mock_send.call_count, 1)
+
+            mock_send.reset_mock()
+            with self.assertRaises(requests.ConnectionError):
+                self.client.get("media-id")
+            self.assertEqual(mock_send.call_count, self.client.max_retries + 1)
+
+    def test_send_is_retried_when_the_connection_was_never_made(self, mock_sleep, _token):
+        import requests
+        from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+        refused = requests.ConnectionError(
+            MaxRetryError(None, "/messages", NewConnectionError(None, "Connection refused"))
+        )
+        attempts = [refused, requests.ConnectTimeout(), _graph_response(200)]
+        with patch.object(self.client, "_send", side_effect=attempts) as mock_send:
+            response = self.client.post("pnid/messages", json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_send.call_count, 3)
+
+    def test_plain_client_errors_are_returned_without_retry(self, mock_sleep, _token):
+        bad = _graph_response(400, {"error": {"code": 100, "message": "Invalid parameter"}})
+        with patch.object(self.client, "_send", return_value=bad) as mock_send:
+            self.assertIs(self.client.post("pnid/messages", json={}), bad)
+        mock_send.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_token_bucket_paces_sends_per_number(self, mock_sleep, _token):
+        from django.test import override_settings
+
+        from api.whatsapp.graph import GraphRateLimited
+
+        with override_settings(WHATSAPP_GRAPH_MESSAGES_PER_SECOND=2):
+            self.client.throttle("pnid-slow")
+            self.client.throttle("pnid-slow")
+            self.client.throttle("pnid-other")
+            mock_sleep.assert_not_called()
+            # time.sleep is mocked, so the bucket never refills: the wait is capped.
+            with self.assertRaises(GraphRateLimited):
+                self.client.throttle("pnid-slow")
+        self.assertTrue(mock_sleep.called)
+        self.assertEqual(self.client.metrics.snapshot()["throttled"], 1)
+
+@patch("api.whatsapp.graph._graph_token", return_value="token")
+class WhatsappMediaStreamingTests(SimpleTestCase):
+    MEDIA_URL = "https://lookaside.fbsbx.com/whatsapp_business/attachments/?id=1"
+
+    def test_download_spools_chunks_without_buffering_response(self, _token):
+        from api.whatsapp.media import download_whatsapp_media
+
+        response = _media_download_response([b"ab", b"cd"], "image/png; charset=binary")
+        with patch("api.whatsapp.graph.GraphClient._send", return_value=response) as mock_send:
+            with download_whatsapp_media("m1", direct_url=self.MEDIA_URL) as media:
+                self.assertEqual((media.mime_type, media.size), ("image/png", 4))
+                self.assertEqual(media.file.read(), b"abcd")
+        self.assertTrue(mock_send.call_args.kwargs["stream"])
+        response.close.assert_called_once()
+
+    def test_download_rejects_oversized_media(self, _token):
+        from api.whatsapp.media import download_whatsapp_media
+
+        declared = _media_download_response([b"x" * 10], "application/pdf", content_length=10)
+        with patch("api.whatsapp.graph.GraphClient._send", return_value=declared):
+            with self.assertRaises(ValueError):
+                with download_whatsapp_media("m1", direct_url=self.MEDIA_URL, max_bytes=5):
+                    pass
+        declared.iter_content.assert_not_called()
+
+        undeclared = _media_download_response([b"xxx", b"xxx"], "application/pdf")
+        with patch("api.whatsapp.graph.GraphClient._send", return_value=undeclared):
+            with self.assertRaises(ValueError):
+                with download_whatsapp_media("m1", direct_url=self.MEDIA_URL, max_bytes=5):
+                    pass
+
+    def test_download_closes_spool_when_stream_breaks(self, _token):
+        import tempfile
+
+        import requests
+
+        from api.whatsapp.media import download_whatsapp_media
+
+        def broken_stream(chunk_size):
+            yield b"ab"
+            raise requests.ConnectionError("reset mid-stream")
+
+        response = _media_download_response([], "application/pdf")
+        response.iter_content.side_effect = broken_stream
+        spools = []
+        real_spool = tempfile.SpooledTemporaryFile
+
+        def tracking_spool(*args, **kwargs):
+            spools.append(real_spool(*args, **kwargs))
+            return spools[-1]
+
+        with patch("api.whatsapp.graph.GraphClient._send", return_value=response), patch(
+            "api.whatsapp.media.tempfile.SpooledTemporaryFile", side_effect=tracking_spool
+        ):
+            with self.assertRaises(requests.ConnectionError):
+                with download_whatsapp_media("m1", direct_url=self.MEDIA_URL):
+                    pass
+        self.assertTrue(spools[0].closed)
+        response.close.assert_called_once()
+
+    def test_multipart_stream_matches_requests_encoding_and_rewinds(self, _token):
+        import io
+
+        import requests
+
+        from api.whatsapp.media import MultipartFileStream
+
+        payload = b"\x89PNG" + b"z" * 5000
+        body = MultipartFileStream(
+            {"messaging_product": "whatsapp", "type": "image"},
+            field_name="file",
+            filename="pic.png",
+            content_type="image/png",
+            fileobj=io.BytesIO(payload),
+            size=len(payload),
+        )
+        first = b"".join(iter(lambda: body.read(1000), b""))
+        self.assertEqual(len(first), len(body))
+        body.seek(0)
+        self.assertEqual(body.read(), first)
+
+        boundary = body.content_type.split("boundary=")[1]
+        expected = requests.Request(
+            "POST",
+            "https://example.com",
+            data={"messaging_product": "whatsapp", "type": "image"},
+            files={"file": ("pic.png", payload, "image/png")},
+        ).prepare()
+        expected_body = expected.body.replace(
+            expected.headers["Content-Type"].split("boundary=")[1].encode(), boundary.encode()
+        )
+        self.assertEqual(first, expected_body)
+
+    def test_upload_streams_body_and_rewinds_on_retry(self, _token):
+        import io
+
+        from api.whatsapp.outbound_media import upload_whatsapp_media
+
+        sent = []
+
+        def fake_send(method, url, **kwargs):
+            sent.append((kwargs["headers"]["Content-Type"], kwargs["data"].read()))
+            return _graph_response(503) if len(sent) == 1 else _graph_response(200, {"id": "mid"})
+
+        with patch("api.whatsapp.graph.GraphClient._send", side_effect=fake_send), patch(
+            "api.whatsapp.graph.time.sleep"
+        ):
+            media_id = upload_whatsapp_media(
+                "pnid",
+                fileobj=io.BytesIO(b"%PDF data"),
+                size=9,
+                mime_type="application/pdf",
+                wa_type="document",
+                filename="doc.pdf",
+            )
+        self.assertEqual(media_id, "mid")
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(sent[0], sent[1])
+        self.assertTrue(sent[0][0].startswith("multipart/form-data; boundary="))
+        self.assertIn(b"%PDF data", sent[0][1])
+
+class WhatsappDeliveryStatusTests(TestCase):
+    def setUp(self):
+        from api.ai_layers.models import LanguageModel
+        from api.consumption.models import Currency
+        from api.providers.models import AIProvider
+
+        Currency.objects.get_or_create(
+            name="Compute Unit", defaults={"one_usd_is": 1000}
+        )
+        provider = AIProvider.objects.create(name="OpenAI-wa-status")
+        LanguageModel.objects.create(
+            provider=provider, slug="gpt-wa-status", name="GPT WA Status"
+        )
+        user = User.objects.create_user(username="wsstatus", password="x")
+        agent = Agent.objects.create(name="Test WA status", salute="hi")
+        ws = WSNumber.objects.create(
+            user=user, agent=agent, number="111222333", platform_id="pnid-status"
+        )
+        conv = Conversation.objects.create(
+            user=None, ws_number=ws, whatsapp_user_number="5491111"
+        )
+        self.reply = Message.objects.create(
+            conversation=conv,
+            type="assistant",
+            text="hello",
+            metadata={"whatsapp_wamid": "wamid.out.text", "whatsapp_media_wamids": ["wamid.out.img"]},
+        )
+
+    def _deliver(self, *statuses):
+        from api.whatsapp.actions import handle_webhook
+
+        handle_webhook(
+            {
+                "entry": [
+                    {
+                        "changes": [
+                            {
+                                "value": {
+                                    "metadata": {"phone_number_id": "pnid-status"},
+                                    "statuses": [
+                                        {
+                                            "id": wamid,
+                                            "status": status,
+                                            "timestamp": "1700000000",
+                                            "recipient_id": "5491111",
+                                        }
+                                        for wamid, status in statuses
+                                    ],
+                                }
+                            }
+                        ]
+                    }
+                ]
+            }
+        )
+        self.reply.refresh_from_db()
+        return self.reply.metadata["whatsapp_delivery"]
+
+    def test_statuses_are_recorded_per_wamid(self):
+        delivery = self._deliver(("wamid.out.text", "delivered"), ("wamid.out.img", "sent"))
+        self.assertEqual(delivery["wamid.out.text"]["status"], "delivered")
+        self.assertEqual(delivery["wamid.out.img"]["status"], "sent")
+
+    def test_out_of_order_statuses_never_move_backwards(self):
+        self._deliver(("wamid.out.text", "read"))
+        delivery = self._deliver(("wamid.out.text", "delivered"), ("wamid.out.text", "sent"))
+        self.assertEqual(delivery["wamid.out.text"]["status"], "read")
+
 @patch("api.whatsapp.views.FeatureFlagService.is_feature_enabled", return_value=(True, "on"))
 class WhatsappNumbersManagementApiTests(TestCase):
     """Authenticated WhatsApp customization API (flag-gated; lines are provisioned in admin)."""
@@ -904,7 +1493,7 @@ class WhatsappEmbeddedMediaToolTests(TestCase):
         is_feature_enabled_mock.assert_not_called()
         self.assertEqual(result.output_format, "mp3")
 
-    @patch("api.ai_layers.tools.generate_video._generate_video_veo")
+    @patch("api.ai_layers.tools.generate_video._submit_veo_generation")
     def test_generate_video_skips_video_tools_flag_for_whatsapp_conversation(
         self, veo_mock, is_feature_enabled_mock
     ):
@@ -913,7 +1502,7 @@ class WhatsappEmbeddedMediaToolTests(TestCase):
 
         is_feature_enabled_mock.return_value = (False, "off")
         conv = get_or_create_whatsapp_conversation(self.ws, "5939000000003")
-        veo_mock.return_value = (b"fake-mp4-bytes", 8.0)
+        veo_mock.return_value = "projects/p/locations/l/operations/op-1"
 
         result = _generate_video_impl(
             prompt="ocean waves at sunset",
@@ -925,6 +1514,7 @@ class WhatsappEmbeddedMediaToolTests(TestCase):
         )
 
         is_feature_enabled_mock.assert_not_called()
+        self.assertEqual(result.status, "pending")
         self.assertEqual(result.duration_seconds, 8.0)
 
 class WhatsappOutboundMediaHelperTests(TestCase):
@@ -962,10 +1552,13 @@ class WhatsappOutboundMediaHelperTests(TestCase):
 
 class WhatsappDeliverReplyTests(TestCase):
     def setUp(self):
+        from django.core.cache import cache
+
         from api.ai_layers.models import LanguageModel
         from api.consumption.models import Currency
         from api.providers.models import AIProvider
 
+        cache.clear()
         Currency.objects.get_or_create(
             name="Compute Unit", defaults={"one_usd_is": 1000}
         )
@@ -993,18 +1586,37 @@ class WhatsappDeliverReplyTests(TestCase):
         self.conv.whatsapp_last_inbound_wamid = "wamid.inbound.test"
         self.conv.save(update_fields=["whatsapp_last_inbound_wamid", "updated_at"])
 
+    def _deliver(self, **kwargs):
+        """Queue the reply, then drain the outbound queue inline once the test transaction "commits"."""
+        from api.whatsapp.actions import deliver_whatsapp_reply
+        from api.whatsapp.outbound import drain_whatsapp_outbound
+
+        with patch(
+            "api.whatsapp.tasks.whatsapp_outbound_drain_task.delay",
+            side_effect=lambda **kw: drain_whatsapp_outbound(**kw),
+        ), patch("api.whatsapp.tasks.whatsapp_send_reaction_task.delay"):
+            with self.captureOnCommitCallbacks(execute=True):
+                deliver_whatsapp_reply(conversation=self.conv, **kwargs)
+
+    def _attach(self, assistant, name="cat.png", content_type="image/png"):
+        from django.core.files.base import ContentFile
+
+        att = MessageAttachment.objects.create(
+            conversation=self.conv, message=assistant, kind="file", content_type=content_type
+        )
+        att.file.save(name, ContentFile(b"\x89PNG"), save=True)
+        return att
+
     @patch("api.whatsapp.actions._pick_whatsapp_reaction", return_value="👍")
     @patch("api.whatsapp.actions.send_reaction")
     @patch("api.whatsapp.actions.send_message", return_value="wamid.text.out")
     @patch(
-        "api.whatsapp.outbound_media.deliver_whatsapp_attachments",
-        return_value=["wamid.media.out"],
+        "api.whatsapp.outbound_media.send_attachment_to_whatsapp",
+        return_value="wamid.media.out",
     )
     def test_deliver_whatsapp_reply_sends_media_then_text(
-        self, mock_deliver_media, mock_send_text, _mock_reaction, _mock_pick
+        self, mock_send_media, mock_send_text, _mock_reaction, _mock_pick
     ):
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         user_msg = Message.objects.create(
             conversation=self.conv,
             type="user",
@@ -1016,16 +1628,18 @@ class WhatsappDeliverReplyTests(TestCase):
             type="assistant",
             text="Here is your image!",
         )
+        att = self._attach(assistant)
 
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid="wamid.inbound.test",
         )
 
-        mock_deliver_media.assert_called_once()
-        call_kwargs = mock_deliver_media.call_args.kwargs
-        self.assertEqual(call_kwargs["reply_to_message_id"], "wamid.inbound.test")
+        mock_send_media.assert_called_once()
+        self.assertEqual(mock_send_media.call_args[0][2].id, att.id)
+        self.assertEqual(
+            mock_send_media.call_args.kwargs["reply_to_message_id"], "wamid.inbound.test"
+        )
         mock_send_text.assert_called_once()
         self.assertEqual(mock_send_text.call_args[0][2], "Here is your image!")
         self.assertIsNone(mock_send_text.call_args[0][3])
@@ -1042,25 +1656,23 @@ class WhatsappDeliverReplyTests(TestCase):
     @patch("api.whatsapp.actions.send_reaction")
     @patch("api.whatsapp.actions.send_message")
     @patch(
-        "api.whatsapp.outbound_media.deliver_whatsapp_attachments",
-        return_value=["wamid.media.only"],
+        "api.whatsapp.outbound_media.send_attachment_to_whatsapp",
+        return_value="wamid.media.only",
     )
     def test_deliver_skips_text_when_body_empty(
-        self, mock_deliver_media, mock_send_text, _mock_reaction, _mock_pick
+        self, mock_send_media, mock_send_text, _mock_reaction, _mock_pick
     ):
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         assistant = Message.objects.create(
             conversation=self.conv,
             type="assistant",
             text="   ",
         )
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._attach(assistant)
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid=None,
         )
-        mock_deliver_media.assert_called_once()
+        mock_send_media.assert_called_once()
         mock_send_text.assert_not_called()
         assistant.refresh_from_db()
         self.assertEqual(
@@ -1071,12 +1683,9 @@ class WhatsappDeliverReplyTests(TestCase):
     @patch("api.whatsapp.actions._pick_whatsapp_reaction", return_value="👍")
     @patch("api.whatsapp.actions.send_reaction")
     @patch("api.whatsapp.actions.send_message", return_value="wamid.text.only")
-    @patch("api.whatsapp.outbound_media.deliver_whatsapp_attachments", return_value=[])
     def test_deliver_text_uses_reply_when_no_media(
-        self, _mock_media, mock_send_text, _mock_reaction, _mock_pick
+        self, mock_send_text, _mock_reaction, _mock_pick
     ):
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         Message.objects.create(
             conversation=self.conv,
             type="user",
@@ -1087,8 +1696,7 @@ class WhatsappDeliverReplyTests(TestCase):
             type="assistant",
             text="Hello back",
         )
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid="wamid.inbound.test",
         )
@@ -1098,12 +1706,9 @@ class WhatsappDeliverReplyTests(TestCase):
     @patch("api.whatsapp.actions._pick_whatsapp_reaction", return_value="👍")
     @patch("api.whatsapp.actions.send_reaction")
     @patch("api.whatsapp.actions.send_message", return_value="wamid.text.clean")
-    @patch("api.whatsapp.outbound_media.deliver_whatsapp_attachments", return_value=[])
     def test_deliver_strips_internal_attachment_manifest_from_text(
-        self, _mock_media, mock_send_text, _mock_reaction, _mock_pick
+        self, mock_send_text, _mock_reaction, _mock_pick
     ):
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         Message.objects.create(
             conversation=self.conv,
             type="user",
@@ -1119,8 +1724,7 @@ class WhatsappDeliverReplyTests(TestCase):
                 "Espero que sea lo que buscabas."
             ),
         )
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid="wamid.inbound.test",
         )
@@ -1132,7 +1736,7 @@ class WhatsappDeliverReplyTests(TestCase):
             "Espero que sea lo que buscabas.",
         )
 
-    @patch("api.whatsapp.outbound_media.requests.post")
+    @patch("api.whatsapp.graph.GraphClient._send")
     def test_send_attachment_prefers_https_link(self, mock_post):
         from django.core.files.base import ContentFile
         from django.test import override_settings
@@ -1268,8 +1872,6 @@ class WhatsappDeliverReplyTests(TestCase):
     ):
         from django.core.files.base import ContentFile
 
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         prior = MessageAttachment.objects.create(
             conversation=self.conv,
             message=None,
@@ -1294,8 +1896,7 @@ class WhatsappDeliverReplyTests(TestCase):
             ),
         )
 
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid="wamid.inbound.test",
         )
@@ -1325,8 +1926,6 @@ class WhatsappDeliverReplyTests(TestCase):
     ):
         from django.core.files.base import ContentFile
 
-        from api.whatsapp.actions import deliver_whatsapp_reply
-
         image = MessageAttachment.objects.create(
             conversation=self.conv,
             message=None,
@@ -1341,8 +1940,7 @@ class WhatsappDeliverReplyTests(TestCase):
             text=f"Aqui el grafico:\n\n![Grafico](attachment:{image.id})\n\nListo.",
         )
 
-        deliver_whatsapp_reply(
-            conversation=self.conv,
+        self._deliver(
             assistant_message_id=assistant.id,
             inbound_wamid=None,
         )
@@ -1354,6 +1952,162 @@ class WhatsappDeliverReplyTests(TestCase):
         self.assertNotIn("attachment:", body)
         self.assertNotIn("Grafico", body)
 
+    @patch("api.whatsapp.outbound._retry_delay", return_value=0)
+    @patch("api.whatsapp.outbound._schedule_drain")
+    @patch("api.whatsapp.actions.send_message")
+    def test_outbound_queue_retries_step_without_reordering_replies(
+        self, mock_send_text, mock_schedule, _delay
+    ):
+        from api.whatsapp.outbound import (
+            drain_whatsapp_outbound,
+            enqueue_whatsapp_outbound,
+            outbound_reply_steps,
+            pending_whatsapp_outbound,
+        )
+
+        first = Message.objects.create(conversation=self.conv, type="assistant", text="first")
+        second = Message.objects.create(conversation=self.conv, type="assistant", text="second")
+        conv_id = str(self.conv.id)
+        for message in (first, second):
+            enqueue_whatsapp_outbound(
+                conv_id,
+                outbound_reply_steps(
+                    message_id=message.id,
+                    phone_number_id="pnid-deliver",
+                    to="5939111222333",
+                    body=message.text,
+                    attachment_ids=[],
+                    reply_to=None,
+                ),
+            )
+        mock_send_text.side_effect = [RuntimeError("graph down"), "wamid.first", "wamid.second"]
+
+        self.assertEqual(drain_whatsapp_outbound(conv_id)["status"], "retrying")
+        mock_schedule.assert_called_once()
+        pending = pending_whatsapp_outbound(conv_id)
+        self.assertEqual([step["message_id"] for step in pending], [first.id, second.id])
+        self.assertEqual(pending[0]["attempts"], 1)
+
+        result = drain_whatsapp_outbound(conv_id)
+        self.assertEqual((result["status"], result["delivered"]), ("drained", 2))
+        self.assertEqual(
+            [call.args[2] for call in mock_send_text.call_args_list], ["first", "first", "second"]
+        )
+        self.assertEqual(pending_whatsapp_outbound(conv_id), [])
+        first.refresh_from_db()
+        self.assertEqual(first.metadata["whatsapp_wamid"], "wamid.first")
+        self.assertIn("whatsapp_outbound_latency_ms", first.metadata)
+
+    @patch("api.whatsapp.actions.send_message")
+    def test_outbound_queue_has_one_drainer_per_conversation(self, mock_send_text):
+        from django_redis import get_redis_connection
+
+        from api.whatsapp.outbound import _outbound_redis_keys, drain_whatsapp_outbound
+
+        _queue_key, lock_key = _outbound_redis_keys(str(self.conv.id))
+        get_redis_connection("default").set(lock_key, "other-worker", ex=30)
+        self.assertEqual(drain_whatsapp_outbound(str(self.conv.id))["status"], "busy")
+        mock_send_text.assert_not_called()
+
+    @patch("api.whatsapp.outbound._schedule_drain")
+    @patch("api.whatsapp.actions.send_message")
+    def test_outbound_queue_does_not_retry_permanent_graph_errors(
+        self, mock_send_text, mock_schedule
+    ):
+        from unittest.mock import Mock
+
+        from api.whatsapp.graph import GraphRequestError
+        from api.whatsapp.outbound import (
+            drain_whatsapp_outbound,
+            enqueue_whatsapp_outbound,
+            outbound_reply_steps,
+        )
+
+        message = Message.objects.create(conversation=self.conv, type="assistant", text="hi")
+        enqueue_whatsapp_outbound(
+            str(self.conv.id),
+            outbound_reply_steps(
+                message_id=message.id,
+                phone_number_id="pnid-deliver",
+                to="5939111222333",
+                body="hi",
+                attachment_ids=[],
+                reply_to=None,
+            ),
+        )
+        refused = Mock(status_code=400)
+        refused.json.return_value = {"error": {"code": 131026, "message": "undeliverable"}}
+        mock_send_text.side_effect = GraphRequestError("Failed to send message.", refused)
+
+        with patch("api.messaging.takeover.emit_message_delivery_failed") as mock_emit:
+            result = drain_whatsapp_outbound(str(self.conv.id))
+
+        self.assertEqual((result["status"], result["failed"]), ("drained", 1))
+        mock_send_text.assert_called_once()
+        mock_schedule.assert_not_called()
+        message.refresh_from_db()
+        self.assertEqual(message.metadata["whatsapp_outbound_failures"][0]["attempts"], 1)
+        conversation, failed_message, error = mock_emit.call_args.args
+        self.assertEqual((conversation.id, failed_message.id), (self.conv.id, message.id))
+        self.assertIn("Failed to send message.", error)
+
+    def test_graph_throttling_errors_are_not_permanent(self):
+        from unittest.mock import Mock
+
+        from api.whatsapp.graph import GraphRequestError
+
+        def error(status, code=None):
+            response = Mock(status_code=status)
+            response.json.return_value = {"error": {"code": code}} if code else {}
+            return GraphRequestError("failed", response)
+
+        self.assertTrue(error(400, 100).permanent)
+        self.assertFalse(error(429).permanent)
+        self.assertFalse(error(400, 131056).permanent)
+        self.assertFalse(error(503).permanent)
+
+    @patch("api.whatsapp.outbound.enqueue_whatsapp_outbound")
+    def test_operator_send_goes_through_outbound_queue(self, mock_enqueue):
+        self.conv.whatsapp_user_number = "5939111222333"
+        self.conv.whatsapp_last_inbound_wamid = "wamid.in"
+        self.conv.save(update_fields=["whatsapp_user_number", "whatsapp_last_inbound_wamid"])
+
+        msg = self.conv.ws_number.send_message(self.conv, "from the operator")
+
+        self.assertEqual((msg.type, msg.text), ("assistant", "from the operator"))
+        conversation_id, steps = mock_enqueue.call_args.args
+        self.assertEqual(conversation_id, str(self.conv.id))
+        self.assertEqual(
+            [(s["kind"], s["message_id"], s["reply_to"]) for s in steps],
+            [("text", msg.id, "wamid.in")],
+        )
+
+    @patch("api.whatsapp.outbound.enqueue_whatsapp_outbound")
+    @patch(
+        "api.whatsapp.views.FeatureFlagService.is_feature_enabled",
+        return_value=(True, None),
+    )
+    def test_operator_send_endpoint_reports_queued(self, _flag, mock_enqueue):
+        import json
+
+        from rest_framework.test import APIClient
+
+        login_token, _ = Token.get_or_create(user=self.owner, token_type="login")
+        response = APIClient().post(
+            f"/v1/whatsapp/conversations/{self.conv.id}",
+            data=json.dumps({"message": "from the operator"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Token {login_token.key}",
+        )
+
+        self.assertEqual(response.status_code, 202, response.content)
+        body = response.json()
+        self.assertEqual(body["status"], "queued")
+        message = Message.objects.get(id=body["message_id"])
+        self.assertEqual(message.text, "from the operator")
+        mock_enqueue.assert_called_once()
+
+
 class WhatsappNumberAccessScopeTests(TestCase):
     def setUp(self):
         from django.utils import timezone
@@ -1807,3 +2561,111 @@ class WhatsappNumberAccessScopeTests(TestCase):
         mock_send.assert_not_called()
         contact = WSContact.objects.get(ws_number=self.ws, number=meta_from)
         self.assertEqual(contact.user_id, mx_member.id)
+
+class WhatsappInboundRoutingCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        from api.ai_layers.models import LanguageModel
+        from api.consumption.models import Currency
+        from api.providers.models import AIProvider
+
+        cache.clear()
+        Currency.objects.get_or_create(
+            name="Compute Unit", defaults={"one_usd_is": 1000}
+        )
+        provider = AIProvider.objects.create(name="OpenAI-wa-routing")
+        LanguageModel.objects.create(
+            provider=provider, slug="gpt-wa-routing", name="GPT WA Routing"
+        )
+        self.owner = User.objects.create_user(username="wa_routing_owner", password="x")
+        self.org = Organization.objects.create(name="WA Routing Org", owner=self.owner)
+        self.agent = Agent.objects.create(
+            name="WA Routing Agent", salute="hi", organization=self.org
+        )
+        self.ws = WSNumber.objects.create(
+            organization=self.org,
+            agent=self.agent,
+            number="15553330000",
+            platform_id="pnid-routing",
+        )
+
+    def _resolve(self, phone="5491111000111", platform_id="pnid-routing"):
+        from api.whatsapp.actions import resolve_inbound_conversation
+
+        webhook_data = {
+            "entry": [{"changes": [{"value": {"metadata": {"phone_number_id": platform_id}}}]}]
+        }
+        return resolve_inbound_conversation(webhook_data, {"from": phone, "id": "wamid.r"})
+
+    def test_steady_state_routing_needs_no_queries(self):
+        ws_number, conv = self._resolve()
+        with self.assertNumQueries(0):
+            cached_ws, cached_conv = self._resolve()
+        self.assertEqual(cached_ws.id, ws_number.id)
+        self.assertEqual(cached_conv.id, conv.id)
+        self.assertIsNotNone(cached_conv.ws_contact_id)
+
+        self.assertIsNone(self._resolve(platform_id="pnid-unknown"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._resolve(platform_id="pnid-unknown"))
+
+    def test_repointed_number_and_closed_thread_are_invalidated(self):
+        _ws, conv = self._resolve()
+
+        conv.status = "inactive"
+        conv.save(update_fields=["status", "updated_at"])
+        _ws, new_conv = self._resolve()
+        self.assertNotEqual(new_conv.id, conv.id)
+        self.assertEqual(new_conv.status, "active")
+
+        ws = WSNumber.objects.get(id=self.ws.id)
+        ws.platform_id = "pnid-routing-new"
+        ws.save()
+        self.assertIsNone(self._resolve())
+        self.assertEqual(self._resolve(platform_id="pnid-routing-new")[0].id, self.ws.id)
+
+    @patch("api.whatsapp.actions.send_message")
+    def test_access_decisions_follow_profile_changes(self, mock_send):
+        from api.authenticate.models import UserProfile
+
+        self.ws.access_mode = WSNumber.ACCESS_MODE_ORGANIZATION
+        self.ws.save(update_fields=["access_mode", "updated_at"])
+        member = User.objects.create_user(username="wa_routing_member", password="x")
+        profile = UserProfile.objects.get(user=member)
+        profile.organization = self.org
+        profile.is_active = True
+        profile.save()
+
+        self.assertIsNone(self._resolve(phone="15554440000"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._resolve(phone="15554440000"))
+        self.assertEqual(mock_send.call_count, 2)
+
+        profile.phone_numbers = [{"country_code": "1", "number": "5554440000", "is_default": True}]
+        profile.save()
+        _ws, conv = self._resolve(phone="15554440000")
+        self.assertEqual(conv.ws_contact.user_id, member.id)
+
+    @patch("api.whatsapp.actions.send_message")
+    def test_unrelated_saves_keep_cached_access_decisions(self, mock_send):
+        from api.authenticate.models import UserProfile
+
+        self.ws.access_mode = WSNumber.ACCESS_MODE_ORGANIZATION
+        self.ws.save(update_fields=["access_mode", "updated_at"])
+        self.assertIsNone(self._resolve(phone="15554440000"))
+
+        outsider = User.objects.create_user(username="wa_routing_outsider", password="x")
+        other_org = Organization.objects.create(name="Other Org", owner=outsider)
+        profile = UserProfile.objects.get(user=outsider)
+        profile.organization = other_org
+        profile.phone_numbers = [{"country_code": "1", "number": "5554440000", "is_default": True}]
+        profile.save()
+        self.org.name = "Renamed WA Routing Org"
+        self.org.save()
+        owner_profile = UserProfile.objects.get(user=self.owner)
+        owner_profile.bio = "edited"
+        owner_profile.save()
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._resolve(phone="15554440000"))
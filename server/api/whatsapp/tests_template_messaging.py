@@ -41,8 +41,8 @@ from api.whatsapp.template_send import (
 from api.whatsapp.template_sync import sync_default_whatsapp_templates
 
 class WhatsAppSendTemplateMessageGraphTests(SimpleTestCase):
-    @patch("api.whatsapp.actions.requests.post")
-    @patch("api.whatsapp.actions._graph_token", return_value="token")
+    @patch("api.whatsapp.graph.GraphClient._send")
+    @patch("api.whatsapp.graph._graph_token", return_value="token")
     def test_send_template_message_payload(self, _token, mock_post):
         from api.whatsapp.actions import send_template_message
 
@@ -72,8 +72,8 @@ class WhatsAppSendTemplateMessageGraphTests(SimpleTestCase):
         self.assertEqual(payload["template"]["language"]["code"], "en")
         self.assertEqual(payload["to"], "525512345678")
 
-    @patch("api.whatsapp.actions.requests.post")
-    @patch("api.whatsapp.actions._graph_token", return_value="token")
+    @patch("api.whatsapp.graph.GraphClient._send")
+    @patch("api.whatsapp.graph._graph_token", return_value="token")
     def test_send_template_message_raises_meta_error(self, _token, mock_post):
         from api.whatsapp.actions import send_template_message
 
@@ -923,6 +923,176 @@ class WhatsAppTemplateSendTests(TestCase):
             )
         self.assertIn("Failed to send WhatsApp template", str(ctx.exception))
 
+class WhatsAppTemplateBroadcastTests(TestCase):
+    def setUp(self):
+        WhatsAppTemplateSendTests.setUp(self)
+        self.unlinked_contact = WSContact.objects.create(
+            ws_number=self.ws, number="525599999999"
+        )
+
+    def _create(self, audience):
+        from api.whatsapp.template_broadcast import create_template_broadcast
+
+        with patch(
+            "api.whatsapp.tasks.whatsapp_template_broadcast_task.delay"
+        ) as mock_delay, self.captureOnCommitCallbacks(execute=True):
+            broadcast = create_template_broadcast(
+                actor_user_id=self.owner.id,
+                organization_id=self.org.id,
+                agent_id=self.agent.id,
+                sender_id=self.ws.id,
+                template_id="task_completed_en",
+                template_variables={"body": ["Quarterly close", "Done"]},
+                audience=audience,
+                source_conversation_id=str(self.source_conversation.id),
+            )
+        return broadcast, mock_delay
+
+    @patch("api.whatsapp.template_broadcast.send_template_message")
+    def test_contact_list_broadcast_sends_verified_and_reports_skipped(self, mock_send):
+        from api.whatsapp.models import WSTemplateBroadcastRecipient
+        from api.whatsapp.tasks import (
+            whatsapp_template_broadcast_chunk_task,
+            whatsapp_template_broadcast_task,
+        )
+
+        mock_send.return_value = "wamid.broadcast.1"
+        broadcast, mock_delay = self._create(
+            {"ws_contact_ids": [self.contact.id, self.unlinked_contact.id, 999999]}
+        )
+        mock_delay.assert_called_once_with(broadcast_id=str(broadcast.id))
+        self.assertEqual((broadcast.total, broadcast.skipped), (3, 2))
+
+        with patch(
+            "api.whatsapp.tasks.whatsapp_template_broadcast_chunk_task.delay",
+            side_effect=lambda **kw: whatsapp_template_broadcast_chunk_task.run(**kw),
+        ):
+            whatsapp_template_broadcast_task(broadcast_id=str(broadcast.id))
+
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.args, ("pnid-tpl", self.target_phone))
+        self.assertEqual(mock_send.call_args.kwargs["template_name"], "task_completed")
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.status, "completed")
+        self.assertEqual((broadcast.sent, broadcast.failed, broadcast.skipped), (1, 0, 2))
+        sent = WSTemplateBroadcastRecipient.objects.get(broadcast=broadcast, status="sent")
+        self.assertEqual(sent.wamid, "wamid.broadcast.1")
+        self.assertEqual(sent.delivery_conversation_id, self.wa_conversation.id)
+        msg = Message.objects.filter(conversation=self.wa_conversation).latest("created_at")
+        self.assertEqual(msg.metadata["whatsapp_template_broadcast_id"], str(broadcast.id))
+        self.assertIn("Quarterly close", msg.text)
+
+        # A redelivered chunk never messages a recipient twice.
+        from api.whatsapp.template_broadcast import send_template_broadcast_chunk
+
+        send_template_broadcast_chunk(str(broadcast.id), [sent.id])
+        mock_send.assert_called_once()
+
+    def test_role_audience_targets_members_with_a_contact_on_the_line(self):
+        from django.utils import timezone
+
+        from api.authenticate.models import Role, RoleAssignment
+
+        role = Role.objects.create(organization=self.org, name="Field", enabled=True)
+        no_phone = User.objects.create_user(username="wa_tpl_nophone", password="x")
+        for user in (self.member, no_phone):
+            RoleAssignment.objects.create(
+                user=user,
+                organization=self.org,
+                role=role,
+                from_date=timezone.now().date(),
+            )
+        broadcast, _mock_delay = self._create({"role_id": str(role.id)})
+
+        rows = {r.user_id: r for r in broadcast.recipients.all()}
+        self.assertEqual(rows[self.member.id].status, "pending")
+        self.assertEqual(rows[self.member.id].ws_contact_id, self.contact.id)
+        self.assertEqual(rows[no_phone.id].status, "skipped")
+        self.assertEqual(broadcast.status, "pending")
+
+    def test_audience_requires_exactly_one_selector(self):
+        with self.assertRaises(ValueError):
+            self._create({"tag_id": 1, "ws_contact_ids": [self.contact.id]})
+
+    @patch("api.whatsapp.template_broadcast.send_template_message")
+    def test_throttled_chunk_returns_unsent_recipients(self, mock_send):
+        from api.whatsapp.graph import GraphRateLimited
+        from api.whatsapp.template_broadcast import send_template_broadcast_chunk
+
+        mock_send.side_effect = GraphRateLimited("budget exhausted")
+        broadcast, _mock_delay = self._create({"ws_contact_ids": [self.contact.id]})
+        recipient = broadcast.recipients.get()
+
+        result = send_template_broadcast_chunk(str(broadcast.id), [recipient.id])
+
+        self.assertEqual(result["status"], "throttled")
+        self.assertEqual(result["retry_ids"], [recipient.id])
+        recipient.refresh_from_db()
+        self.assertEqual(recipient.status, "pending")
+        broadcast.refresh_from_db()
+        self.assertNotEqual(broadcast.status, "completed")
+
+    @patch("api.whatsapp.template_broadcast.send_template_message")
+    def test_send_is_not_failed_when_recording_it_breaks(self, mock_send):
+        from api.whatsapp.template_broadcast import send_template_broadcast_chunk
+
+        mock_send.return_value = "wamid.recorded"
+        broadcast, _mock_delay = self._create({"ws_contact_ids": [self.contact.id]})
+        recipient = broadcast.recipients.get()
+
+        with patch(
+            "api.whatsapp.template_broadcast.Message.objects.create",
+            side_effect=RuntimeError("db down"),
+        ):
+            result = send_template_broadcast_chunk(str(broadcast.id), [recipient.id])
+
+        self.assertEqual((result["sent"], result["failed"]), (1, 0))
+        recipient.refresh_from_db()
+        self.assertEqual((recipient.status, recipient.wamid), ("sent", "wamid.recorded"))
+        broadcast.refresh_from_db()
+        self.assertEqual((broadcast.sent, broadcast.failed), (1, 0))
+
+    def test_stale_claims_are_settled_or_requeued(self):
+        from django.utils import timezone
+
+        from api.whatsapp.models import WSTemplateBroadcastRecipient
+        from api.whatsapp.template_broadcast import (
+            WHATSAPP_BROADCAST_SENDING_TIMEOUT,
+            reclaim_stale_broadcast_recipients,
+        )
+
+        broadcast, _mock_delay = self._create({"ws_contact_ids": [self.contact.id]})
+        lost = broadcast.recipients.get()
+        delivered = WSTemplateBroadcastRecipient.objects.create(
+            broadcast=broadcast, phone="573009999999", wamid="wamid.stale"
+        )
+        fresh = WSTemplateBroadcastRecipient.objects.create(
+            broadcast=broadcast, phone="573008888888"
+        )
+        stale_at = timezone.now() - WHATSAPP_BROADCAST_SENDING_TIMEOUT * 2
+        WSTemplateBroadcastRecipient.objects.filter(id__in=[lost.id, delivered.id]).update(
+            status="sending", claimed_at=stale_at
+        )
+        WSTemplateBroadcastRecipient.objects.filter(id=fresh.id).update(
+            status="sending", claimed_at=timezone.now()
+        )
+
+        with patch(
+            "api.whatsapp.tasks.whatsapp_template_broadcast_chunk_task.delay"
+        ) as mock_chunk, self.captureOnCommitCallbacks(execute=True):
+            result = reclaim_stale_broadcast_recipients()
+
+        self.assertEqual(result, {"marked_sent": 1, "requeued": 1})
+        mock_chunk.assert_called_once_with(
+            broadcast_id=str(broadcast.id), recipient_ids=[lost.id]
+        )
+        statuses = dict(broadcast.recipients.values_list("id", "status"))
+        self.assertEqual(statuses[lost.id], "pending")
+        self.assertEqual(statuses[delivered.id], "sent")
+        self.assertEqual(statuses[fresh.id], "sending")
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.sent, 1)
+
 class WhatsAppTemplateToolsTests(TestCase):
     def setUp(self):
         from api.ai_layers.models import LanguageModel
@@ -3,6 +3,8 @@ from .views import (
     webhook,
     WSNumbersView,
     WSTemplatesView,
+    WSTemplateBroadcastsView,
+    WSTemplateBroadcastDetailView,
     WSConversationsView,
     WSConversationDetailView,
     WSNumberDetailView,
@@ -16,6 +18,16 @@ urlpatterns = [
     path("webhook", webhook, name="webhook_handler"),
     path("numbers", WSNumbersView.as_view(), name="ws_numbers"),
     path("templates", WSTemplatesView.as_view(), name="ws_templates"),
+    path(
+        "templates/broadcasts",
+        WSTemplateBroadcastsView.as_view(),
+        name="ws_template_broadcasts",
+    ),
+    path(
+        "templates/broadcasts/<uuid:pk>",
+        WSTemplateBroadcastDetailView.as_view(),
+        name="ws_template_broadcast_detail",
+    ),
     path(
         "numbers/<int:pk>/contacts",
         WSNumberContactsView.as_view(),
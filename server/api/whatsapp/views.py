@@ -31,11 +31,12 @@ from .conversations import (
     whatsapp_conversation_visible_q,
     ws_number_visible_q,
 )
-from .models import WSContact, WSNumber
+from .models import WSContact, WSNumber, WSTemplateBroadcast
 from .serializers import WSContactSerializer, WSNumberSerializer
 from .template_access import templates_for_organization, wstemplate_to_definition
 from .template_registry import template_summary
 from .tasks import async_handle_webhook
+from .template_broadcast import broadcast_progress, create_template_broadcast
 from .webhook_signature import verify_meta_webhook_signature
 
 _WS_ACCESS_MODES = {
@@ -554,12 +555,79 @@ class WSConversationDetailView(View):
             user, conversation
         ):
             msg = deliver_human_message(conversation, takeover, message)
+        else:
+            _require_whatsapp_numbers_management(user)
+            msg = conversation.ws_number.send_message(conversation, message)
+
+        # Delivery happens on the outbound queue; a refusal by Meta is recorded on
+        # the message and pushed to staff as conversation_message_delivery_failed.
+        return JsonResponse(
+            {"message": "Message queued", "message_id": msg.id, "status": "queued"},
+            status=202,
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(token_required, name="dispatch")
+class WSTemplateBroadcastsView(View):
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        _require_whatsapp_numbers_management(user)
+        broadcasts = WSTemplateBroadcast.objects.filter(
+            ws_number__in=WSNumber.objects.filter(ws_number_visible_q(user))
+        ).order_by("-created_at", "-id")[:50]
+        return JsonResponse(
+            {"broadcasts": [broadcast_progress(b) for b in broadcasts]}
+        )
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        _require_whatsapp_numbers_management(user)
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+        try:
+            sender_id = int(data.get("sender_id"))
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "sender_id must be an integer"}, status=400)
+        ws_number = WSNumber.objects.filter(ws_number_visible_q(user), pk=sender_id).first()
+        if not ws_number:
+            return JsonResponse({"error": "WSNumber not found"}, status=404)
+        organization = resolved_organization_for_ws_number(ws_number)
+        if not organization:
             return JsonResponse(
-                {"message": "Message sent successfully", "message_id": msg.id},
-                status=201,
+                {"error": "WhatsApp line has no organization"},
+                status=400,
             )
 
-        _require_whatsapp_numbers_management(user)
-        conversation.ws_number.send_message(conversation, message)
+        try:
+            broadcast = create_template_broadcast(
+                actor_user_id=user.id,
+                organization_id=organization.id,
+                agent_id=ws_number.agent_id,
+                sender_id=ws_number.id,
+                template_id=data.get("template_id") or "",
+                template_variables=data.get("template_variables") or {},
+                audience=data.get("audience") or {},
+                source_conversation_id=data.get("source_conversation_id"),
+            )
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return JsonResponse(broadcast_progress(broadcast), status=201)
 
-        return JsonResponse({"message": "Message sent successfully"}, status=201)
+
+@method_decorator(csrf_exempt, name="dispatch")
+@method_decorator(token_required, name="dispatch")
+class WSTemplateBroadcastDetailView(View):
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        _require_whatsapp_numbers_management(user)
+        broadcast = WSTemplateBroadcast.objects.filter(
+            ws_number__in=WSNumber.objects.filter(ws_number_visible_q(user)),
+            pk=kwargs.get("pk"),
+        ).first()
+        if not broadcast:
+            return JsonResponse({"error": "Broadcast not found"}, status=404)
+        return JsonResponse(broadcast_progress(broadcast, include_recipients=True))
@@ -46,6 +46,16 @@ export const ConversationTakeoverListener = () => {
       void setConversation(conversation.id);
     };
 
+    const handleDeliveryFailed = (raw: RedisNotification<TakeoverSocketPayload>) => {
+      const takeoverPayload = raw?.message;
+      const convId = takeoverPayload?.conversation_id;
+      if (!takeoverPayload || !convId || !conversation?.id || convId !== conversation.id) {
+        return;
+      }
+      toast.error(t("whatsapp-message-delivery-failed-toast"));
+      void setConversation(conversation.id);
+    };
+
     const handleTakeoverUpdated = (
       raw: RedisNotification<TakeoverSocketPayload>
     ) => {
@@ -54,11 +64,13 @@ export const ConversationTakeoverListener = () => {
 
     socket.on("conversation_takeover_updated", handleTakeoverUpdated);
     socket.on("conversation_message_created", refreshIfCurrent);
+    socket.on("conversation_message_delivery_failed", handleDeliveryFailed);
     socket.on("conversation_takeover_inbound", handleInbound);
 
     return () => {
       socket.off("conversation_takeover_updated", handleTakeoverUpdated);
       socket.off("conversation_message_created", refreshIfCurrent);
+      socket.off("conversation_message_delivery_failed", handleDeliveryFailed);
       socket.off("conversation_takeover_inbound", handleInbound);
     };
   }, [conversation?.id, setConversation, socket, t]);
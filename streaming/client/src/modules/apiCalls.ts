@@ -31,7 +31,7 @@ import {
   TDataExportManifest,
   TOrganizationTenant,
 } from "../types";
-import { TReactionTemplate, TUserData, TUserProfile } from "../types/chatTypes";
+import { TMessage, TReactionTemplate, TUserData, TUserProfile } from "../types/chatTypes";
 import { TAgent, TModel } from "../types/agents";
 import { TUserPreferences } from "./storeTypes";
 import type { TTenantBranding } from "./storeTypes";
@@ -182,6 +182,30 @@ export const getConversation = async (conversationId: string) => {
   }
 };
 
+export type TConversationMessagesWindow = {
+  results: TMessage[];
+  has_more_before: boolean;
+  has_more_after: boolean;
+  before: string | null;
+  after: string | null;
+};
+
+export const getConversationMessages = async (
+  conversationId: string,
+  cursor: { before?: string; after?: string } = {},
+  limit: number = 50
+) => {
+  const params = new URLSearchParams();
+  params.set("limit", String(limit));
+  if (cursor.before) params.set("before", cursor.before);
+  if (cursor.after) params.set("after", cursor.after);
+
+  return makeAuthenticatedRequest<TConversationMessagesWindow>(
+    "GET",
+    `/v1/messaging/conversations/${conversationId}/messages/?${params.toString()}`
+  );
+};
+
 export const makeAuthenticatedRequest = async <T>(
   method: Method,
   endpoint: string,
@@ -616,6 +640,8 @@ export type TConversationsResponse = {
   limit: number;
   offset: number;
   has_next: boolean;
+  next_cursor?: string | null;
+  total_is_approximate?: boolean;
   filter_options: {
     users: { id: number; label: string }[];
     whatsapp_lines?: { id: number; label: string }[];
@@ -671,6 +697,33 @@ export const getConversations = async (
   );
 };
 
+export type TConversationSearchHit = {
+  conversation: TConversation;
+  rank: number;
+  message_id: number | null;
+  snippet: string | null;
+};
+
+export const searchConversations = async (
+  query: string,
+  filters: Pick<TConversationFilters, "scope" | "status" | "channel"> = {},
+  limit: number = 20
+) => {
+  const params = new URLSearchParams();
+  params.set("q", query);
+  params.set("scope", filters.scope ?? "org");
+  params.set("limit", String(limit));
+  if (filters.status) params.set("status", filters.status);
+  if (filters.channel && filters.channel !== "all") {
+    params.set("channel", filters.channel);
+  }
+
+  return makeAuthenticatedRequest<{ results: TConversationSearchHit[] }>(
+    "GET",
+    `/v1/messaging/conversations/search/?${params.toString()}`
+  );
+};
+
 export type TConversationStats = {
   total_conversations: number;
   total_messages: number;
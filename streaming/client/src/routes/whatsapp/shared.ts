@@ -80,6 +80,7 @@ export const WHATSAPP_CAPABILITY_NAMES = [
   "list_whatsapp_resources",
   "list_whatsapp_templates",
   "send_ws_template_message",
+  "broadcast_ws_template_message",
   "send_email",
   "list_organization_members",
   "list_organization_roles",
@@ -1,15 +1,37 @@
-"""Django API client for MCP gateway endpoints."""
+"""
+Django API client for MCP gateway endpoints.
+
+Every DjangoMCPClient shares one pooled ``httpx.AsyncClient`` per process
+(HTTP/2 when ``h2`` is installed), so gateway calls reuse open connections
+instead of paying a new handshake each time.
+
+Agent catalogs are cached per bearer token for ``MCP_AGENT_CATALOG_TTL_SEC``.
+Django publishes ``mcp_agents_changed`` on the notifications channel when
+agents or credential allowlists change; ``server.redis_manager`` then calls
+``invalidate_agent_catalogs``.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import os
 import re
+import time
 from typing import Any
 
 import httpx
 
 API_URL = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
 
+MCP_HTTP_MAX_CONNECTIONS = int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "100"))
+MCP_HTTP_MAX_KEEPALIVE = int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "20"))
+MCP_AGENT_CATALOG_TTL_SEC = float(os.getenv("MCP_AGENT_CATALOG_TTL_SEC", "60"))
+# Beyond this many cached bearers, expired entries are pruned on insert.
+MCP_AGENT_CATALOG_MAX_ENTRIES = 1024
+
+_http_client: httpx.AsyncClient | None = None
+_agent_catalogs: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+
 _CONTENT_DISPOSITION_FILENAME = re.compile(r'filename="([^"]+)"')
 
 
@@ -20,6 +42,66 @@ def _filename_from_content_disposition(header: str | None) -> str | None:
     return match.group(1) if match else None
 
 
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client shared by every DjangoMCPClient."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=MCP_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=MCP_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+            timeout=30.0,
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _catalog_key(bearer_token: str) -> str:
+    return hashlib.sha256(bearer_token.encode()).hexdigest()
+
+
+def invalidate_agent_catalogs(bearer_token: str | None = None) -> None:
+    """Drop the cached catalog of one bearer token, or of every token."""
+    if bearer_token is None:
+        _agent_catalogs.clear()
+    else:
+        _agent_catalogs.pop(_catalog_key(bearer_token), None)
+
+
+def _remember_agent_catalog(bearer_token: str, agents: list[dict[str, Any]]) -> None:
+    now = time.monotonic()
+    if len(_agent_catalogs) >= MCP_AGENT_CATALOG_MAX_ENTRIES:
+        for key in [k for k, (expires, _) in _agent_catalogs.items() if expires <= now]:
+            del _agent_catalogs[key]
+        if len(_agent_catalogs) >= MCP_AGENT_CATALOG_MAX_ENTRIES:
+            _agent_catalogs.clear()
+    _agent_catalogs[_catalog_key(bearer_token)] = (now + MCP_AGENT_CATALOG_TTL_SEC, agents)
+
+
+def _cached_agent_catalog(bearer_token: str) -> list[dict[str, Any]] | None:
+    entry = _agent_catalogs.get(_catalog_key(bearer_token))
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return entry[1]
+
+
 class DjangoMCPClient:
     """HTTP client for authenticated MCP gateway endpoints on Django."""
 
@@ -29,14 +111,28 @@ class DjangoMCPClient:
         self._headers = {"Authorization": f"Bearer {bearer_token}"}
 
     async def list_agents(self) -> list[dict[str, Any]]:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(
-                f"{self.api_url}/v1/ai_layers/mcp/agents/",
-                headers=self._headers,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("agents", [])
+        """Fetch the agent catalog from Django and refresh the cached copy."""
+        resp = await get_http_client().get(
+            f"{self.api_url}/v1/ai_layers/mcp/agents/",
+            headers=self._headers,
+            timeout=30.0,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        agents = data.get("agents", [])
+        _remember_agent_catalog(self.bearer_token, agents)
+        return agents
+
+    async def find_agent(self, tool_name: str) -> dict[str, Any] | None:
+        """Agent exposed as ``tool_name``, from the cached catalog when fresh."""
+        agents = _cached_agent_catalog(self.bearer_token)
+        if agents is not None:
+            agent = next((a for a in agents if a.get("tool_name") == tool_name), None)
+            if agent:
+                return agent
+        # Not cached, or a tool newer than the cached catalog.
+        agents = await self.list_agents()
+        return next((a for a in agents if a.get("tool_name") == tool_name), None)
 
     async def run_agent(
         self,
@@ -52,52 +148,52 @@ class DjangoMCPClient:
         if conversation_id:
             payload["conversation_id"] = conversation_id
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.post(
-                f"{self.api_url}/v1/ai_layers/mcp/run/",
-                headers={**self._headers, "Content-Type": "application/json"},
-                json=payload,
-            )
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client().post(
+            f"{self.api_url}/v1/ai_layers/mcp/run/",
+            headers={**self._headers, "Content-Type": "application/json"},
+            json=payload,
+            timeout=60.0,
+        )
+        resp.raise_for_status()
+        return resp.json()
 
     async def get_task_result(self, task_id: str) -> dict[str, Any]:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(
-                f"{self.api_url}/v1/ai_layers/mcp/result/{task_id}/",
-                headers=self._headers,
-            )
-            if resp.status_code == 500:
-                return resp.json()
-            resp.raise_for_status()
+        resp = await get_http_client().get(
+            f"{self.api_url}/v1/ai_layers/mcp/result/{task_id}/",
+            headers=self._headers,
+            timeout=30.0,
+        )
+        if resp.status_code == 500:
             return resp.json()
+        resp.raise_for_status()
+        return resp.json()
 
     async def download_attachment(
         self, attachment_id: str
     ) -> tuple[bytes, str, str | None]:
         """Fetch attachment bytes from the Django MCP gateway."""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.get(
-                f"{self.api_url}/v1/ai_layers/mcp/attachments/{attachment_id}/",
-                headers=self._headers,
-            )
-            if resp.status_code == 404:
-                raise ValueError("Attachment not found")
-            if resp.status_code in (401, 403):
-                raise ValueError("Access denied for this attachment")
-            if resp.status_code == 400:
-                try:
-                    detail = resp.json().get("error", "Attachment is not downloadable")
-                except Exception:
-                    detail = "Attachment is not downloadable"
-                raise ValueError(detail)
-            resp.raise_for_status()
-            content_type = (
-                resp.headers.get("content-type", "application/octet-stream")
-                .split(";")[0]
-                .strip()
-            )
-            filename = _filename_from_content_disposition(
-                resp.headers.get("content-disposition")
-            )
-            return resp.content, content_type, filename
+        resp = await get_http_client().get(
+            f"{self.api_url}/v1/ai_layers/mcp/attachments/{attachment_id}/",
+            headers=self._headers,
+            timeout=60.0,
+        )
+        if resp.status_code == 404:
+            raise ValueError("Attachment not found")
+        if resp.status_code in (401, 403):
+            raise ValueError("Access denied for this attachment")
+        if resp.status_code == 400:
+            try:
+                detail = resp.json().get("error", "Attachment is not downloadable")
+            except Exception:
+                detail = "Attachment is not downloadable"
+            raise ValueError(detail)
+        resp.raise_for_status()
+        content_type = (
+            resp.headers.get("content-type", "application/octet-stream")
+            .split(";")[0]
+            .strip()
+        )
+        filename = _filename_from_content_disposition(
+            resp.headers.get("content-disposition")
+        )
+        return resp.content, content_type, filename
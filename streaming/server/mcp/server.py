@@ -27,12 +27,16 @@ from server.mcp.attachment_content import (
     download_attachment_tool,
 )
 from server.mcp.auth import extract_bearer_from_scope, get_mcp_bearer_token, set_mcp_bearer_token
-from server.mcp.django_client import DjangoMCPClient
+from server.mcp.django_client import DjangoMCPClient, close_http_client
+from server.mcp.task_events import discard_task_waiter, register_task_waiter
 
 logger = logging.getLogger(__name__)
 
-MCP_POLL_INTERVAL_SEC = float(os.getenv("MCP_POLL_INTERVAL_SEC", "2.0"))
 MCP_POLL_TIMEOUT_SEC = float(os.getenv("MCP_POLL_TIMEOUT_SEC", "240"))
+# How often a waiting tool call reports progress to the MCP client.
+MCP_PROGRESS_INTERVAL_SEC = float(os.getenv("MCP_PROGRESS_INTERVAL_SEC", "5"))
+# Completion is pushed (see task_events); this slow check covers a lost event.
+MCP_RESULT_FALLBACK_SEC = float(os.getenv("MCP_RESULT_FALLBACK_SEC", "30"))
 
 
 def _agent_tool_from_payload(agent: dict[str, Any]) -> types.Tool:
@@ -77,8 +81,7 @@ async def _handle_agent_tool(
         raise ValueError("message is required")
 
     conversation_id = (arguments or {}).get("conversation_id")
-    agents = await client.list_agents()
-    agent = next((a for a in agents if a.get("tool_name") == name), None)
+    agent = await client.find_agent(name)
     if not agent:
         raise ValueError(f"Unknown tool: {name}")
 
@@ -100,13 +103,55 @@ async def _handle_agent_tool(
     if not task_id:
         raise ValueError("Agent task was not started")
 
+    result = await _wait_for_task_result(app, client, task_id)
+    status = result.get("status")
+    if status == "failed":
+        err = result.get("error", "Agent task failed")
+        raise RuntimeError(err)
+
+    output = result.get("output", "")
+    conv_id = result.get("conversation_id") or run_resp.get("conversation_id")
+    payload = {
+        "answer": output,
+        "conversation_id": conv_id,
+        "message_id": result.get("message_id"),
+        "task_id": task_id,
+        "attachments": result.get("attachments") or [],
+        "download_hint": (
+            "Open attachments[].download_url (signed, expires in ~1 hour) "
+            "or call download_attachment with attachments[].attachment_id."
+        ),
+    }
+    return [
+        types.TextContent(
+            type="text",
+            text=json.dumps(payload, ensure_ascii=False, indent=2),
+        )
+    ]
+
+
+async def _wait_for_task_result(
+    app: Server, client: DjangoMCPClient, task_id: str
+) -> dict[str, Any]:
+    """
+    Wait for the agent run to finish and return its result.
+
+    The waiter is registered before the first check, so a run that finishes
+    in between is seen by that check and a later one wakes the waiter.
+    """
     ctx = app.request_context
-    elapsed = 0.0
-    while elapsed < MCP_POLL_TIMEOUT_SEC:
+    waiter = register_task_waiter(task_id)
+    try:
+        started = anyio.current_time()
+        last_check = started
         result = await client.get_task_result(task_id)
-        status = result.get("status")
-
-        if status == "pending":
+        while result.get("status") == "pending":
+            now = anyio.current_time()
+            elapsed = now - started
+            if elapsed >= MCP_POLL_TIMEOUT_SEC:
+                raise TimeoutError(
+                    f"Agent task timed out after {int(MCP_POLL_TIMEOUT_SEC)} seconds"
+                )
             if ctx and ctx.session:
                 await ctx.session.send_log_message(
                     level="info",
@@ -114,37 +159,20 @@ async def _handle_agent_tool(
                     logger="masscer-mcp",
                     related_request_id=ctx.request_id,
                 )
-            await anyio.sleep(MCP_POLL_INTERVAL_SEC)
-            elapsed += MCP_POLL_INTERVAL_SEC
-            continue
-
-        if status == "failed":
-            err = result.get("error", "Agent task failed")
-            raise RuntimeError(err)
-
-        output = result.get("output", "")
-        conv_id = result.get("conversation_id") or run_resp.get("conversation_id")
-        payload = {
-            "answer": output,
-            "conversation_id": conv_id,
-            "message_id": result.get("message_id"),
-            "task_id": task_id,
-            "attachments": result.get("attachments") or [],
-            "download_hint": (
-                "Open attachments[].download_url (signed, expires in ~1 hour) "
-                "or call download_attachment with attachments[].attachment_id."
-            ),
-        }
-        return [
-            types.TextContent(
-                type="text",
-                text=json.dumps(payload, ensure_ascii=False, indent=2),
-            )
-        ]
-
-    raise TimeoutError(
-        f"Agent task timed out after {int(MCP_POLL_TIMEOUT_SEC)} seconds"
-    )
+            with anyio.move_on_after(
+                min(MCP_PROGRESS_INTERVAL_SEC, MCP_POLL_TIMEOUT_SEC - elapsed)
+            ):
+                await waiter.wait()
+
+            woken = waiter.is_set()
+            if woken or anyio.current_time() - last_check >= MCP_RESULT_FALLBACK_SEC:
+                if woken:
+                    waiter = register_task_waiter(task_id)
+                last_check = anyio.current_time()
+                result = await client.get_task_result(task_id)
+        return result
+    finally:
+        discard_task_waiter(task_id)
 
 
 def create_mcp_server() -> Server:
@@ -202,5 +230,8 @@ async def handle_streamable_http(scope: Scope, receive: Receive, send: Send) ->
 async def mcp_lifespan() -> AsyncIterator[None]:
     async with _session_manager.run():
         logger.info("Masscer MCP session manager started")
-        yield
-        logger.info("Masscer MCP session manager stopped")
+        try:
+            yield
+        finally:
+            await close_http_client()
+            logger.info("Masscer MCP session manager stopped")
@@ -0,0 +1,36 @@
+"""
+Completion events for MCP-dispatched agent runs.
+
+When a run dispatched through the MCP gateway finishes, Celery publishes
+``mcp_task_finished`` on the Redis notifications channel.
+``server.redis_manager`` passes it to ``notify_task_finished``, which wakes
+the tool call waiting on that task in this process. Every streaming process
+receives the event and ignores task ids it is not waiting on.
+"""
+
+from __future__ import annotations
+
+import anyio
+
+MCP_TASK_FINISHED_EVENT = "mcp_task_finished"
+
+_waiters: dict[str, anyio.Event] = {}
+
+
+def register_task_waiter(task_id: str) -> anyio.Event:
+    """Fresh event set when ``task_id`` finishes; replaces any previous one."""
+    event = anyio.Event()
+    _waiters[task_id] = event
+    return event
+
+
+def discard_task_waiter(task_id: str) -> None:
+    _waiters.pop(task_id, None)
+
+
+def notify_task_finished(task_id: str | None) -> bool:
+    event = _waiters.get(task_id or "")
+    if event is None:
+        return False
+    event.set()
+    return True
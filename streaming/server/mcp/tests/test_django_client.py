@@ -0,0 +1,77 @@
+"""Tests for the pooled Django MCP client and its agent catalog cache."""
+
+from __future__ import annotations
+
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from server.mcp.django_client import DjangoMCPClient, invalidate_agent_catalogs
+
+
+def _agents_response(*tool_names: str) -> Mock:
+    resp = Mock()
+    resp.raise_for_status = Mock()
+    resp.json.return_value = {
+        "agents": [{"tool_name": name, "slug": name[len("ask_"):]} for name in tool_names]
+    }
+    return resp
+
+
+class AgentCatalogCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        invalidate_agent_catalogs()
+        self.http = Mock()
+        self.http.get = AsyncMock(return_value=_agents_response("ask_writer"))
+        patcher = patch("server.mcp.django_client.get_http_client", return_value=self.http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        invalidate_agent_catalogs()
+
+    async def test_tool_lookup_reuses_cached_catalog(self):
+        client = DjangoMCPClient("token-a")
+
+        first = await client.find_agent("ask_writer")
+        second = await DjangoMCPClient("token-a").find_agent("ask_writer")
+
+        self.assertEqual(first["slug"], "writer")
+        self.assertEqual(second["slug"], "writer")
+        self.assertEqual(self.http.get.await_count, 1)
+
+    async def test_catalogs_are_scoped_per_bearer(self):
+        await DjangoMCPClient("token-a").find_agent("ask_writer")
+        await DjangoMCPClient("token-b").find_agent("ask_writer")
+
+        self.assertEqual(self.http.get.await_count, 2)
+
+    async def test_unknown_tool_refetches_catalog(self):
+        client = DjangoMCPClient("token-a")
+        await client.list_agents()
+        self.http.get.return_value = _agents_response("ask_writer", "ask_editor")
+
+        agent = await client.find_agent("ask_editor")
+
+        self.assertEqual(agent["slug"], "editor")
+        self.assertEqual(self.http.get.await_count, 2)
+
+    async def test_invalidation_forces_refetch(self):
+        client = DjangoMCPClient("token-a")
+        await client.find_agent("ask_writer")
+
+        invalidate_agent_catalogs()
+        await client.find_agent("ask_writer")
+
+        self.assertEqual(self.http.get.await_count, 2)
+
+    async def test_expired_catalog_is_refetched(self):
+        client = DjangoMCPClient("token-a")
+        with patch("server.mcp.django_client.MCP_AGENT_CATALOG_TTL_SEC", 0):
+            await client.find_agent("ask_writer")
+        await client.find_agent("ask_writer")
+
+        self.assertEqual(self.http.get.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
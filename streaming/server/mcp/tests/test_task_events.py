@@ -0,0 +1,84 @@
+"""Tests for push-based completion of MCP agent tool calls."""
+
+from __future__ import annotations
+
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import anyio
+
+from server.mcp.server import _wait_for_task_result
+from server.mcp.task_events import (
+    discard_task_waiter,
+    notify_task_finished,
+    register_task_waiter,
+)
+
+
+def _app_without_session() -> Mock:
+    app = Mock()
+    app.request_context = None
+    return app
+
+
+class TaskWaiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_notify_sets_registered_waiter(self):
+        waiter = register_task_waiter("task-1")
+        self.addCleanup(discard_task_waiter, "task-1")
+
+        self.assertTrue(notify_task_finished("task-1"))
+        self.assertTrue(waiter.is_set())
+
+    async def test_notify_ignores_unknown_task(self):
+        self.assertFalse(notify_task_finished("not-waiting"))
+        self.assertFalse(notify_task_finished(None))
+
+
+class WaitForTaskResultTests(unittest.IsolatedAsyncioTestCase):
+    async def test_returns_immediately_when_already_finished(self):
+        client = Mock()
+        client.get_task_result = AsyncMock(return_value={"status": "completed", "output": "hi"})
+
+        result = await _wait_for_task_result(_app_without_session(), client, "task-2")
+
+        self.assertEqual(result["output"], "hi")
+        client.get_task_result.assert_awaited_once_with("task-2")
+
+    async def test_completion_event_wakes_waiting_call(self):
+        client = Mock()
+        client.get_task_result = AsyncMock(
+            side_effect=[{"status": "pending"}, {"status": "completed", "output": "done"}]
+        )
+
+        async def finish_soon():
+            await anyio.sleep(0.05)
+            notify_task_finished("task-3")
+
+        # Long fallback and progress intervals: only the pushed event can end the wait quickly.
+        with patch("server.mcp.server.MCP_PROGRESS_INTERVAL_SEC", 30), patch(
+            "server.mcp.server.MCP_RESULT_FALLBACK_SEC", 60
+        ):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(finish_soon)
+                with anyio.fail_after(5):
+                    result = await _wait_for_task_result(
+                        _app_without_session(), client, "task-3"
+                    )
+
+        self.assertEqual(result["output"], "done")
+        self.assertEqual(client.get_task_result.await_count, 2)
+        self.assertFalse(notify_task_finished("task-3"))
+
+    async def test_times_out_when_task_never_finishes(self):
+        client = Mock()
+        client.get_task_result = AsyncMock(return_value={"status": "pending"})
+
+        with patch("server.mcp.server.MCP_POLL_TIMEOUT_SEC", 0.1), patch(
+            "server.mcp.server.MCP_PROGRESS_INTERVAL_SEC", 0.05
+        ):
+            with self.assertRaises(TimeoutError):
+                await _wait_for_task_result(_app_without_session(), client, "task-4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,15 @@ import asyncio
 import json
 
 CHANNEL_NAME = "notifications"
+# Published by Django when agents or MCP credential allowlists change.
+MCP_AGENTS_CHANGED_EVENT = "mcp_agents_changed"
 
 REDIS_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 r = redis.Redis.from_url(REDIS_URL)
 
 async def listen_to_notifications():
+    from .mcp.django_client import invalidate_agent_catalogs
+    from .mcp.task_events import MCP_TASK_FINISHED_EVENT, notify_task_finished
     from .socket import sio
 
     pubsub = r.pubsub()
@@ -27,6 +31,13 @@ async def listen_to_notifications():
                     route_id_to_emit = decoded_message.get("user_id", None)
                 event_type = decoded_message.get("event_type", None)
 
+                if event_type == MCP_AGENTS_CHANGED_EVENT:
+                    invalidate_agent_catalogs()
+                    continue
+                if event_type == MCP_TASK_FINISHED_EVENT:
+                    notify_task_finished((decoded_message.get("message") or {}).get("task_id"))
+                    continue
+
                 if route_id_to_emit and event_type:
                     route_ids_to_socket_id_raw = r.get("route_id_to_socket_id")
                     if route_ids_to_socket_id_raw is None: